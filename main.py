@@ -25,6 +25,7 @@ sys.path.append(current_dir)
 
 from src.agents.unified.unified_agent import UnifiedAgent
 from src.config.config_loader import config_loader
+from src.infrastructure.monitoring.metrics import get_metrics
 
 
 def setup_logging(debug_mode=False):
@@ -196,6 +197,8 @@ def main():
     parser.add_argument("--config", type=str, help="配置文件路径")
     parser.add_argument("--debug", action="store_true", help="调试模式，显示详细日志")
     parser.add_argument("--no-debug", action="store_true", help="关闭调试模式，仅显示对话信息")
+    parser.add_argument("--metrics-port", type=int, help="在指定端口暴露 Prometheus /metrics 端点（默认读取 METRICS_PORT / monitoring.metrics.port）")
+    parser.add_argument("--dump-metrics", action="store_true", help="退出前打印 Prometheus 格式的指标")
     
     args = parser.parse_args()
     
@@ -209,6 +212,18 @@ def main():
     debug_mode = args.debug and not args.no_debug
     setup_logging(debug_mode)
     
+    # 命令行参数优先，其次是 services.monitoring.metrics.port 配置
+    metrics = get_metrics()
+    metrics_port = args.metrics_port or metrics.port
+    if metrics_port:
+        try:
+            if metrics.start_server(metrics_port):
+                print(f"📊 指标端点: http://localhost:{metrics_port}/metrics")
+            else:
+                print("⚠️  指标采集未启用（需要安装 prometheus-client 并开启 monitoring.metrics.enabled）")
+        except OSError as e:
+            print(f"⚠️  指标端点启动失败（端口 {metrics_port}）: {e}")
+    
     try:
         # 创建智能体（传入streaming_style参数）
         agent = UnifiedAgent(
@@ -228,6 +243,9 @@ def main():
     except Exception as e:
         print(f"初始化智能体失败: {str(e)}")
         sys.exit(1)
+    finally:
+        if args.dump_metrics:
+            print(metrics.render().decode("utf-8"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+缓存编解码基准测试
+
+用与核心服务写入 Redis 相同结构的数据（会话/任务字典、带 datetime 的消息字典、
+工具结果、Redis 对话历史）比较各编码方式和压缩方式的编码耗时、解码耗时和体积。
+
+用法:
+    python scripts/benchmarks/cache_codecs.py [--rows 200] [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.infrastructure.cache.codecs import (  # noqa: E402
+    MSGPACK_AVAILABLE,
+    ZSTD_AVAILABLE,
+    LZ4_AVAILABLE,
+    CacheSerializer
+)
+
+
+def build_payloads(rows: int) -> dict:
+    """构造与线上缓存内容结构一致的样本数据"""
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    sessions = {
+        f"session_{i}": {
+            "id": f"session_{i}",
+            "user_id": f"user_{i % 50}",
+            "title": f"供应链咨询 {i}",
+            "status": "active",
+            "message_count": i % 30,
+            "metadata": {"provider": "siliconflow", "tags": ["inventory", "forecast"]},
+            "created_at": (now + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(rows)
+    }
+    messages = {
+        f"msg_{i}": {
+            "id": f"msg_{i}",
+            "session_id": f"session_{i % 20}",
+            "content": "请分析华东仓库本周的库存周转情况，并给出补货建议。" * 3,
+            "type": "user" if i % 2 else "assistant",
+            "parent_id": f"msg_{i - 1}" if i else None,
+            "created_at": now + timedelta(seconds=i),
+            "updated_at": now + timedelta(seconds=i),
+        }
+        for i in range(rows)
+    }
+    tool_result = {
+        "result": json.dumps(
+            {"sku": [f"SKU-{i:05d}" for i in range(rows)], "forecast": [300.5 + i for i in range(rows)]},
+            ensure_ascii=False
+        )
+    }
+    chat_history = json.dumps(
+        [{"type": "human" if i % 2 else "ai", "content": f"第{i}轮对话内容：库存、采购与物流安排。"} for i in range(rows)],
+        ensure_ascii=False
+    )
+    return {
+        "sessions(dict)": sessions,
+        "messages(datetime)": messages,
+        "tool_result": tool_result,
+        "chat_history(str)": chat_history,
+    }
+
+
+def build_serializers() -> dict:
+    """待比较的编解码配置"""
+    serializers = {
+        "pickle": CacheSerializer(codec="pickle"),
+        "json": CacheSerializer(codec="json"),
+        "json+zlib": CacheSerializer(codec="json", compression="zlib"),
+    }
+    if MSGPACK_AVAILABLE:
+        serializers["msgpack"] = CacheSerializer(codec="msgpack")
+    if ZSTD_AVAILABLE:
+        serializers["auto+zstd"] = CacheSerializer(codec="auto", compression="zstd")
+    if LZ4_AVAILABLE:
+        serializers["auto+lz4"] = CacheSerializer(codec="auto", compression="lz4")
+    return serializers
+
+
+def legacy_encode(value) -> bytes:
+    """改造前 RedisCacheService.set 的序列化方式"""
+    if isinstance(value, (str, int, float, bool)):
+        return str(value).encode("utf-8")
+    return pickle.dumps(value)
+
+
+def legacy_decode(data: bytes):
+    """改造前 RedisCacheService.get 的反序列化方式"""
+    try:
+        return pickle.loads(data)
+    except (pickle.UnpicklingError, AttributeError, EOFError, ImportError):
+        try:
+            return json.loads(data)
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return data.decode("utf-8")
+
+
+def bench(encode, decode, value, repeat: int):
+    data = encode(value)
+    encode_us = min(timeit.repeat(lambda: encode(value), number=repeat, repeat=3)) / repeat * 1e6
+    decode_us = min(timeit.repeat(lambda: decode(data), number=repeat, repeat=3)) / repeat * 1e6
+    return len(data), encode_us, decode_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缓存编解码基准测试")
+    parser.add_argument("--rows", type=int, default=200, help="每份样本的记录数")
+    parser.add_argument("--repeat", type=int, default=200, help="每项测量的循环次数")
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.rows)
+    serializers = build_serializers()
+
+    print(f"{'payload':<22}{'codec':<12}{'bytes':>10}{'encode µs':>12}{'decode µs':>12}")
+    for payload_name, value in payloads.items():
+        rows = [("legacy", *bench(legacy_encode, legacy_decode, value, args.repeat))]
+        for name, serializer in serializers.items():
+            rows.append((name, *bench(serializer.encode, serializer.decode, value, args.repeat)))
+        for name, size, encode_us, decode_us in rows:
+            print(f"{payload_name:<22}{name:<12}{size:>10}{encode_us:>12.1f}{decode_us:>12.1f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
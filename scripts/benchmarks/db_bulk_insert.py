@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+数据库批量写入基准测试
+
+比较逐行 insert、insert_many（不同批次大小）和 upsert_many 的写入耗时。
+默认使用临时 SQLite 文件；指定 --postgres 时使用 POSTGRES_* 环境变量连接 PostgreSQL，
+并额外比较 executemany 与 COPY 两种路径。
+
+用法:
+    python scripts/benchmarks/db_bulk_insert.py [--rows 5000] [--batch-sizes 100,1000,5000]
+    POSTGRES_USER=... POSTGRES_PASSWORD=... python scripts/benchmarks/db_bulk_insert.py --postgres
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.infrastructure.database.database_service import (  # noqa: E402
+    DatabaseService,
+    PostgreSQLService,
+    SQLiteService
+)
+
+TABLE = "bench_sessions"
+
+
+def build_rows(count: int) -> List[Dict[str, Any]]:
+    """构造与历史会话导入结构一致的样本行"""
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    return [
+        {
+            "id": f"session_{i}",
+            "user_id": f"user_{i % 50}",
+            "agent_id": f"agent_{i % 5}",
+            "title": f"供应链咨询 {i}",
+            "status": "active" if i % 3 else "closed",
+            "created_at": (now + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+async def reset_table(db: DatabaseService) -> None:
+    await db.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    await db.execute(
+        f"CREATE TABLE {TABLE} (id TEXT PRIMARY KEY, user_id TEXT, agent_id TEXT, "
+        f"title TEXT, status TEXT, created_at TEXT)"
+    )
+
+
+async def timed(db: DatabaseService, action: Callable[[], Awaitable[Any]]) -> float:
+    """在空表上执行一次写入并返回耗时（秒）"""
+    await reset_table(db)
+    start = time.perf_counter()
+    await action()
+    return time.perf_counter() - start
+
+
+async def run_cases(db: DatabaseService, rows: List[Dict[str, Any]], batch_sizes: List[int]) -> Dict[str, float]:
+    results = {}
+
+    async def row_by_row():
+        for row in rows:
+            await db.insert(TABLE, row)
+
+    results["insert (逐行)"] = await timed(db, row_by_row)
+    for size in batch_sizes:
+        results[f"insert_many batch={size}"] = await timed(db, lambda size=size: db.insert_many(TABLE, rows, size))
+
+    if isinstance(db, PostgreSQLService):
+        db.use_copy = False
+        results[f"insert_many executemany batch={db.batch_size}"] = await timed(db, lambda: db.insert_many(TABLE, rows))
+        db.use_copy = True
+
+    # 在已有数据上整体更新一遍
+    async def upsert():
+        await db.insert_many(TABLE, rows)
+        start = time.perf_counter()
+        await db.upsert_many(TABLE, [{**row, "status": "closed"} for row in rows], ["id"])
+        return time.perf_counter() - start
+
+    await reset_table(db)
+    results["upsert_many（全部冲突）"] = await upsert()
+    return results
+
+
+def print_results(title: str, rows: int, results: Dict[str, float]) -> None:
+    print(f"\n{title}（{rows} 行）")
+    print(f"{'方式':<40}{'耗时(ms)':>12}{'行/秒':>14}")
+    for name, seconds in results.items():
+        print(f"{name:<40}{seconds * 1000:>12.1f}{rows / seconds:>14.0f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="数据库批量写入基准测试")
+    parser.add_argument("--rows", type=int, default=5000, help="写入行数")
+    parser.add_argument("--batch-sizes", default="100,1000,5000", help="insert_many 的批次大小，逗号分隔")
+    parser.add_argument("--postgres", action="store_true", help="使用 POSTGRES_* 环境变量连接 PostgreSQL")
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows)
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",") if size]
+
+    if args.postgres:
+        db = PostgreSQLService(
+            host=os.getenv("POSTGRES_HOST", "localhost"),
+            port=int(os.getenv("POSTGRES_PORT", "5432")),
+            database=os.getenv("POSTGRES_DB", "trae_agents"),
+            username=os.getenv("POSTGRES_USER", ""),
+            password=os.getenv("POSTGRES_PASSWORD", "")
+        )
+        title = "PostgreSQL"
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix="bench_db_"), "bench.db")
+        db = SQLiteService(path)
+        title = f"SQLite ({path})"
+
+    try:
+        await db.connect()
+        results = await run_cases(db, rows, batch_sizes)
+        await db.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    finally:
+        await db.disconnect()
+    print_results(title, args.rows, results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
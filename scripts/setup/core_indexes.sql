@@ -0,0 +1,15 @@
+-- 核心服务查询索引
+-- MessageService/SessionService/TaskService 的列表查询都下推为 WHERE/ORDER BY/LIMIT，
+-- 以下索引覆盖这些查询条件（PostgreSQL 与 SQLite 通用）
+
+-- 会话消息按时间顺序分页
+CREATE INDEX IF NOT EXISTS idx_messages_session_created ON messages (session_id, created_at);
+
+-- 按用户、智能体查询会话，以及按状态筛选活跃会话
+CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_agent ON sessions (agent_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_status_user ON sessions (status, user_id);
+
+-- 按智能体、状态查询任务
+CREATE INDEX IF NOT EXISTS idx_tasks_agent ON tasks (agent_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_agent ON tasks (status, agent_id);
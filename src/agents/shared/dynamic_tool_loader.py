@@ -206,7 +206,14 @@ class DynamicToolLoader:
         if not factory:
             raise ToolLoaderError(f"No factory for tool type: {config.type}")
         
-        return factory.create_tool(config)
+        tool = factory.create_tool(config)
+        
+        # 确定性工具按输入指纹缓存结果
+        if getattr(config, 'memoize', False):
+            from .tool_memoization import get_tool_memoizer
+            tool = get_tool_memoizer().wrap_tool(tool, ttl=config.memoize_ttl)
+        
+        return tool
     
     def get_available_tool_types(self) -> List[ToolType]:
         """获取支持的工具类型"""
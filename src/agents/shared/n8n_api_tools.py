@@ -2,28 +2,79 @@
 N8N API 工具包 - 完整功能版本
 直接通过 n8n REST API 操作工作流，支持创建、更新、删除、执行等完整功能
 参考: https://github.com/czlonkowski/n8n-mcp
+
+所有工具共享同一个基于 httpx 的异步客户端（按 API 地址和 Key 复用），
+连接保持长连接，并发请求数有上限，429/5xx 自动指数退避重试，相同的 GET 请求合并为一次。
 """
 
 import os
 import json
+import copy
+import random
+import asyncio
+import atexit
 import logging
-import requests
-from typing import Dict, Any, List, Optional
+import threading
+import httpx
+from typing import Dict, Any, List, Optional, Iterator, AsyncIterator, Awaitable, Tuple
 from datetime import datetime
 from langchain.tools import BaseTool
 from pydantic import Field
 
+from src.shared.exceptions import ExternalServiceError
+from .n8n_workflow_catalog import get_workflow_catalog
+from .n8n_workflow_templates import WorkflowTemplate, get_workflow_template_store
+from .n8n_design_stream import WorkflowDesignStreamError, WorkflowDesignStreamParser
+from .n8n_node_registry import get_node_registry
+
+
+class N8NAPIError(ExternalServiceError):
+    """N8N API 错误"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(f"N8N API 错误: {message}", error_code=str(status_code) if status_code else None)
+        self.status_code = status_code
+
 
 class N8NAPIClient:
-    """N8N API 客户端"""
-    
-    def __init__(self, api_url: str = None, api_key: str = None):
+    """
+    N8N API 客户端
+
+    请求在客户端自有的后台事件循环上通过 httpx.AsyncClient 发送，
+    同步方法（供 LangChain 工具的 _run 使用）和 a 前缀的异步方法共享同一个连接池。
+    """
+
+    # 可以安全重试的 HTTP 方法；POST 只在请求未被处理（429 或连接失败）时重试
+    IDEMPOTENT_METHODS = frozenset({"GET", "PUT", "DELETE"})
+    RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+    # n8n 公共 API 单页最大条数
+    MAX_PAGE_SIZE = 250
+
+    def __init__(
+        self,
+        api_url: str = None,
+        api_key: str = None,
+        timeout: float = 30.0,
+        max_connections: int = 20,
+        max_concurrency: int = 10,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
         """
         初始化 N8N API 客户端
         
         Args:
             api_url: N8N API URL (默认从环境变量读取)
             api_key: N8N API Key (默认从环境变量读取)
+            timeout: 单次请求超时（秒）
+            max_connections: 连接池最大连接数（同时也是保持长连接的上限）
+            max_concurrency: 同时在途的请求数上限
+            max_retries: 429/5xx/连接错误的最大重试次数
+            backoff_base: 指数退避的初始等待时间（秒）
+            backoff_max: 单次退避的最长等待时间（秒）
+            transport: 自定义 httpx 传输层（测试时可传入 httpx.MockTransport）
         """
         self.api_url = (api_url or os.getenv("N8N_API_URL", "http://localhost:5678")).rstrip('/')
         self.api_key = api_key or os.getenv("N8N_API_KEY", "")
@@ -32,50 +83,243 @@ class N8NAPIClient:
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
         self.logger = logging.getLogger(__name__)
-    
+
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[Tuple[str, Tuple], asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "coalesced": 0, "errors": 0}
+
+    # ---------------------------------------------------------------- 事件循环
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """启动客户端专用的后台事件循环（httpx.AsyncClient 绑定在该循环上）"""
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="n8n-api-client", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def _run_sync(self, coro: Awaitable[Any]) -> Any:
+        """在后台事件循环上执行协程并阻塞等待结果"""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("不能在 N8N 客户端事件循环内调用同步方法，请使用 a 前缀的异步方法")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def _run_async(self, coro: Awaitable[Any]) -> Any:
+        """在后台事件循环上执行协程，调用方可以处于任意事件循环"""
+        loop = self._ensure_loop()
+        try:
+            if asyncio.get_running_loop() is loop:
+                return await coro
+        except RuntimeError:
+            pass
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """延迟创建 httpx 客户端（必须在后台事件循环内调用）"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.api_url}/api/v1",
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                transport=self._transport
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    # ---------------------------------------------------------------- 请求
+
     def _request(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
         """
-        发送 HTTP 请求到 N8N API
+        发送 HTTP 请求到 N8N API（同步）
         
         Args:
             method: HTTP 方法
             endpoint: API 端点
-            **kwargs: 其他请求参数
+            **kwargs: 其他请求参数（params、json）
             
         Returns:
             API 响应
         """
-        url = f"{self.api_url}/api/v1{endpoint}"
-        
+        return self._run_sync(self._dispatch(method, endpoint, **kwargs))
+
+    async def arequest(self, method: str, endpoint: str, **kwargs) -> Dict[str, Any]:
+        """发送 HTTP 请求到 N8N API（异步）"""
+        return await self._run_async(self._dispatch(method, endpoint, **kwargs))
+
+    async def _dispatch(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        json: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """相同的 GET 请求在途时合并为一次，其余请求直接发送"""
+        method = method.upper()
+        if method != "GET":
+            return await self._send(method, endpoint, params, json)
+
+        key = (endpoint, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["coalesced"] += 1
+            # 各调用方拿到独立副本，避免相互修改
+            return copy.deepcopy(await asyncio.shield(inflight))
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
         try:
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=self.headers,
-                timeout=30,
-                **kwargs
-            )
-            response.raise_for_status()
-            
-            # 处理空响应
-            if not response.content:
-                return {"success": True}
-            
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"N8N API 请求失败: {e}")
-            error_msg = str(e)
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    error_msg = error_data.get('message', error_msg)
-                except (ValueError, KeyError, AttributeError) as json_err:
-                    # JSON 解析失败，使用原始错误消息
-                    pass
-            raise Exception(f"N8N API 错误: {error_msg}")
-    
+            result = await self._send(method, endpoint, params, json)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        json: Optional[Any]
+    ) -> Dict[str, Any]:
+        """发送请求，429/5xx 与连接错误按指数退避重试"""
+        client = self._get_client()
+        idempotent = method in self.IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    self._stats["requests"] += 1
+                    response = await client.request(method, endpoint, params=params, json=json)
+            except httpx.TransportError as e:
+                # 非幂等请求只在连接尚未建立时重试，避免重复创建/执行
+                retryable = idempotent or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if not retryable or attempt >= self.max_retries:
+                    self._stats["errors"] += 1
+                    self.logger.error(f"N8N API 请求失败: {method} {endpoint}: {e}")
+                    raise N8NAPIError(str(e) or e.__class__.__name__) from e
+            else:
+                status = response.status_code
+                if status < 400:
+                    # 处理空响应
+                    if not response.content:
+                        return {"success": True}
+                    return response.json()
+
+                retryable = status in self.RETRY_STATUS_CODES and (idempotent or status == 429)
+                if not retryable or attempt >= self.max_retries:
+                    self._stats["errors"] += 1
+                    message = self._error_message(response)
+                    self.logger.error(f"N8N API 请求失败: {method} {endpoint}: {status} {message}")
+                    raise N8NAPIError(message, status)
+                retry_after = self._retry_after(response)
+
+            delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.backoff_max))
+            attempt += 1
+            self._stats["retries"] += 1
+            self.logger.warning(f"N8N API 请求重试 {attempt}/{self.max_retries}: {method} {endpoint}，{delay:.2f}s 后重试")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _error_message(response: httpx.Response) -> str:
+        """从错误响应中提取 n8n 的错误信息"""
+        try:
+            return response.json().get('message') or f"HTTP {response.status_code}"
+        except (ValueError, AttributeError):
+            return response.text or f"HTTP {response.status_code}"
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        """解析 Retry-After 头（仅支持秒数形式）"""
+        value = response.headers.get("Retry-After")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    # ---------------------------------------------------------------- 分页
+
+    def _iter_pages(self, endpoint: str, params: Dict[str, Any], page_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """按 nextCursor 逐页获取（同步）"""
+        params = {**params, "limit": min(page_size, self.MAX_PAGE_SIZE)}
+        while True:
+            page = self._request("GET", endpoint, params=params)
+            yield page.get('data', [])
+            cursor = page.get('nextCursor')
+            if not cursor:
+                return
+            params = {**params, "cursor": cursor}
+
+    async def _aiter_pages(self, endpoint: str, params: Dict[str, Any], page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """按 nextCursor 逐页获取（异步）"""
+        params = {**params, "limit": min(page_size, self.MAX_PAGE_SIZE)}
+        while True:
+            page = await self.arequest("GET", endpoint, params=params)
+            yield page.get('data', [])
+            cursor = page.get('nextCursor')
+            if not cursor:
+                return
+            params = {**params, "cursor": cursor}
+
+    @staticmethod
+    def _workflow_params(active: Optional[bool]) -> Dict[str, Any]:
+        return {} if active is None else {"active": str(active).lower()}
+
+    @staticmethod
+    def _execution_params(workflow_id: Optional[str]) -> Dict[str, Any]:
+        return {"workflowId": workflow_id} if workflow_id else {}
+
+    def iter_workflows(self, active: bool = None, page_size: int = 100) -> Iterator[Dict[str, Any]]:
+        """逐条遍历工作流，按需翻页"""
+        for page in self._iter_pages("/workflows", self._workflow_params(active), page_size):
+            yield from page
+
+    async def aiter_workflows(self, active: bool = None, page_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """逐条遍历工作流，按需翻页（异步）"""
+        async for page in self._aiter_pages("/workflows", self._workflow_params(active), page_size):
+            for workflow in page:
+                yield workflow
+
+    def iter_executions(self, workflow_id: str = None, page_size: int = 100) -> Iterator[Dict[str, Any]]:
+        """逐条遍历执行记录，按需翻页"""
+        for page in self._iter_pages("/executions", self._execution_params(workflow_id), page_size):
+            yield from page
+
+    async def aiter_executions(self, workflow_id: str = None, page_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """逐条遍历执行记录，按需翻页（异步）"""
+        async for page in self._aiter_pages("/executions", self._execution_params(workflow_id), page_size):
+            for execution in page:
+                yield execution
+
+    # ---------------------------------------------------------------- 工作流
+
     def create_workflow(self, workflow: Dict[str, Any]) -> Dict[str, Any]:
         """创建工作流"""
         return self._request("POST", "/workflows", json=workflow)
@@ -93,12 +337,8 @@ class N8NAPIClient:
         return self._request("DELETE", f"/workflows/{workflow_id}")
     
     def list_workflows(self, active: bool = None) -> List[Dict[str, Any]]:
-        """列出所有工作流"""
-        params = {}
-        if active is not None:
-            params['active'] = str(active).lower()
-        response = self._request("GET", "/workflows", params=params)
-        return response.get('data', [])
+        """列出所有工作流（跟随分页取完全部结果）"""
+        return list(self.iter_workflows(active=active))
     
     def activate_workflow(self, workflow_id: str) -> Dict[str, Any]:
         """激活工作流"""
@@ -114,12 +354,80 @@ class N8NAPIClient:
         return self._request("POST", f"/workflows/{workflow_id}/execute", json=payload)
     
     def get_executions(self, workflow_id: str = None, limit: int = 20) -> List[Dict[str, Any]]:
-        """获取执行历史"""
-        params = {"limit": limit}
-        if workflow_id:
-            params['workflowId'] = workflow_id
-        response = self._request("GET", "/executions", params=params)
-        return response.get('data', [])
+        """获取最近 limit 条执行历史"""
+        executions = []
+        for execution in self.iter_executions(workflow_id, page_size=limit):
+            executions.append(execution)
+            if len(executions) >= limit:
+                break
+        return executions
+
+    async def acreate_workflow(self, workflow: Dict[str, Any]) -> Dict[str, Any]:
+        """创建工作流（异步）"""
+        return await self.arequest("POST", "/workflows", json=workflow)
+
+    async def aget_workflow(self, workflow_id: str) -> Dict[str, Any]:
+        """获取工作流（异步）"""
+        return await self.arequest("GET", f"/workflows/{workflow_id}")
+
+    async def aupdate_workflow(self, workflow_id: str, workflow: Dict[str, Any]) -> Dict[str, Any]:
+        """更新工作流（异步）"""
+        return await self.arequest("PUT", f"/workflows/{workflow_id}", json=workflow)
+
+    async def adelete_workflow(self, workflow_id: str) -> Dict[str, Any]:
+        """删除工作流（异步）"""
+        return await self.arequest("DELETE", f"/workflows/{workflow_id}")
+
+    async def aexecute_workflow(self, workflow_id: str, data: Dict[str, Any] = None) -> Dict[str, Any]:
+        """执行工作流（异步）"""
+        return await self.arequest("POST", f"/workflows/{workflow_id}/execute", json={"data": data or {}})
+
+    # ---------------------------------------------------------------- 生命周期
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取请求统计（发送次数、重试次数、合并次数、失败次数）"""
+        return {**self._stats, "inflight": len(self._inflight)}
+
+    def close(self) -> None:
+        """关闭连接池并停止后台事件循环"""
+        with self._loop_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+        if self._client is not None:
+            client, self._client = self._client, None
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+_clients: Dict[Tuple[str, str], N8NAPIClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_n8n_client(api_url: str = None, api_key: str = None) -> N8NAPIClient:
+    """获取共享的 N8N API 客户端（相同的 API 地址和 Key 复用同一个连接池）"""
+    api_url = (api_url or os.getenv("N8N_API_URL", "http://localhost:5678")).rstrip('/')
+    api_key = api_key or os.getenv("N8N_API_KEY", "")
+    with _clients_lock:
+        client = _clients.get((api_url, api_key))
+        if client is None:
+            client = _clients[(api_url, api_key)] = N8NAPIClient(api_url, api_key)
+        return client
+
+
+def close_n8n_clients() -> None:
+    """关闭所有共享的 N8N API 客户端"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+atexit.register(close_n8n_clients)
 
 
 class N8NCreateWorkflowTool(BaseTool):
@@ -157,7 +465,7 @@ class N8NCreateWorkflowTool(BaseTool):
             api_key=api_key or os.getenv("N8N_API_KEY", ""),
             **kwargs
         )
-        object.__setattr__(self, 'client', N8NAPIClient(self.api_url, self.api_key))
+        object.__setattr__(self, 'client', get_n8n_client(self.api_url, self.api_key))
         object.__setattr__(self, 'logger', logging.getLogger(__name__))
     
     def _run(self, workflow_json: str = None, name: str = None, **kwargs) -> str:
@@ -212,6 +520,7 @@ class N8NCreateWorkflowTool(BaseTool):
             
             # 创建工作流
             result = self.client.create_workflow(workflow)
+            get_workflow_catalog(self.client).upsert(result)
             
             return json.dumps({
                 "success": True,
@@ -298,13 +607,24 @@ AI 对话场景:
             api_key=api_key or os.getenv("N8N_API_KEY", ""),
             **kwargs
         )
-        object.__setattr__(self, 'client', N8NAPIClient(self.api_url, self.api_key))
+        object.__setattr__(self, 'client', get_n8n_client(self.api_url, self.api_key))
         object.__setattr__(self, 'logger', logging.getLogger(__name__))
     
     def _generate_workflow_with_llm(self, description: str, max_retries: int = 3) -> Dict[str, Any]:
         """使用 LLM 智能生成工作流结构，支持自动重试和校正"""
         from src.infrastructure.llm.llm_factory import LLMFactory
         
+        # 相同需求直接复用模板库中已校验的设计；相似需求的设计只作为 few-shot 示例交给 LLM
+        template_store = get_workflow_template_store()
+        match = template_store.lookup(description)
+        if match.hit:
+            design = template_store.reuse(match)
+            if self._validate_workflow_design(design) is None:
+                self.logger.info("♻️ 复用相同需求的工作流模板，跳过 LLM 生成")
+                return self._convert_design_to_n8n(design, description)
+            template_store.forget(match.template.id)
+        example = match.seed
+        
         self.logger.info(f"使用 LLM 生成工作流: {description}")
         
         # 创建 LLM 实例
@@ -316,30 +636,36 @@ AI 对话场景:
         for attempt in range(max_retries):
             try:
                 # 根据重试次数调整 prompt
-                prompt = self._build_workflow_prompt(description, attempt, last_error, last_response)
+                prompt = self._build_workflow_prompt(description, attempt, last_error, last_response, example)
                 
                 self.logger.info(f"LLM 生成尝试 {attempt + 1}/{max_retries}")
                 
-                # 调用 LLM 生成设计
-                response = llm.invoke(prompt)
-                design_text = response.content if hasattr(response, 'content') else str(response)
-                last_response = design_text
-                
-                # 清理可能的 markdown 代码块
-                design_text = self._clean_json_response(design_text)
-                
-                # 解析 LLM 的设计
-                design = json.loads(design_text)
+                # 流式接收设计，nodes/connections 的每个元素到达时即校验，出错立即停止生成
+                parser = WorkflowDesignStreamParser(self._validate_design_item)
+                for chunk in self._stream_llm(llm, prompt):
+                    if parser.feed(chunk):
+                        break
+                last_response = parser.text
+                design = parser.result()
                 
-                # 验证设计的有效性
+                # 验证设计的整体有效性（节点数量、必需字段等）
                 validation_error = self._validate_workflow_design(design)
                 if validation_error:
                     raise ValueError(f"工作流设计验证失败: {validation_error}")
                 
                 # 将设计转换为 n8n 格式
                 self.logger.info(f"✅ LLM 成功生成工作流（尝试 {attempt + 1}）")
+                template_store.add(description, design, match.embedding, llm_calls=attempt + 1)
                 return self._convert_design_to_n8n(design, description)
                 
+            except WorkflowDesignStreamError as e:
+                kind = "JSON 解析错误" if e.kind == "json" else "验证错误"
+                last_error = f"{kind}: {str(e)}"
+                last_response = e.partial
+                self.logger.warning(f"尝试 {attempt + 1} 失败（已接收 {parser.consumed} 个字符后停止生成）: {last_error}")
+                if attempt == max_retries - 1:
+                    raise Exception(f"LLM 多次尝试后生成的工作流仍不符合要求: {last_error}")
+                
             except json.JSONDecodeError as e:
                 last_error = f"JSON 解析错误: {str(e)}"
                 self.logger.warning(f"尝试 {attempt + 1} 失败: {last_error}")
@@ -360,7 +686,19 @@ AI 对话场景:
         
         raise Exception("LLM 生成工作流失败：超过最大重试次数")
     
-    def _build_workflow_prompt(self, description: str, attempt: int, last_error: str = None, last_response: str = None) -> str:
+    def _stream_llm(self, llm: Any, prompt: str) -> Iterator[str]:
+        """逐块产出 LLM 输出；调用方停止迭代时流式请求随之关闭"""
+        if not hasattr(llm, "stream"):
+            response = llm.invoke(prompt)
+            yield response.content if hasattr(response, 'content') else str(response)
+            return
+        for chunk in llm.stream(prompt):
+            content = chunk.content if hasattr(chunk, 'content') else str(chunk)
+            if content:
+                yield content
+    
+    def _build_workflow_prompt(self, description: str, attempt: int, last_error: str = None, last_response: str = None,
+                               example: Optional[WorkflowTemplate] = None) -> str:
         """根据重试次数和错误信息构建优化的 prompt"""
         
         base_prompt = f"""你是一个 n8n 工作流设计专家。根据用户需求设计一个简洁但完整的工作流。
@@ -376,46 +714,7 @@ AI 对话场景:
 
 📋 常用节点类型：
 
-【触发器类】（第一个节点必须是这些之一）
-- webhook: Webhook 触发器 ⭐ 推荐用于对话/API场景
-- manualTrigger: 手动触发 ⭐ 推荐用于测试
-- scheduleTrigger: 定时触发（Cron 表达式）
-- emailTrigger: 邮件触发
-
-【AI/智能类】⭐ 核心节点
-- aiAgent: AI Agent 智能体
-  * 功能：调用 LLM 执行复杂 AI 任务
-  * 用途：对话、分析、决策、问答、内容生成、总结、翻译等
-  * 配置：需设置 model（如 gpt-4）、prompt、tools
-  * ⭐ 对话场景必选节点！
-  
-- chatOpenAI: OpenAI 聊天 API
-- chatAnthropic: Claude 聊天 API
-- embeddings: 文本向量化
-- vectorStore: 向量数据库（RAG）
-- memoryManager: 对话记忆管理 ⭐ 多轮对话必选
-
-【数据处理类】
-- set: 设置/转换数据 ⭐ 常用
-- code: JavaScript 代码 ⭐ 灵活
-- if: 条件判断
-- switch: 多路分支
-- filter: 过滤数据
-- merge: 合并数据流
-- aggregate: 聚合数据
-
-【HTTP/API 类】
-- httpRequest: HTTP API 调用 ⭐ 调用外部服务
-
-【数据库类】
-- postgres: PostgreSQL
-- mongodb: MongoDB
-- redis: Redis 缓存 ⭐ 存储会话
-
-【响应类】
-- respondToWebhook: Webhook 响应 ⭐ 对话场景必选
-- emailSend: 发送邮件
-- slack: Slack 通知
+{get_node_registry().render_prompt_section()}
 
 ⭐⭐⭐ 场景模板 ⭐⭐⭐
 
@@ -471,6 +770,13 @@ AI 对话场景:
 - 所有大括号、方括号必须正确配对
 - 不要在 JSON 中使用注释"""
         
+        # 相似需求已校验的设计作为参考示例，节点和参数需按本次需求调整
+        if example is not None:
+            base_prompt += f"""
+
+📎 参考示例（相似需求「{example.description}」的已校验设计，仅供参考，请按本次需求调整节点、参数和数量）：
+{json.dumps(example.design, ensure_ascii=False)}"""
+        
         # 如果是重试，添加错误反馈
         if attempt > 0 and last_error:
             base_prompt += f"""
@@ -478,8 +784,8 @@ AI 对话场景:
 ❌ 上次生成失败，错误信息：
 {last_error}
 
-上次的响应：
-{last_response[:500] if last_response else "无"}
+上次的响应（末尾部分，出错时生成已被中断）：
+{last_response[-500:] if last_response else "无"}
 
 请修正以上错误，重新生成正确的 JSON。"""
         
@@ -504,29 +810,11 @@ AI 对话场景:
 3. 必须包含 connections 数组
 4. 第一个节点必须是触发器类型
 5. 每个节点必须有 name 和 type 字段
-6. connections 中的节点名称必须在 nodes 中存在"""
+6. connections 中的节点名称必须在 nodes 中存在
+7. 节点 type 必须是上面列出的节点类型之一"""
         
         return base_prompt
     
-    def _clean_json_response(self, text: str) -> str:
-        """清理 LLM 响应中的非 JSON 内容"""
-        text = text.strip()
-        
-        # 移除 markdown 代码块
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
-        
-        # 移除可能的前后说明文字
-        # 查找第一个 { 和最后一个 }
-        start = text.find('{')
-        end = text.rfind('}')
-        if start != -1 and end != -1:
-            text = text[start:end+1]
-        
-        return text.strip()
-    
     def _validate_workflow_design(self, design: Dict) -> str:
         """验证工作流设计的有效性，返回错误信息或 None"""
         
@@ -543,59 +831,82 @@ AI 对话场景:
         if "connections" not in design or not isinstance(design["connections"], list):
             return "缺少 connections 数组或格式错误"
         
-        # 检查第一个节点是否为触发器
-        first_node = design["nodes"][0]
-        if "type" not in first_node:
-            return "第一个节点缺少 type 字段"
-        
-        first_node_type = first_node["type"].lower()
-        # webhook、manualTrigger、scheduleTrigger 等都是触发器类型
-        trigger_keywords = ["trigger", "manual", "webhook", "schedule", "cron"]
-        is_trigger = any(keyword in first_node_type for keyword in trigger_keywords)
-        
-        if not is_trigger:
-            return f"第一个节点必须是触发器类型（trigger/webhook/manual），但得到: {first_node['type']}"
-        
-        # 检查所有节点是否有必需字段
+        # 检查所有节点是否有必需字段（第一个节点必须是触发器）
         node_names = set()
         for i, node in enumerate(design["nodes"]):
-            if "name" not in node:
-                return f"节点 {i} 缺少 name 字段"
-            if "type" not in node:
-                return f"节点 {i} ({node.get('name')}) 缺少 type 字段"
+            error = self._validate_design_node(i, node)
+            if error:
+                return error
             node_names.add(node["name"])
         
         # 检查 connections 是否引用了存在的节点
         for conn in design["connections"]:
-            if "from" not in conn or "to" not in conn:
-                return f"连接缺少 from 或 to 字段: {conn}"
+            error = self._validate_design_connection(conn, node_names)
+            if error:
+                return error
+        
+        return None  # 验证通过
+    
+    def _validate_design_node(self, index: int, node: Any) -> Optional[str]:
+        """验证单个节点，返回错误信息或 None"""
+        if not isinstance(node, dict):
+            return f"节点 {index} 必须是对象"
+        
+        registry = get_node_registry()
+        if index == 0:
+            if "type" not in node:
+                return "第一个节点缺少 type 字段"
+            if not registry.is_trigger(node["type"]):
+                return f"第一个节点必须是触发器类型（{', '.join(registry.trigger_names())}），但得到: {node['type']}"
+        
+        if "name" not in node:
+            return f"节点 {index} 缺少 name 字段"
+        if "type" not in node:
+            return f"节点 {index} ({node.get('name')}) 缺少 type 字段"
+        if not registry.is_known(node["type"]):
+            return (
+                f"节点 {index} ({node['name']}) 的类型 {node['type']} 不受支持，"
+                f"可用类型: {', '.join(registry.names(prompt_only=True))}"
+            )
+        return None
+    
+    def _validate_design_connection(self, conn: Any, node_names: Optional[set]) -> Optional[str]:
+        """验证单个连接，node_names 为 None 时只检查字段"""
+        if not isinstance(conn, dict) or "from" not in conn or "to" not in conn:
+            return f"连接缺少 from 或 to 字段: {conn}"
+        if node_names is not None:
             if conn["from"] not in node_names:
                 return f"连接引用了不存在的节点: {conn['from']}"
             if conn["to"] not in node_names:
                 return f"连接引用了不存在的节点: {conn['to']}"
-        
-        return None  # 验证通过
+        return None
+    
+    def _validate_design_item(self, field: str, index: int, item: Any, parser: WorkflowDesignStreamParser) -> Optional[str]:
+        """流式解析时逐个校验 nodes / connections 元素"""
+        if field == "nodes":
+            return self._validate_design_node(index, item)
+        # nodes 数组尚未完整接收时（connections 写在前面）只检查字段，引用留给整体校验
+        node_names = None
+        if "nodes" in parser.closed_fields:
+            node_names = {node.get("name") for node in parser.items["nodes"] if isinstance(node, dict)}
+        return self._validate_design_connection(item, node_names)
     
     def _convert_design_to_n8n(self, design: Dict, description: str) -> Dict[str, Any]:
-        """将 LLM 的设计转换为 n8n 工作流格式"""
+        """将 LLM 的设计转换为 n8n 工作流格式（节点类型、版本和参数均由节点注册表查表得到）"""
+        registry = get_node_registry()
         nodes = []
         connections = {}
         
         # 转换节点
         for i, node_design in enumerate(design.get("nodes", [])):
-            node_type = node_design.get("type", "n8n-nodes-base.set")
-            if not node_type.startswith("n8n-nodes-base."):
-                node_type = f"n8n-nodes-base.{node_type}"
-            
-            # 根据节点类型设置参数
-            parameters = self._get_node_parameters(node_type, node_design)
+            design_type = node_design.get("type", "set")
             
             node = {
                 "name": node_design.get("name", f"Node{i+1}"),
-                "type": node_type,
-                "typeVersion": self._get_type_version(node_type),
+                "type": registry.n8n_type(design_type),
+                "typeVersion": registry.type_version(design_type),
                 "position": node_design.get("position", [250 + i*200, 300]),
-                "parameters": parameters
+                "parameters": registry.parameters(design_type, node_design.get("description", ""))
             }
             nodes.append(node)
         
@@ -621,173 +932,6 @@ AI 对话场景:
             }
         }
     
-    def _get_node_parameters(self, node_type: str, node_design: Dict) -> Dict:
-        """根据节点类型生成参数"""
-        desc = node_design.get("description", "")
-        node_lower = node_type.lower()
-        
-        # 触发器类
-        if "trigger" in node_lower:
-            if "schedule" in node_lower:
-                return {"rule": {"interval": [{"field": "hours", "hoursInterval": 1}]}}
-            elif "webhook" in node_lower:
-                return {"path": "webhook", "responseMode": "onReceived"}
-            elif "email" in node_lower:
-                return {"pollTime": 60000}
-            else:
-                return {}
-        
-        # AI/智能类节点
-        elif "aiagent" in node_lower or ("agent" in node_lower and "langchain" in node_type):
-            return {"text": f"={{{{ $json.input || '{desc}' }}}}", "options": {}}
-        
-        elif "chatopenai" in node_lower or "chatanthropic" in node_lower:
-            return {"messages": [{"role": "user", "content": f"={{{{ $json.input || '{desc}' }}}}"}]}
-        
-        elif "embedding" in node_lower:
-            return {"text": "={{$json.text}}"}
-        
-        elif "vectorstore" in node_lower:
-            return {"operation": "insert", "text": "={{$json.text}}"}
-        
-        elif "memory" in node_lower:
-            return {"operation": "get", "key": "conversation"}
-        
-        # HTTP/API类
-        elif "httprequest" in node_lower:
-            return {
-                "method": "POST",
-                "url": "https://api.example.com/endpoint",
-                "sendBody": True,
-                "specifyBody": "json",
-                "jsonBody": "={}",
-                "options": {}
-            }
-        
-        # 数据处理类
-        elif node_type == "n8n-nodes-base.set" or "set" in node_lower:
-            return {
-                "values": {
-                    "string": [
-                        {"name": "data", "value": desc or "处理数据"},
-                        {"name": "timestamp", "value": "={{$now.format('YYYY-MM-DD HH:mm:ss')}}"}
-                    ]
-                },
-                "options": {}
-            }
-        
-        elif node_type == "n8n-nodes-base.if" or (node_lower == "if"):
-            return {
-                "conditions": {
-                    "string": [
-                        {"value1": "={{$json.status}}", "operation": "equals", "value2": "active"}
-                    ]
-                }
-            }
-        
-        elif "switch" in node_lower:
-            return {
-                "mode": "expression",
-                "rules": {
-                    "rules": [
-                        {"value": "={{$json.value}}", "output": 0}
-                    ]
-                }
-            }
-        
-        elif "filter" in node_lower:
-            return {"conditions": {"string": [{"value1": "={{$json.field}}", "operation": "notEmpty"}]}}
-        
-        # 数据库类
-        elif "postgres" in node_lower or "mysql" in node_lower:
-            return {"operation": "select", "query": "SELECT * FROM table_name"}
-        
-        elif "mongodb" in node_lower:
-            return {"operation": "find", "collection": "collection_name"}
-        
-        elif "redis" in node_lower:
-            return {"operation": "get", "key": "key_name"}
-        
-        # 通知类
-        elif "emailsend" in node_lower or "email" in node_lower:
-            return {
-                "fromEmail": "noreply@example.com",
-                "toEmail": "={{$json.email}}",
-                "subject": desc or "通知",
-                "message": "={{$json.message}}"
-            }
-        
-        elif "slack" in node_lower:
-            return {"channelId": "", "text": "={{$json.message}}"}
-        
-        elif "telegram" in node_lower:
-            return {"chatId": "", "text": "={{$json.message}}"}
-        
-        # 工具类
-        elif "code" in node_lower:
-            return {"mode": "runOnceForAllItems", "jsCode": "// 处理数据\nreturn items;"}
-        
-        elif "wait" in node_lower:
-            return {"amount": 1, "unit": "seconds"}
-        
-        else:
-            return {}
-    
-    def _get_type_version(self, node_type: str) -> int:
-        """获取节点类型版本"""
-        version_map = {
-            # 触发器类
-            "n8n-nodes-base.manualTrigger": 1,
-            "n8n-nodes-base.webhook": 1,
-            "n8n-nodes-base.scheduleTrigger": 1,
-            "n8n-nodes-base.emailTrigger": 1,
-            
-            # 数据处理类
-            "n8n-nodes-base.set": 3,
-            "n8n-nodes-base.if": 1,
-            "n8n-nodes-base.switch": 3,
-            "n8n-nodes-base.merge": 2,
-            "n8n-nodes-base.splitInBatches": 2,
-            "n8n-nodes-base.itemLists": 2,
-            "n8n-nodes-base.filter": 1,
-            
-            # AI/智能类
-            "@n8n/n8n-nodes-langchain.agent": 1,
-            "@n8n/n8n-nodes-langchain.chatOpenAI": 1,
-            "@n8n/n8n-nodes-langchain.chatAnthropic": 1,
-            "@n8n/n8n-nodes-langchain.embeddings": 1,
-            "@n8n/n8n-nodes-langchain.vectorStore": 1,
-            "@n8n/n8n-nodes-langchain.memoryManager": 1,
-            
-            # HTTP/API类
-            "n8n-nodes-base.httpRequest": 4,
-            
-            # 数据库类
-            "n8n-nodes-base.postgres": 2,
-            "n8n-nodes-base.mysql": 2,
-            "n8n-nodes-base.mongodb": 1,
-            "n8n-nodes-base.redis": 1,
-            
-            # 通知类
-            "n8n-nodes-base.emailSend": 2,
-            "n8n-nodes-base.slack": 2,
-            "n8n-nodes-base.telegram": 1,
-            "n8n-nodes-base.discord": 1,
-            
-            # 文件处理类
-            "n8n-nodes-base.readBinaryFile": 1,
-            "n8n-nodes-base.writeBinaryFile": 1,
-            "n8n-nodes-base.spreadsheet": 2,
-            
-            # 工具类
-            "n8n-nodes-base.code": 2,
-            "n8n-nodes-base.function": 1,
-            "n8n-nodes-base.executeCommand": 1,
-            "n8n-nodes-base.wait": 1,
-            "n8n-nodes-base.noOp": 1,
-        }
-        return version_map.get(node_type, 1)
-    
     def _generate_simple_fallback_workflow_DEPRECATED(self, description: str) -> Dict[str, Any]:
         """已废弃：使用 LLM 自动重试机制代替硬编码备用方案"""
         raise NotImplementedError("此方法已废弃，LLM 应通过自动重试来修正错误")
@@ -802,6 +946,7 @@ AI 对话场景:
             
             # 2. 创建到 n8n
             result = self.client.create_workflow(workflow)
+            get_workflow_catalog(self.client).upsert(result)
             
             return json.dumps({
                 "success": True,
@@ -824,15 +969,19 @@ AI 对话场景:
 
 
 class N8NListWorkflowsTool(BaseTool):
-    """N8N 列出工作流工具"""
+    """N8N 列出工作流工具（查询本地工作流目录，过期后增量同步）"""
     
     name: str = "n8n_list_workflows"
-    description: str = """列出 n8n 实例上的所有工作流。
+    description: str = """列出 n8n 实例上的工作流（精简摘要）。
     
 可选参数:
-- active: 只显示激活的工作流 (true/false)
+- active: 只显示激活/未激活的工作流 (true/false)
+- name: 按名称关键字过滤
+- tag: 按标签过滤
+- limit: 最多返回条数（默认 20，按更新时间倒序）
+- refresh: 是否强制从 n8n 刷新 (true/false)
 
-返回: 工作流列表，包括 ID、名称、状态等
+返回: 工作流摘要列表，包括 ID、名称、激活状态、标签、节点数、更新时间
 """
     
     api_url: str = Field(default="")
@@ -847,32 +996,49 @@ class N8NListWorkflowsTool(BaseTool):
             api_key=api_key or os.getenv("N8N_API_KEY", ""),
             **kwargs
         )
-        object.__setattr__(self, 'client', N8NAPIClient(self.api_url, self.api_key))
+        object.__setattr__(self, 'client', get_n8n_client(self.api_url, self.api_key))
+        object.__setattr__(self, 'catalog', get_workflow_catalog(self.client))
     
-    def _run(self, active: str = None) -> str:
+    def _run(
+        self,
+        active: str = None,
+        name: str = None,
+        tag: str = None,
+        limit: int = 20,
+        refresh: str = None
+    ) -> str:
         """列出工作流"""
         try:
             active_filter = None
             if active:
-                active_filter = active.lower() == 'true'
+                active_filter = str(active).lower() == 'true'
             
-            workflows = self.client.list_workflows(active=active_filter)
+            workflows, total = self.catalog.search(
+                name=name,
+                tag=tag,
+                active=active_filter,
+                limit=int(limit) if limit else None,
+                refresh=str(refresh).lower() == 'true'
+            )
             
+            # 精简输出，减少写入 LLM 上下文的内容
             return json.dumps({
                 "success": True,
+                "total": total,
                 "count": len(workflows),
                 "workflows": [
                     {
-                        "id": w.get('id'),
-                        "name": w.get('name'),
-                        "active": w.get('active'),
-                        "created_at": w.get('createdAt'),
-                        "updated_at": w.get('updatedAt'),
-                        "url": f"{self.api_url}/workflow/{w.get('id')}"
+                        "id": w.id,
+                        "name": w.name,
+                        "active": w.active,
+                        "tags": w.tags,
+                        "nodes": w.node_count,
+                        "updated_at": w.updated_at
                     }
                     for w in workflows
-                ]
-            }, indent=2, ensure_ascii=False)
+                ],
+                "url_template": f"{self.api_url}/workflow/{{id}}"
+            }, ensure_ascii=False, separators=(',', ':'))
             
         except Exception as e:
             return json.dumps({
@@ -906,7 +1072,7 @@ class N8NExecuteWorkflowTool(BaseTool):
             api_key=api_key or os.getenv("N8N_API_KEY", ""),
             **kwargs
         )
-        object.__setattr__(self, 'client', N8NAPIClient(self.api_url, self.api_key))
+        object.__setattr__(self, 'client', get_n8n_client(self.api_url, self.api_key))
     
     def _run(self, workflow_id: str, data: str = None) -> str:
         """执行工作流"""
@@ -961,12 +1127,13 @@ class N8NDeleteWorkflowTool(BaseTool):
             api_key=api_key or os.getenv("N8N_API_KEY", ""),
             **kwargs
         )
-        object.__setattr__(self, 'client', N8NAPIClient(self.api_url, self.api_key))
+        object.__setattr__(self, 'client', get_n8n_client(self.api_url, self.api_key))
     
     def _run(self, workflow_id: str) -> str:
         """删除工作流"""
         try:
             self.client.delete_workflow(workflow_id)
+            get_workflow_catalog(self.client).remove(workflow_id)
             
             return json.dumps({
                 "success": True,
@@ -0,0 +1,256 @@
+"""
+工作流设计流式解析
+
+逐块消费 LLM 输出的工作流设计 JSON，在字符流上维护容器栈做增量语法检查，
+根对象下 nodes / connections 数组中的每个元素一闭合就解析并交给回调校验。
+遇到第一个语法或结构错误立即抛出，调用方可以停止生成并带着定位信息重试。
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+class WorkflowDesignStreamError(ValueError):
+    """流式解析中发现的错误"""
+
+    def __init__(self, message: str, kind: str, partial: str = ""):
+        """
+        Args:
+            message: 错误描述（含位置）
+            kind: json（语法错误）或 validation（结构校验失败）
+            partial: 出错前已接收的文本
+        """
+        super().__init__(message)
+        self.kind = kind
+        self.partial = partial
+
+
+# 元素校验回调: (数组字段名, 元素下标, 元素, 解析器) -> 错误信息或 None
+ItemValidator = Callable[[str, int, Any, "WorkflowDesignStreamParser"], Optional[str]]
+
+_WHITESPACE = " \t\r\n"
+_LITERAL_START = "-0123456789tfn"
+
+
+class _Frame:
+    """容器栈帧"""
+    __slots__ = ("kind", "start", "state", "count", "key", "field")
+
+    def __init__(self, kind: str, start: int, field: Optional[str] = None):
+        self.kind = kind          # "{" 或 "["
+        self.start = start        # 容器起始字符在缓冲区中的位置
+        # 对象: key / colon / value / comma；数组: value / comma
+        self.state = "key" if kind == "{" else "value"
+        self.count = 0            # 已完成的成员数
+        self.key: Optional[str] = None
+        self.field = field        # 根对象下的数组对应的字段名
+
+
+class WorkflowDesignStreamParser:
+    """工作流设计 JSON 的增量解析器"""
+
+    def __init__(self, validator: Optional[ItemValidator] = None, fields=("nodes", "connections")):
+        """
+        初始化解析器
+
+        Args:
+            validator: 根对象下数组元素的校验回调
+            fields: 需要逐元素校验的根对象字段
+        """
+        self.validator = validator
+        self.fields = set(fields)
+        self.items: Dict[str, List[Any]] = {name: [] for name in fields}
+        self.closed_fields: Set[str] = set()
+        self.consumed = 0
+
+        self._text = ""
+        self._stack: List[_Frame] = []
+        self._started = False
+        self._done = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._literal_start: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        """根对象是否已闭合"""
+        return self._done
+
+    @property
+    def text(self) -> str:
+        """根对象的原始文本（从第一个 { 开始）"""
+        return self._text
+
+    def feed(self, chunk: str) -> bool:
+        """
+        输入一段文本
+
+        Returns:
+            根对象已闭合时返回 True，之后的输出可以丢弃
+
+        Raises:
+            WorkflowDesignStreamError: 发现语法或结构错误
+        """
+        if self._done:
+            return True
+        if not self._started:
+            # 跳过 markdown 代码块标记等前导说明文字
+            start = chunk.find("{")
+            if start == -1:
+                self.consumed += len(chunk)
+                return False
+            self.consumed += start
+            chunk = chunk[start:]
+            self._started = True
+            self._stack.append(_Frame("{", 0))
+            begin = 1
+        else:
+            begin = 0
+
+        offset = len(self._text)
+        self._text += chunk
+        for i in range(begin, len(chunk)):
+            self._consume(chunk[i], offset + i)
+            if self._done:
+                # 根对象之后的输出全部丢弃
+                self._text = self._text[:offset + i + 1]
+                self.consumed += i + 1
+                return True
+        self.consumed += len(chunk)
+        return False
+
+    def result(self) -> Dict[str, Any]:
+        """
+        获取完整的设计
+
+        Raises:
+            WorkflowDesignStreamError: 输出在根对象闭合前结束
+        """
+        if not self._started:
+            raise WorkflowDesignStreamError("响应中没有 JSON 对象", "json", self._text)
+        if not self._done:
+            raise WorkflowDesignStreamError(
+                f"JSON 不完整，输出在第 {len(self._text)} 个字符处结束，仍有 {len(self._stack)} 层括号未闭合",
+                "json", self._text
+            )
+        return json.loads(self._text)
+
+    # ---------------------------------------------------------------- 内部实现
+
+    def _error(self, message: str, position: int, kind: str = "json") -> WorkflowDesignStreamError:
+        context = self._text[max(0, position - 40):position + 1]
+        return WorkflowDesignStreamError(
+            f"{message}（第 {position} 个字符附近: ...{context}）", kind, self._text[:position + 1]
+        )
+
+    def _consume(self, char: str, position: int) -> None:
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                self._end_string(position)
+            return
+
+        if self._literal_start is not None:
+            if char not in _WHITESPACE and char not in ",}]":
+                return
+            self._end_literal(position)
+
+        if char in _WHITESPACE:
+            return
+
+        frame = self._stack[-1]
+        if char == '"':
+            if frame.state not in ("key", "value"):
+                raise self._error("缺少逗号分隔", position)
+            self._in_string = True
+            self._string_start = position
+        elif char in "{[":
+            self._expect_value(frame, position)
+            field = frame.key if len(self._stack) == 1 and char == "[" and frame.key in self.fields else None
+            self._stack.append(_Frame(char, position, field))
+        elif char in "}]":
+            self._close(frame, char, position)
+        elif char == ",":
+            if frame.state != "comma":
+                raise self._error("多余的逗号", position)
+            frame.state = "key" if frame.kind == "{" else "value"
+        elif char == ":":
+            if frame.state != "colon":
+                raise self._error("意外的冒号", position)
+            frame.state = "value"
+        elif char == "'":
+            raise self._error("字符串必须使用双引号，不能使用单引号", position)
+        elif char == "/":
+            raise self._error("JSON 中不能包含注释", position)
+        elif char in _LITERAL_START:
+            self._expect_value(frame, position)
+            self._literal_start = position
+        else:
+            raise self._error(f"意外的字符 {char!r}，字符串必须放在双引号内", position)
+
+    def _expect_value(self, frame: _Frame, position: int) -> None:
+        if frame.state == "key":
+            raise self._error("对象的键必须是双引号字符串", position)
+        if frame.state != "value":
+            raise self._error("缺少逗号分隔", position)
+
+    def _end_string(self, position: int) -> None:
+        frame = self._stack[-1]
+        if frame.state == "key":
+            frame.key = json.loads(self._text[self._string_start:position + 1])
+            frame.state = "colon"
+            return
+        if frame.field is not None:
+            self._emit(frame.field, self._text[self._string_start:position + 1], position)
+        self._complete_value(frame)
+
+    def _end_literal(self, position: int) -> None:
+        literal = self._text[self._literal_start:position]
+        start, self._literal_start = self._literal_start, None
+        try:
+            json.loads(literal)
+        except ValueError:
+            raise self._error(f"无效的值 {literal!r}（布尔值和空值应为 true/false/null）", start)
+        frame = self._stack[-1]
+        if frame.field is not None:
+            self._emit(frame.field, literal, position - 1)
+        self._complete_value(frame)
+
+    def _complete_value(self, frame: _Frame) -> None:
+        frame.state = "comma"
+        frame.count += 1
+
+    def _close(self, frame: _Frame, char: str, position: int) -> None:
+        expected = "}" if frame.kind == "{" else "]"
+        if char != expected:
+            raise self._error(f"括号不匹配，期望 {expected}", position)
+        if frame.state != "comma":
+            if frame.count > 0 or frame.state not in ("key", "value"):
+                raise self._error("最后一个元素后不能有逗号", position)
+        self._stack.pop()
+
+        if not self._stack:
+            self._done = True
+            return
+
+        parent = self._stack[-1]
+        if parent.field is not None:
+            self._emit(parent.field, self._text[frame.start:position + 1], position)
+        elif frame.field is not None:
+            self.closed_fields.add(frame.field)
+        self._complete_value(parent)
+
+    def _emit(self, field: str, raw: str, position: int) -> None:
+        """根对象下数组的一个元素闭合：解析并校验"""
+        item = json.loads(raw)
+        index = len(self.items[field])
+        self.items[field].append(item)
+        if self.validator is not None:
+            error = self.validator(field, index, item, self)
+            if error:
+                raise self._error(error, position, kind="validation")
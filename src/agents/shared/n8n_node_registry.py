@@ -0,0 +1,164 @@
+"""
+N8N 节点类型注册表
+
+从 config/tools/n8n_node_types.json 一次性加载支持的节点类型，按名称、别名和完整 n8n 类型建立字典索引。
+工作流转换（类型、版本、默认参数）、设计校验（类型与触发器检查）和 LLM 提示词中的节点列表都以它为准。
+"""
+
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NODE_TYPES_PATH = Path(__file__).parent.parent.parent.parent / "config" / "tools" / "n8n_node_types.json"
+
+# 未登记的节点类型沿用 n8n 内置节点的命名空间
+BASE_NAMESPACE = "n8n-nodes-base."
+DESCRIPTION_PLACEHOLDER = "{description}"
+
+
+@dataclass(frozen=True)
+class NodeTypeSpec:
+    """节点类型定义"""
+    name: str
+    type: str
+    version: int
+    category: str
+    description: str
+    parameters: Dict[str, Any] = field(default_factory=dict)
+    trigger: bool = False
+    prompt: bool = True
+    notes: Tuple[str, ...] = ()
+    aliases: Tuple[str, ...] = ()
+    description_default: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "NodeTypeSpec":
+        return cls(
+            name=data["name"],
+            type=data["type"],
+            version=int(data.get("version", 1)),
+            category=data.get("category", ""),
+            description=data.get("description", ""),
+            parameters=data.get("parameters", {}),
+            trigger=bool(data.get("trigger", False)),
+            prompt=bool(data.get("prompt", True)),
+            notes=tuple(data.get("notes", ())),
+            aliases=tuple(data.get("aliases", ())),
+            description_default=data.get("description_default", "")
+        )
+
+
+class NodeRegistry:
+    """节点类型注册表"""
+
+    def __init__(self, specs: List[NodeTypeSpec], categories: Optional[List[Dict[str, str]]] = None):
+        """
+        初始化注册表
+
+        Args:
+            specs: 节点类型定义
+            categories: 分类（id、title），决定提示词中节点列表的分组与顺序
+        """
+        self.specs = list(specs)
+        self.categories = list(categories or [])
+        self._index: Dict[str, NodeTypeSpec] = {}
+        # 参数模板预先序列化，生成参数时只需一次字符串替换和反序列化
+        self._templates: Dict[str, Tuple[str, bool]] = {}
+        for spec in self.specs:
+            for key in (spec.name, spec.type, *spec.aliases):
+                self._index.setdefault(key.lower(), spec)
+            template = json.dumps(spec.parameters, ensure_ascii=False)
+            self._templates[spec.name] = (template, DESCRIPTION_PLACEHOLDER in template)
+        self._prompt: Optional[str] = None
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "NodeRegistry":
+        """从 JSON 文件加载注册表"""
+        path = Path(path or DEFAULT_NODE_TYPES_PATH)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        specs = [NodeTypeSpec.from_dict(item) for item in data.get("nodes", [])]
+        logger.debug(f"已加载 {len(specs)} 个 n8n 节点类型: {path}")
+        return cls(specs, data.get("categories"))
+
+    def resolve(self, node_type: str) -> Optional[NodeTypeSpec]:
+        """按名称、别名或完整 n8n 类型查找节点定义（不区分大小写）"""
+        if not isinstance(node_type, str):
+            return None
+        key = node_type.strip().lower()
+        spec = self._index.get(key)
+        if spec is None and key.startswith(BASE_NAMESPACE):
+            spec = self._index.get(key[len(BASE_NAMESPACE):])
+        return spec
+
+    def is_known(self, node_type: str) -> bool:
+        return self.resolve(node_type) is not None
+
+    def is_trigger(self, node_type: str) -> bool:
+        spec = self.resolve(node_type)
+        return spec is not None and spec.trigger
+
+    def n8n_type(self, node_type: str) -> str:
+        """完整的 n8n 节点类型"""
+        spec = self.resolve(node_type)
+        if spec is not None:
+            return spec.type
+        return node_type if node_type.startswith(BASE_NAMESPACE) else f"{BASE_NAMESPACE}{node_type}"
+
+    def type_version(self, node_type: str) -> int:
+        spec = self.resolve(node_type)
+        return spec.version if spec is not None else 1
+
+    def parameters(self, node_type: str, description: str = "") -> Dict[str, Any]:
+        """按参数模板生成节点参数，模板中的 {description} 替换为节点描述"""
+        spec = self.resolve(node_type)
+        if spec is None:
+            return {}
+        template, has_placeholder = self._templates[spec.name]
+        if has_placeholder:
+            text = description or spec.description_default
+            # 按 JSON 字符串转义后替换，描述中的引号和换行不会破坏模板
+            template = template.replace(DESCRIPTION_PLACEHOLDER, json.dumps(text, ensure_ascii=False)[1:-1])
+        return json.loads(template)
+
+    def names(self, prompt_only: bool = False) -> List[str]:
+        """节点名称列表"""
+        return [spec.name for spec in self.specs if spec.prompt or not prompt_only]
+
+    def trigger_names(self) -> List[str]:
+        return [spec.name for spec in self.specs if spec.trigger]
+
+    def render_prompt_section(self) -> str:
+        """生成提示词中的节点类型列表（按分类分组，结果缓存）"""
+        if self._prompt is None:
+            sections = []
+            for category in self.categories:
+                lines = [category["title"]]
+                for spec in self.specs:
+                    if spec.category != category["id"] or not spec.prompt:
+                        continue
+                    lines.append(f"- {spec.name}: {spec.description}")
+                    lines.extend(f"  * {note}" for note in spec.notes)
+                if len(lines) > 1:
+                    sections.append("\n".join(lines))
+            self._prompt = "\n\n".join(sections)
+        return self._prompt
+
+
+_registry: Optional[NodeRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_node_registry() -> NodeRegistry:
+    """获取全局节点类型注册表（首次调用时加载）"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = NodeRegistry.load()
+    return _registry
@@ -0,0 +1,237 @@
+"""
+N8N 工作流目录缓存
+
+在本地维护 n8n 工作流的摘要目录，按名称、标签、激活状态建立索引，列表查询直接在本地完成。
+目录过期后做增量同步：n8n 公共 API 不支持按修改时间过滤，也不返回 ETag，
+因此仍需遍历一遍列表，但只有 updatedAt 变化的工作流会重新生成摘要，已删除的工作流从索引中移除。
+通过工具创建、删除工作流时直接更新目录，无需等待下一次同步。
+"""
+
+import threading
+import time
+import logging
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+@dataclass
+class WorkflowSummary:
+    """工作流摘要（提供给 LLM 的精简信息）"""
+    id: str
+    name: str
+    active: bool = False
+    tags: List[str] = field(default_factory=list)
+    node_count: int = 0
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+    @classmethod
+    def from_workflow(cls, workflow: Dict[str, Any]) -> "WorkflowSummary":
+        """从 n8n 工作流对象生成摘要"""
+        tags = [tag.get("name", "") if isinstance(tag, dict) else str(tag) for tag in workflow.get("tags") or []]
+        return cls(
+            id=str(workflow.get("id")),
+            name=workflow.get("name") or "",
+            active=bool(workflow.get("active")),
+            tags=[tag for tag in tags if tag],
+            node_count=len(workflow.get("nodes") or []),
+            created_at=workflow.get("createdAt"),
+            updated_at=workflow.get("updatedAt")
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return asdict(self)
+
+
+class N8NWorkflowCatalog:
+    """N8N 工作流目录缓存"""
+
+    def __init__(self, client: Any, ttl: float = 60.0, page_size: int = 100):
+        """
+        初始化工作流目录
+
+        Args:
+            client: N8NAPIClient 实例
+            ttl: 目录有效期（秒），过期后查询时触发增量同步
+            page_size: 同步时每页获取的工作流数量
+        """
+        self.client = client
+        self.ttl = ttl
+        self.page_size = page_size
+        self.logger = logging.getLogger(__name__)
+
+        self._entries: Dict[str, WorkflowSummary] = {}
+        self._by_name: Dict[str, Set[str]] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+        self._by_active: Dict[bool, Set[str]] = {True: set(), False: set()}
+        self._lock = threading.RLock()
+        self._synced_at: Optional[float] = None
+        self._stats = {"syncs": 0, "changed": 0, "removed": 0, "lookups": 0}
+
+    @property
+    def is_stale(self) -> bool:
+        """目录是否需要同步"""
+        return self._synced_at is None or time.monotonic() - self._synced_at >= self.ttl
+
+    def sync(self, force: bool = False) -> Dict[str, int]:
+        """
+        增量同步目录
+
+        Args:
+            force: 即使未过期也立即同步
+
+        Returns:
+            本次同步新增/更新和删除的工作流数量
+        """
+        with self._lock:
+            if not force and not self.is_stale:
+                return {"changed": 0, "removed": 0}
+
+            seen = set()
+            changed = 0
+            for workflow in self.client.iter_workflows(page_size=self.page_size):
+                workflow_id = str(workflow.get("id"))
+                seen.add(workflow_id)
+                current = self._entries.get(workflow_id)
+                if current is not None and current.updated_at and current.updated_at == workflow.get("updatedAt"):
+                    continue
+                self._index(WorkflowSummary.from_workflow(workflow))
+                changed += 1
+
+            removed = [workflow_id for workflow_id in self._entries if workflow_id not in seen]
+            for workflow_id in removed:
+                self._unindex(workflow_id)
+
+            self._synced_at = time.monotonic()
+            self._stats["syncs"] += 1
+            self._stats["changed"] += changed
+            self._stats["removed"] += len(removed)
+            self.logger.debug(f"工作流目录同步完成: {changed} 个变更, {len(removed)} 个删除, 共 {len(self._entries)} 个")
+            return {"changed": changed, "removed": len(removed)}
+
+    def upsert(self, workflow: Dict[str, Any]) -> Optional[WorkflowSummary]:
+        """写入或更新单个工作流（创建/更新工作流后调用）"""
+        if not workflow or workflow.get("id") is None:
+            return None
+        summary = WorkflowSummary.from_workflow(workflow)
+        with self._lock:
+            self._index(summary)
+        return summary
+
+    def remove(self, workflow_id: str) -> None:
+        """移除单个工作流（删除工作流后调用）"""
+        with self._lock:
+            self._unindex(str(workflow_id))
+
+    def invalidate(self) -> None:
+        """标记目录过期，下次查询时同步"""
+        with self._lock:
+            self._synced_at = None
+
+    def get(self, workflow_id: str) -> Optional[WorkflowSummary]:
+        """按ID获取工作流摘要"""
+        with self._lock:
+            if self.is_stale:
+                self.sync()
+            return self._entries.get(str(workflow_id))
+
+    def search(
+        self,
+        name: Optional[str] = None,
+        tag: Optional[str] = None,
+        active: Optional[bool] = None,
+        limit: Optional[int] = None,
+        refresh: bool = False
+    ) -> Tuple[List[WorkflowSummary], int]:
+        """
+        查询工作流
+
+        Args:
+            name: 名称关键字（不区分大小写，子串匹配）
+            tag: 标签名（不区分大小写，精确匹配）
+            active: 激活状态
+            limit: 最多返回的条数
+            refresh: 查询前强制同步
+
+        Returns:
+            (按更新时间倒序排列的摘要列表, 过滤后的总数)
+        """
+        with self._lock:
+            if refresh or self.is_stale:
+                self.sync(force=True)
+            self._stats["lookups"] += 1
+
+            candidates: Optional[Set[str]] = None
+            if tag:
+                candidates = set(self._by_tag.get(tag.lower(), ()))
+            if active is not None:
+                ids = self._by_active[active]
+                candidates = set(ids) if candidates is None else candidates & ids
+            if name:
+                keyword = name.lower()
+                matched = set()
+                for workflow_name, ids in self._by_name.items():
+                    if keyword in workflow_name:
+                        matched |= ids
+                candidates = matched if candidates is None else candidates & matched
+
+            ids = self._entries.keys() if candidates is None else candidates
+            results = sorted(
+                (self._entries[workflow_id] for workflow_id in ids),
+                key=lambda summary: summary.updated_at or "",
+                reverse=True
+            )
+        total = len(results)
+        return (results[:limit] if limit else results), total
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取目录统计"""
+        with self._lock:
+            return {
+                **self._stats,
+                "workflows": len(self._entries),
+                "active": len(self._by_active[True]),
+                "stale": self.is_stale
+            }
+
+    def _index(self, summary: WorkflowSummary) -> None:
+        """写入摘要并更新索引（调用方需持有锁）"""
+        self._unindex(summary.id)
+        self._entries[summary.id] = summary
+        self._by_name.setdefault(summary.name.lower(), set()).add(summary.id)
+        for tag in summary.tags:
+            self._by_tag.setdefault(tag.lower(), set()).add(summary.id)
+        self._by_active[summary.active].add(summary.id)
+
+    def _unindex(self, workflow_id: str) -> None:
+        """移除摘要及其索引（调用方需持有锁）"""
+        summary = self._entries.pop(workflow_id, None)
+        if summary is None:
+            return
+        self._discard(self._by_name, summary.name.lower(), workflow_id)
+        for tag in summary.tags:
+            self._discard(self._by_tag, tag.lower(), workflow_id)
+        self._by_active[summary.active].discard(workflow_id)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, workflow_id: str) -> None:
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(workflow_id)
+            if not ids:
+                del index[key]
+
+
+_catalogs: Dict[Tuple[str, str], N8NWorkflowCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_workflow_catalog(client: Any) -> N8NWorkflowCatalog:
+    """获取客户端对应的共享工作流目录（与 get_n8n_client 一样按 API 地址和 Key 复用）"""
+    key = (client.api_url, client.api_key)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None or catalog.client is not client:
+            catalog = _catalogs[key] = N8NWorkflowCatalog(client)
+        return catalog
@@ -0,0 +1,341 @@
+"""
+N8N 工作流模板库
+
+保存通过校验的 LLM 工作流设计，按规范化的需求描述和嵌入向量建立索引。
+只有描述精确匹配（规范化后相同）的需求直接复用已有设计；
+描述相似的需求仍由 LLM 生成，相似模板只作为 few-shot 示例放入 prompt。
+同时统计命中率与节省的 LLM 调用次数。
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import threading
+import uuid
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.config.config_loader import config_loader
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_description(description: str) -> str:
+    """规范化需求描述（去除多余空白、统一小写），用于精确匹配"""
+    return " ".join(description.split()).lower()
+
+
+@dataclass
+class WorkflowTemplate:
+    """工作流模板"""
+    id: str
+    description: str
+    design: Dict[str, Any]
+    embedding: Optional[List[float]] = None
+    hits: int = 0
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+
+@dataclass
+class TemplateMatch:
+    """模板查询结果：exact 为 True 时可直接复用，否则 template 只是相似的参考设计"""
+    template: Optional[WorkflowTemplate]
+    score: float
+    embedding: Optional[List[float]] = None
+    exact: bool = False
+
+    @property
+    def hit(self) -> bool:
+        return self.template is not None and self.exact
+
+    @property
+    def seed(self) -> Optional[WorkflowTemplate]:
+        """相似但不相同的模板，作为 LLM 生成时的 few-shot 示例"""
+        return None if self.exact else self.template
+
+
+class WorkflowTemplateStore:
+    """
+    工作流模板库
+
+    精确匹配直接复用设计，嵌入相似度只用来挑选 few-shot 示例。EmbeddingService 是异步接口，而工作流生成工具走同步的 _run，
+    因此嵌入计算在模板库自己的事件循环线程上执行。未配置嵌入服务时只做描述精确匹配。
+    """
+
+    def __init__(
+        self,
+        embedding_service: Optional[Any] = None,
+        similarity_threshold: float = 0.92,
+        max_templates: int = 500,
+        storage_path: Optional[str] = None,
+        timeout: float = 10.0
+    ):
+        """
+        初始化模板库
+
+        Args:
+            embedding_service: EmbeddingService 实例，None 时只按描述精确匹配
+            similarity_threshold: 作为 few-shot 示例的最低余弦相似度
+            max_templates: 最多保存的模板数，超出时淘汰命中次数最少的模板
+            storage_path: 模板持久化文件路径，None 时只保存在内存
+            timeout: 单次嵌入计算超时（秒），超时视为未命中
+        """
+        self.embedding_service = embedding_service
+        self.similarity_threshold = similarity_threshold
+        self.max_templates = max_templates
+        self.storage_path = storage_path
+        self.timeout = timeout
+
+        self._templates: List[WorkflowTemplate] = []
+        self._by_description: Dict[str, WorkflowTemplate] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._indexed: List[WorkflowTemplate] = []
+        self._lock = threading.RLock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "seeded": 0,
+            "generations": 0,
+            "llm_calls": 0,
+            "llm_calls_saved": 0,
+            "embedding_errors": 0
+        }
+
+        if storage_path:
+            self._load()
+
+    # ---------------------------------------------------------------- 查询与写入
+
+    def lookup(self, description: str) -> TemplateMatch:
+        """
+        查找需求描述对应的模板
+
+        Returns:
+            描述精确匹配时 hit 为 True，可直接复用；否则 seed 为相似度达到阈值的参考模板（可能为 None）。
+            embedding 为本次计算的描述向量，写入模板时可复用
+        """
+        with self._lock:
+            self._stats["lookups"] += 1
+            template = self._by_description.get(normalize_description(description))
+            if template is not None:
+                self._record_hit(template)
+                return TemplateMatch(template, 1.0, template.embedding, exact=True)
+
+        embedding = self._embed(description)
+        if embedding is None:
+            with self._lock:
+                self._stats["misses"] += 1
+            return TemplateMatch(None, 0.0)
+
+        with self._lock:
+            template, score = self._nearest(embedding)
+            self._stats["misses"] += 1
+            if template is not None and score >= self.similarity_threshold:
+                self._stats["seeded"] += 1
+                return TemplateMatch(template, score, embedding)
+            return TemplateMatch(None, score, embedding)
+
+    def add(
+        self,
+        description: str,
+        design: Dict[str, Any],
+        embedding: Optional[List[float]] = None,
+        llm_calls: int = 1
+    ) -> WorkflowTemplate:
+        """
+        保存一个通过校验的工作流设计
+
+        Args:
+            description: 需求描述
+            design: LLM 生成的工作流设计
+            embedding: 描述的嵌入向量（lookup 已计算时传入避免重复计算）
+            llm_calls: 生成该设计实际调用 LLM 的次数（含重试）
+        """
+        if embedding is None:
+            embedding = self._embed(description)
+
+        template = WorkflowTemplate(
+            id=str(uuid.uuid4()),
+            description=description,
+            design=copy.deepcopy(design),
+            embedding=list(embedding) if embedding is not None else None
+        )
+        with self._lock:
+            self._stats["generations"] += 1
+            self._stats["llm_calls"] += llm_calls
+
+            previous = self._by_description.get(normalize_description(description))
+            if previous is not None:
+                self._templates.remove(previous)
+            self._templates.append(template)
+            self._by_description[normalize_description(description)] = template
+            if len(self._templates) > self.max_templates:
+                evicted = min(self._templates[:-1], key=lambda item: item.hits)
+                self._templates.remove(evicted)
+                self._by_description.pop(normalize_description(evicted.description), None)
+            self._matrix = None
+            self._save()
+        return template
+
+    def reuse(self, match: TemplateMatch) -> Dict[str, Any]:
+        """
+        返回精确命中模板的设计副本
+
+        相似但不相同的需求往往只差一个数量、频率或目标系统，直接套用会悄悄丢掉这些差异，
+        因此只允许复用精确匹配的模板。
+        """
+        if not match.hit:
+            raise ValueError("只有精确匹配的模板可以直接复用")
+        return copy.deepcopy(match.template.design)
+
+    def forget(self, template_id: str) -> None:
+        """删除模板（例如改写后的设计未通过校验）"""
+        with self._lock:
+            for template in self._templates:
+                if template.id == template_id:
+                    self._templates.remove(template)
+                    self._by_description.pop(normalize_description(template.description), None)
+                    self._matrix = None
+                    self._save()
+                    return
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取命中率与节省的 LLM 调用次数"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["templates"] = len(self._templates)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    # ---------------------------------------------------------------- 内部实现
+
+    def _record_hit(self, template: WorkflowTemplate) -> None:
+        """记录命中（调用方需持有锁）：按未命中时平均每次生成的 LLM 调用数估算节省量"""
+        template.hits += 1
+        self._stats["hits"] += 1
+        generations = self._stats["generations"]
+        average = self._stats["llm_calls"] / generations if generations else 1
+        self._stats["llm_calls_saved"] += max(1, round(average))
+
+    def _nearest(self, embedding: List[float]):
+        """向量化计算与所有模板的余弦相似度（调用方需持有锁）"""
+        if self._matrix is None:
+            self._indexed = [template for template in self._templates if template.embedding is not None]
+            if not self._indexed:
+                return None, 0.0
+            matrix = np.asarray([template.embedding for template in self._indexed], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._matrix = matrix / np.where(norms == 0, 1, norms)
+        if not self._indexed:
+            return None, 0.0
+
+        query = np.asarray(embedding, dtype=np.float32)
+        if query.shape[0] != self._matrix.shape[1]:
+            return None, 0.0
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None, 0.0
+        scores = self._matrix @ (query / norm)
+        best = int(np.argmax(scores))
+        return self._indexed[best], float(scores[best])
+
+    def _embed(self, description: str) -> Optional[List[float]]:
+        """计算描述的嵌入向量，失败时返回 None（退化为精确匹配）"""
+        if self.embedding_service is None:
+            return None
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                self.embedding_service.embed_query(description), self._get_loop()
+            )
+            return list(future.result(self.timeout))
+        except Exception as e:
+            with self._lock:
+                self._stats["embedding_errors"] += 1
+            logger.warning(f"工作流描述嵌入失败，跳过相似度匹配: {e}")
+            return None
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """获取（必要时启动）嵌入计算专用的事件循环线程"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="n8n-template-store", daemon=True).start()
+            return self._loop
+
+    def _load(self) -> None:
+        if not os.path.exists(self.storage_path):
+            return
+        try:
+            with open(self.storage_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"加载工作流模板失败: {e}")
+            return
+        for record in records[-self.max_templates:]:
+            template = WorkflowTemplate(**record)
+            self._templates.append(template)
+            self._by_description[normalize_description(template.description)] = template
+
+    def _save(self) -> None:
+        """持久化模板（调用方需持有锁）"""
+        if not self.storage_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.storage_path)), exist_ok=True)
+            tmp_path = f"{self.storage_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump([asdict(template) for template in self._templates], f, ensure_ascii=False)
+            os.replace(tmp_path, self.storage_path)
+        except OSError as e:
+            logger.warning(f"保存工作流模板失败: {e}")
+
+
+# 全局模板库实例（首次使用时按 services.tools.n8n_templates 配置创建）
+_template_store: Optional[WorkflowTemplateStore] = None
+_template_store_lock = threading.Lock()
+
+
+def get_workflow_template_store() -> WorkflowTemplateStore:
+    """获取全局工作流模板库"""
+    global _template_store
+    with _template_store_lock:
+        if _template_store is None:
+            services = config_loader.get_services_config().get("services", {})
+            template_config = services.get("tools", {}).get("n8n_templates", {})
+
+            embedding_service = None
+            # 嵌入模型首次加载可能阻塞工具调用数秒，默认关闭，只在显式开启时挑选 few-shot 示例
+            if template_config.get("use_embeddings", False):
+                embedding_config = services.get("embedding", {})
+                try:
+                    from src.infrastructure.embedding import EmbeddingServiceFactory
+                    embedding_service = EmbeddingServiceFactory.create_embedding_service(
+                        provider=embedding_config.get("provider", "huggingface"),
+                        model=embedding_config.get("model"),
+                        api_key=embedding_config.get("api_key") or None
+                    )
+                except Exception as e:
+                    logger.warning(f"嵌入服务不可用，工作流模板只做精确匹配: {e}")
+
+            _template_store = WorkflowTemplateStore(
+                embedding_service=embedding_service,
+                similarity_threshold=template_config.get("similarity_threshold", 0.92),
+                max_templates=template_config.get("max_templates", 500),
+                storage_path=template_config.get("storage_path", "./data/n8n_workflow_templates.json")
+            )
+        return _template_store
+
+
+def get_workflow_template_stats() -> Dict[str, Any]:
+    """获取工作流模板库统计，模板库尚未创建时返回空字典"""
+    if _template_store is None:
+        return {}
+    return _template_store.get_stats()
@@ -0,0 +1,307 @@
+"""
+并行ReAct模块
+允许模型在一个推理步骤中给出多个相互独立的工具调用，并发执行后一次性把所有观察结果反馈给模型
+"""
+
+import asyncio
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from langchain.agents import AgentExecutor
+from langchain.agents.agent import MultiActionAgentOutputParser
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
+from langchain.agents.output_parsers.react_single_input import (
+    FINAL_ANSWER_ACTION,
+    FINAL_ANSWER_AND_PARSABLE_ACTION_ERROR_MESSAGE
+)
+from langchain.tools.render import render_text_description
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnablePassthrough
+from langchain_core.tools import BaseTool
+from pydantic import PrivateAttr
+
+
+# 追加在工具说明之后，告诉模型可以在同一步给出多个互不依赖的工具调用
+PARALLEL_TOOL_INSTRUCTIONS = """
+
+When several tool calls do not depend on each other's results (e.g. assessing risk for three
+suppliers and forecasting demand), list them all in the same step and they will run in parallel:
+
+Thought: these calls are independent
+Action: first tool name
+Action Input: first input
+Action: second tool name
+Action Input: second input
+
+All observations are returned together as "Observation 1", "Observation 2", ... in the same order.
+Only combine calls whose inputs are already known; otherwise use one Action per step."""
+
+# 匹配一个 Action/Action Input 对，输入延伸到下一个 Action/Thought 或文本结尾
+_ACTION_PATTERN = re.compile(
+    r"Action\s*\d*\s*:[\s]*(.*?)[\s]*Action\s*\d*\s*Input\s*\d*\s*:[\s]*(.*?)"
+    r"(?=\n\s*(?:Action\s*\d*\s*:|Thought\s*\d*\s*:)|\Z)",
+    re.DOTALL
+)
+
+
+class ParallelReActOutputParser(MultiActionAgentOutputParser):
+    """
+    多动作ReAct输出解析器
+
+    只有一个动作或格式不完整时交给标准 ReActSingleInputOutputParser 处理，
+    因此单动作时的行为和错误提示与标准ReAct完全一致。
+    """
+
+    def parse(self, text: str) -> Union[List[AgentAction], AgentFinish]:
+        matches = list(_ACTION_PATTERN.finditer(text))
+        if len(matches) <= 1:
+            result = ReActSingleInputOutputParser().parse(text)
+            return result if isinstance(result, AgentFinish) else [result]
+
+        if FINAL_ANSWER_ACTION in text:
+            raise OutputParserException(f"{FINAL_ANSWER_AND_PARSABLE_ACTION_ERROR_MESSAGE}: {text}")
+
+        # 重复的动作保留在列表中，使 Observation 编号与模型给出的 Action 一一对应；
+        # 执行器对同一步内的重复动作只执行一次并共享结果
+        actions: List[AgentAction] = []
+        for match in matches:
+            tool = match.group(1).strip()
+            tool_input = match.group(2).strip().strip(" ").strip('"')
+            # 同一步的所有动作共享完整的模型输出作为日志，便于草稿区只回放一次
+            actions.append(AgentAction(tool, tool_input, text))
+        return actions
+
+    @property
+    def _type(self) -> str:
+        return "parallel-react"
+
+
+def format_parallel_log_to_str(
+    intermediate_steps: List[Tuple[AgentAction, str]],
+    observation_prefix: str = "Observation",
+    llm_prefix: str = "Thought: "
+) -> str:
+    """
+    构造草稿区（agent_scratchpad）
+
+    连续且日志相同的步骤属于同一次模型输出，只回放一次日志，
+    观察结果按动作顺序编号；单动作步骤与 format_log_to_str 输出一致。
+
+    Args:
+        intermediate_steps: 中间步骤
+        observation_prefix: 观察结果前缀
+        llm_prefix: 下一轮思考前缀
+
+    Returns:
+        草稿区文本
+    """
+    thoughts = ""
+    index = 0
+    while index < len(intermediate_steps):
+        action, observation = intermediate_steps[index]
+        group = [observation]
+        index += 1
+        while index < len(intermediate_steps) and intermediate_steps[index][0].log == action.log:
+            group.append(intermediate_steps[index][1])
+            index += 1
+
+        thoughts += action.log
+        if len(group) == 1:
+            thoughts += f"\n{observation_prefix}: {group[0]}\n{llm_prefix}"
+        else:
+            for number, item in enumerate(group, 1):
+                thoughts += f"\n{observation_prefix} {number}: {item}"
+            thoughts += f"\n{llm_prefix}"
+    return thoughts
+
+
+def create_parallel_react_agent(
+    llm: BaseLanguageModel,
+    tools: Sequence[BaseTool],
+    prompt: BasePromptTemplate
+) -> Runnable:
+    """
+    创建支持单步多工具调用的ReAct智能体
+
+    与 create_react_agent 使用相同的提示词变量（tools、tool_names、agent_scratchpad），
+    并在工具说明后追加并行调用格式说明，因此可以直接复用现有提示词配置。
+
+    Args:
+        llm: 语言模型
+        tools: 工具列表
+        prompt: 提示词模板
+
+    Returns:
+        输出为 List[AgentAction] 或 AgentFinish 的智能体 Runnable
+    """
+    missing_vars = {"tools", "tool_names", "agent_scratchpad"}.difference(
+        prompt.input_variables + list(prompt.partial_variables)
+    )
+    if missing_vars:
+        raise ValueError(f"Prompt missing required variables: {missing_vars}")
+
+    prompt = prompt.partial(
+        tools=render_text_description(list(tools)) + PARALLEL_TOOL_INSTRUCTIONS,
+        tool_names=", ".join(tool.name for tool in tools)
+    )
+    return (
+        RunnablePassthrough.assign(
+            agent_scratchpad=lambda x: format_parallel_log_to_str(x["intermediate_steps"])
+        )
+        | prompt
+        | llm.bind(stop=["\nObservation"])
+        | ParallelReActOutputParser()
+    )
+
+
+def is_parallel_safe(tool: Optional[BaseTool]) -> bool:
+    """
+    工具是否可以与同一步的其他工具并发执行
+
+    只有无副作用的工具才允许并发：启用了结果记忆化的确定性工具（tools_config.json 中 memoize=true），
+    或在 metadata 中声明 parallel_safe 的工具。创建/删除工作流、运行团队等有副作用的工具按顺序执行。
+    """
+    if tool is None:
+        # 未知工具由 InvalidTool 返回错误信息，没有副作用
+        return True
+    return bool(getattr(tool, "_memoized", False) or (tool.metadata or {}).get("parallel_safe"))
+
+
+def _action_key(action: AgentAction) -> Tuple[str, str]:
+    return action.tool, str(action.tool_input)
+
+
+def _shared_step(step: AgentStep, action: AgentAction) -> AgentStep:
+    """重复动作复用同一结果，但保留各自的动作对象"""
+    return step if step.action is action else AgentStep(action=action, observation=step.observation)
+
+
+class _ActionBatch:
+    """同一步中待执行的一组动作"""
+
+    def __init__(self):
+        self.actions: List[AgentAction] = []
+        self.parallel: Optional[bool] = None
+        # 按 (工具, 输入) 去重后的执行结果，重复动作共享
+        self.futures: Dict[Tuple[str, str], Future] = {}
+        self.steps: Dict[Tuple[str, str], AgentStep] = {}
+        self.tasks: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.lock: Optional[asyncio.Lock] = None
+
+    def unique_actions(self) -> Dict[Tuple[str, str], AgentAction]:
+        unique: Dict[Tuple[str, str], AgentAction] = {}
+        for action in self.actions:
+            unique.setdefault(_action_key(action), action)
+        return unique
+
+
+class ParallelAgentExecutor(AgentExecutor):
+    """
+    并行工具执行器
+
+    同步路径（invoke）用线程池并发执行同一步的动作，异步路径（ainvoke/astream）沿用
+    AgentExecutor 的 asyncio.gather；执行结果均按动作顺序返回。
+    只有一步中的工具全部无副作用（见 is_parallel_safe）时才并发，否则按顺序执行；
+    同一步内重复的 (工具, 输入) 只执行一次。
+    """
+
+    max_parallel_tools: int = 4
+    """同一步内最多并发执行的工具数"""
+
+    _batches: Dict[int, _ActionBatch] = PrivateAttr(default_factory=dict)
+
+    def _register(self, batch: _ActionBatch, item) -> None:
+        if isinstance(item, AgentAction):
+            self._batches[id(item)] = batch
+            batch.actions.append(item)
+
+    def _release(self, batch: _ActionBatch) -> None:
+        for action in batch.actions:
+            self._batches.pop(id(action), None)
+
+    def _runs_in_parallel(self, batch: _ActionBatch, name_to_tool_map) -> bool:
+        if batch.parallel is None:
+            batch.parallel = (
+                self.max_parallel_tools > 1
+                and len(batch.unique_actions()) > 1
+                and all(is_parallel_safe(name_to_tool_map.get(action.tool)) for action in batch.actions)
+            )
+        return batch.parallel
+
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        # 标准实现先产出本步的全部动作，再逐个调用 _perform_agent_action；
+        # 在动作产出时登记批次，第一次执行时决定并发或顺序执行
+        batch = _ActionBatch()
+        try:
+            for item in super()._iter_next_step(
+                name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+            ):
+                self._register(batch, item)
+                yield item
+        finally:
+            self._release(batch)
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None) -> AgentStep:
+        batch = self._batches.pop(id(agent_action), None)
+        if batch is None or len(batch.actions) <= 1:
+            return super()._perform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+        key = _action_key(agent_action)
+        if self._runs_in_parallel(batch, name_to_tool_map):
+            if not batch.futures:
+                unique = batch.unique_actions()
+                workers = min(self.max_parallel_tools, len(unique))
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="react-tool") as pool:
+                    batch.futures = {
+                        action_key: pool.submit(
+                            super(ParallelAgentExecutor, self)._perform_agent_action,
+                            name_to_tool_map, color_mapping, action, run_manager
+                        )
+                        for action_key, action in unique.items()
+                    }
+            return _shared_step(batch.futures[key].result(), agent_action)
+
+        # 顺序执行：动作按产出顺序逐个执行，重复动作复用前面的结果
+        step = batch.steps.get(key)
+        if step is None:
+            step = batch.steps[key] = super()._perform_agent_action(
+                name_to_tool_map, color_mapping, agent_action, run_manager
+            )
+        return _shared_step(step, agent_action)
+
+    async def _aiter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        batch = _ActionBatch()
+        try:
+            async for item in super()._aiter_next_step(
+                name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+            ):
+                self._register(batch, item)
+                yield item
+        finally:
+            self._release(batch)
+
+    async def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None) -> AgentStep:
+        batch = self._batches.pop(id(agent_action), None)
+        if batch is None or len(batch.actions) <= 1:
+            return await super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+        key = _action_key(agent_action)
+        task = batch.tasks.get(key)
+        if task is None:
+            perform = super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+            if not self._runs_in_parallel(batch, name_to_tool_map):
+                # asyncio.gather 按动作顺序启动协程，锁按获取顺序放行，因此仍按动作顺序逐个执行
+                if batch.lock is None:
+                    batch.lock = asyncio.Lock()
+                perform = self._serialized(batch.lock, perform)
+            task = batch.tasks[key] = asyncio.ensure_future(perform)
+        return _shared_step(await task, agent_action)
+
+    @staticmethod
+    async def _serialized(lock: asyncio.Lock, perform):
+        async with lock:
+            return await perform
@@ -0,0 +1,155 @@
+"""
+智能体流式事件模块
+把 LangChain astream_events 转换为类型化事件（token、tool_start、tool_end、final），
+并过滤掉ReAct的 Thought/Action 脚手架，只把最终答案逐token推送给客户端
+"""
+
+import json
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, Optional
+
+from langchain_core.runnables import Runnable
+
+
+# 智能体主LLM的标签，用于区分工具内部发起的LLM调用
+AGENT_LLM_TAG = "agent_reasoning"
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+class StreamEventType(Enum):
+    """流式事件类型"""
+    TOKEN = "token"  # 最终答案的一个token片段
+    TOOL_START = "tool_start"  # 工具开始执行
+    TOOL_END = "tool_end"  # 工具执行完成
+    FINAL = "final"  # 完整的最终答案
+    ERROR = "error"  # 执行出错
+
+
+@dataclass
+class AgentStreamEvent:
+    """智能体流式事件"""
+    type: StreamEventType
+    data: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {"type": self.type.value, "data": self.data, "timestamp": self.timestamp}
+
+    def to_sse(self) -> str:
+        """转换为 Server-Sent Events 格式的文本帧"""
+        payload = json.dumps(self.data, ensure_ascii=False, default=str)
+        return f"event: {self.type.value}\ndata: {payload}\n\n"
+
+
+class FinalAnswerStreamFilter:
+    """
+    最终答案流过滤器
+
+    逐token输入一次LLM调用的输出，在出现 "Final Answer:" 之前的内容（Thought/Action/Action Input）全部丢弃，
+    之后的内容原样输出。标记可能被拆分在多个token中，因此保留尾部缓冲直到能确定是否匹配。
+    """
+
+    def __init__(self, marker: str = FINAL_ANSWER_MARKER):
+        self.marker = marker
+        self.found = False
+        self._buffer = ""
+        self._strip_leading = True
+
+    def feed(self, text: str) -> str:
+        """
+        输入一个token，返回应当输出给客户端的文本（可能为空）
+
+        Args:
+            text: LLM输出的token
+
+        Returns:
+            需要输出的文本
+        """
+        if not self.found:
+            self._buffer += text
+            index = self._buffer.find(self.marker)
+            if index < 0:
+                # 只需保留可能构成标记前缀的尾部
+                self._buffer = self._buffer[-(len(self.marker) - 1):]
+                return ""
+            self.found = True
+            text = self._buffer[index + len(self.marker):]
+            self._buffer = ""
+
+        if self._strip_leading:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._strip_leading = False
+        return text
+
+
+def _chunk_text(chunk: Any) -> str:
+    """提取LLM流式块中的文本"""
+    if chunk is None:
+        return ""
+    content = getattr(chunk, "content", None)
+    if content is None:
+        content = getattr(chunk, "text", chunk)
+    if isinstance(content, list):
+        # 多模态消息内容块
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content if isinstance(content, str) else str(content)
+
+
+async def stream_agent_events(
+    runnable: Runnable,
+    inputs: Dict[str, Any],
+    config: Optional[Dict[str, Any]] = None,
+    llm_tag: Optional[str] = AGENT_LLM_TAG
+) -> AsyncIterator[AgentStreamEvent]:
+    """
+    运行智能体并产出类型化流式事件
+
+    Args:
+        runnable: AgentExecutor 或 RunnableWithMessageHistory
+        inputs: 输入
+        config: 运行配置（如 session_id）
+        llm_tag: 只转发带有该标签的LLM调用的token，None 表示转发全部LLM调用
+
+    Yields:
+        AgentStreamEvent: 流式事件
+    """
+    filters: Dict[str, FinalAnswerStreamFilter] = {}
+
+    async for event in runnable.astream_events(inputs, config=config, version="v2"):
+        kind = event["event"]
+        run_id = event.get("run_id", "")
+
+        if kind in ("on_chat_model_stream", "on_llm_stream"):
+            if llm_tag and llm_tag not in event.get("tags", []):
+                continue
+            stream_filter = filters.setdefault(run_id, FinalAnswerStreamFilter())
+            text = stream_filter.feed(_chunk_text(event["data"].get("chunk")))
+            if text:
+                yield AgentStreamEvent(StreamEventType.TOKEN, {"token": text})
+
+        elif kind in ("on_chat_model_end", "on_llm_end"):
+            filters.pop(run_id, None)
+
+        elif kind == "on_tool_start":
+            yield AgentStreamEvent(StreamEventType.TOOL_START, {
+                "tool": event.get("name"),
+                "input": event["data"].get("input"),
+            })
+
+        elif kind == "on_tool_end":
+            yield AgentStreamEvent(StreamEventType.TOOL_END, {
+                "tool": event.get("name"),
+                "output": str(event["data"].get("output")),
+            })
+
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            output = event["data"].get("output")
+            if isinstance(output, dict):
+                output = output.get("output", output)
+            yield AgentStreamEvent(StreamEventType.FINAL, {"output": output})
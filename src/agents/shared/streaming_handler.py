@@ -1,6 +1,9 @@
 """
 流式输出处理器
 提供美观的、层次分明的智能体执行过程展示
+
+回调只把结构化事件写入事件总线的环形缓冲区，终端渲染在总线的消费线程中完成，
+因此终端或重定向日志变慢不会拖慢智能体本身。
 """
 
 import sys
@@ -9,9 +12,46 @@ from typing import Any, Dict, List, Optional
 from langchain.callbacks.base import BaseCallbackHandler
 from langchain_core.agents import AgentAction, AgentFinish
 from langchain_core.outputs import LLMResult
+from src.interfaces.events.event_bus import Event, EventBus
+
+
+class BufferedStreamingHandler(BaseCallbackHandler):
+    """缓冲式流式处理器基类 - 回调入队，消费线程渲染"""
+    
+    def __init__(self, event_bus: Optional[EventBus] = None, flush_timeout: float = 5.0):
+        """
+        初始化缓冲式处理器
+        
+        Args:
+            event_bus: 事件总线，默认为每个处理器创建独立的总线；
+                       共享总线时可以再订阅日志或网络等其他消费者
+            flush_timeout: 链结束时等待终端渲染完成的最长时间（秒）
+        """
+        super().__init__()
+        self.event_bus = event_bus or EventBus(name=f"{type(self).__name__}-render")
+        self.flush_timeout = flush_timeout
+        self.event_bus.subscribe(self.render)
+    
+    def _emit(self, event_type: str, **payload: Any) -> None:
+        """发布事件，缓冲区满时直接丢弃"""
+        self.event_bus.publish(event_type, **payload)
+    
+    def _flush(self) -> None:
+        """等待已发布的事件渲染完成，保证最终答案打印在执行过程之后"""
+        self.event_bus.flush(self.flush_timeout)
+    
+    def render(self, event: Event) -> None:
+        """在消费线程中渲染事件"""
+        renderer = getattr(self, f"_render_{event.type}", None)
+        if renderer:
+            renderer(**event.payload)
+    
+    def on_chain_error(self, error: BaseException, **kwargs) -> None:
+        """链出错时等待渲染完成"""
+        self._flush()
 
 
-class StreamingDisplayHandler(BaseCallbackHandler):
+class StreamingDisplayHandler(BufferedStreamingHandler):
     """流式显示处理器 - 美观的输出格式"""
     
     # 颜色代码
@@ -44,15 +84,16 @@ class StreamingDisplayHandler(BaseCallbackHandler):
         'output': '📤',
     }
     
-    def __init__(self, verbose: bool = True, show_colors: bool = True):
+    def __init__(self, verbose: bool = True, show_colors: bool = True, event_bus: Optional[EventBus] = None):
         """
         初始化流式显示处理器
         
         Args:
             verbose: 是否显示详细信息
             show_colors: 是否使用颜色
+            event_bus: 事件总线，默认创建独立的总线
         """
-        super().__init__()
+        super().__init__(event_bus)
         self.verbose = verbose
         self.show_colors = show_colors
         self.step_count = 0
@@ -96,8 +137,41 @@ class StreamingDisplayHandler(BaseCallbackHandler):
         """Agent链开始时调用"""
         if not self.verbose:
             return
-        
-        chain_name = serialized.get("name", "Agent")
+        self._emit("chain_start", inputs=inputs)
+    
+    def on_chain_end(self, outputs: Dict[str, Any], **kwargs) -> None:
+        """Agent链结束时调用"""
+        if not self.verbose:
+            return
+        self._emit("chain_end", outputs=outputs)
+        self._flush()
+    
+    def on_agent_action(self, action: AgentAction, **kwargs) -> None:
+        """Agent执行动作时调用"""
+        if not self.verbose:
+            return
+        self.step_count += 1
+        self._emit("agent_action", action=action)
+    
+    def on_tool_end(self, output: str, **kwargs) -> None:
+        """工具执行结束时调用"""
+        if not self.verbose:
+            return
+        self._emit("tool_end", output=output)
+    
+    def on_tool_error(self, error: Exception, **kwargs) -> None:
+        """工具执行错误时调用"""
+        if not self.verbose:
+            return
+        self._emit("tool_error", error=error)
+    
+    def on_agent_finish(self, finish: AgentFinish, **kwargs) -> None:
+        """Agent完成时调用"""
+        if not self.verbose:
+            return
+        self._emit("agent_finish", finish=finish)
+    
+    def _render_chain_start(self, inputs: Dict[str, Any]) -> None:
         user_input = inputs.get("input", inputs.get("question", ""))
         
         self._print_box(
@@ -107,12 +181,7 @@ class StreamingDisplayHandler(BaseCallbackHandler):
             color="header"
         )
     
-    def on_chain_end(self, outputs: Dict[str, Any], **kwargs) -> None:
-        """Agent链结束时调用"""
-        if not self.verbose:
-            return
-        
-        output = outputs.get("output", "")
+    def _render_chain_end(self, outputs: Dict[str, Any]) -> None:
         self._print_box(
             "执行完成",
             "",
@@ -120,13 +189,7 @@ class StreamingDisplayHandler(BaseCallbackHandler):
             color="green"
         )
     
-    def on_agent_action(self, action: AgentAction, **kwargs) -> None:
-        """Agent执行动作时调用"""
-        if not self.verbose:
-            return
-        
-        self.step_count += 1
-        
+    def _render_agent_action(self, action: AgentAction) -> None:
         # 解析思考过程
         thought = self._extract_thought(action.log)
         
@@ -144,7 +207,6 @@ class StreamingDisplayHandler(BaseCallbackHandler):
             )
         
         # 显示工具调用
-        tool_icon = self._get_tool_icon(action.tool)
         self._print_section(
             f"工具调用: {action.tool}",
             f"参数: {self._format_input(action.tool_input)}",
@@ -156,17 +218,13 @@ class StreamingDisplayHandler(BaseCallbackHandler):
         sys.stdout.write(self._color(f"  ⏳ 执行中", "gray"))
         sys.stdout.flush()
     
-    def on_tool_end(self, output: str, **kwargs) -> None:
-        """工具执行结束时调用"""
-        if not self.verbose:
-            return
-        
+    def _render_tool_end(self, output: Any) -> None:
         # 清除"执行中"提示
         sys.stdout.write("\r" + " " * 50 + "\r")
         sys.stdout.flush()
         
         # 显示工具结果
-        formatted_output = self._format_tool_output(output)
+        formatted_output = self._format_tool_output(str(output))
         self._print_section(
             "观察结果",
             formatted_output,
@@ -174,11 +232,7 @@ class StreamingDisplayHandler(BaseCallbackHandler):
             indent=0
         )
     
-    def on_tool_error(self, error: Exception, **kwargs) -> None:
-        """工具执行错误时调用"""
-        if not self.verbose:
-            return
-        
+    def _render_tool_error(self, error: Exception) -> None:
         self._print_section(
             "错误",
             str(error),
@@ -186,11 +240,7 @@ class StreamingDisplayHandler(BaseCallbackHandler):
             indent=0
         )
     
-    def on_agent_finish(self, finish: AgentFinish, **kwargs) -> None:
-        """Agent完成时调用"""
-        if not self.verbose:
-            return
-        
+    def _render_agent_finish(self, finish: AgentFinish) -> None:
         # 解析最终思考
         final_thought = self._extract_final_thought(finish.log)
         
@@ -292,11 +342,17 @@ class StreamingDisplayHandler(BaseCallbackHandler):
         return '🔧'
 
 
-class SimpleStreamingHandler(BaseCallbackHandler):
+class SimpleStreamingHandler(BufferedStreamingHandler):
     """简化版流式处理器 - 更简洁的输出"""
     
-    def __init__(self):
-        super().__init__()
+    def __init__(self, event_bus: Optional[EventBus] = None):
+        """
+        初始化简化版处理器
+        
+        Args:
+            event_bus: 事件总线，默认创建独立的总线
+        """
+        super().__init__(event_bus)
         self.step_count = 0
         self.current_tool = None
     
@@ -304,7 +360,31 @@ class SimpleStreamingHandler(BaseCallbackHandler):
         """Agent执行动作时调用"""
         self.step_count += 1
         self.current_tool = action.tool
-        
+        self._emit("agent_action", action=action)
+    
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs) -> None:
+        """工具开始执行"""
+        # 工具开始执行时的回调
+        pass
+    
+    def on_tool_end(self, output: str, **kwargs) -> None:
+        """工具执行结束时调用"""
+        self._emit("tool_end", output=output)
+    
+    def on_tool_error(self, error: Exception, **kwargs) -> None:
+        """工具执行错误时调用"""
+        self._emit("tool_error", error=error)
+    
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Dict[str, Any], **kwargs) -> None:
+        """链开始"""
+        self._emit("chain_start", inputs=inputs)
+    
+    def on_chain_end(self, outputs: Dict[str, Any], **kwargs) -> None:
+        """链结束"""
+        self._emit("chain_end", outputs=outputs)
+        self._flush()
+    
+    def _render_agent_action(self, action: AgentAction) -> None:
         print(f"\n{'─' * 60}")
         
         # 显示工具
@@ -325,13 +405,7 @@ class SimpleStreamingHandler(BaseCallbackHandler):
         sys.stdout.write("⏳ 执行中...")
         sys.stdout.flush()
     
-    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs) -> None:
-        """工具开始执行"""
-        # 工具开始执行时的回调
-        pass
-    
-    def on_tool_end(self, output: str, **kwargs) -> None:
-        """工具执行结束时调用"""
+    def _render_tool_end(self, output: Any) -> None:
         # 清除"执行中"提示
         sys.stdout.write("\r" + " " * 60 + "\r")
         sys.stdout.flush()
@@ -339,6 +413,7 @@ class SimpleStreamingHandler(BaseCallbackHandler):
         print("✅ 完成")
         
         # 显示结果摘要
+        output = str(output) if output is not None else ""
         if output:
             summary = output[:200] + "..." if len(output) > 200 else output
             # 处理多行输出
@@ -351,14 +426,12 @@ class SimpleStreamingHandler(BaseCallbackHandler):
                 print(f"   ... (共{len(lines)}行)")
         print()
     
-    def on_tool_error(self, error: Exception, **kwargs) -> None:
-        """工具执行错误时调用"""
+    def _render_tool_error(self, error: Exception) -> None:
         sys.stdout.write("\r" + " " * 60 + "\r")
         sys.stdout.flush()
         print(f"❌ 错误: {str(error)}\n")
     
-    def on_chain_start(self, serialized: Dict[str, Any], inputs: Dict[str, Any], **kwargs) -> None:
-        """链开始"""
+    def _render_chain_start(self, inputs: Dict[str, Any]) -> None:
         user_input = inputs.get("input", "")
         print(f"\n{'═' * 60}")
         print(f"🤖 智能体启动")
@@ -366,8 +439,7 @@ class SimpleStreamingHandler(BaseCallbackHandler):
         print(f"📥 问题: {user_input}")
         print(f"{'═' * 60}\n")
     
-    def on_chain_end(self, outputs: Dict[str, Any], **kwargs) -> None:
-        """链结束"""
+    def _render_chain_end(self, outputs: Dict[str, Any]) -> None:
         print(f"\n{'═' * 60}")
         print(f"✅ 执行完成")
         print(f"{'═' * 60}\n")
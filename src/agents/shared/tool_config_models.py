@@ -51,6 +51,8 @@ class ToolConfig(BaseModel):
     enabled: bool = Field(True, description="是否启用")
     description: Optional[str] = Field(None, description="工具描述")
     config: Dict[str, Any] = Field(default_factory=dict, description="工具特定配置")
+    memoize: bool = Field(False, description="是否按输入指纹缓存工具结果（仅适用于确定性工具）")
+    memoize_ttl: Optional[int] = Field(None, description="结果缓存过期时间(秒)，默认使用全局配置")
 
 
 class BuiltinToolConfig(ToolConfig):
@@ -0,0 +1,307 @@
+"""
+工具结果记忆化模块
+对确定性工具（分析、预测、优化、风险评估等）按输入指纹缓存结果，重复调用直接命中缓存
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, Optional, Tuple
+
+from langchain.tools import BaseTool
+
+from src.config.config_loader import config_loader
+
+logger = logging.getLogger(__name__)
+
+# 记忆化的 _arun 未命中时置位：工具自己的 _arun 通常直接调用 self._run（此时已被替换为记忆化版本），
+# 置位期间 _run 跳过缓存，避免同一次调用被查询、统计、写入两次，以及在事件循环上同步等待缓存
+_bypass_memoization: ContextVar[bool] = ContextVar("bypass_tool_memoization", default=False)
+
+
+def normalize_tool_input(value: Any) -> Any:
+    """
+    规范化工具输入，使语义相同的输入得到相同的指纹
+
+    JSON字符串会被解析后按键排序重新序列化，其他字符串去除首尾空白。
+
+    Args:
+        value: 工具输入
+
+    Returns:
+        规范化后的输入
+    """
+    if isinstance(value, str):
+        stripped = value.strip()
+        if stripped[:1] in ("{", "["):
+            try:
+                return {"__json__": json.loads(stripped)}
+            except ValueError:
+                pass
+        return stripped
+    if isinstance(value, dict):
+        return {str(k): normalize_tool_input(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_tool_input(item) for item in value]
+    return value
+
+
+def tool_input_fingerprint(tool_name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
+    """
+    计算工具输入指纹
+
+    Args:
+        tool_name: 工具名称
+        args: 位置参数
+        kwargs: 关键字参数（run_manager 等回调参数会被忽略）
+
+    Returns:
+        SHA-256 十六进制摘要
+    """
+    payload = {
+        "tool": tool_name,
+        "args": normalize_tool_input(list(args)),
+        "kwargs": normalize_tool_input({k: v for k, v in kwargs.items() if k not in ("run_manager", "callbacks")}),
+    }
+    serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class ToolResultMemoizer:
+    """
+    基于 CacheService 的工具结果记忆化层
+
+    CacheService 是异步接口，而 AgentExecutor 的同步路径会调用工具的 _run，
+    因此所有缓存操作都在记忆化层自己的事件循环线程上执行，同步和异步调用共享同一个缓存客户端。
+    """
+
+    def __init__(
+        self,
+        cache_service: Optional[Any] = None,
+        default_ttl: int = 3600,
+        max_entries: int = 1024,
+        key_prefix: str = "tool_memo:",
+        timeout: float = 2.0
+    ):
+        """
+        初始化记忆化层
+
+        Args:
+            cache_service: 缓存服务实例，默认使用内存缓存
+            default_ttl: 默认过期时间（秒）
+            max_entries: 最多记录的结果数，超出时按LRU淘汰
+            key_prefix: 缓存键前缀
+            timeout: 单次缓存操作超时（秒），超时视为未命中
+        """
+        if cache_service is None:
+            from src.infrastructure.cache.cache_service import MemoryCacheService
+            cache_service = MemoryCacheService()
+        self.cache = cache_service
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """获取（必要时启动）缓存操作专用的事件循环线程"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="tool-memoizer", daemon=True).start()
+            return self._loop
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+
+    def _record(self, tool_name: str, field: str) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(tool_name, {"hits": 0, "misses": 0, "stores": 0, "errors": 0})
+            stats[field] += 1
+
+    def make_key(self, tool_name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
+        """生成缓存键"""
+        return f"{self.key_prefix}{tool_name}:{tool_input_fingerprint(tool_name, args, kwargs)}"
+
+    async def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self.cache.get(key)
+
+    async def _store(self, key: str, result: Any, ttl: int) -> None:
+        await self.cache.set(key, {"result": result}, expire=ttl)
+        evicted = []
+        with self._lock:
+            self._lru[key] = None
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                evicted.append(self._lru.popitem(last=False)[0])
+        for old_key in evicted:
+            await self.cache.delete(old_key)
+
+    def _handle_lookup(self, tool_name: str, key: str, entry: Any) -> Tuple[bool, Any]:
+        if isinstance(entry, dict) and "result" in entry:
+            self._record(tool_name, "hits")
+            with self._lock:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+            return True, entry["result"]
+        self._record(tool_name, "misses")
+        return False, None
+
+    def lookup(self, tool_name: str, key: str) -> Tuple[bool, Any]:
+        """同步查询缓存，返回 (是否命中, 结果)"""
+        try:
+            entry = self._submit(self._lookup(key)).result(self.timeout)
+        except Exception as e:
+            logger.debug(f"工具缓存查询失败 {tool_name}: {e}")
+            self._record(tool_name, "errors")
+            entry = None
+        return self._handle_lookup(tool_name, key, entry)
+
+    async def alookup(self, tool_name: str, key: str) -> Tuple[bool, Any]:
+        """异步查询缓存，返回 (是否命中, 结果)"""
+        try:
+            entry = await asyncio.wait_for(asyncio.wrap_future(self._submit(self._lookup(key))), self.timeout)
+        except Exception as e:
+            logger.debug(f"工具缓存查询失败 {tool_name}: {e}")
+            self._record(tool_name, "errors")
+            entry = None
+        return self._handle_lookup(tool_name, key, entry)
+
+    def store(self, tool_name: str, key: str, result: Any, ttl: Optional[int] = None) -> None:
+        """同步写入缓存，失败时只记录错误"""
+        try:
+            self._submit(self._store(key, result, ttl or self.default_ttl)).result(self.timeout)
+            self._record(tool_name, "stores")
+        except Exception as e:
+            logger.debug(f"工具缓存写入失败 {tool_name}: {e}")
+            self._record(tool_name, "errors")
+
+    async def astore(self, tool_name: str, key: str, result: Any, ttl: Optional[int] = None) -> None:
+        """异步写入缓存，失败时只记录错误"""
+        try:
+            future = self._submit(self._store(key, result, ttl or self.default_ttl))
+            await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+            self._record(tool_name, "stores")
+        except Exception as e:
+            logger.debug(f"工具缓存写入失败 {tool_name}: {e}")
+            self._record(tool_name, "errors")
+
+    def wrap_tool(self, tool: BaseTool, ttl: Optional[int] = None) -> BaseTool:
+        """
+        为工具实例启用记忆化（原地替换 _run/_arun，工具名称和参数签名保持不变）
+
+        Args:
+            tool: 工具实例
+            ttl: 该工具结果的过期时间，默认使用 default_ttl
+
+        Returns:
+            同一个工具实例
+        """
+        if getattr(tool, "_memoized", False):
+            return tool
+
+        original_run = tool._run
+        original_arun = tool._arun
+        memoizer = self
+
+        @wraps(original_run)
+        def _run(*args, **kwargs):
+            if _bypass_memoization.get():
+                return original_run(*args, **kwargs)
+            key = memoizer.make_key(tool.name, args, kwargs)
+            hit, result = memoizer.lookup(tool.name, key)
+            if hit:
+                return result
+            result = original_run(*args, **kwargs)
+            memoizer.store(tool.name, key, result, ttl)
+            return result
+
+        @wraps(original_arun)
+        async def _arun(*args, **kwargs):
+            key = memoizer.make_key(tool.name, args, kwargs)
+            hit, result = await memoizer.alookup(tool.name, key)
+            if hit:
+                return result
+            token = _bypass_memoization.set(True)
+            try:
+                result = await original_arun(*args, **kwargs)
+            finally:
+                _bypass_memoization.reset(token)
+            await memoizer.astore(tool.name, key, result, ttl)
+            return result
+
+        # BaseTool 是 pydantic 模型，使用 object.__setattr__ 绕过字段校验
+        object.__setattr__(tool, "_run", _run)
+        object.__setattr__(tool, "_arun", _arun)
+        object.__setattr__(tool, "_memoized", True)
+        return tool
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取命中统计
+
+        Returns:
+            包含总体和按工具划分的命中次数与命中率的字典
+        """
+        with self._lock:
+            per_tool = {name: dict(stats) for name, stats in self._stats.items()}
+            entries = len(self._lru)
+        for stats in per_tool.values():
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        hits = sum(stats["hits"] for stats in per_tool.values())
+        misses = sum(stats["misses"] for stats in per_tool.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "entries": entries,
+            "tools": per_tool,
+        }
+
+    def reset_stats(self) -> None:
+        """重置命中统计"""
+        with self._lock:
+            self._stats.clear()
+
+
+# 全局记忆化层实例（首次使用时按 services.tools.memoization 配置创建）
+_tool_memoizer: Optional[ToolResultMemoizer] = None
+
+
+def get_tool_memoizer() -> ToolResultMemoizer:
+    """获取全局工具记忆化层"""
+    global _tool_memoizer
+    if _tool_memoizer is None:
+        services = config_loader.get_services_config().get("services", {})
+        memo_config = services.get("tools", {}).get("memoization", {})
+        backend = memo_config.get("backend", "memory")
+
+        cache_service = None
+        if backend != "memory":
+            from src.infrastructure.cache.cache_service import CacheServiceFactory
+            cache_service = CacheServiceFactory.create_service(backend, services.get(backend, {}))
+
+        _tool_memoizer = ToolResultMemoizer(
+            cache_service=cache_service,
+            default_ttl=memo_config.get("ttl", 3600),
+            max_entries=memo_config.get("max_entries", 1024),
+            key_prefix=memo_config.get("key_prefix", "tool_memo:")
+        )
+    return _tool_memoizer
+
+
+def get_tool_cache_stats() -> Dict[str, Any]:
+    """获取工具缓存命中统计，未启用任何记忆化工具时返回空字典"""
+    if _tool_memoizer is None:
+        return {}
+    return _tool_memoizer.get_stats()
@@ -3,6 +3,7 @@
 结合ReAct架构、多轮对话记忆、工具调用和可配置输出格式
 """
 
+import time
 import warnings
 import logging
 from typing import Dict, Any, List, Optional
@@ -13,8 +14,14 @@ from langchain_core.messages import BaseMessage
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.chat_history import InMemoryChatMessageHistory
 from src.infrastructure.llm.llm_factory import LLMFactory
+from src.infrastructure.monitoring.tracing import get_tracer, summarize_trace, TracedChatMessageHistory
+from src.infrastructure.monitoring.metrics import get_metrics
 from src.agents.shared.tools import get_tools, get_tools_for_agent
 from src.agents.shared.output_formatter import OutputFormatter, OutputFormat
+from src.agents.shared.tool_memoization import get_tool_cache_stats
+from src.agents.shared.n8n_workflow_templates import get_workflow_template_stats
+from src.agents.shared.parallel_react import create_parallel_react_agent, ParallelAgentExecutor
+from src.agents.shared.stream_events import AGENT_LLM_TAG, AgentStreamEvent, StreamEventType, stream_agent_events
 from src.agents.shared.streaming_handler import StreamingDisplayHandler, SimpleStreamingHandler
 from src.config.config_loader import config_loader
 from src.prompts.prompt_loader import prompt_loader
@@ -86,6 +93,12 @@ class UnifiedAgent:
         
         self.memory = self._create_memory(memory, redis_url, session_id)
         
+        # 链路追踪（每轮对话的延迟分解）
+        self.tracer = get_tracer()
+        
+        # 指标采集（请求、工具、LLM用量）
+        self.metrics = get_metrics()
+        
         # 🆕 初始化上下文追踪器
         self.context_tracker = ContextTracker(max_history=10)
         
@@ -294,7 +307,13 @@ Question: {input}
 Thought:{agent_scratchpad}"""
                 prompt = ChatPromptTemplate.from_template(template)
         
-        return create_react_agent(self.llm, self.tools, prompt)
+        # 为推理LLM打标签，流式输出时只转发它的最终答案token
+        agent_llm = self.llm.with_config(tags=[AGENT_LLM_TAG])
+        
+        # 并行模式下模型可以在一步中给出多个相互独立的工具调用
+        if unified_config.get("parameters", {}).get("parallel_tool_calls", False):
+            return create_parallel_react_agent(agent_llm, self.tools, prompt)
+        return create_react_agent(agent_llm, self.tools, prompt)
     
     def _create_agent_executor(self):
         """
@@ -308,6 +327,8 @@ Thought:{agent_scratchpad}"""
         parameters = unified_config.get("parameters", {})
         max_iterations = parameters.get("max_iterations", 25)  # 默认25次
         max_execution_time = parameters.get("max_execution_time", 180)  # 默认3分钟
+        parallel_tool_calls = parameters.get("parallel_tool_calls", False)
+        max_parallel_tools = parameters.get("max_parallel_tools", 4)
         
         # 创建流式处理器（根据配置选择）
         callbacks = []
@@ -329,8 +350,10 @@ Thought:{agent_scratchpad}"""
             streaming_handler = SimpleStreamingHandler()
             callbacks = [streaming_handler]
         
-        # 创建基础的AgentExecutor
-        executor = AgentExecutor(
+        # 创建基础的AgentExecutor（并行模式下同一步的多个工具调用并发执行）
+        executor_kwargs = {"max_parallel_tools": max_parallel_tools} if parallel_tool_calls else {}
+        executor_class = ParallelAgentExecutor if parallel_tool_calls else AgentExecutor
+        executor = executor_class(
             agent=self.agent,
             tools=self.tools,
             verbose=verbose_mode,  # 根据模式决定是否verbose
@@ -341,7 +364,8 @@ Thought:{agent_scratchpad}"""
             callbacks=callbacks if callbacks else None,  # 添加流式处理器
             agent_kwargs={
                 "tool_names": [tool.name for tool in self.tools]
-            }
+            },
+            **executor_kwargs
         )
         
         if self.memory:
@@ -350,6 +374,8 @@ Thought:{agent_scratchpad}"""
                 """获取会话历史，确保返回正确的 memory 对象"""
                 # 对于 ConversationBufferWithSummary，它实现了 BaseChatMessageHistory 接口
                 # 对于 RedisChatMessageHistory，也实现了同样的接口
+                if self.tracer.enabled:
+                    return TracedChatMessageHistory(self.memory, self.tracer)
                 return self.memory
             
             agent_with_history = RunnableWithMessageHistory(
@@ -363,6 +389,29 @@ Thought:{agent_scratchpad}"""
             # 如果不需要记忆功能，直接使用AgentExecutor
             return executor
     
+    def _invoke_config(self, session_id: str, turn=None) -> Optional[Dict[str, Any]]:
+        """
+        构建执行配置（会话ID、追踪和指标回调）
+        
+        Args:
+            session_id: 会话ID
+            turn: 本轮追踪的根span
+            
+        Returns:
+            传给 invoke/ainvoke 的配置，无需配置时返回None
+        """
+        config: Dict[str, Any] = {}
+        callbacks = []
+        if self.memory:
+            config["configurable"] = {"session_id": session_id}
+        if turn is not None:
+            callbacks.append(self.tracer.callback_handler(turn))
+        if self.metrics.enabled:
+            callbacks.append(self.metrics.callback_handler())
+        if callbacks:
+            config["callbacks"] = callbacks
+        return config or None
+    
     def run(self, query: str, session_id: str = "default") -> Dict[str, Any]:
         """
         运行智能体
@@ -374,6 +423,9 @@ Thought:{agent_scratchpad}"""
         Returns:
             包含响应和元数据的字典
         """
+        turn = self.tracer.begin_turn("agent.run", session_id=session_id)
+        started = time.perf_counter()
+        status = "success"
         try:
             # 🆕 1. 记录查询到上下文追踪器
             self.context_tracker.add_query(query)
@@ -385,17 +437,11 @@ Thought:{agent_scratchpad}"""
                 if self.streaming_style != "none":
                     print(f"🔍 检测到上下文依赖查询，增强提示已生成")
             
-            # 执行智能体
-            if self.memory:
-                # 使用RunnableWithMessageHistory的invoke方法
-                # 不需要在这里添加intermediate_steps，因为AgentExecutor会处理
-                response = self.agent_executor.invoke(
-                    {"input": enhanced_query},  # 🆕 使用增强后的查询
-                    config={"configurable": {"session_id": session_id}}
-                )
-            else:
-                # 使用AgentExecutor的invoke方法
-                response = self.agent_executor.invoke({"input": enhanced_query})  # 🆕 使用增强后的查询
+            # 执行智能体（有记忆时由RunnableWithMessageHistory按session_id加载和保存历史）
+            response = self.agent_executor.invoke(
+                {"input": enhanced_query},  # 🆕 使用增强后的查询
+                config=self._invoke_config(session_id, turn)
+            )
             
             # 处理不同类型的响应
             if hasattr(response, 'get'):
@@ -429,17 +475,23 @@ Thought:{agent_scratchpad}"""
                 "has_memory": self.memory is not None,
                 "memory_type": "redis" if self.redis_url else "in_memory",
                 # 🆕 添加上下文追踪器统计信息
-                "context_stats": self.context_tracker.get_statistics()
+                "context_stats": self.context_tracker.get_statistics(),
+                "tool_cache": get_tool_cache_stats(),
+                "workflow_templates": get_workflow_template_stats()
             }
             
             # 使用OutputFormatter格式化响应
-            formatted_response = self.output_formatter.format_response(raw_output, metadata)
+            with self.tracer.span("output.format", category="output_format"):
+                formatted_response = self.output_formatter.format_response(raw_output, metadata)
+            if turn is not None:
+                metadata["trace"] = summarize_trace(turn)
             
             return {
                 "response": formatted_response,
                 "metadata": metadata
             }
         except Exception as e:
+            status = "error"
             error_msg = f"智能体运行出错: {str(e)}"
             metadata = {
                 "query": query,
@@ -448,10 +500,16 @@ Thought:{agent_scratchpad}"""
                 "output_format": self.output_formatter.get_format(),
                 "session_id": session_id
             }
+            if turn is not None:
+                turn.record_error(e)
+                metadata["trace"] = summarize_trace(turn)
             return {
                 "response": error_msg,
                 "metadata": metadata
             }
+        finally:
+            self.metrics.observe_request("unified", "run", status, time.perf_counter() - started)
+            self.tracer.end_turn(turn)
     
     async def arun(self, query: str, session_id: str = "default") -> Dict[str, Any]:
         """
@@ -464,17 +522,15 @@ Thought:{agent_scratchpad}"""
         Returns:
             包含响应和元数据的字典
         """
+        turn = self.tracer.begin_turn("agent.arun", session_id=session_id)
+        started = time.perf_counter()
+        status = "success"
         try:
-            if self.memory:
-                # 使用RunnableWithMessageHistory的ainvoke方法
-                # 不需要在这里添加intermediate_steps，因为AgentExecutor会处理
-                response = await self.agent_executor.ainvoke(
-                    {"input": query},
-                    config={"configurable": {"session_id": session_id}}
-                )
-            else:
-                # 使用AgentExecutor的ainvoke方法
-                response = await self.agent_executor.ainvoke({"input": query})
+            # 有记忆时由RunnableWithMessageHistory按session_id加载和保存历史
+            response = await self.agent_executor.ainvoke(
+                {"input": query},
+                config=self._invoke_config(session_id, turn)
+            )
             
             # 处理不同类型的响应
             if hasattr(response, 'get'):
@@ -495,17 +551,23 @@ Thought:{agent_scratchpad}"""
                 "output_format": self.output_formatter.get_format(),
                 "session_id": session_id,
                 "has_memory": self.memory is not None,
-                "memory_type": "redis" if self.redis_url else "in_memory"
+                "memory_type": "redis" if self.redis_url else "in_memory",
+                "tool_cache": get_tool_cache_stats(),
+                "workflow_templates": get_workflow_template_stats()
             }
             
             # 使用OutputFormatter格式化响应
-            formatted_response = self.output_formatter.format_response(raw_output, metadata)
+            with self.tracer.span("output.format", category="output_format"):
+                formatted_response = self.output_formatter.format_response(raw_output, metadata)
+            if turn is not None:
+                metadata["trace"] = summarize_trace(turn)
             
             return {
                 "response": formatted_response,
                 "metadata": metadata
             }
         except Exception as e:
+            status = "error"
             error_msg = f"智能体异步运行出错: {str(e)}"
             metadata = {
                 "query": query,
@@ -514,10 +576,16 @@ Thought:{agent_scratchpad}"""
                 "output_format": self.output_formatter.get_format(),
                 "session_id": session_id
             }
+            if turn is not None:
+                turn.record_error(e)
+                metadata["trace"] = summarize_trace(turn)
             return {
                 "response": error_msg,
                 "metadata": metadata
             }
+        finally:
+            self.metrics.observe_request("unified", "arun", status, time.perf_counter() - started)
+            self.tracer.end_turn(turn)
     
     def chat(self, message: str, history: Optional[List[BaseMessage]] = None, session_id: str = "default") -> Dict[str, Any]:
         """
@@ -630,6 +698,27 @@ Thought:{agent_scratchpad}"""
                 "metadata": metadata
             }
     
+    async def astream_events(self, query: str, session_id: str = "default"):
+        """
+        以类型化事件流式运行智能体
+        
+        最终答案按token推送，Thought/Action 等推理脚手架会被过滤；
+        每个事件都可以通过 to_sse() 直接作为 Server-Sent Events 转发。
+        
+        Args:
+            query: 用户查询
+            session_id: 会话ID，用于区分不同对话
+            
+        Yields:
+            AgentStreamEvent: token、tool_start、tool_end、final 或 error 事件
+        """
+        config = {"configurable": {"session_id": session_id}} if self.memory else None
+        try:
+            async for event in stream_agent_events(self.agent_executor, {"input": query}, config=config):
+                yield event
+        except Exception as e:
+            yield AgentStreamEvent(StreamEventType.ERROR, {"error": f"智能体异步流式运行出错: {str(e)}"})
+    
     async def astream(self, query: str, session_id: str = "default"):
         """
         异步流式运行智能体
@@ -639,38 +728,50 @@ Thought:{agent_scratchpad}"""
             session_id: 会话ID，用于区分不同对话
             
         Yields:
-            异步流式输出的响应片段
+            异步流式输出的响应片段，metadata.event 标明片段类型（token/tool_start/tool_end/final/error）
         """
-        try:
-            if self.memory:
-                # 使用RunnableWithMessageHistory的astream方法
-                # 不需要在这里添加intermediate_steps，因为AgentExecutor会处理
-                async for chunk in self.agent_executor.astream(
-                    {"input": query},
-                    config={"configurable": {"session_id": session_id}}
-                ):
-                    for processed_chunk in self._process_stream_chunk(chunk, query):
-                        yield processed_chunk
+        base_metadata = {
+            "query": query,
+            "agent_type": "unified",
+            "session_id": session_id
+        }
+        
+        async for event in self.astream_events(query, session_id):
+            metadata = dict(base_metadata, event=event.type.value)
+            
+            if event.type == StreamEventType.TOKEN:
+                yield {"response": event.data["token"], "metadata": metadata}
+            elif event.type == StreamEventType.TOOL_START:
+                metadata["is_intermediate_step"] = True
+                yield {
+                    "response": f"\n🔧 使用工具: {event.data['tool']}\n📝 输入: {event.data['input']}\n",
+                    "metadata": metadata
+                }
+            elif event.type == StreamEventType.TOOL_END:
+                metadata["is_intermediate_step"] = True
+                yield {"response": f"📊 结果: {event.data['output']}\n", "metadata": metadata}
+            elif event.type == StreamEventType.FINAL:
+                # 完整答案在token之后再给出一次，供需要整段结果的调用方使用
+                metadata.update({
+                    "tools_used": [tool.name for tool in self.tools],
+                    "output_format": self.output_formatter.get_format(),
+                    "has_memory": self.memory is not None,
+                    "memory_type": "redis" if self.redis_url else "in_memory",
+                    "is_final": True
+                })
+                yield {
+                    "response": self.output_formatter.format_response(str(event.data["output"]), metadata),
+                    "metadata": metadata
+                }
             else:
-                # 使用AgentExecutor的astream方法进行异步流式输出
-                async for chunk in self.agent_executor.astream({"input": query}):
-                    for processed_chunk in self._process_stream_chunk(chunk, query):
-                        yield processed_chunk
-                    
-        except Exception as e:
-            error_msg = f"智能体异步流式运行出错: {str(e)}"
-            metadata = {
-                "query": query,
-                "error": str(e),
-                "agent_type": "unified",
-                "output_format": self.output_formatter.get_format(),
-                "session_id": session_id
-            }
-            formatted_error = self.output_formatter.format_response(error_msg, metadata)
-            yield {
-                "response": formatted_error,
-                "metadata": metadata
-            }
+                metadata.update({
+                    "error": event.data["error"],
+                    "output_format": self.output_formatter.get_format()
+                })
+                yield {
+                    "response": self.output_formatter.format_response(event.data["error"], metadata),
+                    "metadata": metadata
+                }
     
     def _process_stream_chunk(self, chunk: Dict[str, Any], query: str):
         """
@@ -1066,6 +1167,7 @@ Thought:{agent_scratchpad}"""
                 
                 # 检测停止原因
                 stop_reason = self._detect_stop_reason(result)
+                self.metrics.record_stop_reason("unified", stop_reason.value)
                 
                 # 累积结果
                 if result.get("response"):
@@ -1081,6 +1183,7 @@ Thought:{agent_scratchpad}"""
                     result["response"] = final_response
                     result["metadata"]["auto_continue_attempts"] = attempt + 1
                     result["metadata"]["stop_reason"] = stop_reason.value
+                    self.metrics.observe_auto_continue("unified", attempt + 1)
                     return result
                 
                 # 如果是错误，不再继续
@@ -1097,9 +1200,12 @@ Thought:{agent_scratchpad}"""
                     result["metadata"]["auto_continue_attempts"] = attempt + 1
                     result["metadata"]["stop_reason"] = stop_reason.value
                     result["metadata"]["partial_result"] = True
+                    self.metrics.observe_auto_continue("unified", attempt + 1)
                     return result
                 
             except Exception as e:
+                self.metrics.record_stop_reason("unified", AgentStopReason.ERROR.value)
+                self.metrics.observe_auto_continue("unified", attempt + 1)
                 error_result = {
                     "response": f"执行出错: {str(e)}",
                     "metadata": {
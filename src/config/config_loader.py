@@ -323,6 +323,15 @@ class ConfigLoader:
         services_config = self.get_services_config()
         return services_config.get("tools", {})
     
+    def get_risk_rules_config(self) -> Dict[str, Any]:
+        """
+        获取风险评分规则表配置
+
+        Returns:
+            风险评分规则字典
+        """
+        return self.load_config("risk_rules").get("risk_rules", {})
+
     def get_output_config(self) -> Dict[str, Any]:
         """
         获取输出格式配置
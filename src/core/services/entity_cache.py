@@ -0,0 +1,86 @@
+"""
+实体缓存
+
+按实体ID分键缓存记录，并为常用查询维护二级索引（索引键保存有序的实体ID列表），
+读写的开销只与涉及的实体数量有关，不随整表大小增长。
+"""
+
+from typing import Any, Dict, List, Optional
+
+from ...infrastructure.cache import CacheService
+
+
+class EntityCache:
+    """单类实体的分键缓存与二级索引"""
+
+    def __init__(self, cache_service: CacheService, entity: str, ttl: int = 3600):
+        """
+        初始化实体缓存
+
+        Args:
+            cache_service: 缓存服务
+            entity: 实体名称，用作键前缀（如 message）
+            ttl: 缓存过期时间（秒）
+        """
+        self.cache_service = cache_service
+        self.entity = entity
+        self.ttl = ttl
+
+    def entity_key(self, entity_id: str) -> str:
+        """实体缓存键，如 message:<id>"""
+        return f"{self.entity}:{entity_id}"
+
+    def index_key(self, index: str, value: Any) -> str:
+        """二级索引缓存键，如 message:by_session:<session_id>"""
+        return f"{self.entity}:by_{index}:{value}"
+
+    async def get(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        """获取单个实体记录"""
+        return await self.cache_service.get(self.entity_key(entity_id))
+
+    async def put(self, row: Dict[str, Any]) -> None:
+        """写入单个实体记录"""
+        await self.cache_service.set(self.entity_key(row["id"]), row, expire=self.ttl)
+
+    async def put_many(self, rows: List[Dict[str, Any]]) -> None:
+        """批量写入实体记录"""
+        if rows:
+            await self.cache_service.set_many({self.entity_key(row["id"]): row for row in rows}, expire=self.ttl)
+
+    async def evict(self, *entity_ids: str) -> None:
+        """删除实体记录"""
+        if entity_ids:
+            await self.cache_service.delete_many([self.entity_key(entity_id) for entity_id in entity_ids])
+
+    async def get_index(self, index: str, value: Any) -> Optional[List[Dict[str, Any]]]:
+        """
+        按二级索引获取实体记录
+
+        Returns:
+            按索引顺序排列的记录；索引未缓存或有记录已过期时返回 None，由调用方回源数据库
+        """
+        ids = await self.cache_service.get(self.index_key(index, value))
+        if ids is None:
+            return None
+        if not ids:
+            return []
+        rows = await self.cache_service.get_many([self.entity_key(entity_id) for entity_id in ids])
+        if len(rows) != len(ids):
+            return None
+        return [rows[self.entity_key(entity_id)] for entity_id in ids]
+
+    async def set_index(self, index: str, value: Any, rows: List[Dict[str, Any]]) -> None:
+        """缓存一次完整的索引查询结果（同时写入各实体记录）"""
+        await self.put_many(rows)
+        await self.cache_service.set(self.index_key(index, value), [row["id"] for row in rows], expire=self.ttl)
+
+    async def drop_index(self, index: str, *values: Any) -> None:
+        """
+        使索引失效，下次查询时从数据库重建
+
+        写入实体时一律使索引失效而不是在缓存中追加ID：get 后再 set 不是原子操作，
+        多个进程并发写入 Redis 时会互相覆盖，丢失ID的索引在整个TTL内都会被当作完整结果。
+        """
+        keys = [self.index_key(index, value) for value in dict.fromkeys(values) if value is not None]
+        if keys:
+            await self.cache_service.delete_many(keys)
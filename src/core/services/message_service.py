@@ -5,21 +5,45 @@
 """
 
 from typing import Dict, List, Optional, Any
+from dataclasses import asdict
 from datetime import datetime
+import json
 import uuid
 
 from ..domain.message_model import MessageModel, MessageType, MessageStatus, MessageMetadata
 from ...infrastructure.database import DatabaseService
 from ...infrastructure.cache import CacheService
+from .entity_cache import EntityCache
+from .write_behind import WriteBehindQueue
 
 
 class MessageService:
     """消息服务类"""
     
-    def __init__(self, db_service: DatabaseService, cache_service: CacheService):
+    def __init__(
+        self,
+        db_service: DatabaseService,
+        cache_service: CacheService,
+        write_behind: bool = False,
+        flush_interval: float = 0.05,
+        flush_size: int = 100
+    ):
+        """
+        初始化消息服务
+        
+        Args:
+            db_service: 数据库服务
+            cache_service: 缓存服务
+            write_behind: 是否启用后写，新消息先进入缓存，由后台任务批量插入数据库
+            flush_interval: 后写模式下批量插入的最长间隔（秒）
+            flush_size: 后写模式下累积到该数量时立即插入
+        """
         self.db_service = db_service
         self.cache_service = cache_service
-        self._messages_cache_key = "messages"
+        self._cache = EntityCache(cache_service, "message")
+        self._writer = WriteBehindQueue(
+            self._insert_messages, flush_interval, flush_size, on_dead_letter=self._evict_dead_letters
+        ) if write_behind else None
     
     async def create_message(
         self,
@@ -27,9 +51,15 @@ class MessageService:
         content: str,
         message_type: MessageType,
         parent_id: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        durable: bool = False
     ) -> MessageModel:
-        """创建新消息"""
+        """
+        创建新消息
+        
+        Args:
+            durable: 后写模式下是否等待该消息写入数据库后再返回
+        """
         message_id = str(uuid.uuid4())
         
         # 创建元数据对象
@@ -54,33 +84,63 @@ class MessageService:
             parent_id=parent_id
         )
         
+        row = asdict(message)
+        if self._writer is not None:
+            # 先写缓存保证随后的读取可见，再交给后写队列批量入库；
+            # 会话索引直接失效，下次查询先落盘再从数据库重建
+            await self._cache.put(row)
+            await self._cache.drop_index("session", session_id)
+            written = self._writer.enqueue(self._message_to_record(message))
+            if durable:
+                await written
+            return message
+        
         # 保存到数据库
-        await self.db_service.save("messages", message_id, message.__dict__)
+        await self.db_service.insert("messages", self._message_to_record(message))
         
-        # 更新缓存
-        await self._update_messages_cache()
+        # 更新缓存（并发写入时在缓存中读改写索引会丢失ID，因此直接使索引失效）
+        await self._cache.put(row)
+        await self._cache.drop_index("session", session_id)
         
         return message
     
     async def get_message(self, message_id: str) -> Optional[MessageModel]:
         """获取消息"""
         # 先从缓存获取
-        messages_cache = await self.cache_service.get(self._messages_cache_key)
-        if messages_cache and message_id in messages_cache:
-            message_data = messages_cache[message_id]
+        message_data = await self._cache.get(message_id)
+        if message_data:
             return self._dict_to_message_model(message_data)
         
+        # 尚在后写队列中的消息
+        if self._writer is not None:
+            message_data = self._writer.get_pending(message_id)
+            if message_data:
+                return self._dict_to_message_model(message_data)
+        
         # 从数据库获取
-        message_data = await self.db_service.get("messages", message_id)
-        if not message_data:
+        rows = await self.db_service.select("messages", {"id": message_id}, limit=1)
+        if not rows:
             return None
-            
+        message_data = rows[0]
+        
+        await self._cache.put(message_data)
         return self._dict_to_message_model(message_data)
     
-    async def get_messages_by_session(self, session_id: str) -> List[MessageModel]:
-        """根据会话ID获取消息列表"""
-        messages = await self.get_all_messages()
-        return [message for message in messages if message.session_id == session_id]
+    async def get_messages_by_session(self, session_id: str, limit: Optional[int] = None) -> List[MessageModel]:
+        """根据会话ID获取消息列表（按创建时间排序）"""
+        messages_data = await self._cache.get_index("session", session_id)
+        if messages_data is None:
+            await self.flush()
+            messages_data = await self.db_service.select(
+                "messages", {"session_id": session_id}, order_by="created_at", limit=limit
+            )
+            # 只缓存完整结果，分页结果不能作为索引
+            if limit is None:
+                await self._cache.set_index("session", session_id, messages_data)
+        elif limit is not None:
+            messages_data = messages_data[:limit]
+        
+        return [self._dict_to_message_model(message_data) for message_data in messages_data]
     
     async def get_conversation(
         self, 
@@ -89,36 +149,37 @@ class MessageService:
         include_system: bool = True
     ) -> List[MessageModel]:
         """获取对话历史"""
-        messages = await self.get_messages_by_session(session_id)
-        
-        # 过滤系统消息（如果需要）
-        if not include_system:
-            messages = [msg for msg in messages if not msg.is_system_message()]
-        
-        # 按时间排序
-        messages.sort(key=lambda msg: msg.created_at)
-        
-        # 限制数量
-        if len(messages) > limit:
-            messages = messages[-limit:]
-        
-        return messages
+        messages_data = await self._cache.get_index("session", session_id)
+        if messages_data is not None:
+            messages = [self._dict_to_message_model(message_data) for message_data in messages_data]
+            # 过滤系统消息（如果需要）
+            if not include_system:
+                messages = [msg for msg in messages if not msg.is_system_message()]
+            return messages[-limit:] if limit else messages
+        
+        # 取最近 limit 条再按时间正序返回
+        await self.flush()
+        messages_data = await self.db_service.select(
+            "messages",
+            {"session_id": session_id},
+            order_by="created_at",
+            descending=True,
+            limit=limit,
+            exclude=None if include_system else {"type": MessageType.SYSTEM.value}
+        )
+        messages_data.reverse()
+        return [self._dict_to_message_model(message_data) for message_data in messages_data]
     
     async def get_message_thread(self, message_id: str) -> List[MessageModel]:
         """获取消息线程（回复链）"""
-        message = await self.get_message(message_id)
-        if not message:
-            return []
-        
-        # 获取同一会话的所有消息
-        session_messages = await self.get_messages_by_session(message.session_id)
-        
-        # 构建消息线程
+        # 沿 parent_id 逐条回溯，每条消息都按ID从缓存或数据库读取
         thread = []
+        seen = set()
         current_id = message_id
         
-        while current_id:
-            current_msg = next((msg for msg in session_messages if msg.id == current_id), None)
+        while current_id and current_id not in seen:
+            seen.add(current_id)
+            current_msg = await self.get_message(current_id)
             if not current_msg:
                 break
                 
@@ -129,20 +190,9 @@ class MessageService:
     
     async def get_all_messages(self) -> List[MessageModel]:
         """获取所有消息"""
-        # 先从缓存获取
-        messages_cache = await self.cache_service.get(self._messages_cache_key)
-        if messages_cache:
-            return [self._dict_to_message_model(message_data) for message_data in messages_cache.values()]
-        
-        # 从数据库获取
-        messages_data = await self.db_service.query("messages", {})
-        messages = [self._dict_to_message_model(message_data) for message_data in messages_data]
-        
-        # 更新缓存
-        messages_dict = {message.id: message.__dict__ for message in messages}
-        await self.cache_service.set(self._messages_cache_key, messages_dict, expire=3600)
-        
-        return messages
+        await self.flush()
+        messages_data = await self.db_service.select("messages", order_by="created_at")
+        return [self._dict_to_message_model(message_data) for message_data in messages_data]
     
     async def update_message(self, message_id: str, updates: Dict[str, Any]) -> Optional[MessageModel]:
         """更新消息"""
@@ -156,12 +206,7 @@ class MessageService:
         if "metadata" in updates:
             message.update_metadata(updates["metadata"])
         
-        # 更新数据库
-        await self.db_service.update("messages", message_id, message.__dict__)
-        
-        # 更新缓存
-        await self._update_messages_cache()
-        
+        await self._save(message)
         return message
     
     async def deliver_message(self, message_id: str) -> bool:
@@ -171,13 +216,7 @@ class MessageService:
             return False
         
         message.deliver()
-        
-        # 更新数据库
-        await self.db_service.update("messages", message_id, message.__dict__)
-        
-        # 更新缓存
-        await self._update_messages_cache()
-        
+        await self._save(message)
         return True
     
     async def read_message(self, message_id: str) -> bool:
@@ -187,13 +226,7 @@ class MessageService:
             return False
         
         message.read()
-        
-        # 更新数据库
-        await self.db_service.update("messages", message_id, message.__dict__)
-        
-        # 更新缓存
-        await self._update_messages_cache()
-        
+        await self._save(message)
         return True
     
     async def fail_message(self, message_id: str) -> bool:
@@ -203,45 +236,89 @@ class MessageService:
             return False
         
         message.fail()
-        
-        # 更新数据库
-        await self.db_service.update("messages", message_id, message.__dict__)
-        
-        # 更新缓存
-        await self._update_messages_cache()
-        
+        await self._save(message)
         return True
     
     async def delete_message(self, message_id: str) -> bool:
         """删除消息"""
+        await self.flush()
+        message = await self.get_message(message_id)
+        
         # 从数据库删除
-        result = await self.db_service.delete("messages", message_id)
+        deleted = await self.db_service.delete("messages", {"id": message_id})
         
-        if result:
+        if deleted:
             # 更新缓存
-            await self._update_messages_cache()
+            await self._cache.evict(message_id)
+            if message:
+                await self._cache.drop_index("session", message.session_id)
         
-        return result
+        return deleted > 0
     
-    async def delete_messages_by_session(self, session_id: str) -> int:
-        """删除会话的所有消息"""
-        messages = await self.get_messages_by_session(session_id)
-        deleted_count = 0
-        
-        for message in messages:
-            if await self.delete_message(message.id):
-                deleted_count += 1
-        
-        return deleted_count
+    async def delete_messages_by_session(self, session_id: str, flush: bool = True) -> int:
+        """
+        删除会话的所有消息
+        
+        Args:
+            flush: 是否先把后写队列落盘。调用方已在外层事务之前落盘时传 False：
+                在事务内落盘会等待后写任务，而后写任务又在等待该事务释放写连接
+        """
+        if flush:
+            await self.flush()
+        
+        # 查询ID和删除在同一个事务内，清理的缓存与实际删除的记录一致
+        async with self.db_service.transaction():
+            rows = await self.db_service.select("messages", {"session_id": session_id})
+            deleted = await self.db_service.delete("messages", {"session_id": session_id})
+        
+        await self._cache.evict(*[row["id"] for row in rows])
+        await self._cache.drop_index("session", session_id)
+        return deleted
+    
+    async def flush(self) -> int:
+        """
+        持久化检查点：把后写队列中的消息全部写入数据库
+        
+        Returns:
+            本次写入的消息数
+        """
+        if self._writer is None:
+            return 0
+        return await self._writer.flush()
     
-    async def _update_messages_cache(self) -> None:
-        """更新消息缓存"""
-        messages_data = await self.db_service.query("messages", {})
-        messages_dict = {message_data["id"]: message_data for message_data in messages_data}
-        await self.cache_service.set(self._messages_cache_key, messages_dict, expire=3600)
+    async def close(self) -> None:
+        """关闭服务前调用，写入后写队列中剩余的消息"""
+        if self._writer is not None:
+            await self._writer.close()
+    
+    async def _insert_messages(self, records: List[Dict[str, Any]]) -> None:
+        """批量插入消息（PostgreSQL 使用 COPY，SQLite 每批一个事务）"""
+        await self.db_service.insert_many("messages", records)
+    
+    async def _evict_dead_letters(self, records: List[Dict[str, Any]]) -> None:
+        """后写队列丢弃的消息从未入库，从缓存和所属会话的索引中移除，避免继续被读到"""
+        await self._cache.evict(*[record["id"] for record in records])
+        await self._cache.drop_index("session", *[record["session_id"] for record in records])
+    
+    def _message_to_record(self, message: MessageModel) -> Dict[str, Any]:
+        """将MessageModel转换为可直接绑定到SQL参数的记录"""
+        record = asdict(message)
+        record["type"] = message.type.value
+        record["status"] = message.status.value
+        record["metadata"] = json.dumps(record["metadata"], ensure_ascii=False) if message.metadata else None
+        return record
+    
+    async def _save(self, message: MessageModel) -> None:
+        """更新数据库并刷新该消息的缓存（会话索引只存ID，无需失效）"""
+        # 消息可能还在后写队列中，先落盘再更新
+        await self.flush()
+        await self.db_service.update("messages", self._message_to_record(message), {"id": message.id})
+        await self._cache.put(asdict(message))
     
     def _dict_to_message_model(self, message_data: Dict[str, Any]) -> MessageModel:
         """将字典转换为MessageModel对象"""
+        message_data = dict(message_data)
+        
         # 处理枚举类型
         if "type" in message_data and isinstance(message_data["type"], str):
             message_data["type"] = MessageType(message_data["type"])
@@ -251,6 +328,8 @@ class MessageService:
         # 处理元数据对象
         if "metadata" in message_data and message_data["metadata"]:
             metadata_data = message_data["metadata"]
+            if isinstance(metadata_data, str):
+                metadata_data = json.loads(metadata_data)
             message_data["metadata"] = MessageMetadata(
                 model=metadata_data.get("model"),
                 temperature=metadata_data.get("temperature"),
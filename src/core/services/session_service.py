@@ -4,22 +4,42 @@
 提供会话管理的核心业务逻辑。
 """
 
-from typing import Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Dict, List, Optional, Any
+from dataclasses import asdict
 from datetime import datetime
+import json
 import uuid
 
 from ..domain.session_model import SessionModel, SessionStatus, SessionContext
 from ...infrastructure.database import DatabaseService
 from ...infrastructure.cache import CacheService
+from .entity_cache import EntityCache
+
+if TYPE_CHECKING:
+    from .message_service import MessageService
 
 
 class SessionService:
     """会话服务类"""
     
-    def __init__(self, db_service: DatabaseService, cache_service: CacheService):
+    def __init__(
+        self,
+        db_service: DatabaseService,
+        cache_service: CacheService,
+        message_service: Optional["MessageService"] = None
+    ):
+        """
+        初始化会话服务
+        
+        Args:
+            db_service: 数据库服务
+            cache_service: 缓存服务
+            message_service: 消息服务，提供时删除会话会在同一个事务内删除其消息
+        """
         self.db_service = db_service
         self.cache_service = cache_service
-        self._sessions_cache_key = "sessions"
+        self.message_service = message_service
+        self._cache = EntityCache(cache_service, "session")
     
     async def create_session(
         self,
@@ -45,64 +65,51 @@ class SessionService:
         )
         
         # 保存到数据库
-        await self.db_service.save("sessions", session_id, session.__dict__)
+        row = self._session_to_record(session)
+        await self.db_service.insert("sessions", row)
         
         # 更新缓存
-        await self._update_sessions_cache()
+        await self._cache.put(row)
+        await self._drop_indexes(session)
         
         return session
     
     async def get_session(self, session_id: str) -> Optional[SessionModel]:
         """获取会话"""
         # 先从缓存获取
-        sessions_cache = await self.cache_service.get(self._sessions_cache_key)
-        if sessions_cache and session_id in sessions_cache:
-            session_data = sessions_cache[session_id]
+        session_data = await self._cache.get(session_id)
+        if session_data:
             return self._dict_to_session_model(session_data)
         
         # 从数据库获取
-        session_data = await self.db_service.get("sessions", session_id)
-        if not session_data:
+        rows = await self.db_service.select("sessions", {"id": session_id}, limit=1)
+        if not rows:
             return None
-            
+        session_data = rows[0]
+        
+        await self._cache.put(session_data)
         return self._dict_to_session_model(session_data)
     
     async def get_sessions_by_user(self, user_id: str) -> List[SessionModel]:
         """根据用户ID获取会话列表"""
-        sessions = await self.get_all_sessions()
-        return [session for session in sessions if session.context.user_id == user_id]
+        return await self._query_index("user", {"user_id": user_id})
     
     async def get_sessions_by_agent(self, agent_id: str) -> List[SessionModel]:
         """根据智能体ID获取会话列表"""
-        sessions = await self.get_all_sessions()
-        return [session for session in sessions if session.context.agent_id == agent_id]
+        return await self._query_index("agent", {"agent_id": agent_id})
     
     async def get_active_sessions(self, user_id: Optional[str] = None) -> List[SessionModel]:
         """获取活跃会话"""
-        sessions = await self.get_all_sessions()
-        active_sessions = [session for session in sessions if session.status == SessionStatus.ACTIVE]
-        
+        where = {"status": SessionStatus.ACTIVE.value}
         if user_id:
-            active_sessions = [session for session in active_sessions if session.context.user_id == user_id]
-        
-        return active_sessions
+            where["user_id"] = user_id
+        sessions_data = await self.db_service.select("sessions", where, order_by="created_at")
+        return [self._dict_to_session_model(session_data) for session_data in sessions_data]
     
     async def get_all_sessions(self) -> List[SessionModel]:
         """获取所有会话"""
-        # 先从缓存获取
-        sessions_cache = await self.cache_service.get(self._sessions_cache_key)
-        if sessions_cache:
-            return [self._dict_to_session_model(session_data) for session_data in sessions_cache.values()]
-        
-        # 从数据库获取
-        sessions_data = await self.db_service.query("sessions", {})
-        sessions = [self._dict_to_session_model(session_data) for session_data in sessions_data]
-        
-        # 更新缓存
-        sessions_dict = {session.id: session.__dict__ for session in sessions}
-        await self.cache_service.set(self._sessions_cache_key, sessions_dict, expire=3600)
-        
-        return sessions
+        sessions_data = await self.db_service.select("sessions", order_by="created_at")
+        return [self._dict_to_session_model(session_data) for session_data in sessions_data]
     
     async def update_session(self, session_id: str, updates: Dict[str, Any]) -> Optional[SessionModel]:
         """更新会话"""
@@ -116,12 +123,7 @@ class SessionService:
         if "context" in updates:
             session.update_context(updates["context"])
         
-        # 更新数据库
-        await self.db_service.update("sessions", session_id, session.__dict__)
-        
-        # 更新缓存
-        await self._update_sessions_cache()
-        
+        await self._save(session)
         return session
     
     async def close_session(self, session_id: str) -> bool:
@@ -131,13 +133,7 @@ class SessionService:
             return False
         
         session.close()
-        
-        # 更新数据库
-        await self.db_service.update("sessions", session_id, session.__dict__)
-        
-        # 更新缓存
-        await self._update_sessions_cache()
-        
+        await self._save(session)
         return True
     
     async def activate_session(self, session_id: str) -> bool:
@@ -147,13 +143,7 @@ class SessionService:
             return False
         
         session.activate()
-        
-        # 更新数据库
-        await self.db_service.update("sessions", session_id, session.__dict__)
-        
-        # 更新缓存
-        await self._update_sessions_cache()
-        
+        await self._save(session)
         return True
     
     async def deactivate_session(self, session_id: str) -> bool:
@@ -163,13 +153,7 @@ class SessionService:
             return False
         
         session.deactivate()
-        
-        # 更新数据库
-        await self.db_service.update("sessions", session_id, session.__dict__)
-        
-        # 更新缓存
-        await self._update_sessions_cache()
-        
+        await self._save(session)
         return True
     
     async def update_session_context(self, session_id: str, context_updates: Dict[str, Any]) -> bool:
@@ -179,34 +163,66 @@ class SessionService:
             return False
         
         session.update_context(context_updates)
-        
-        # 更新数据库
-        await self.db_service.update("sessions", session_id, session.__dict__)
-        
-        # 更新缓存
-        await self._update_sessions_cache()
-        
+        await self._save(session)
         return True
     
     async def delete_session(self, session_id: str) -> bool:
-        """删除会话"""
+        """删除会话（配置了消息服务时连同其消息在一个事务内删除）"""
+        session = await self.get_session(session_id)
+        if self.message_service is not None:
+            # 后写队列在事务外落盘
+            await self.message_service.flush()
+        
         # 从数据库删除
-        result = await self.db_service.delete("sessions", session_id)
+        async with self.db_service.transaction():
+            deleted = await self.db_service.delete("sessions", {"id": session_id})
+            if deleted and self.message_service is not None:
+                await self.message_service.delete_messages_by_session(session_id, flush=False)
         
-        if result:
+        if deleted:
             # 更新缓存
-            await self._update_sessions_cache()
+            await self._cache.evict(session_id)
+            if session:
+                await self._drop_indexes(session)
         
-        return result
+        return deleted > 0
     
-    async def _update_sessions_cache(self) -> None:
-        """更新会话缓存"""
-        sessions_data = await self.db_service.query("sessions", {})
-        sessions_dict = {session_data["id"]: session_data for session_data in sessions_data}
-        await self.cache_service.set(self._sessions_cache_key, sessions_dict, expire=3600)
+    async def _query_index(self, index: str, where: Dict[str, Any]) -> List[SessionModel]:
+        """按索引列查询会话，结果缓存为二级索引"""
+        value = next(iter(where.values()))
+        sessions_data = await self._cache.get_index(index, value)
+        if sessions_data is None:
+            sessions_data = await self.db_service.select("sessions", where, order_by="created_at")
+            await self._cache.set_index(index, value, sessions_data)
+        return [self._dict_to_session_model(session_data) for session_data in sessions_data]
+    
+    async def _save(self, session: SessionModel) -> None:
+        """更新数据库并刷新该会话的缓存"""
+        row = self._session_to_record(session)
+        await self.db_service.update("sessions", row, {"id": session.id})
+        await self._cache.put(row)
+    
+    async def _drop_indexes(self, session: SessionModel) -> None:
+        """会话增删时使所属用户和智能体的索引失效"""
+        await self._cache.drop_index("user", session.context.user_id)
+        await self._cache.drop_index("agent", session.context.agent_id)
+    
+    def _session_to_record(self, session: SessionModel) -> Dict[str, Any]:
+        """将SessionModel转换为可直接绑定到SQL参数的记录，user_id/agent_id 展开为独立列以便建索引"""
+        record = asdict(session)
+        record["status"] = session.status.value
+        record["context"] = json.dumps(record["context"], ensure_ascii=False)
+        record["user_id"] = session.context.user_id
+        record["agent_id"] = session.context.agent_id
+        return record
     
     def _dict_to_session_model(self, session_data: Dict[str, Any]) -> SessionModel:
         """将字典转换为SessionModel对象"""
+        session_data = dict(session_data)
+        # 展开的索引列只用于查询
+        session_data.pop("user_id", None)
+        session_data.pop("agent_id", None)
+        
         # 处理枚举类型
         if "status" in session_data and isinstance(session_data["status"], str):
             session_data["status"] = SessionStatus(session_data["status"])
@@ -214,6 +230,8 @@ class SessionService:
         # 处理上下文对象
         if "context" in session_data and session_data["context"]:
             context_data = session_data["context"]
+            if isinstance(context_data, str):
+                context_data = json.loads(context_data)
             session_data["context"] = SessionContext(
                 user_id=context_data["user_id"],
                 agent_id=context_data["agent_id"],
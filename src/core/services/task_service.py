@@ -4,13 +4,16 @@
 提供任务管理的核心业务逻辑。
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
+from dataclasses import asdict
 from datetime import datetime
+import json
 import uuid
 
 from ..domain.task_model import TaskModel, TaskStatus, TaskPriority, TaskResult
 from ...infrastructure.database import DatabaseService
 from ...infrastructure.cache import CacheService
+from .entity_cache import EntityCache
 
 
 class TaskService:
@@ -19,7 +22,7 @@ class TaskService:
     def __init__(self, db_service: DatabaseService, cache_service: CacheService):
         self.db_service = db_service
         self.cache_service = cache_service
-        self._tasks_cache_key = "tasks"
+        self._cache = EntityCache(cache_service, "task")
     
     async def create_task(
         self,
@@ -41,43 +44,49 @@ class TaskService:
         )
         
         # 保存到数据库
-        await self.db_service.save("tasks", task_id, task.__dict__)
+        row = self._task_to_record(task)
+        await self.db_service.insert("tasks", row)
         
         # 更新缓存
-        await self._update_tasks_cache()
+        await self._cache.put(row)
+        await self._cache.drop_index("agent", agent_id)
+        await self._cache.drop_index("status", task.status.value)
         
         return task
     
     async def get_task(self, task_id: str) -> Optional[TaskModel]:
         """获取任务"""
         # 先从缓存获取
-        tasks_cache = await self.cache_service.get(self._tasks_cache_key)
-        if tasks_cache and task_id in tasks_cache:
-            task_data = tasks_cache[task_id]
+        task_data = await self._cache.get(task_id)
+        if task_data:
             return self._dict_to_task_model(task_data)
         
         # 从数据库获取
-        task_data = await self.db_service.get("tasks", task_id)
-        if not task_data:
+        rows = await self.db_service.select("tasks", {"id": task_id}, limit=1)
+        if not rows:
             return None
-            
+        task_data = rows[0]
+        
+        await self._cache.put(task_data)
         return self._dict_to_task_model(task_data)
     
     async def get_tasks_by_agent(self, agent_id: str) -> List[TaskModel]:
         """根据智能体ID获取任务列表"""
-        tasks = await self.get_all_tasks()
-        return [task for task in tasks if task.agent_id == agent_id]
+        return await self._query_index("agent", "agent_id", agent_id)
     
     async def get_tasks_by_status(self, status: TaskStatus) -> List[TaskModel]:
         """根据状态获取任务列表"""
-        tasks = await self.get_all_tasks()
-        return [task for task in tasks if task.status == status]
+        return await self._query_index("status", "status", status.value)
     
     async def get_pending_tasks(self, agent_id: Optional[str] = None) -> List[TaskModel]:
         """获取待处理任务"""
-        tasks = await self.get_tasks_by_status(TaskStatus.PENDING)
         if agent_id:
-            tasks = [task for task in tasks if task.agent_id == agent_id]
+            tasks_data = await self.db_service.select(
+                "tasks", {"status": TaskStatus.PENDING.value, "agent_id": agent_id}, order_by="created_at"
+            )
+            tasks = [self._dict_to_task_model(task_data) for task_data in tasks_data]
+        else:
+            tasks = await self.get_tasks_by_status(TaskStatus.PENDING)
         
         # 按优先级排序
         priority_order = {
@@ -91,20 +100,8 @@ class TaskService:
     
     async def get_all_tasks(self) -> List[TaskModel]:
         """获取所有任务"""
-        # 先从缓存获取
-        tasks_cache = await self.cache_service.get(self._tasks_cache_key)
-        if tasks_cache:
-            return [self._dict_to_task_model(task_data) for task_data in tasks_cache.values()]
-        
-        # 从数据库获取
-        tasks_data = await self.db_service.query("tasks", {})
-        tasks = [self._dict_to_task_model(task_data) for task_data in tasks_data]
-        
-        # 更新缓存
-        tasks_dict = {task.id: task.__dict__ for task in tasks}
-        await self.cache_service.set(self._tasks_cache_key, tasks_dict, expire=3600)
-        
-        return tasks
+        tasks_data = await self.db_service.select("tasks", order_by="created_at")
+        return [self._dict_to_task_model(task_data) for task_data in tasks_data]
     
     async def update_task(self, task_id: str, updates: Dict[str, Any]) -> Optional[TaskModel]:
         """更新任务"""
@@ -122,106 +119,116 @@ class TaskService:
         if "input_data" in updates:
             task.input_data.update(updates["input_data"])
         
-        # 更新数据库
-        await self.db_service.update("tasks", task_id, task.__dict__)
-        
-        # 更新缓存
-        await self._update_tasks_cache()
-        
+        await self._save(task, task.status)
         return task
     
     async def start_task(self, task_id: str) -> bool:
         """开始任务"""
-        task = await self.get_task(task_id)
-        if not task or task.status != TaskStatus.PENDING:
-            return False
-        
-        task.start()
-        
-        # 更新数据库
-        await self.db_service.update("tasks", task_id, task.__dict__)
-        
-        # 更新缓存
-        await self._update_tasks_cache()
-        
-        return True
+        return await self._transition(task_id, [TaskStatus.PENDING], lambda task: task.start())
     
     async def complete_task(self, task_id: str, result: TaskResult) -> bool:
         """完成任务"""
-        task = await self.get_task(task_id)
-        if not task or task.status != TaskStatus.RUNNING:
-            return False
-        
-        task.complete(result)
-        
-        # 更新数据库
-        await self.db_service.update("tasks", task_id, task.__dict__)
-        
-        # 更新缓存
-        await self._update_tasks_cache()
-        
-        return True
+        return await self._transition(task_id, [TaskStatus.RUNNING], lambda task: task.complete(result))
     
     async def fail_task(self, task_id: str, error: str) -> bool:
         """标记任务失败"""
-        task = await self.get_task(task_id)
-        if not task or task.status not in [TaskStatus.PENDING, TaskStatus.RUNNING]:
-            return False
-        
-        task.fail(error)
-        
-        # 更新数据库
-        await self.db_service.update("tasks", task_id, task.__dict__)
-        
-        # 更新缓存
-        await self._update_tasks_cache()
-        
-        return True
+        return await self._transition(
+            task_id, [TaskStatus.PENDING, TaskStatus.RUNNING], lambda task: task.fail(error)
+        )
     
     async def cancel_task(self, task_id: str) -> bool:
         """取消任务"""
-        task = await self.get_task(task_id)
-        if not task or task.status in [TaskStatus.COMPLETED, TaskStatus.CANCELLED]:
-            return False
-        
-        task.cancel()
-        
-        # 更新数据库
-        await self.db_service.update("tasks", task_id, task.__dict__)
-        
-        # 更新缓存
-        await self._update_tasks_cache()
-        
-        return True
+        cancellable = [status for status in TaskStatus if status not in (TaskStatus.COMPLETED, TaskStatus.CANCELLED)]
+        return await self._transition(task_id, cancellable, lambda task: task.cancel())
     
     async def delete_task(self, task_id: str) -> bool:
         """删除任务"""
+        task = await self.get_task(task_id)
+        
         # 从数据库删除
-        result = await self.db_service.delete("tasks", task_id)
+        deleted = await self.db_service.delete("tasks", {"id": task_id})
         
-        if result:
+        if deleted:
             # 更新缓存
-            await self._update_tasks_cache()
+            await self._cache.evict(task_id)
+            if task:
+                await self._cache.drop_index("agent", task.agent_id)
+                await self._cache.drop_index("status", task.status.value)
+        
+        return deleted > 0
+    
+    async def _query_index(self, index: str, column: str, value: Any) -> List[TaskModel]:
+        """按索引列查询任务，结果缓存为二级索引"""
+        tasks_data = await self._cache.get_index(index, value)
+        if tasks_data is None:
+            tasks_data = await self.db_service.select("tasks", {column: value}, order_by="created_at")
+            await self._cache.set_index(index, value, tasks_data)
+        return [self._dict_to_task_model(task_data) for task_data in tasks_data]
+    
+    async def _transition(
+        self,
+        task_id: str,
+        allowed: List[TaskStatus],
+        apply: Callable[[TaskModel], None]
+    ) -> bool:
+        """
+        状态变更：在一个事务内读取数据库中的最新状态、校验并写入，读写使用同一个连接、一次提交
+        
+        更新条件带上原状态，并发的状态变更只有一个能成功；提交后再刷新缓存。
+        """
+        async with self.db_service.transaction():
+            rows = await self.db_service.select("tasks", {"id": task_id}, limit=1)
+            if not rows:
+                return False
+            task = self._dict_to_task_model(rows[0])
+            if task.status not in allowed:
+                return False
+            
+            previous_status = task.status
+            apply(task)
+            row = self._task_to_record(task)
+            updated = await self.db_service.update("tasks", row, {"id": task_id, "status": previous_status.value})
         
-        return result
+        if not updated:
+            return False
+        await self._cache.put(row)
+        await self._cache.drop_index("status", previous_status.value, task.status.value)
+        return True
+    
+    async def _save(self, task: TaskModel, previous_status: TaskStatus) -> None:
+        """更新数据库并刷新该任务的缓存，状态变化时使新旧状态的索引失效"""
+        row = self._task_to_record(task)
+        await self.db_service.update("tasks", row, {"id": task.id})
+        await self._cache.put(row)
+        if task.status != previous_status:
+            await self._cache.drop_index("status", previous_status.value, task.status.value)
     
-    async def _update_tasks_cache(self) -> None:
-        """更新任务缓存"""
-        tasks_data = await self.db_service.query("tasks", {})
-        tasks_dict = {task_data["id"]: task_data for task_data in tasks_data}
-        await self.cache_service.set(self._tasks_cache_key, tasks_dict, expire=3600)
+    def _task_to_record(self, task: TaskModel) -> Dict[str, Any]:
+        """将TaskModel转换为可直接绑定到SQL参数的记录"""
+        record = asdict(task)
+        record["status"] = task.status.value
+        record["priority"] = task.priority.value
+        record["input_data"] = json.dumps(record["input_data"], ensure_ascii=False)
+        record["result"] = json.dumps(record["result"], ensure_ascii=False) if task.result else None
+        return record
     
     def _dict_to_task_model(self, task_data: Dict[str, Any]) -> TaskModel:
         """将字典转换为TaskModel对象"""
+        task_data = dict(task_data)
+        
         # 处理枚举类型
         if "status" in task_data and isinstance(task_data["status"], str):
             task_data["status"] = TaskStatus(task_data["status"])
         if "priority" in task_data and isinstance(task_data["priority"], str):
             task_data["priority"] = TaskPriority(task_data["priority"])
+        if isinstance(task_data.get("input_data"), str):
+            task_data["input_data"] = json.loads(task_data["input_data"])
         
         # 处理结果对象
         if "result" in task_data and task_data["result"]:
             result_data = task_data["result"]
+            if isinstance(result_data, str):
+                result_data = json.loads(result_data)
             task_data["result"] = TaskResult(
                 success=result_data["success"],
                 data=result_data.get("data"),
@@ -0,0 +1,264 @@
+"""
+后写队列
+
+把单条写入合并成批次，由后台任务按时间间隔或批次大小触发一次批量持久化，
+调用方可以等待某条记录落盘，也可以通过 flush 设置持久化检查点。
+写入失败的批次按指数退避重试，超过重试次数后逐条写入：同批其他记录写入成功而自身仍然失败的记录
+（如违反约束）进入死信并移出队列；全部失败时视为数据库不可用，记录保留在队列中继续退避重试。
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class WriteBehindQueue:
+    """按批次异步写入记录的队列"""
+
+    def __init__(
+        self,
+        writer: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        flush_interval: float = 0.05,
+        flush_size: int = 100,
+        max_retries: int = 3,
+        retry_backoff: float = 0.1,
+        max_backoff: float = 5.0,
+        on_dead_letter: Optional[Callable[[List[Dict[str, Any]]], Awaitable[Any]]] = None,
+        logger: Optional[logging.Logger] = None
+    ):
+        """
+        初始化后写队列
+
+        Args:
+            writer: 批量写入函数，接收一批记录，必须在一个事务内完成写入
+            flush_interval: 两次批量写入之间的最长等待时间（秒）
+            flush_size: 累积到该数量时立即写入
+            max_retries: 队首批次连续失败的重试次数，超过后逐条写入以找出无法写入的记录
+            retry_backoff: 首次重试前的等待时间（秒），之后每次翻倍
+            max_backoff: 重试等待时间上限（秒）
+            on_dead_letter: 记录进入死信后调用，接收这些记录（如清理缓存中未落盘的数据）
+            logger: 日志记录器
+        """
+        if flush_size < 1:
+            raise ValueError("flush_size 必须大于0")
+        self.writer = writer
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.on_dead_letter = on_dead_letter
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+        self._queue: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        # 队首批次连续失败的次数
+        self._failures = 0
+        self._dead_letters: List[Dict[str, Any]] = []
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "failed_batches": 0, "dead_lettered": 0}
+
+    @property
+    def pending(self) -> int:
+        """尚未写入的记录数"""
+        return len(self._queue)
+
+    @property
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        """重试后仍无法写入而被丢弃的记录"""
+        return list(self._dead_letters)
+
+    def get_pending(self, record_id: Any) -> Optional[Dict[str, Any]]:
+        """获取尚未写入的记录"""
+        return self._pending.get(record_id)
+
+    def enqueue(self, record: Dict[str, Any]) -> asyncio.Future:
+        """
+        加入一条记录
+
+        Args:
+            record: 待写入的记录，必须包含 id
+
+        Returns:
+            记录写入后完成的 Future，可用 await 等待落盘
+        """
+        if self._closed:
+            raise RuntimeError("后写队列已关闭")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((record, future))
+        self._pending[record["id"]] = record
+        self._stats["enqueued"] += 1
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        if len(self._queue) >= self.flush_size:
+            self._wakeup.set()
+        return future
+
+    async def flush(self) -> int:
+        """
+        持久化检查点：把当前队列中的所有记录写入，写入失败时抛出异常
+
+        队首批次失败超过 max_retries 次后，下一次写入改为逐条写入，只有同批其他记录写入成功时
+        仍然失败的记录才进入死信，因此反复失败的记录不会永久阻塞后面的记录，数据库短暂不可用也不会丢失记录。
+
+        Returns:
+            本次写入的记录数
+        """
+        written = 0
+        async with self._lock:
+            while self._queue:
+                written += await self._write_batch()
+        return written
+
+    async def close(self, timeout: float = 30.0) -> None:
+        """
+        写入剩余记录并停止后台任务，用于关闭时的收尾
+
+        Args:
+            timeout: 写入持续失败时最多重试的时间（秒），超时后剩余记录进入死信
+        """
+        self._closed = True
+        self._wakeup.set()
+        self._stopping.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except Exception as e:
+                self.logger.error(f"后写任务异常退出: {e}")
+            self._task = None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self._queue:
+            try:
+                await self.flush()
+            except Exception as e:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    async with self._lock:
+                        entries = [(record, future, e) for record, future in self._queue]
+                        del self._queue[:]
+                        await self._dead_letter(entries)
+                    break
+                self.logger.error(f"关闭时批量写入失败，{len(self._queue)} 条记录待重试: {e}")
+                await asyncio.sleep(min(self._retry_delay(), remaining))
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取队列统计"""
+        return {**self._stats, "pending": len(self._queue)}
+
+    def _retry_delay(self) -> float:
+        return min(self.retry_backoff * (2 ** max(self._failures - 1, 0)), self.max_backoff)
+
+    async def _run(self) -> None:
+        while self._queue:
+            if self._failures:
+                # 上一批写入失败，按指数退避等待后重试；关闭时立即唤醒，由 close 在超时内继续重试
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self._retry_delay())
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # 记录保留在队列中，退避后重试
+                self.logger.error(
+                    f"批量写入失败（第 {self._failures} 次），{len(self._queue)} 条记录待重试: {e}"
+                )
+                if self._closed:
+                    break
+
+    async def _write_batch(self) -> int:
+        """写入队首的一批记录（调用方需持有锁）"""
+        batch = self._queue[:self.flush_size]
+        if self._failures > self.max_retries:
+            return await self._write_records_individually(batch)
+
+        try:
+            await self.writer([record for record, _ in batch])
+        except Exception as e:
+            self._failures += 1
+            self._stats["failed_batches"] += 1
+            # 通知正在等待落盘的调用方，记录本身仍留在队列中等待重试
+            for _, future in batch:
+                _fail(future, e)
+            raise
+
+        self._failures = 0
+        del self._queue[:len(batch)]
+        for record, future in batch:
+            self._complete(record, future)
+        self._stats["written"] += len(batch)
+        self._stats["batches"] += 1
+        return len(batch)
+
+    async def _write_records_individually(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> int:
+        """
+        批次反复失败时逐条写入，找出无法写入的记录（如违反约束）移入死信，让后面的记录继续写入
+
+        所有记录都写入失败时无法区分坏记录和数据库不可用，记录全部保留在队列中，按退避继续重试。
+        """
+        written, failed = [], []
+        for record, future in batch:
+            try:
+                await self.writer([record])
+            except Exception as e:
+                failed.append((record, future, e))
+            else:
+                written.append((record, future))
+
+        if not written:
+            self._failures += 1
+            self._stats["failed_batches"] += 1
+            for _, future, e in failed:
+                _fail(future, e)
+            raise failed[-1][2]
+
+        self._failures = 0
+        del self._queue[:len(batch)]
+        for record, future in written:
+            self._complete(record, future)
+        self._stats["written"] += len(written)
+        self._stats["batches"] += 1
+        await self._dead_letter(failed)
+        return len(written)
+
+    async def _dead_letter(self, entries: List[Tuple[Dict[str, Any], asyncio.Future, Exception]]) -> None:
+        """把已移出队列的记录放入死信并通知 on_dead_letter（调用方需持有锁）"""
+        if not entries:
+            return
+        for record, future, error in entries:
+            self._dead_letters.append(record)
+            self._stats["dead_lettered"] += 1
+            self.logger.error(f"记录 {record['id']} 无法写入，已丢弃: {error}")
+            _fail(future, error)
+            self._complete(record, future)
+        if self.on_dead_letter is not None:
+            try:
+                await self.on_dead_letter([record for record, _, _ in entries])
+            except Exception as e:
+                self.logger.error(f"死信回调失败: {e}")
+
+    def _complete(self, record: Dict[str, Any], future: asyncio.Future) -> None:
+        # 同一ID可能在写入期间被再次入队，只清理本批次对应的记录
+        if self._pending.get(record["id"]) is record:
+            del self._pending[record["id"]]
+        if not future.done():
+            future.set_result(True)
+
+
+def _fail(future: asyncio.Future, error: Exception) -> None:
+    if not future.done():
+        future.set_exception(error)
+        # 标记异常已被获取，避免调用方未等待时产生 "exception was never retrieved" 警告
+        future.exception()
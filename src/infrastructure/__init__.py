@@ -1,13 +1,14 @@
 """
 基础设施层模块
 
-包含数据库、缓存、外部服务和向量存储等基础设施组件。
+包含数据库、缓存、外部服务、向量存储和监控等基础设施组件。
 """
 
 from .database import DatabaseService, PostgreSQLService, SQLiteService, DatabaseServiceFactory
-from .cache import CacheService, RedisCacheService, MemoryCacheService, CacheServiceFactory
+from .cache import CacheService, RedisCacheService, MemoryCacheService, TieredCacheService, CacheServiceFactory
 from .external import ExternalService, LLMService, WeatherService, NewsService, ExternalServiceFactory
 from .vector_store import VectorStore, ChromaVectorStore, PineconeVectorStore, FaissVectorStore, VectorStoreFactory
+from .monitoring import Tracer, get_tracer, AgentMetrics, get_metrics
 
 __all__ = [
     # 数据库服务
@@ -20,6 +21,7 @@ __all__ = [
     "CacheService",
     "RedisCacheService",
     "MemoryCacheService", 
+    "TieredCacheService",
     "CacheServiceFactory",
     
     # 外部服务
@@ -34,5 +36,11 @@ __all__ = [
     "ChromaVectorStore",
     "PineconeVectorStore", 
     "FaissVectorStore",
-    "VectorStoreFactory"
+    "VectorStoreFactory",
+    
+    # 监控
+    "Tracer",
+    "get_tracer",
+    "AgentMetrics",
+    "get_metrics"
 ]
\ No newline at end of file
@@ -5,10 +5,12 @@
 """
 
 from .cache_service import CacheService, RedisCacheService, MemoryCacheService, CacheServiceFactory
+from .tiered_cache import TieredCacheService
 
 __all__ = [
     "CacheService",
     "RedisCacheService",
     "MemoryCacheService", 
+    "TieredCacheService",
     "CacheServiceFactory"
 ]
\ No newline at end of file
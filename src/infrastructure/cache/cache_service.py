@@ -4,13 +4,17 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union
-import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+import heapq
 import logging
-import pickle
+import sys
+import time
 from datetime import timedelta
 
 from src.shared.exceptions.exceptions import CacheError
+from src.infrastructure.monitoring.metrics import get_metrics
+from .codecs import CacheSerializer
 
 
 class CacheService(ABC):
@@ -149,6 +153,57 @@ class CacheService(ABC):
             是否清空成功
         """
         pass
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        批量获取缓存值
+        
+        Args:
+            keys: 缓存键列表
+            
+        Returns:
+            命中的键值字典，未命中的键不出现在结果中
+        """
+        result = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+    
+    async def set_many(
+        self,
+        mapping: Dict[str, Any],
+        expire: Optional[Union[int, timedelta]] = None
+    ) -> bool:
+        """
+        批量设置缓存值
+        
+        Args:
+            mapping: 键值字典
+            expire: 过期时间（秒或timedelta），对所有键生效
+            
+        Returns:
+            是否全部设置成功
+        """
+        results = [await self.set(key, value, expire) for key, value in mapping.items()]
+        return all(results)
+    
+    async def delete_many(self, keys: List[str]) -> int:
+        """
+        批量删除缓存
+        
+        Args:
+            keys: 缓存键列表
+            
+        Returns:
+            实际删除的键数量
+        """
+        deleted = 0
+        for key in keys:
+            if await self.delete(key):
+                deleted += 1
+        return deleted
 
 
 class RedisCacheService(CacheService):
@@ -160,7 +215,9 @@ class RedisCacheService(CacheService):
         port: int = 6379,
         db: int = 0,
         password: Optional[str] = None,
-        logger: Optional[logging.Logger] = None
+        logger: Optional[logging.Logger] = None,
+        serializer: Optional[CacheSerializer] = None,
+        health_check_interval: int = 30
     ):
         """
         初始化Redis缓存服务
@@ -171,12 +228,16 @@ class RedisCacheService(CacheService):
             db: 数据库编号
             password: 密码
             logger: 日志记录器
+            serializer: 缓存值编解码器，默认使用 CacheSerializer()
+            health_check_interval: 连接空闲超过该秒数后，由客户端在下次命令前自动检查连接
         """
         super().__init__(logger)
         self.host = host
         self.port = port
         self.db = db
         self.password = password
+        self.serializer = serializer or CacheSerializer()
+        self.health_check_interval = health_check_interval
         self._redis = None
     
     async def connect(self) -> None:
@@ -189,7 +250,10 @@ class RedisCacheService(CacheService):
                 port=self.port,
                 db=self.db,
                 password=self.password,
-                decode_responses=False  # 保持二进制数据
+                decode_responses=False,  # 保持二进制数据
+                # 断线重连和空闲连接检查交给客户端，不再每次操作前 PING
+                health_check_interval=self.health_check_interval,
+                retry_on_timeout=True
             )
             
             # 测试连接
@@ -208,8 +272,13 @@ class RedisCacheService(CacheService):
             self._connected = False
             self.logger.info("已断开Redis连接")
     
+    async def _ensure_connected(self) -> None:
+        """首次使用时建立连接；之后的断线由 redis 客户端的连接池自动重连"""
+        if self._redis is None:
+            await self.connect()
+    
     async def is_connected(self) -> bool:
-        """检查是否已连接"""
+        """检查是否已连接（发送 PING，仅用于健康检查）"""
         if not self._redis:
             return False
         
@@ -222,24 +291,15 @@ class RedisCacheService(CacheService):
     
     async def get(self, key: str) -> Optional[Any]:
         """获取缓存值"""
-        if not await self.is_connected():
-            await self.connect()
+        await self._ensure_connected()
         
         try:
             value = await self._redis.get(key)
+            get_metrics().record_cache_lookup("redis", value is not None)
             if value is None:
                 return None
             
-            # 尝试反序列化
-            try:
-                return pickle.loads(value)
-            except (pickle.UnpicklingError, AttributeError, EOFError, ImportError) as pickle_err:
-                # 如果反序列化失败，尝试JSON解析
-                try:
-                    return json.loads(value)
-                except (json.JSONDecodeError, TypeError, ValueError) as json_err:
-                    # 如果都失败，直接返回字符串
-                    return value.decode('utf-8') if isinstance(value, bytes) else value
+            return self.serializer.decode(value)
         except Exception as e:
             self.logger.error(f"获取缓存失败: {str(e)}")
             raise CacheError(f"获取缓存失败: {str(e)}")
@@ -251,15 +311,11 @@ class RedisCacheService(CacheService):
         expire: Optional[Union[int, timedelta]] = None
     ) -> bool:
         """设置缓存值"""
-        if not await self.is_connected():
-            await self.connect()
+        await self._ensure_connected()
         
         try:
             # 序列化值
-            if isinstance(value, (str, int, float, bool)):
-                serialized_value = str(value).encode('utf-8')
-            else:
-                serialized_value = pickle.dumps(value)
+            serialized_value = self.serializer.encode(value)
             
             # 设置过期时间
             if isinstance(expire, timedelta):
@@ -277,8 +333,7 @@ class RedisCacheService(CacheService):
     
     async def delete(self, key: str) -> bool:
         """删除缓存"""
-        if not await self.is_connected():
-            await self.connect()
+        await self._ensure_connected()
         
         try:
             result = await self._redis.delete(key)
@@ -289,8 +344,7 @@ class RedisCacheService(CacheService):
     
     async def exists(self, key: str) -> bool:
         """检查缓存是否存在"""
-        if not await self.is_connected():
-            await self.connect()
+        await self._ensure_connected()
         
         try:
             result = await self._redis.exists(key)
@@ -301,8 +355,7 @@ class RedisCacheService(CacheService):
     
     async def expire(self, key: str, seconds: int) -> bool:
         """设置缓存过期时间"""
-        if not await self.is_connected():
-            await self.connect()
+        await self._ensure_connected()
         
         try:
             result = await self._redis.expire(key, seconds)
@@ -313,8 +366,7 @@ class RedisCacheService(CacheService):
     
     async def ttl(self, key: str) -> int:
         """获取缓存剩余过期时间"""
-        if not await self.is_connected():
-            await self.connect()
+        await self._ensure_connected()
         
         try:
             return await self._redis.ttl(key)
@@ -324,8 +376,7 @@ class RedisCacheService(CacheService):
     
     async def keys(self, pattern: str = "*") -> List[str]:
         """获取匹配模式的所有键"""
-        if not await self.is_connected():
-            await self.connect()
+        await self._ensure_connected()
         
         try:
             keys = await self._redis.keys(pattern)
@@ -337,8 +388,7 @@ class RedisCacheService(CacheService):
     
     async def flushdb(self) -> bool:
         """清空当前数据库"""
-        if not await self.is_connected():
-            await self.connect()
+        await self._ensure_connected()
         
         try:
             result = await self._redis.flushdb()
@@ -346,21 +396,159 @@ class RedisCacheService(CacheService):
         except Exception as e:
             self.logger.error(f"清空缓存数据库失败: {str(e)}")
             raise CacheError(f"清空缓存数据库失败: {str(e)}")
+    
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """批量获取缓存值（MGET，一次往返）"""
+        if not keys:
+            return {}
+        await self._ensure_connected()
+        
+        try:
+            values = await self._redis.mget(keys)
+            result = {}
+            for key, value in zip(keys, values):
+                if value is not None:
+                    result[key] = self.serializer.decode(value)
+            metrics = get_metrics()
+            metrics.record_cache_lookup("redis", True, len(result))
+            metrics.record_cache_lookup("redis", False, len(keys) - len(result))
+            return result
+        except Exception as e:
+            self.logger.error(f"批量获取缓存失败: {str(e)}")
+            raise CacheError(f"批量获取缓存失败: {str(e)}")
+    
+    async def set_many(
+        self,
+        mapping: Dict[str, Any],
+        expire: Optional[Union[int, timedelta]] = None
+    ) -> bool:
+        """批量设置缓存值（无过期时间时用 MSET，否则用管道批量 SETEX）"""
+        if not mapping:
+            return True
+        await self._ensure_connected()
+        
+        try:
+            encoded = {key: self.serializer.encode(value) for key, value in mapping.items()}
+            if isinstance(expire, timedelta):
+                expire = int(expire.total_seconds())
+            
+            if not expire:
+                return bool(await self._redis.mset(encoded))
+            
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, value in encoded.items():
+                    pipe.setex(key, expire, value)
+                results = await pipe.execute()
+            return all(results)
+        except Exception as e:
+            self.logger.error(f"批量设置缓存失败: {str(e)}")
+            raise CacheError(f"批量设置缓存失败: {str(e)}")
+    
+    async def delete_many(self, keys: List[str]) -> int:
+        """批量删除缓存（一条 DEL 命令）"""
+        if not keys:
+            return 0
+        await self._ensure_connected()
+        
+        try:
+            return await self._redis.delete(*keys)
+        except Exception as e:
+            self.logger.error(f"批量删除缓存失败: {str(e)}")
+            raise CacheError(f"批量删除缓存失败: {str(e)}")
+    
+    async def publish(self, channel: str, message: str) -> int:
+        """
+        向频道发布消息
+        
+        Args:
+            channel: 频道名称
+            message: 消息内容
+            
+        Returns:
+            收到消息的订阅者数量
+        """
+        await self._ensure_connected()
+        
+        try:
+            return await self._redis.publish(channel, message)
+        except Exception as e:
+            self.logger.error(f"发布消息失败: {str(e)}")
+            raise CacheError(f"发布消息失败: {str(e)}")
+    
+    async def subscribe(self, channel: str):
+        """
+        订阅频道
+        
+        Args:
+            channel: 频道名称
+            
+        Returns:
+            已订阅的 redis PubSub 对象，调用方负责关闭
+        """
+        await self._ensure_connected()
+        
+        try:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(channel)
+            return pubsub
+        except Exception as e:
+            self.logger.error(f"订阅频道失败: {str(e)}")
+            raise CacheError(f"订阅频道失败: {str(e)}")
+
+
+def _estimate_size(value: Any, depth: int = 0) -> int:
+    """估算对象占用的内存字节数（容器递归三层）"""
+    size = sys.getsizeof(value)
+    if depth >= 3:
+        return size
+    if isinstance(value, dict):
+        size += sum(_estimate_size(k, depth + 1) + _estimate_size(v, depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_estimate_size(item, depth + 1) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += _estimate_size(vars(value), depth + 1)
+    return size
 
 
 class MemoryCacheService(CacheService):
-    """内存缓存服务"""
+    """
+    内存缓存服务
+
+    按访问顺序维护的 LRU 缓存：读写都是 O(1)，超过条目数或字节数上限时淘汰最久未使用的键；
+    过期时间记录在最小堆中，访问时惰性检查，并按 sweep_interval 周期性批量清理已过期的键。
+    """
     
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        default_ttl: Optional[int] = None,
+        sweep_interval: float = 60.0
+    ):
         """
         初始化内存缓存服务
         
         Args:
             logger: 日志记录器
+            max_entries: 最大条目数，None 表示不限制
+            max_bytes: 估算占用字节数上限，None 表示不限制
+            default_ttl: 未指定过期时间时的默认过期秒数，None 表示永不过期
+            sweep_interval: 周期性清理过期键的间隔（秒）
         """
         super().__init__(logger)
-        self._cache: Dict[str, Any] = {}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.sweep_interval = sweep_interval
+        
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
         self._expires: Dict[str, float] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._bytes = 0
+        self._next_sweep = time.time() + sweep_interval
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
         self._connected = True
     
     async def connect(self) -> None:
@@ -382,15 +570,16 @@ class MemoryCacheService(CacheService):
         if not self._connected:
             raise CacheError("缓存服务未连接")
         
-        # 检查是否过期
-        if key in self._expires and self._expires[key] < 0:
-            # 如果设置了过期时间，检查是否已过期
-            import time
-            if time.time() > self._expires[key]:
-                await self.delete(key)
-                return None
+        self._maybe_sweep()
+        if key not in self._cache or self._expire_if_due(key):
+            self._stats["misses"] += 1
+            get_metrics().record_cache_lookup("memory", False)
+            return None
         
-        return self._cache.get(key)
+        self._cache.move_to_end(key)
+        self._stats["hits"] += 1
+        get_metrics().record_cache_lookup("memory", True)
+        return self._cache[key]
     
     async def set(
         self,
@@ -403,17 +592,27 @@ class MemoryCacheService(CacheService):
             raise CacheError("缓存服务未连接")
         
         try:
+            size = _estimate_size(value)
+            if self.max_bytes is not None and size > self.max_bytes:
+                self.logger.warning(f"缓存值超过容量上限，未写入: {key} ({size} 字节)")
+                self._remove(key)
+                return False
+            
+            self._remove(key)
             self._cache[key] = value
+            self._sizes[key] = size
+            self._bytes += size
             
             # 设置过期时间
+            if expire is None:
+                expire = self.default_ttl
             if expire:
-                import time
                 if isinstance(expire, timedelta):
                     expire = int(expire.total_seconds())
-                self._expires[key] = time.time() + expire
-            elif key in self._expires:
-                del self._expires[key]
+                self._set_expiry(key, time.time() + expire)
             
+            self._maybe_sweep()
+            self._enforce_limits()
             return True
         except Exception as e:
             self.logger.error(f"设置缓存失败: {str(e)}")
@@ -425,12 +624,7 @@ class MemoryCacheService(CacheService):
             raise CacheError("缓存服务未连接")
         
         try:
-            deleted = key in self._cache
-            if key in self._cache:
-                del self._cache[key]
-            if key in self._expires:
-                del self._expires[key]
-            return deleted
+            return self._remove(key)
         except Exception as e:
             self.logger.error(f"删除缓存失败: {str(e)}")
             raise CacheError(f"删除缓存失败: {str(e)}")
@@ -440,14 +634,7 @@ class MemoryCacheService(CacheService):
         if not self._connected:
             raise CacheError("缓存服务未连接")
         
-        # 检查是否过期
-        if key in self._expires and self._expires[key] > 0:
-            import time
-            if time.time() > self._expires[key]:
-                await self.delete(key)
-                return False
-        
-        return key in self._cache
+        return key in self._cache and not self._expire_if_due(key)
     
     async def expire(self, key: str, seconds: int) -> bool:
         """设置缓存过期时间"""
@@ -455,9 +642,8 @@ class MemoryCacheService(CacheService):
             raise CacheError("缓存服务未连接")
         
         try:
-            if key in self._cache:
-                import time
-                self._expires[key] = time.time() + seconds
+            if key in self._cache and not self._expire_if_due(key):
+                self._set_expiry(key, time.time() + seconds)
                 return True
             return False
         except Exception as e:
@@ -469,25 +655,25 @@ class MemoryCacheService(CacheService):
         if not self._connected:
             raise CacheError("缓存服务未连接")
         
-        if key not in self._cache:
-            return -2  # 不存在
+        if key not in self._cache or self._expire_if_due(key):
+            return -2  # 不存在或已过期
         
         if key not in self._expires:
             return -1  # 永不过期
         
-        import time
-        remaining = self._expires[key] - time.time()
-        if remaining <= 0:
-            await self.delete(key)
-            return -2  # 已过期
-        
-        return int(remaining)
+        return round(self._expires[key] - time.time())
     
     async def keys(self, pattern: str = "*") -> List[str]:
         """获取匹配模式的所有键"""
         if not self._connected:
             raise CacheError("缓存服务未连接")
         
+        self.purge_expired()
+        if pattern == "*":
+            return list(self._cache.keys())
+        if not any(ch in pattern for ch in "*?["):
+            return [pattern] if pattern in self._cache else []
+        
         import fnmatch
         return [key for key in self._cache.keys() if fnmatch.fnmatch(key, pattern)]
     
@@ -498,11 +684,91 @@ class MemoryCacheService(CacheService):
         
         try:
             self._cache.clear()
+            self._sizes.clear()
             self._expires.clear()
+            self._expiry_heap.clear()
+            self._bytes = 0
             return True
         except Exception as e:
             self.logger.error(f"清空缓存数据库失败: {str(e)}")
             raise CacheError(f"清空缓存数据库失败: {str(e)}")
+    
+    def purge_expired(self) -> int:
+        """
+        清理所有已过期的键
+        
+        Returns:
+            清理的键数量
+        """
+        now = time.time()
+        purged = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            deadline, key = heapq.heappop(self._expiry_heap)
+            # 堆中可能残留已被覆盖或删除的旧记录，以 _expires 为准
+            if self._expires.get(key) == deadline:
+                self._remove(key)
+                purged += 1
+        if purged:
+            self._stats["expirations"] += purged
+            get_metrics().record_cache_eviction("memory", "expired", purged)
+        self._next_sweep = now + self.sweep_interval
+        return purged
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "entries": len(self._cache),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+        }
+    
+    def _set_expiry(self, key: str, deadline: float) -> None:
+        self._expires[key] = deadline
+        heapq.heappush(self._expiry_heap, (deadline, key))
+        # 旧记录过多时重建堆，避免反复续期的键撑大堆
+        if len(self._expiry_heap) > 2 * len(self._expires) + 64:
+            self._expiry_heap = [(deadline, key) for key, deadline in self._expires.items()]
+            heapq.heapify(self._expiry_heap)
+    
+    def _expire_if_due(self, key: str) -> bool:
+        """惰性过期检查，已过期时删除并返回 True"""
+        deadline = self._expires.get(key)
+        if deadline is None or deadline > time.time():
+            return False
+        self._remove(key)
+        self._stats["expirations"] += 1
+        get_metrics().record_cache_eviction("memory", "expired")
+        return True
+    
+    def _maybe_sweep(self) -> None:
+        if self._expiry_heap and time.time() >= self._next_sweep:
+            self.purge_expired()
+    
+    def _enforce_limits(self) -> None:
+        """按 LRU 顺序淘汰，直到满足条目数和字节数上限"""
+        evicted = 0
+        while self._cache and (
+            (self.max_entries is not None and len(self._cache) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._cache))
+            self._remove(oldest)
+            evicted += 1
+        if evicted:
+            self._stats["evictions"] += evicted
+            get_metrics().record_cache_eviction("memory", "lru", evicted)
+    
+    def _remove(self, key: str) -> bool:
+        if key not in self._cache:
+            return False
+        del self._cache[key]
+        self._bytes -= self._sizes.pop(key, 0)
+        self._expires.pop(key, None)
+        return True
 
 
 class CacheServiceFactory:
@@ -518,7 +784,7 @@ class CacheServiceFactory:
         创建缓存服务实例
         
         Args:
-            cache_type: 缓存类型 (redis, memory)
+            cache_type: 缓存类型 (redis, memory, tiered)
             config: 缓存配置
             logger: 日志记录器
             
@@ -533,9 +799,51 @@ class CacheServiceFactory:
                 port=config.get("port", 6379),
                 db=config.get("db", 0),
                 password=config.get("password"),
-                logger=logger
+                logger=logger,
+                serializer=CacheSerializer(
+                    codec=config.get("codec", "auto"),
+                    compression=config.get("compression", "none"),
+                    compress_threshold=config.get("compress_threshold", 1024),
+                    allow_pickle=config.get("allow_pickle", True)
+                )
             )
         elif cache_type == "memory":
-            return MemoryCacheService(logger=logger)
+            return MemoryCacheService(
+                logger=logger,
+                max_entries=config.get("max_size"),
+                max_bytes=config.get("max_bytes"),
+                default_ttl=config.get("ttl"),
+                sweep_interval=config.get("sweep_interval", 60.0)
+            )
+        elif cache_type == "tiered":
+            from .tiered_cache import TieredCacheService
+            
+            l1_config = config.get("l1", {})
+            # L2 的连接参数取自 services.redis、序列化参数取自 services.cache.redis，tiered 中的同名键优先
+            l2_config = {
+                **CacheServiceFactory._shared_redis_config(),
+                **{key: value for key, value in config.items() if key != "l1"}
+            }
+            return TieredCacheService(
+                l2=CacheServiceFactory.create_service("redis", l2_config, logger),
+                l1=CacheServiceFactory.create_service("memory", l1_config, logger),
+                l1_ttl=l1_config.get("ttl", 60),
+                write_policy=config.get("write_policy", "write_through"),
+                flush_interval=config.get("flush_interval", 0.1),
+                invalidation_channel=config.get("invalidation_channel", "cache:invalidate"),
+                logger=logger
+            )
         else:
-            raise CacheError(f"不支持的缓存类型: {cache_type}")
\ No newline at end of file
+            raise CacheError(f"不支持的缓存类型: {cache_type}")
+    
+    @staticmethod
+    def _shared_redis_config() -> Dict[str, Any]:
+        """services.redis 连接参数与 services.cache.redis 缓存参数的合并结果"""
+        from src.config.config_loader import config_loader
+        
+        try:
+            services = config_loader.get_services_config().get("services", {})
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"加载Redis配置失败，使用默认连接参数: {e}")
+            return {}
+        return {**services.get("redis", {}), **services.get("cache", {}).get("redis", {})}
\ No newline at end of file
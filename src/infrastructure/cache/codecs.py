@@ -0,0 +1,285 @@
+"""
+缓存序列化模块
+带类型标记头的编解码层：写入时在数据前加一个标记字节和一个记录编码方式、压缩方式的头字节，
+读取时按头字节一次分派，不再依次尝试 pickle/JSON/字符串
+"""
+
+import json
+import logging
+import pickle
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.shared.exceptions.exceptions import CacheError
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+
+    def _msgpack_dumps(value: Any) -> bytes:
+        # strict_types 拒绝 tuple 和各种子类，保证编码无损
+        return msgpack.packb(value, use_bin_type=True, strict_types=True)
+
+    def _msgpack_loads(data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    try:
+        import ormsgpack
+
+        # 关闭 ormsgpack 对 datetime/枚举/tuple 等类型的有损转换，遇到时抛出 TypeError
+        _ORMSGPACK_STRICT = (
+            ormsgpack.OPT_PASSTHROUGH_BIG_INT | ormsgpack.OPT_PASSTHROUGH_DATACLASS
+            | ormsgpack.OPT_PASSTHROUGH_DATETIME | ormsgpack.OPT_PASSTHROUGH_ENUM
+            | ormsgpack.OPT_PASSTHROUGH_SUBCLASS | ormsgpack.OPT_PASSTHROUGH_TUPLE
+            | ormsgpack.OPT_PASSTHROUGH_UUID
+        )
+
+        def _msgpack_dumps(value: Any) -> bytes:
+            return ormsgpack.packb(value, option=_ORMSGPACK_STRICT)
+
+        _msgpack_loads = ormsgpack.unpackb
+        MSGPACK_AVAILABLE = True
+    except ImportError:
+        MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+# 编码方式（头字节低3位）
+CODEC_RAW = 1      # bytes 原样存储
+CODEC_TEXT = 2     # str 按 UTF-8 存储
+CODEC_JSON = 3
+CODEC_MSGPACK = 4
+CODEC_PICKLE = 5
+
+# 压缩方式（头字节高位）
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+COMPRESSION_LZ4 = 3
+
+CODEC_NAMES = {"raw": CODEC_RAW, "text": CODEC_TEXT, "json": CODEC_JSON, "msgpack": CODEC_MSGPACK, "pickle": CODEC_PICKLE}
+COMPRESSION_NAMES = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD, "lz4": COMPRESSION_LZ4}
+
+# 标记字节：0xFF 不会出现在合法的 UTF-8 文本（包括 JSON）中，pickle 以 0x80 开头，
+# 因此旧版本写入的数据不会被误认为带头数据
+_MAGIC = 0xFF
+
+_PLAIN_SCALARS = frozenset((str, int, float, bool, type(None)))
+
+
+def _is_plain(value: Any) -> bool:
+    """判断值是否只由 JSON 可无损表示的类型组成"""
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        item_type = type(item)
+        if item_type in _PLAIN_SCALARS:
+            continue
+        if item_type is dict:
+            for key in item:
+                if type(key) is not str:
+                    return False
+            stack.extend(item.values())
+        elif item_type is list:
+            stack.extend(item)
+        else:
+            return False
+    return True
+
+
+def _json_dumps(value: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _json_loads(data: bytes) -> Any:
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _compressors() -> Dict[int, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    table = {COMPRESSION_ZLIB: (lambda data: zlib.compress(data, 6), zlib.decompress)}
+    if ZSTD_AVAILABLE:
+        table[COMPRESSION_ZSTD] = (
+            # ZstdCompressor 实例不能被多个线程同时使用，每次调用单独创建
+            lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data),
+        )
+    if LZ4_AVAILABLE:
+        table[COMPRESSION_LZ4] = (lz4.frame.compress, lz4.frame.decompress)
+    return table
+
+
+class CacheSerializer:
+    """
+    缓存值编解码器
+
+    bytes/str 原样存储；结构化数据优先用严格模式的 msgpack 编码（遇到无法无损表示的类型直接失败，
+    不需要预先遍历检查），JSON 编码则先检查是否只含基本类型；
+    其他对象（datetime、枚举、领域模型等）在 allow_pickle 时使用 pickle，否则拒绝写入。
+    """
+
+    def __init__(
+        self,
+        codec: str = "auto",
+        compression: str = "none",
+        compress_threshold: int = 1024,
+        allow_pickle: bool = True
+    ):
+        """
+        初始化编解码器
+
+        Args:
+            codec: 结构化数据的编码方式 auto、msgpack、json 或 pickle（auto 优先 msgpack）
+            compression: 压缩方式 none、zlib、zstd 或 lz4
+            compress_threshold: 编码后超过该字节数才压缩
+            allow_pickle: 是否允许 pickle 编解码（共享缓存建议关闭）
+        """
+        if codec == "auto":
+            codec = "msgpack" if MSGPACK_AVAILABLE else "json"
+        if codec not in ("json", "msgpack", "pickle"):
+            raise CacheError(f"不支持的缓存编码: {codec}")
+        if codec == "msgpack" and not MSGPACK_AVAILABLE:
+            logger.warning("未安装 msgpack，缓存编码回退为 json")
+            codec = "json"
+        if compression not in COMPRESSION_NAMES:
+            raise CacheError(f"不支持的压缩方式: {compression}")
+
+        self._compressors = _compressors()
+        compression_id = COMPRESSION_NAMES[compression]
+        if compression_id != COMPRESSION_NONE and compression_id not in self._compressors:
+            logger.warning(f"未安装 {compression} 压缩库，回退为 zlib")
+            compression_id = COMPRESSION_ZLIB
+
+        self.codec = codec
+        self.compression = compression_id
+        self.compress_threshold = compress_threshold
+        self.allow_pickle = allow_pickle
+
+        self._structured_codec = CODEC_NAMES[codec]
+        self._encoders: Dict[int, Callable[[Any], bytes]] = {
+            CODEC_RAW: bytes,
+            CODEC_TEXT: lambda value: value.encode("utf-8"),
+            CODEC_JSON: _json_dumps,
+            CODEC_PICKLE: lambda value: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+        }
+        self._decoders: Dict[int, Callable[[bytes], Any]] = {
+            CODEC_RAW: bytes,
+            CODEC_TEXT: lambda data: data.decode("utf-8"),
+            CODEC_JSON: _json_loads,
+            CODEC_PICKLE: self._pickle_loads,
+        }
+        if MSGPACK_AVAILABLE:
+            self._encoders[CODEC_MSGPACK] = _msgpack_dumps
+            self._decoders[CODEC_MSGPACK] = _msgpack_loads
+
+    def encode(self, value: Any) -> bytes:
+        """
+        编码缓存值
+
+        Args:
+            value: 缓存值
+
+        Returns:
+            带标记字节和头字节的二进制数据
+        """
+        codec = self._choose_codec(value)
+        try:
+            body = self._encoders[codec](value)
+        except Exception as e:
+            # msgpack 无法无损表示的值（datetime、tuple、超大整数等）回退到 pickle
+            if codec in (CODEC_JSON, CODEC_MSGPACK) and self.allow_pickle:
+                codec, body = CODEC_PICKLE, self._encoders[CODEC_PICKLE](value)
+            else:
+                raise CacheError(f"缓存值编码失败: {e}")
+
+        compression = COMPRESSION_NONE
+        if self.compression != COMPRESSION_NONE and len(body) >= self.compress_threshold:
+            compressed = self._compressors[self.compression][0](body)
+            if len(compressed) < len(body):
+                body, compression = compressed, self.compression
+        return bytes((_MAGIC, (compression << 3) | codec)) + body
+
+    def decode(self, data: bytes) -> Any:
+        """
+        解码缓存值
+
+        Args:
+            data: encode 生成的数据（也兼容旧版本直接写入的 pickle/JSON/文本）
+
+        Returns:
+            缓存值
+        """
+        if len(data) < 2 or data[0] != _MAGIC:
+            return self._decode_legacy(data)
+
+        header = data[1]
+        codec, compression = header & 0x07, header >> 3
+        if codec not in CODEC_NAMES.values() or compression not in COMPRESSION_NAMES.values():
+            # 头字节不合法，说明不是 encode 写入的数据
+            return self._decode_legacy(data)
+        if codec not in self._decoders or (compression != COMPRESSION_NONE and compression not in self._compressors):
+            raise CacheError(f"缓存数据需要未安装的编解码库: {header:#04x}")
+
+        body = memoryview(data)[2:]
+        try:
+            if compression != COMPRESSION_NONE:
+                body = self._compressors[compression][1](body)
+            return self._decoders[codec](bytes(body))
+        except CacheError:
+            raise
+        except Exception as e:
+            raise CacheError(f"缓存值解码失败: {e}")
+
+    def _choose_codec(self, value: Any) -> int:
+        value_type = type(value)
+        if value_type is bytes:
+            return CODEC_RAW
+        if value_type is str:
+            return CODEC_TEXT
+        if self._structured_codec == CODEC_MSGPACK:
+            return CODEC_MSGPACK
+        if self._structured_codec == CODEC_JSON and _is_plain(value):
+            return CODEC_JSON
+        if not self.allow_pickle:
+            raise CacheError(f"缓存值类型 {value_type.__name__} 无法无损编码，且未允许 pickle")
+        return CODEC_PICKLE
+
+    def _pickle_loads(self, data: bytes) -> Any:
+        if not self.allow_pickle:
+            raise CacheError("缓存数据使用 pickle 编码，但当前配置不允许 pickle 解码")
+        return pickle.loads(data)
+
+    def _decode_legacy(self, data: bytes) -> Any:
+        """兼容升级前写入的数据：pickle → JSON → 文本"""
+        if self.allow_pickle and data[:1] == b"\x80":
+            try:
+                return pickle.loads(data)
+            except Exception:
+                pass
+        try:
+            return json.loads(data)
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return data.decode("utf-8", errors="replace")
@@ -0,0 +1,383 @@
+"""
+二级缓存服务
+每个进程内的有界 MemoryCacheService 作为 L1，共享的 Redis 作为 L2；
+写入后通过 Redis pub/sub 广播失效消息，使其他进程的 L1 保持一致
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from src.shared.exceptions.exceptions import CacheError
+from .cache_service import CacheService, MemoryCacheService
+
+
+WRITE_THROUGH = "write_through"
+WRITE_BEHIND = "write_behind"
+
+# 失效消息中表示清空全部键的标记
+_FLUSH_ALL = "*"
+
+# L2 持续写回失败时后台写回间隔的上限（秒）
+_MAX_FLUSH_BACKOFF = 30.0
+
+
+class TieredCacheService(CacheService):
+    """
+    L1 + L2 二级缓存服务
+
+    读：先查 L1，未命中再查 L2 并回填 L1（L1 使用较短的 TTL 兜底）。
+    写：write_through 同步写入 L2；write_behind 先写 L1，由后台任务合并后批量写入 L2。
+    L1 中保存的是对象本身，调用方不应修改 get 返回的可变对象。
+    """
+
+    def __init__(
+        self,
+        l2: CacheService,
+        l1: Optional[MemoryCacheService] = None,
+        l1_ttl: Optional[int] = 60,
+        write_policy: str = WRITE_THROUGH,
+        flush_interval: float = 0.1,
+        invalidation_channel: Optional[str] = "cache:invalidate",
+        logger: Optional[logging.Logger] = None
+    ):
+        """
+        初始化二级缓存服务
+
+        Args:
+            l2: 共享缓存（通常是 RedisCacheService）
+            l1: 进程内缓存，默认创建 1000 条上限的 MemoryCacheService
+            l1_ttl: L1 条目的最长存活时间（秒），用于限制错过失效消息时的不一致窗口
+            write_policy: 写策略 write_through 或 write_behind
+            flush_interval: write_behind 模式下批量写入 L2 的间隔（秒）
+            invalidation_channel: 失效广播频道，None 表示不广播（仅当 L2 支持 publish/subscribe 时生效）
+            logger: 日志记录器
+        """
+        super().__init__(logger)
+        if write_policy not in (WRITE_THROUGH, WRITE_BEHIND):
+            raise CacheError(f"不支持的写策略: {write_policy}")
+        self.l1 = l1 or MemoryCacheService(logger=logger, max_entries=1000)
+        self.l2 = l2
+        self.l1_ttl = l1_ttl
+        self.write_policy = write_policy
+        self.flush_interval = flush_interval
+        self.invalidation_channel = invalidation_channel
+        self.instance_id = uuid.uuid4().hex
+
+        self._pending: Dict[str, Tuple[Any, Optional[int]]] = {}
+        # 正在写回L2的键，以及写回期间被删除（墓碑）的键；写回串行进行，保证新值总在旧值之后写入
+        self._inflight: Set[str] = set()
+        self._tombstones: Set[str] = set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_failures = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._pubsub = None
+        self._stats = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "l2_writes": 0,
+            "l2_write_errors": 0,
+            "invalidations_sent": 0,
+            "invalidations_received": 0,
+        }
+
+    async def connect(self) -> None:
+        """连接L2并订阅失效广播"""
+        await self.l1.connect()
+        await self.l2.connect()
+        if self.invalidation_channel and hasattr(self.l2, "subscribe"):
+            self._pubsub = await self.l2.subscribe(self.invalidation_channel)
+            self._listener_task = asyncio.create_task(self._listen())
+        self._connected = True
+        self.logger.info(f"二级缓存服务已启动（{self.write_policy}）")
+
+    async def disconnect(self) -> None:
+        """写回待写入的数据并断开连接"""
+        await self.flush()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            self._listener_task = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.close()
+            except Exception as e:
+                self.logger.debug(f"关闭订阅失败: {e}")
+            self._pubsub = None
+        await self.l2.disconnect()
+        await self.l1.disconnect()
+        self._connected = False
+        self.logger.info("二级缓存服务已停止")
+
+    async def is_connected(self) -> bool:
+        """检查是否已连接"""
+        return self._connected and await self.l2.is_connected()
+
+    async def get(self, key: str) -> Optional[Any]:
+        """获取缓存值（L1 → 待写入队列 → L2）"""
+        value = await self.l1.get(key)
+        if value is not None:
+            self._stats["l1_hits"] += 1
+            return value
+        if key in self._pending:
+            self._stats["l1_hits"] += 1
+            return self._pending[key][0]
+
+        value = await self.l2.get(key)
+        if value is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["l2_hits"] += 1
+        await self.l1.set(key, value, self.l1_ttl)
+        return value
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        expire: Optional[Union[int, timedelta]] = None
+    ) -> bool:
+        """设置缓存值"""
+        if isinstance(expire, timedelta):
+            expire = int(expire.total_seconds())
+        await self.l1.set(key, value, self._l1_expire(expire))
+
+        if self.write_policy == WRITE_BEHIND:
+            self._pending[key] = (value, expire)
+            self._ensure_flush_task()
+            return True
+
+        result = await self.l2.set(key, value, expire)
+        self._stats["l2_writes"] += 1
+        await self._broadcast(key)
+        return result
+
+    async def delete(self, key: str) -> bool:
+        """删除缓存"""
+        self._discard_pending(key)
+        in_l1 = await self.l1.delete(key)
+        in_l2 = await self.l2.delete(key)
+        await self._broadcast(key)
+        return in_l1 or in_l2
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """批量获取缓存值，L1 未命中的键合并为一次 L2 批量查询"""
+        result = {}
+        missing = []
+        for key in keys:
+            value = await self.l1.get(key)
+            if value is None and key in self._pending:
+                value = self._pending[key][0]
+            if value is None:
+                missing.append(key)
+            else:
+                result[key] = value
+        self._stats["l1_hits"] += len(result)
+
+        if missing:
+            found = await self.l2.get_many(missing)
+            self._stats["l2_hits"] += len(found)
+            self._stats["misses"] += len(missing) - len(found)
+            for key, value in found.items():
+                await self.l1.set(key, value, self.l1_ttl)
+            result.update(found)
+        return result
+
+    async def set_many(
+        self,
+        mapping: Dict[str, Any],
+        expire: Optional[Union[int, timedelta]] = None
+    ) -> bool:
+        """批量设置缓存值"""
+        if isinstance(expire, timedelta):
+            expire = int(expire.total_seconds())
+        await self.l1.set_many(mapping, self._l1_expire(expire))
+
+        if self.write_policy == WRITE_BEHIND:
+            for key, value in mapping.items():
+                self._pending[key] = (value, expire)
+            self._ensure_flush_task()
+            return True
+
+        result = await self.l2.set_many(mapping, expire)
+        self._stats["l2_writes"] += len(mapping)
+        await self._broadcast(*mapping)
+        return result
+
+    async def delete_many(self, keys: List[str]) -> int:
+        """批量删除缓存"""
+        for key in keys:
+            self._discard_pending(key)
+        await self.l1.delete_many(keys)
+        deleted = await self.l2.delete_many(keys)
+        await self._broadcast(*keys)
+        return deleted
+
+    async def exists(self, key: str) -> bool:
+        """检查缓存是否存在"""
+        if key in self._pending or await self.l1.exists(key):
+            return True
+        return await self.l2.exists(key)
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        """设置缓存过期时间"""
+        await self.flush()
+        await self.l1.expire(key, min(seconds, self.l1_ttl) if self.l1_ttl else seconds)
+        result = await self.l2.expire(key, seconds)
+        await self._broadcast(key)
+        return result
+
+    async def ttl(self, key: str) -> int:
+        """获取缓存剩余过期时间（以L2为准）"""
+        await self.flush()
+        return await self.l2.ttl(key)
+
+    async def keys(self, pattern: str = "*") -> List[str]:
+        """获取匹配模式的所有键（以L2为准）"""
+        await self.flush()
+        return await self.l2.keys(pattern)
+
+    async def flushdb(self) -> bool:
+        """清空当前数据库"""
+        self._pending.clear()
+        self._tombstones |= self._inflight
+        await self.l1.flushdb()
+        result = await self.l2.flushdb()
+        await self._broadcast(_FLUSH_ALL)
+        return result
+
+    async def flush(self) -> int:
+        """
+        把 write_behind 队列中的数据写入L2
+
+        写回期间被删除的键记为墓碑：尚未写入的跳过，已经写入的补发一次删除，
+        避免进行中的批量写入把刚删除的旧值写回L2。
+
+        Returns:
+            写入的键数量
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            self._inflight = set(pending)
+            written = 0
+            failed = False
+            try:
+                # 按过期时间分组，每组一次批量写入
+                groups: Dict[Optional[int], Dict[str, Any]] = {}
+                for key, (value, expire) in pending.items():
+                    groups.setdefault(expire, {})[key] = value
+                for expire, mapping in groups.items():
+                    mapping = {key: value for key, value in mapping.items() if key not in self._tombstones}
+                    if not mapping:
+                        continue
+                    try:
+                        await self.l2.set_many(mapping, expire)
+                    except Exception as e:
+                        failed = True
+                        self._stats["l2_write_errors"] += 1
+                        self.logger.error(f"写回L2失败（{len(mapping)} 个键）: {e}")
+                        # 未被新值覆盖、也未被删除的键放回队列，下次重试
+                        for key, value in mapping.items():
+                            if key not in self._tombstones:
+                                self._pending.setdefault(key, (value, expire))
+                        continue
+                    await self._delete_tombstoned(mapping)
+                    written += len(mapping)
+                    self._stats["l2_writes"] += len(mapping)
+                    await self._broadcast(*mapping)
+            finally:
+                self._inflight = set()
+                self._tombstones = set()
+            self._flush_failures = self._flush_failures + 1 if failed else 0
+            return written
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各级缓存命中统计"""
+        lookups = self._stats["l1_hits"] + self._stats["l2_hits"] + self._stats["misses"]
+        l2_lookups = self._stats["l2_hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "l1_hit_rate": self._stats["l1_hits"] / lookups if lookups else 0.0,
+            "l2_hit_rate": self._stats["l2_hits"] / l2_lookups if l2_lookups else 0.0,
+            "overall_hit_rate": (self._stats["l1_hits"] + self._stats["l2_hits"]) / lookups if lookups else 0.0,
+            "pending_writes": len(self._pending),
+            "l1": self.l1.get_stats(),
+        }
+
+    async def handle_invalidation(self, message: Union[str, bytes]) -> None:
+        """
+        处理其他进程发来的失效消息，消息格式为 "<实例ID>|<键>"，多个键以换行分隔
+
+        Args:
+            message: 失效消息
+        """
+        if isinstance(message, bytes):
+            message = message.decode("utf-8")
+        sender, _, keys = message.partition("|")
+        if sender == self.instance_id or not keys:
+            return
+        self._stats["invalidations_received"] += 1
+        if keys == _FLUSH_ALL:
+            await self.l1.flushdb()
+        else:
+            await self.l1.delete_many(keys.split("\n"))
+
+    def _l1_expire(self, expire: Optional[int]) -> Optional[int]:
+        if expire and self.l1_ttl:
+            return min(expire, self.l1_ttl)
+        return expire or self.l1_ttl
+
+    async def _broadcast(self, *keys: str) -> None:
+        """一条消息广播一批键的失效"""
+        if not keys or not self.invalidation_channel or not hasattr(self.l2, "publish"):
+            return
+        try:
+            await self.l2.publish(self.invalidation_channel, f"{self.instance_id}|" + "\n".join(keys))
+            self._stats["invalidations_sent"] += 1
+        except Exception as e:
+            # 广播失败时其他进程的L1依靠 l1_ttl 兜底过期
+            self.logger.warning(f"发送缓存失效消息失败（{len(keys)} 个键）: {e}")
+
+    def _discard_pending(self, key: str) -> None:
+        self._pending.pop(key, None)
+        if key in self._inflight:
+            self._tombstones.add(key)
+
+    async def _delete_tombstoned(self, mapping: Dict[str, Any]) -> None:
+        """删除写回过程中被删除、但已随本批写入L2的键"""
+        stale = [key for key in mapping if key in self._tombstones]
+        if not stale:
+            return
+        try:
+            await self.l2.delete_many(stale)
+        except Exception as e:
+            self.logger.error(f"清理写回期间删除的键失败（{len(stale)} 个键）: {e}")
+
+    def _ensure_flush_task(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while self._pending:
+            # L2 连续写回失败时按指数退避，避免每个周期都重试
+            delay = min(self.flush_interval * (2 ** self._flush_failures), _MAX_FLUSH_BACKOFF)
+            await asyncio.sleep(delay)
+            await self.flush()
+
+    async def _listen(self) -> None:
+        try:
+            async for message in self._pubsub.listen():
+                if message.get("type") == "message":
+                    await self.handle_invalidation(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.error(f"缓存失效订阅中断: {e}")
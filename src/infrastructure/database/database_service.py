@@ -4,23 +4,44 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union, Tuple
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Union, Tuple
 import logging
+import re
+import time
 
+from src.infrastructure.monitoring.metrics import get_metrics
 from src.shared.exceptions.exceptions import DatabaseError
 
 
+_IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# 生成的CRUD语句缓存上限（按表和列组合计）
+_STATEMENT_CACHE_LIMIT = 1024
+
+
+def _identifier(name: str) -> str:
+    """校验表名/列名，防止拼接SQL时注入"""
+    if not _IDENTIFIER_PATTERN.match(name):
+        raise DatabaseError(f"非法的标识符: {name}")
+    return name
+
+
 class DatabaseService(ABC):
     """数据库服务抽象基类"""
     
-    def __init__(self, logger: Optional[logging.Logger] = None):
+    def __init__(self, logger: Optional[logging.Logger] = None, batch_size: int = 1000):
         """
         初始化数据库服务
         
         Args:
             logger: 日志记录器
+            batch_size: 批量写入时每批的行数
         """
         self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.batch_size = batch_size
         self._connected = False
     
     @abstractmethod
@@ -56,6 +77,24 @@ class DatabaseService(ABC):
         """
         pass
     
+    @abstractmethod
+    async def execute_many(
+        self,
+        query: str,
+        params_list: List[Dict[str, Any]]
+    ) -> int:
+        """
+        用多组参数执行同一条SQL，所有参数组在一个事务内提交
+        
+        Args:
+            query: SQL查询语句
+            params_list: 查询参数列表
+            
+        Returns:
+            执行的参数组数量
+        """
+        pass
+    
     @abstractmethod
     async def fetch_one(
         self,
@@ -110,6 +149,100 @@ class DatabaseService(ABC):
         """
         pass
     
+    async def insert_many(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        batch_size: Optional[int] = None
+    ) -> int:
+        """
+        批量插入记录，每批一次 executemany
+        
+        Args:
+            table: 表名
+            rows: 数据字典列表，列以第一行为准
+            batch_size: 每批行数，默认使用 self.batch_size
+            
+        Returns:
+            插入的行数
+        """
+        if not rows:
+            return 0
+        columns = list(rows[0])
+        query = (
+            f"INSERT INTO {_identifier(table)} ({', '.join(_identifier(c) for c in columns)}) "
+            f"VALUES ({self._placeholders(columns)})"
+        )
+        return await self._execute_batches(query, columns, rows, batch_size)
+    
+    async def upsert_many(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        conflict_columns: List[str],
+        update_columns: Optional[List[str]] = None,
+        batch_size: Optional[int] = None
+    ) -> int:
+        """
+        批量插入或更新记录（INSERT ... ON CONFLICT DO UPDATE，PostgreSQL 与 SQLite 3.24+ 通用）
+        
+        Args:
+            table: 表名
+            rows: 数据字典列表，列以第一行为准
+            conflict_columns: 唯一约束列
+            update_columns: 冲突时更新的列，默认为除唯一约束列外的所有列；为空列表时忽略冲突行
+            batch_size: 每批行数，默认使用 self.batch_size
+            
+        Returns:
+            处理的行数
+        """
+        if not rows:
+            return 0
+        columns = list(rows[0])
+        if update_columns is None:
+            update_columns = [c for c in columns if c not in conflict_columns]
+        
+        query = (
+            f"INSERT INTO {_identifier(table)} ({', '.join(_identifier(c) for c in columns)}) "
+            f"VALUES ({self._placeholders(columns)}) "
+            f"ON CONFLICT ({', '.join(_identifier(c) for c in conflict_columns)}) "
+        )
+        if update_columns:
+            query += "DO UPDATE SET " + ", ".join(f"{_identifier(c)} = EXCLUDED.{c}" for c in update_columns)
+        else:
+            query += "DO NOTHING"
+        return await self._execute_batches(query, columns, rows, batch_size)
+    
+    def _placeholders(self, columns: List[str]) -> str:
+        return ", ".join(self.placeholder(column, i) for i, column in enumerate(columns, 1))
+    
+    def _batches(
+        self,
+        columns: List[str],
+        rows: List[Dict[str, Any]],
+        batch_size: Optional[int]
+    ) -> List[List[Dict[str, Any]]]:
+        """按列顺序规整每一行并切分批次"""
+        size = batch_size or self.batch_size
+        try:
+            normalized = [{column: row[column] for column in columns} for row in rows]
+        except KeyError as e:
+            raise DatabaseError(f"批量写入的行缺少列: {e}")
+        return [normalized[i:i + size] for i in range(0, len(normalized), size)]
+    
+    async def _execute_batches(
+        self,
+        query: str,
+        columns: List[str],
+        rows: List[Dict[str, Any]],
+        batch_size: Optional[int]
+    ) -> int:
+        """每批一次 execute_many（每批一个事务）"""
+        total = 0
+        for batch in self._batches(columns, rows, batch_size):
+            total += await self.execute_many(query, batch)
+        return total
+    
     @abstractmethod
     async def update(
         self,
@@ -162,6 +295,81 @@ class DatabaseService(ABC):
     async def rollback_transaction(self) -> None:
         """回滚事务"""
         pass
+    
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """
+        事务上下文：正常退出时提交，抛出异常时回滚
+        
+        用法:
+            async with db.transaction():
+                await db.insert(...)
+                await db.update(...)
+        """
+        await self.begin_transaction()
+        try:
+            yield
+        except BaseException:
+            await self.rollback_transaction()
+            raise
+        else:
+            await self.commit_transaction()
+    
+    def placeholder(self, name: str, position: int) -> str:
+        """
+        生成SQL参数占位符
+        
+        Args:
+            name: 参数名
+            position: 参数序号（从1开始）
+            
+        Returns:
+            占位符字符串，默认使用命名参数 :name
+        """
+        return f":{name}"
+    
+    async def select(
+        self,
+        table: str,
+        where: Optional[Dict[str, Any]] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        exclude: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        按条件查询记录，过滤、排序和分页都在数据库中完成
+        
+        Args:
+            table: 表名
+            where: 等值条件
+            order_by: 排序列
+            descending: 是否倒序
+            limit: 最多返回的记录数
+            exclude: 不等条件
+            
+        Returns:
+            记录字典列表
+        """
+        clauses = []
+        params: Dict[str, Any] = {}
+        for operator, conditions in (("=", where or {}), ("<>", exclude or {})):
+            for column, value in conditions.items():
+                name = f"p{len(params)}"
+                clauses.append(f"{_identifier(column)} {operator} {self.placeholder(name, len(params) + 1)}")
+                params[name] = value
+        
+        query = f"SELECT * FROM {_identifier(table)}"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        if order_by:
+            query += f" ORDER BY {_identifier(order_by)}" + (" DESC" if descending else "")
+        if limit is not None:
+            name = f"p{len(params)}"
+            query += f" LIMIT {self.placeholder(name, len(params) + 1)}"
+            params[name] = int(limit)
+        
+        return await self.fetch_all(query, params or None)
 
 
 class PostgreSQLService(DatabaseService):
@@ -174,7 +382,14 @@ class PostgreSQLService(DatabaseService):
         database: str,
         username: str,
         password: str,
-        logger: Optional[logging.Logger] = None
+        logger: Optional[logging.Logger] = None,
+        batch_size: int = 1000,
+        use_copy: bool = True,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_inactive_connection_lifetime: float = 300.0,
+        statement_cache_size: int = 100,
+        command_timeout: Optional[float] = None
     ):
         """
         初始化PostgreSQL服务
@@ -186,14 +401,32 @@ class PostgreSQLService(DatabaseService):
             username: 用户名
             password: 密码
             logger: 日志记录器
+            batch_size: 批量写入时每批的行数
+            use_copy: insert_many 是否使用 COPY 协议写入
+            min_size: 连接池最小连接数
+            max_size: 连接池最大连接数（每个进程一个连接池）
+            max_inactive_connection_lifetime: 空闲连接的最长保留时间（秒）
+            statement_cache_size: 每个连接缓存的预编译语句数量，0 表示关闭
+            command_timeout: 语句默认超时时间（秒）
         """
-        super().__init__(logger)
+        super().__init__(logger, batch_size)
+        self.use_copy = use_copy
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_inactive_connection_lifetime = max_inactive_connection_lifetime
+        self.statement_cache_size = statement_cache_size
+        self.command_timeout = command_timeout
+        self._statements: Dict[Tuple, str] = {}
+        self._in_use = 0
+        self._pool_stats = {"acquisitions": 0, "wait_total": 0.0, "wait_max": 0.0}
         self.host = host
         self.port = port
         self.database = database
         self.username = username
         self.password = password
         self._pool = None
+        # 当前任务所在事务固定使用的连接
+        self._pinned: ContextVar[Optional["_PinnedConnection"]] = ContextVar(f"pg_transaction_{id(self)}", default=None)
     
     async def connect(self) -> None:
         """连接PostgreSQL数据库"""
@@ -206,8 +439,11 @@ class PostgreSQLService(DatabaseService):
                 database=self.database,
                 user=self.username,
                 password=self.password,
-                min_size=1,
-                max_size=10
+                min_size=self.min_size,
+                max_size=self.max_size,
+                max_inactive_connection_lifetime=self.max_inactive_connection_lifetime,
+                statement_cache_size=self.statement_cache_size,
+                command_timeout=self.command_timeout
             )
             
             self._connected = True
@@ -228,6 +464,64 @@ class PostgreSQLService(DatabaseService):
         """检查是否已连接"""
         return self._connected and self._pool is not None
     
+    def placeholder(self, name: str, position: int) -> str:
+        """asyncpg 使用 $1、$2 形式的位置参数"""
+        return f"${position}"
+    
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[Any]:
+        """获取执行语句的连接：事务中复用固定的连接，否则从连接池借用"""
+        pinned = self._current_pinned()
+        if pinned is not None:
+            yield pinned.connection
+            return
+        start = time.perf_counter()
+        async with self._pool.acquire() as conn:
+            self._record_acquire(time.perf_counter() - start)
+            try:
+                yield conn
+            finally:
+                self._in_use -= 1
+    
+    def _record_acquire(self, wait_seconds: float) -> None:
+        """记录一次从连接池取连接的等待时间"""
+        self._in_use += 1
+        self._pool_stats["acquisitions"] += 1
+        self._pool_stats["wait_total"] += wait_seconds
+        self._pool_stats["wait_max"] = max(self._pool_stats["wait_max"], wait_seconds)
+        size = self._pool.get_size() if hasattr(self._pool, "get_size") else self._in_use
+        get_metrics().observe_db_pool("postgresql", wait_seconds, self._in_use, size, self.max_size)
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取连接池统计：连接数、占用率和获取连接的等待时间"""
+        acquisitions = self._pool_stats["acquisitions"]
+        stats = {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "in_use": self._in_use,
+            "utilization": self._in_use / self.max_size if self.max_size else 0.0,
+            "acquisitions": acquisitions,
+            "avg_wait": self._pool_stats["wait_total"] / acquisitions if acquisitions else 0.0,
+            "max_wait": self._pool_stats["wait_max"],
+            "cached_statements": len(self._statements),
+        }
+        if self._pool is not None and hasattr(self._pool, "get_size"):
+            stats["size"] = self._pool.get_size()
+            stats["idle"] = self._pool.get_idle_size()
+        return stats
+    
+    def _statement(self, key: Tuple, build: Callable[[], str]) -> str:
+        """
+        获取生成的SQL文本，相同的表和列组合复用同一条文本，
+        使 asyncpg 的每连接预编译语句缓存可以命中
+        """
+        query = self._statements.get(key)
+        if query is None:
+            if len(self._statements) >= _STATEMENT_CACHE_LIMIT:
+                self._statements.clear()
+            query = self._statements[key] = build()
+        return query
+    
     async def execute(
         self,
         query: str,
@@ -238,7 +532,7 @@ class PostgreSQLService(DatabaseService):
             await self.connect()
         
         try:
-            async with self._pool.acquire() as conn:
+            async with self._acquire() as conn:
                 if params:
                     result = await conn.execute(query, *params.values())
                 else:
@@ -248,6 +542,26 @@ class PostgreSQLService(DatabaseService):
             self.logger.error(f"执行SQL查询失败: {str(e)}")
             raise DatabaseError(f"执行SQL查询失败: {str(e)}")
     
+    async def execute_many(
+        self,
+        query: str,
+        params_list: List[Dict[str, Any]]
+    ) -> int:
+        """批量执行SQL，executemany 在同一连接的一个事务内完成"""
+        if not params_list:
+            return 0
+        if not await self.is_connected():
+            await self.connect()
+        
+        try:
+            async with self._acquire() as conn:
+                async with conn.transaction():
+                    await conn.executemany(query, [tuple(params.values()) for params in params_list])
+            return len(params_list)
+        except Exception as e:
+            self.logger.error(f"批量执行SQL失败: {str(e)}")
+            raise DatabaseError(f"批量执行SQL失败: {str(e)}")
+    
     async def fetch_one(
         self,
         query: str,
@@ -258,7 +572,7 @@ class PostgreSQLService(DatabaseService):
             await self.connect()
         
         try:
-            async with self._pool.acquire() as conn:
+            async with self._acquire() as conn:
                 if params:
                     row = await conn.fetchrow(query, *params.values())
                 else:
@@ -279,7 +593,7 @@ class PostgreSQLService(DatabaseService):
             await self.connect()
         
         try:
-            async with self._pool.acquire() as conn:
+            async with self._acquire() as conn:
                 if params:
                     rows = await conn.fetch(query, *params.values())
                 else:
@@ -296,19 +610,66 @@ class PostgreSQLService(DatabaseService):
         data: Dict[str, Any]
     ) -> Union[str, int]:
         """插入记录"""
-        columns = list(data.keys())
-        values = list(data.values())
-        placeholders = [f"${i+1}" for i in range(len(values))]
-        
-        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(placeholders)}) RETURNING id"
+        columns = tuple(data.keys())
+        query = self._statement(
+            ("insert", table, columns),
+            lambda: (
+                f"INSERT INTO {_identifier(table)} ({', '.join(_identifier(c) for c in columns)}) "
+                f"VALUES ({self._placeholders(list(columns))}) RETURNING id"
+            )
+        )
         
         try:
-            result = await self.fetch_one(query, dict(zip(columns, values)))
+            result = await self.fetch_one(query, data)
             return result["id"] if result else None
         except Exception as e:
             self.logger.error(f"插入记录失败: {str(e)}")
             raise DatabaseError(f"插入记录失败: {str(e)}")
     
+    async def insert_many(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        batch_size: Optional[int] = None
+    ) -> int:
+        """批量插入记录，默认通过 COPY 写入，所有批次在一个事务内提交"""
+        if not rows:
+            return 0
+        if not self.use_copy:
+            async with self.transaction():
+                return await super().insert_many(table, rows, batch_size)
+        
+        columns = [_identifier(column) for column in rows[0]]
+        batches = self._batches(columns, rows, batch_size)
+        
+        try:
+            async with self.transaction():
+                async with self._acquire() as conn:
+                    for batch in batches:
+                        await conn.copy_records_to_table(
+                            _identifier(table),
+                            records=[tuple(row.values()) for row in batch],
+                            columns=columns
+                        )
+            return len(rows)
+        except DatabaseError:
+            raise
+        except Exception as e:
+            self.logger.error(f"批量插入记录失败: {str(e)}")
+            raise DatabaseError(f"批量插入记录失败: {str(e)}")
+    
+    async def upsert_many(
+        self,
+        table: str,
+        rows: List[Dict[str, Any]],
+        conflict_columns: List[str],
+        update_columns: Optional[List[str]] = None,
+        batch_size: Optional[int] = None
+    ) -> int:
+        """批量插入或更新记录，所有批次在一个事务内提交"""
+        async with self.transaction():
+            return await super().upsert_many(table, rows, conflict_columns, update_columns, batch_size)
+    
     async def update(
         self,
         table: str,
@@ -316,21 +677,20 @@ class PostgreSQLService(DatabaseService):
         where: Dict[str, Any]
     ) -> int:
         """更新记录"""
-        set_clauses = []
-        where_clauses = []
-        params = {}
+        set_columns = tuple(data.keys())
+        where_columns = tuple(where.keys())
         
-        # 构建SET子句
-        for i, (column, value) in enumerate(data.items(), 1):
-            set_clauses.append(f"{column} = ${i}")
-            params[f"set_{column}"] = value
+        def build() -> str:
+            # 构建SET子句和WHERE子句
+            set_clauses = [f"{_identifier(column)} = ${i}" for i, column in enumerate(set_columns, 1)]
+            where_clauses = [
+                f"{_identifier(column)} = ${i}" for i, column in enumerate(where_columns, len(set_columns) + 1)
+            ]
+            return f"UPDATE {_identifier(table)} SET {', '.join(set_clauses)} WHERE {' AND '.join(where_clauses)}"
         
-        # 构建WHERE子句
-        for i, (column, value) in enumerate(where.items(), len(data) + 1):
-            where_clauses.append(f"{column} = ${i}")
-            params[f"where_{column}"] = value
-        
-        query = f"UPDATE {table} SET {', '.join(set_clauses)} WHERE {' AND '.join(where_clauses)}"
+        query = self._statement(("update", table, set_columns, where_columns), build)
+        params = {f"set_{column}": value for column, value in data.items()}
+        params.update({f"where_{column}": value for column, value in where.items()})
         
         try:
             result = await self.execute(query, params)
@@ -348,15 +708,15 @@ class PostgreSQLService(DatabaseService):
         where: Dict[str, Any]
     ) -> int:
         """删除记录"""
-        where_clauses = []
-        params = {}
-        
-        # 构建WHERE子句
-        for i, (column, value) in enumerate(where.items(), 1):
-            where_clauses.append(f"{column} = ${i}")
-            params[f"where_{column}"] = value
-        
-        query = f"DELETE FROM {table} WHERE {' AND '.join(where_clauses)}"
+        where_columns = tuple(where.keys())
+        query = self._statement(
+            ("delete", table, where_columns),
+            lambda: (
+                f"DELETE FROM {_identifier(table)} WHERE "
+                + " AND ".join(f"{_identifier(column)} = ${i}" for i, column in enumerate(where_columns, 1))
+            )
+        )
+        params = {f"where_{column}": value for column, value in where.items()}
         
         try:
             result = await self.execute(query, params)
@@ -369,49 +729,119 @@ class PostgreSQLService(DatabaseService):
             raise DatabaseError(f"删除记录失败: {str(e)}")
     
     async def begin_transaction(self) -> None:
-        """开始事务"""
+        """
+        开始事务：从连接池取出一个连接固定给当前任务，之后的语句都在该连接上执行；
+        事务中再次调用时创建保存点
+        
+        在事务中创建的子任务会继承同一个连接，不要在事务内并发执行语句
+        """
         if not await self.is_connected():
             await self.connect()
         
+        pinned = self._current_pinned()
         try:
-            async with self._pool.acquire() as conn:
-                await conn.execute("BEGIN")
+            if pinned is None:
+                start = time.perf_counter()
+                conn = await self._pool.acquire()
+                self._record_acquire(time.perf_counter() - start)
+                pinned = _PinnedConnection(conn)
+                self._pinned.set(pinned)
+            tx = pinned.connection.transaction()
+            await tx.start()
+            pinned.transactions.append(tx)
         except Exception as e:
+            if pinned is not None and not pinned.transactions:
+                await self._release(pinned)
             self.logger.error(f"开始事务失败: {str(e)}")
             raise DatabaseError(f"开始事务失败: {str(e)}")
     
     async def commit_transaction(self) -> None:
-        """提交事务"""
-        if not await self.is_connected():
-            await self.connect()
-        
-        try:
-            async with self._pool.acquire() as conn:
-                await conn.execute("COMMIT")
-        except Exception as e:
-            self.logger.error(f"提交事务失败: {str(e)}")
-            raise DatabaseError(f"提交事务失败: {str(e)}")
+        """提交最内层事务（保存点），最外层提交后归还连接"""
+        await self._finish_transaction(commit=True)
     
     async def rollback_transaction(self) -> None:
-        """回滚事务"""
-        if not await self.is_connected():
-            await self.connect()
+        """回滚最内层事务（保存点），最外层回滚后归还连接"""
+        await self._finish_transaction(commit=False)
+    
+    async def _finish_transaction(self, commit: bool) -> None:
+        action = "提交" if commit else "回滚"
+        pinned = self._current_pinned()
+        if pinned is None or not pinned.transactions:
+            raise DatabaseError(f"{action}事务失败: 没有进行中的事务")
         
+        tx = pinned.transactions.pop()
         try:
-            async with self._pool.acquire() as conn:
-                await conn.execute("ROLLBACK")
+            if commit:
+                await tx.commit()
+            else:
+                await tx.rollback()
         except Exception as e:
-            self.logger.error(f"回滚事务失败: {str(e)}")
-            raise DatabaseError(f"回滚事务失败: {str(e)}")
+            self.logger.error(f"{action}事务失败: {str(e)}")
+            raise DatabaseError(f"{action}事务失败: {str(e)}")
+        finally:
+            if not pinned.transactions:
+                await self._release(pinned)
+    
+    def _current_pinned(self) -> Optional["_PinnedConnection"]:
+        """
+        当前任务所在事务的固定连接
+        
+        事务内创建的子任务会复制上下文，从而继承同一个 _PinnedConnection；
+        只有开启事务的任务本身使用它，子任务以及事务结束后的任何任务都从连接池借用连接。
+        """
+        pinned = self._pinned.get()
+        if pinned is None or pinned.closed or pinned.owner is not asyncio.current_task():
+            return None
+        return pinned
+    
+    async def _release(self, pinned: "_PinnedConnection") -> None:
+        # 标记关闭：仍持有该对象的子任务上下文不会再使用已归还的连接
+        connection, pinned.connection = pinned.connection, None
+        pinned.closed = True
+        self._pinned.set(None)
+        self._in_use -= 1
+        await self._pool.release(connection)
+
+
+class _PinnedConnection:
+    """事务期间固定的连接及其嵌套事务栈"""
+    
+    def __init__(self, connection: Any):
+        self.connection = connection
+        self.transactions: List[Any] = []
+        self.owner = asyncio.current_task()
+        self.closed = False
+
+
+class _SQLiteTransaction:
+    """任务持有写连接期间的事务状态"""
+    
+    def __init__(self):
+        self.depth = 1
+        self.owner = asyncio.current_task()
 
 
 class SQLiteService(DatabaseService):
-    """SQLite数据库服务"""
+    """
+    SQLite数据库服务
+    
+    使用 WAL 日志模式：读取走只读连接池，不会被写入阻塞；所有写入由单个写连接串行执行，
+    后台写任务把同时排队的写入合并到一个事务中提交（组提交），减少 fsync 次数。
+    事务期间写连接只属于开启事务的任务，事务内创建的子任务写入会直接报错而不是死锁。
+    """
     
     def __init__(
         self,
         database_path: str,
-        logger: Optional[logging.Logger] = None
+        logger: Optional[logging.Logger] = None,
+        batch_size: int = 1000,
+        read_pool_size: int = 4,
+        journal_mode: str = "wal",
+        synchronous: str = "normal",
+        mmap_size: int = 256 * 1024 * 1024,
+        busy_timeout: int = 5000,
+        write_batch_size: int = 100,
+        commit_delay: float = 0.0
     ):
         """
         初始化SQLite服务
@@ -419,28 +849,77 @@ class SQLiteService(DatabaseService):
         Args:
             database_path: 数据库文件路径
             logger: 日志记录器
+            batch_size: 批量写入时每批的行数，每批一个事务
+            read_pool_size: 只读连接数量，内存数据库或为0时读取也走写连接
+            journal_mode: 日志模式，WAL 模式下读写互不阻塞
+            synchronous: 同步级别，WAL 下 normal 只在检查点时 fsync，掉电可能丢失最近提交的事务
+            mmap_size: 内存映射读取的字节数，0 表示关闭
+            busy_timeout: 数据库被其他进程锁定时的等待时间（毫秒）
+            write_batch_size: 一次组提交最多合并的写操作数
+            commit_delay: 组提交前等待更多写入的时间（秒），0 表示只合并已排队的写入
         """
-        super().__init__(logger)
+        super().__init__(logger, batch_size)
         self.database_path = database_path
+        self.read_pool_size = 0 if self._is_memory_database(database_path) else read_pool_size
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self.write_batch_size = write_batch_size
+        self.commit_delay = commit_delay
+        
         self._connection = None
+        self._readers: Optional[asyncio.Queue] = None
+        self._reader_connections: List[Any] = []
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._writer_lock = asyncio.Lock()
+        # 当前任务持有写连接时的事务状态（嵌套深度和所属任务）
+        self._transaction: ContextVar[Optional["_SQLiteTransaction"]] = ContextVar(
+            f"sqlite_transaction_{id(self)}", default=None
+        )
+        self._stats = {"writes": 0, "commits": 0, "reads": 0}
+    
+    @staticmethod
+    def _is_memory_database(path: str) -> bool:
+        return path in ("", ":memory:") or "mode=memory" in path
     
     async def connect(self) -> None:
-        """连接SQLite数据库"""
+        """连接SQLite数据库：打开写连接、只读连接池并启动写任务"""
         try:
             import aiosqlite
             
-            self._connection = await aiosqlite.connect(self.database_path)
+            # 自动提交模式，事务由写任务显式控制
+            self._connection = await aiosqlite.connect(self.database_path, isolation_level=None)
+            await self._apply_pragmas(self._connection)
+            
+            self._readers = asyncio.Queue()
+            for _ in range(self.read_pool_size):
+                reader = await aiosqlite.connect(self.database_path, isolation_level=None)
+                await self._apply_pragmas(reader, read_only=True)
+                self._reader_connections.append(reader)
+                self._readers.put_nowait(reader)
+            
+            self._write_queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._write_loop())
             self._connected = True
-            self.logger.info(f"已连接到SQLite数据库: {self.database_path}")
+            self.logger.info(
+                f"已连接到SQLite数据库: {self.database_path}"
+                f"（journal_mode={self.journal_mode}, 只读连接 {self.read_pool_size} 个）"
+            )
         except Exception as e:
+            await self._close_connections()
             self.logger.error(f"连接SQLite数据库失败: {str(e)}")
             raise DatabaseError(f"连接SQLite数据库失败: {str(e)}")
     
     async def disconnect(self) -> None:
-        """断开SQLite连接"""
+        """提交排队中的写入后断开SQLite连接"""
+        if self._writer_task is not None:
+            self._write_queue.put_nowait(None)
+            await self._writer_task
+            self._writer_task = None
         if self._connection:
-            await self._connection.close()
-            self._connection = None
+            await self._close_connections()
             self._connected = False
             self.logger.info("已断开SQLite数据库连接")
     
@@ -448,48 +927,64 @@ class SQLiteService(DatabaseService):
         """检查是否已连接"""
         return self._connected and self._connection is not None
     
+    def get_stats(self) -> Dict[str, Any]:
+        """获取读写统计，commits 小于 writes 说明发生了组提交"""
+        return {
+            **self._stats,
+            "read_pool_size": self.read_pool_size,
+            "idle_readers": self._readers.qsize() if self._readers is not None else 0,
+            "queued_writes": self._write_queue.qsize() if self._write_queue is not None else 0,
+        }
+    
     async def execute(
         self,
         query: str,
         params: Optional[Dict[str, Any]] = None
     ) -> Any:
         """执行SQL查询"""
-        if not await self.is_connected():
-            await self.connect()
+        async def operation(conn):
+            cursor = await conn.execute(query, params) if params else await conn.execute(query)
+            return cursor.lastrowid
         
         try:
-            if params:
-                cursor = await self._connection.execute(query, params)
-            else:
-                cursor = await self._connection.execute(query)
-            
-            await self._connection.commit()
-            return cursor.lastrowid
+            return await self._write(operation)
         except Exception as e:
             self.logger.error(f"执行SQL查询失败: {str(e)}")
-            await self._connection.rollback()
             raise DatabaseError(f"执行SQL查询失败: {str(e)}")
     
+    async def execute_many(
+        self,
+        query: str,
+        params_list: List[Dict[str, Any]]
+    ) -> int:
+        """批量执行SQL，所有参数组在同一个事务内提交"""
+        if not params_list:
+            return 0
+        
+        async def operation(conn):
+            await conn.executemany(query, params_list)
+            return len(params_list)
+        
+        try:
+            return await self._write(operation)
+        except Exception as e:
+            self.logger.error(f"批量执行SQL失败: {str(e)}")
+            raise DatabaseError(f"批量执行SQL失败: {str(e)}")
+    
     async def fetch_one(
         self,
         query: str,
         params: Optional[Dict[str, Any]] = None
     ) -> Optional[Dict[str, Any]]:
         """获取单条记录"""
-        if not await self.is_connected():
-            await self.connect()
-        
         try:
-            if params:
-                cursor = await self._connection.execute(query, params)
-            else:
-                cursor = await self._connection.execute(query)
-            
-            row = await cursor.fetchone()
-            if row:
-                columns = [column[0] for column in cursor.description]
-                return dict(zip(columns, row))
-            return None
+            async with self._reader() as conn:
+                cursor = await conn.execute(query, params) if params else await conn.execute(query)
+                row = await cursor.fetchone()
+                if row:
+                    columns = [column[0] for column in cursor.description]
+                    return dict(zip(columns, row))
+                return None
         except Exception as e:
             self.logger.error(f"获取单条记录失败: {str(e)}")
             raise DatabaseError(f"获取单条记录失败: {str(e)}")
@@ -500,20 +995,14 @@ class SQLiteService(DatabaseService):
         params: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """获取所有记录"""
-        if not await self.is_connected():
-            await self.connect()
-        
         try:
-            if params:
-                cursor = await self._connection.execute(query, params)
-            else:
-                cursor = await self._connection.execute(query)
-            
-            rows = await cursor.fetchall()
-            if rows:
-                columns = [column[0] for column in cursor.description]
-                return [dict(zip(columns, row)) for row in rows]
-            return []
+            async with self._reader() as conn:
+                cursor = await conn.execute(query, params) if params else await conn.execute(query)
+                rows = await cursor.fetchall()
+                if rows:
+                    columns = [column[0] for column in cursor.description]
+                    return [dict(zip(columns, row)) for row in rows]
+                return []
         except Exception as e:
             self.logger.error(f"获取所有记录失败: {str(e)}")
             raise DatabaseError(f"获取所有记录失败: {str(e)}")
@@ -560,12 +1049,9 @@ class SQLiteService(DatabaseService):
         query = f"UPDATE {table} SET {', '.join(set_clauses)} WHERE {' AND '.join(where_clauses)}"
         
         try:
-            cursor = await self._connection.execute(query, values)
-            await self._connection.commit()
-            return cursor.rowcount
+            return await self._write(lambda conn: self._rowcount(conn, query, values))
         except Exception as e:
             self.logger.error(f"更新记录失败: {str(e)}")
-            await self._connection.rollback()
             raise DatabaseError(f"更新记录失败: {str(e)}")
     
     async def delete(
@@ -585,46 +1071,203 @@ class SQLiteService(DatabaseService):
         query = f"DELETE FROM {table} WHERE {' AND '.join(where_clauses)}"
         
         try:
-            cursor = await self._connection.execute(query, values)
-            await self._connection.commit()
-            return cursor.rowcount
+            return await self._write(lambda conn: self._rowcount(conn, query, values))
         except Exception as e:
             self.logger.error(f"删除记录失败: {str(e)}")
-            await self._connection.rollback()
             raise DatabaseError(f"删除记录失败: {str(e)}")
     
     async def begin_transaction(self) -> None:
-        """开始事务"""
+        """
+        开始事务：当前任务独占写连接直到最外层事务结束，事务内的读写都在写连接上执行；
+        事务中再次调用时创建保存点
+        """
         if not await self.is_connected():
             await self.connect()
         
+        state = self._current_transaction()
+        if state is None:
+            self._reject_inside_foreign_transaction("开始事务")
         try:
-            await self._connection.execute("BEGIN")
+            if state is None:
+                await self._writer_lock.acquire()
+                try:
+                    await self._connection.execute("BEGIN IMMEDIATE")
+                except Exception:
+                    self._writer_lock.release()
+                    raise
+                self._transaction.set(_SQLiteTransaction())
+            else:
+                state.depth += 1
+                await self._connection.execute(f"SAVEPOINT sp_{state.depth}")
         except Exception as e:
             self.logger.error(f"开始事务失败: {str(e)}")
             raise DatabaseError(f"开始事务失败: {str(e)}")
     
     async def commit_transaction(self) -> None:
-        """提交事务"""
-        if not await self.is_connected():
-            await self.connect()
+        """提交最内层事务（保存点），最外层提交后释放写连接"""
+        await self._finish_transaction(commit=True)
+    
+    async def rollback_transaction(self) -> None:
+        """回滚最内层事务（保存点），最外层回滚后释放写连接"""
+        await self._finish_transaction(commit=False)
+    
+    async def _finish_transaction(self, commit: bool) -> None:
+        action = "提交" if commit else "回滚"
+        state = self._current_transaction()
+        if state is None:
+            raise DatabaseError(f"{action}事务失败: 没有进行中的事务")
         
+        level = state.depth
         try:
-            await self._connection.commit()
+            if level > 1:
+                if not commit:
+                    await self._connection.execute(f"ROLLBACK TO sp_{level}")
+                await self._connection.execute(f"RELEASE sp_{level}")
+            else:
+                await self._connection.execute("COMMIT" if commit else "ROLLBACK")
+                if commit:
+                    self._stats["commits"] += 1
         except Exception as e:
-            self.logger.error(f"提交事务失败: {str(e)}")
-            raise DatabaseError(f"提交事务失败: {str(e)}")
+            self.logger.error(f"{action}事务失败: {str(e)}")
+            raise DatabaseError(f"{action}事务失败: {str(e)}")
+        finally:
+            state.depth -= 1
+            if state.depth == 0:
+                self._transaction.set(None)
+                self._writer_lock.release()
     
-    async def rollback_transaction(self) -> None:
-        """回滚事务"""
+    def _current_transaction(self) -> Optional["_SQLiteTransaction"]:
+        """
+        当前任务进行中的事务
+        
+        事务内创建的子任务会复制上下文，从而继承同一个事务状态；只有开启事务的任务本身在写连接上直接执行，
+        子任务以及事务结束后的任何任务都走只读连接池和写任务的组提交。
+        """
+        state = self._transaction.get()
+        if state is None or state.depth <= 0 or state.owner is not asyncio.current_task():
+            return None
+        return state
+    
+    def _reject_inside_foreign_transaction(self, action: str) -> None:
+        """
+        拒绝事务进行中由其子任务发起的、需要写连接的操作
+        
+        事务所在任务持有写连接直到事务结束；子任务的写入要排队等待写连接，
+        而事务所在任务往往又在等待子任务（例如等待后写队列落盘），两者互相等待形成死锁。
+        因此直接报错：写入应在事务所在任务中执行，或在事务结束后执行。
+        """
+        state = self._transaction.get()
+        if state is not None and state.depth > 0 and state.owner is not asyncio.current_task():
+            raise DatabaseError(f"{action}失败: 事务进行中，事务内创建的任务不能使用写连接")
+    
+    async def _apply_pragmas(self, conn: Any, read_only: bool = False) -> None:
+        await conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        await conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        if read_only:
+            await conn.execute("PRAGMA query_only = ON")
+            return
+        await conn.execute(f"PRAGMA journal_mode = {_identifier(self.journal_mode)}")
+        await conn.execute(f"PRAGMA synchronous = {_identifier(self.synchronous)}")
+    
+    async def _close_connections(self) -> None:
+        for reader in self._reader_connections:
+            await reader.close()
+        self._reader_connections = []
+        self._readers = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+    
+    @staticmethod
+    async def _rowcount(conn: Any, query: str, values: List[Any]) -> int:
+        cursor = await conn.execute(query, values)
+        return cursor.rowcount
+    
+    @asynccontextmanager
+    async def _reader(self) -> AsyncIterator[Any]:
+        """获取读连接：事务中使用写连接以读到未提交的数据，否则从只读连接池借用"""
+        if not await self.is_connected():
+            await self.connect()
+        self._stats["reads"] += 1
+        
+        if self._current_transaction() is not None:
+            yield self._connection
+        elif self._reader_connections:
+            conn = await self._readers.get()
+            try:
+                yield conn
+            finally:
+                self._readers.put_nowait(conn)
+        else:
+            self._reject_inside_foreign_transaction("读取")
+            async with self._writer_lock:
+                yield self._connection
+    
+    async def _write(self, operation: Callable[[Any], Awaitable[Any]]) -> Any:
+        """把写操作交给写任务执行，事务中直接在写连接上执行"""
         if not await self.is_connected():
             await self.connect()
+        self._stats["writes"] += 1
         
+        if self._current_transaction() is not None:
+            return await operation(self._connection)
+        self._reject_inside_foreign_transaction("写入")
+        future = asyncio.get_running_loop().create_future()
+        self._write_queue.put_nowait((operation, future))
+        return await future
+    
+    async def _write_loop(self) -> None:
+        """写任务：取出排队的写操作，合并到一个事务中提交"""
+        stopping = False
+        while not stopping:
+            item = await self._write_queue.get()
+            if item is None:
+                break
+            if self.commit_delay:
+                await asyncio.sleep(self.commit_delay)
+            batch = [item]
+            while len(batch) < self.write_batch_size and not self._write_queue.empty():
+                item = self._write_queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            async with self._writer_lock:
+                await self._commit_batch(batch)
+    
+    async def _commit_batch(self, batch: List[Tuple[Callable[[Any], Awaitable[Any]], asyncio.Future]]) -> None:
+        """每个写操作放在各自的保存点中执行，单个操作失败不影响同批次的其他操作"""
+        conn = self._connection
+        results: List[Tuple[asyncio.Future, bool, Any]] = []
         try:
-            await self._connection.rollback()
+            await conn.execute("BEGIN IMMEDIATE")
+            for operation, future in batch:
+                await conn.execute("SAVEPOINT write_op")
+                try:
+                    result = await operation(conn)
+                except Exception as e:
+                    await conn.execute("ROLLBACK TO write_op")
+                    results.append((future, False, e))
+                else:
+                    results.append((future, True, result))
+                await conn.execute("RELEASE write_op")
+            await conn.execute("COMMIT")
+            self._stats["commits"] += 1
         except Exception as e:
-            self.logger.error(f"回滚事务失败: {str(e)}")
-            raise DatabaseError(f"回滚事务失败: {str(e)}")
+            self.logger.error(f"提交写入批次失败（{len(batch)} 个操作）: {str(e)}")
+            try:
+                await conn.execute("ROLLBACK")
+            except Exception:
+                pass
+            results = [(future, False, e) for _, future in batch]
+        
+        for future, ok, value in results:
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
 
 
 class DatabaseServiceFactory:
@@ -650,18 +1293,34 @@ class DatabaseServiceFactory:
         db_type = db_type.lower()
         
         if db_type == "postgresql":
+            pool_config = config.get("pool", {})
             return PostgreSQLService(
                 host=config.get("host", "localhost"),
                 port=config.get("port", 5432),
                 database=config.get("database", ""),
                 username=config.get("username", ""),
                 password=config.get("password", ""),
-                logger=logger
+                logger=logger,
+                batch_size=config.get("batch_size", 1000),
+                use_copy=config.get("use_copy", True),
+                min_size=pool_config.get("min_size", 1),
+                max_size=pool_config.get("max_size", config.get("pool_size", 10)),
+                max_inactive_connection_lifetime=pool_config.get("max_inactive_connection_lifetime", 300.0),
+                statement_cache_size=pool_config.get("statement_cache_size", 100),
+                command_timeout=pool_config.get("command_timeout")
             )
         elif db_type == "sqlite":
             return SQLiteService(
                 database_path=config.get("path", ""),
-                logger=logger
+                logger=logger,
+                batch_size=config.get("batch_size", 1000),
+                read_pool_size=config.get("read_pool_size", config.get("pool_size", 4)),
+                journal_mode=config.get("journal_mode", "wal"),
+                synchronous=config.get("synchronous", "normal"),
+                mmap_size=config.get("mmap_size", 256 * 1024 * 1024),
+                busy_timeout=config.get("busy_timeout", 5000),
+                write_batch_size=config.get("write_batch_size", 100),
+                commit_delay=config.get("commit_delay", 0.0)
             )
         else:
             raise DatabaseError(f"不支持的数据库类型: {db_type}")
\ No newline at end of file
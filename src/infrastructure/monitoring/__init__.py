@@ -0,0 +1,39 @@
+"""
+监控模块
+
+提供链路追踪和指标采集的实现。
+"""
+
+from .tracing import (
+    Span,
+    Tracer,
+    SpanExporter,
+    FileSpanExporter,
+    OTLPHttpSpanExporter,
+    TracingCallbackHandler,
+    TracedChatMessageHistory,
+    summarize_trace,
+    get_tracer
+)
+from .metrics import (
+    AgentMetrics,
+    MetricsCallbackHandler,
+    PROMETHEUS_AVAILABLE,
+    get_metrics
+)
+
+__all__ = [
+    "Span",
+    "Tracer",
+    "SpanExporter",
+    "FileSpanExporter",
+    "OTLPHttpSpanExporter",
+    "TracingCallbackHandler",
+    "TracedChatMessageHistory",
+    "summarize_trace",
+    "get_tracer",
+    "AgentMetrics",
+    "MetricsCallbackHandler",
+    "PROMETHEUS_AVAILABLE",
+    "get_metrics"
+]
@@ -0,0 +1,345 @@
+"""
+指标采集模块
+基于 prometheus-client 的指标注册表，统计智能体请求、工具调用、缓存命中、Redis对话历史流量、数据库连接池和LLM用量，
+可通过 /metrics 端点暴露给 Prometheus 或在命令行中导出
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        start_http_server
+    )
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    PROMETHEUS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+# 请求和工具耗时的直方图分桶（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# 等待数据库连接的直方图分桶（秒）
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+
+class AgentMetrics:
+    """
+    智能体指标注册表
+
+    未安装 prometheus-client 或配置关闭时所有记录方法都是空操作，调用方无需判断。
+    """
+
+    def __init__(
+        self,
+        namespace: str = "agent",
+        enabled: bool = True,
+        llm_pricing: Optional[Dict[str, Dict[str, float]]] = None,
+        registry: Optional[Any] = None,
+        port: Optional[int] = None
+    ):
+        """
+        初始化指标注册表
+
+        Args:
+            namespace: 指标名前缀
+            enabled: 是否启用
+            llm_pricing: 模型单价表，{模型: {"input": 每千token价格, "output": 每千token价格}}
+            registry: 自定义 CollectorRegistry，默认新建独立注册表
+            port: 配置的 /metrics 端点端口，None 表示不自动启动
+        """
+        self.enabled = enabled and PROMETHEUS_AVAILABLE
+        self.llm_pricing = llm_pricing or {}
+        self.port = port
+        self._server_started = False
+        if not self.enabled:
+            if enabled:
+                logger.warning("未安装 prometheus-client，指标采集已禁用")
+            self.registry = None
+            return
+
+        self.registry = registry or CollectorRegistry()
+        ns = namespace
+
+        # 智能体
+        self.requests = Counter(
+            "requests_total", "智能体请求数", ["agent", "method", "status"], namespace=ns, registry=self.registry
+        )
+        self.request_latency = Histogram(
+            "request_duration_seconds", "智能体请求耗时", ["agent", "method"],
+            namespace=ns, buckets=LATENCY_BUCKETS, registry=self.registry
+        )
+        self.auto_continue_attempts = Histogram(
+            "auto_continue_attempts", "自动继续执行次数", ["agent"],
+            namespace=ns, buckets=(1, 2, 3, 4, 5, 8), registry=self.registry
+        )
+        self.stop_reasons = Counter(
+            "stop_reasons_total", "智能体停止原因", ["agent", "reason"], namespace=ns, registry=self.registry
+        )
+
+        # 工具
+        self.tool_calls = Counter(
+            "tool_calls_total", "工具调用数", ["tool", "status"], namespace=ns, registry=self.registry
+        )
+        self.tool_latency = Histogram(
+            "tool_duration_seconds", "工具调用耗时", ["tool"],
+            namespace=ns, buckets=LATENCY_BUCKETS, registry=self.registry
+        )
+
+        # 缓存
+        self.cache_requests = Counter(
+            "cache_requests_total", "缓存查询数", ["backend", "result"], namespace=ns, registry=self.registry
+        )
+        self.cache_evictions = Counter(
+            "cache_evictions_total", "缓存淘汰数", ["backend", "reason"], namespace=ns, registry=self.registry
+        )
+
+        # Redis对话历史
+        self.history_bytes = Counter(
+            "redis_history_bytes_total", "Redis对话历史读写字节数", ["direction"], namespace=ns, registry=self.registry
+        )
+
+        # 数据库连接池
+        self.db_pool_wait = Histogram(
+            "db_pool_acquire_wait_seconds", "从连接池获取数据库连接的等待时间", ["backend"],
+            namespace=ns, buckets=POOL_WAIT_BUCKETS, registry=self.registry
+        )
+        self.db_pool_connections = Gauge(
+            "db_pool_connections", "数据库连接池连接数", ["backend", "state"], namespace=ns, registry=self.registry
+        )
+
+        # LLM
+        self.llm_requests = Counter(
+            "llm_requests_total", "LLM调用数", ["model", "status"], namespace=ns, registry=self.registry
+        )
+        self.llm_latency = Histogram(
+            "llm_request_duration_seconds", "LLM调用耗时", ["model"],
+            namespace=ns, buckets=LATENCY_BUCKETS, registry=self.registry
+        )
+        self.llm_tokens = Counter(
+            "llm_tokens_total", "LLM token用量", ["model", "type"], namespace=ns, registry=self.registry
+        )
+        self.llm_cost = Counter(
+            "llm_cost_total", "LLM估算费用", ["model"], namespace=ns, registry=self.registry
+        )
+
+    # 智能体
+
+    def observe_request(self, agent: str, method: str, status: str, seconds: float) -> None:
+        """记录一次智能体请求"""
+        if not self.enabled:
+            return
+        self.requests.labels(agent, method, status).inc()
+        self.request_latency.labels(agent, method).observe(seconds)
+
+    def record_stop_reason(self, agent: str, reason: str) -> None:
+        """记录智能体停止原因"""
+        if self.enabled:
+            self.stop_reasons.labels(agent, reason).inc()
+
+    def observe_auto_continue(self, agent: str, attempts: int) -> None:
+        """记录自动继续执行的总次数"""
+        if self.enabled:
+            self.auto_continue_attempts.labels(agent).observe(attempts)
+
+    # 工具
+
+    def record_tool_call(self, tool: str, seconds: float, error: bool = False) -> None:
+        """记录一次工具调用"""
+        if not self.enabled:
+            return
+        self.tool_calls.labels(tool, "error" if error else "success").inc()
+        self.tool_latency.labels(tool).observe(seconds)
+
+    # 缓存
+
+    def record_cache_lookup(self, backend: str, hit: bool, count: int = 1) -> None:
+        """记录缓存命中或未命中"""
+        if self.enabled and count:
+            self.cache_requests.labels(backend, "hit" if hit else "miss").inc(count)
+
+    def record_cache_eviction(self, backend: str, reason: str = "expired", count: int = 1) -> None:
+        """记录缓存淘汰"""
+        if self.enabled and count:
+            self.cache_evictions.labels(backend, reason).inc(count)
+
+    # Redis对话历史
+
+    def record_history_bytes(self, direction: str, size: int) -> None:
+        """记录Redis对话历史读（read）写（written）字节数"""
+        if self.enabled and size:
+            self.history_bytes.labels(direction).inc(size)
+
+    # 数据库连接池
+
+    def observe_db_pool(self, backend: str, wait_seconds: float, in_use: int, size: int, max_size: int) -> None:
+        """记录一次获取数据库连接的等待时间和当前连接池占用"""
+        if not self.enabled:
+            return
+        self.db_pool_wait.labels(backend).observe(wait_seconds)
+        self.db_pool_connections.labels(backend, "in_use").set(in_use)
+        self.db_pool_connections.labels(backend, "open").set(size)
+        self.db_pool_connections.labels(backend, "max").set(max_size)
+
+    # LLM
+
+    def record_llm_call(self, model: str, seconds: float, input_tokens: int = 0,
+                        output_tokens: int = 0, error: bool = False) -> None:
+        """记录一次LLM调用的耗时、token用量和估算费用"""
+        if not self.enabled:
+            return
+        model = model or "unknown"
+        self.llm_requests.labels(model, "error" if error else "success").inc()
+        self.llm_latency.labels(model).observe(seconds)
+        if input_tokens:
+            self.llm_tokens.labels(model, "input").inc(input_tokens)
+        if output_tokens:
+            self.llm_tokens.labels(model, "output").inc(output_tokens)
+        price = self.llm_pricing.get(model)
+        if price:
+            cost = input_tokens / 1000 * price.get("input", 0) + output_tokens / 1000 * price.get("output", 0)
+            if cost:
+                self.llm_cost.labels(model).inc(cost)
+
+    # 导出
+
+    def render(self) -> bytes:
+        """以 Prometheus 文本格式导出全部指标"""
+        if not self.enabled:
+            return b"# metrics disabled (prometheus-client not installed or monitoring.metrics.enabled=false)\n"
+        return generate_latest(self.registry)
+
+    @property
+    def content_type(self) -> str:
+        """/metrics 响应的 Content-Type"""
+        return CONTENT_TYPE_LATEST
+
+    def start_server(self, port: int = 8001, addr: str = "0.0.0.0") -> bool:
+        """
+        在后台线程启动 /metrics HTTP 端点
+
+        Args:
+            port: 监听端口
+            addr: 监听地址
+
+        Returns:
+            是否已启动
+        """
+        if not self.enabled:
+            return False
+        if not self._server_started:
+            start_http_server(port, addr=addr, registry=self.registry)
+            self._server_started = True
+            logger.info(f"指标端点已启动: http://{addr}:{port}/metrics")
+        return True
+
+    def callback_handler(self) -> "MetricsCallbackHandler":
+        """创建采集工具和LLM指标的 LangChain 回调处理器"""
+        return MetricsCallbackHandler(self)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """LangChain 回调 → 工具调用和LLM用量指标"""
+
+    def __init__(self, metrics: AgentMetrics):
+        super().__init__()
+        self.metrics = metrics
+        self._started: Dict[UUID, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, name: str) -> None:
+        with self._lock:
+            self._started[run_id] = (name, time.perf_counter())
+
+    def _finish(self, run_id: UUID) -> Optional[tuple]:
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is None:
+            return None
+        return started[0], time.perf_counter() - started[1]
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, kwargs.get("name") or (serialized or {}).get("name", "tool"))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        finished = self._finish(run_id)
+        if finished:
+            self.metrics.record_tool_call(finished[0], finished[1])
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        finished = self._finish(run_id)
+        if finished:
+            self.metrics.record_tool_call(finished[0], finished[1], error=True)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, _model_name(serialized, kwargs))
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *,
+                            run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, _model_name(serialized, kwargs))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        finished = self._finish(run_id)
+        if finished:
+            from src.infrastructure.monitoring.tracing import _token_usage
+
+            input_tokens, output_tokens = _token_usage(response)
+            self.metrics.record_llm_call(finished[0], finished[1], input_tokens, output_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        finished = self._finish(run_id)
+        if finished:
+            self.metrics.record_llm_call(finished[0], finished[1], error=True)
+
+
+def _model_name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> str:
+    """从回调参数中提取模型名称"""
+    params = kwargs.get("invocation_params") or {}
+    return params.get("model_name") or params.get("model") or (serialized or {}).get("name") or "unknown"
+
+
+# 全局指标注册表（首次使用时按 services.monitoring.metrics 配置创建）
+_metrics: Optional[AgentMetrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> AgentMetrics:
+    """获取全局指标注册表"""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                from src.config.config_loader import config_loader
+
+                # 缓存等底层组件也会记录指标，配置加载失败时使用默认配置而不是让调用方出错
+                try:
+                    services = config_loader.get_services_config().get("services", {})
+                except Exception as e:
+                    logger.warning(f"加载指标配置失败，使用默认配置: {e}")
+                    services = {}
+                monitoring = services.get("monitoring", {})
+                metrics_config = monitoring.get("metrics", {})
+                port = metrics_config.get("port")
+                _metrics = AgentMetrics(
+                    namespace=metrics_config.get("namespace", "agent"),
+                    enabled=monitoring.get("enabled", True) and metrics_config.get("enabled", True),
+                    llm_pricing=metrics_config.get("llm_pricing", {}),
+                    # 环境变量未设置时端口为空字符串，表示不启动端点
+                    port=int(port) if port not in (None, "") else None
+                )
+    return _metrics
@@ -0,0 +1,603 @@
+"""
+链路追踪模块
+记录智能体每一轮对话的span（记忆加载、提示词构建、LLM调用、工具调用、解析、输出格式化、记忆保存），
+生成延迟分解摘要，并以 OTLP/JSON 格式导出到文件或本地 OpenTelemetry Collector
+"""
+
+import contextvars
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+from src.interfaces.events.event_bus import Event, EventBus
+
+logger = logging.getLogger(__name__)
+
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    """追踪span"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    kind: str = "internal"
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+    children: List["Span"] = field(default_factory=list, repr=False)
+
+    @property
+    def duration_ms(self) -> float:
+        """span耗时（毫秒），未结束时按当前时间计算"""
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """设置属性"""
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        """记录异常"""
+        self.status = "error"
+        self.attributes["error.type"] = type(error).__name__
+        self.attributes["error.message"] = str(error)
+
+    def end(self) -> None:
+        """结束span（重复调用无副作用）"""
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    def iter_spans(self) -> Iterator["Span"]:
+        """深度优先遍历自身及所有子span"""
+        yield self
+        for child in list(self.children):
+            yield from child.iter_spans()
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """转换为 OTLP/JSON span"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 3 if self.kind == "client" else 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": 2 if self.status == "error" else 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """转换为 OTLP 属性键值对"""
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def summarize_trace(root: Span) -> Dict[str, Any]:
+    """
+    生成一轮对话的延迟分解摘要，用于返回给调用方的元数据
+
+    Args:
+        root: 根span
+
+    Returns:
+        包含总耗时、按类别汇总的耗时以及各span明细的字典
+    """
+    breakdown: Dict[str, float] = {}
+    spans = []
+    llm_usage = {"calls": 0, "input_tokens": 0, "output_tokens": 0}
+    for span in root.iter_spans():
+        if span is root:
+            continue
+        category = span.attributes.get("category", span.name)
+        breakdown[category] = round(breakdown.get(category, 0.0) + span.duration_ms, 3)
+        entry = {"name": span.name, "duration_ms": round(span.duration_ms, 3)}
+        for key in ("tool.name", "llm.model", "llm.ttft_ms", "llm.input_tokens", "llm.output_tokens"):
+            if key in span.attributes:
+                entry[key] = span.attributes[key]
+        if span.status == "error":
+            entry["status"] = "error"
+        spans.append(entry)
+        if category == "llm":
+            llm_usage["calls"] += 1
+            llm_usage["input_tokens"] += int(span.attributes.get("llm.input_tokens", 0) or 0)
+            llm_usage["output_tokens"] += int(span.attributes.get("llm.output_tokens", 0) or 0)
+
+    return {
+        "trace_id": root.trace_id,
+        "total_ms": round(root.duration_ms, 3),
+        "breakdown_ms": breakdown,
+        "llm_usage": llm_usage,
+        "spans": spans,
+    }
+
+
+class SpanExporter(ABC):
+    """span导出器基类"""
+
+    @abstractmethod
+    def export(self, spans: Sequence[Span], service_name: str) -> None:
+        """导出一条链路的全部span"""
+        pass
+
+    @staticmethod
+    def build_payload(spans: Sequence[Span], service_name: str) -> Dict[str, Any]:
+        """构建 OTLP/JSON ExportTraceServiceRequest"""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "agent-v3.tracing"},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    以 JSON Lines 形式追加写入 OTLP/JSON 负载，可被 Collector 的 filelog/otlpjsonfile 接收
+
+    文件超过 max_bytes 时按 RotatingFileHandler 的方式轮转为 .1、.2 ...，最多保留 backup_count 个旧文件。
+    """
+
+    def __init__(self, file_path: str = "./logs/traces.jsonl", max_bytes: int = 10485760, backup_count: int = 5):
+        """
+        Args:
+            file_path: 输出文件路径
+            max_bytes: 单个文件大小上限，0 表示不轮转
+            backup_count: 保留的旧文件数，0 表示超出上限时直接截断
+        """
+        self.file_path = file_path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[Span], service_name: str) -> None:
+        line = json.dumps(self.build_payload(spans, service_name), ensure_ascii=False) + "\n"
+        directory = os.path.dirname(self.file_path)
+        with self._lock:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if self.max_bytes > 0 and os.path.exists(self.file_path):
+                if os.path.getsize(self.file_path) + len(line.encode("utf-8")) > self.max_bytes:
+                    self._rotate()
+            with open(self.file_path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def _rotate(self) -> None:
+        if self.backup_count <= 0:
+            os.remove(self.file_path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.file_path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.file_path}.{index + 1}")
+        os.replace(self.file_path, f"{self.file_path}.1")
+
+
+class OTLPHttpSpanExporter(SpanExporter):
+    """通过 OTLP/HTTP JSON 协议发送到 Collector（默认 http://localhost:4318/v1/traces）"""
+
+    def __init__(self, endpoint: str = "http://localhost:4318/v1/traces", timeout: float = 5.0,
+                 headers: Optional[Dict[str, str]] = None):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def export(self, spans: Sequence[Span], service_name: str) -> None:
+        import requests
+
+        response = requests.post(
+            self.endpoint,
+            data=json.dumps(self.build_payload(spans, service_name)),
+            headers=self.headers,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+
+class Tracer:
+    """
+    追踪器
+
+    当前span保存在 contextvars 中，LangChain 在线程池中执行回调和工具时会复制上下文，
+    因此嵌套调用自动挂到正确的父span下。一轮对话结束后整棵span树通过事件总线异步导出，
+    导出失败或变慢都不会影响智能体响应。
+    """
+
+    def __init__(self, service_name: str = "agent-v3", exporters: Optional[List[SpanExporter]] = None,
+                 enabled: bool = True, buffer_size: int = 256):
+        """
+        初始化追踪器
+
+        Args:
+            service_name: 服务名称（OTLP resource 属性 service.name）
+            exporters: 导出器列表
+            enabled: 是否启用
+            buffer_size: 待导出轮次的缓冲区大小，溢出时丢弃
+        """
+        self.service_name = service_name
+        self.exporters = exporters or []
+        self.enabled = enabled
+        self._export_bus = EventBus(capacity=buffer_size, name="trace-export")
+        self._export_bus.subscribe(self._export)
+        self._turn_tokens: Dict[str, contextvars.Token] = {}
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        """获取当前span"""
+        return _current_span.get()
+
+    def start_span(self, name: str, parent: Optional[Span] = None, category: Optional[str] = None,
+                   kind: str = "internal", **attributes: Any) -> Span:
+        """
+        创建span（不切换当前span，需要手动调用 end）
+
+        Args:
+            name: span名称
+            parent: 父span，默认为当前span
+            category: 延迟分解时的类别，默认与名称相同
+            kind: span类型（internal/client）
+            **attributes: 属性
+
+        Returns:
+            Span: 新建的span
+        """
+        parent = parent if parent is not None else _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            kind=kind,
+            attributes={"category": category or name, **attributes}
+        )
+        if parent is not None:
+            parent.children.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, category: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+        """
+        在当前上下文中记录一个span
+
+        Args:
+            name: span名称
+            category: 延迟分解时的类别
+            **attributes: 属性
+
+        Yields:
+            Span: 当前span，未启用或不在一轮追踪中时为 None
+        """
+        if not self.enabled or _current_span.get() is None:
+            yield None
+            return
+        span = self.start_span(name, category=category, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def begin_turn(self, name: str = "agent.turn", **attributes: Any) -> Optional[Span]:
+        """
+        开始追踪一轮对话，并把根span设为当前span
+
+        Args:
+            name: 根span名称
+            **attributes: 根span属性
+
+        Returns:
+            Span: 根span，未启用时为 None
+        """
+        if not self.enabled:
+            return None
+        root = self.start_span(name, parent=None, category="turn", **attributes)
+        self._turn_tokens[root.span_id] = _current_span.set(root)
+        return root
+
+    def end_turn(self, root: Optional[Span], error: Optional[BaseException] = None) -> None:
+        """
+        结束一轮对话并异步导出整棵span树
+
+        Args:
+            root: begin_turn 返回的根span
+            error: 本轮的异常
+        """
+        if root is None:
+            return
+        token = self._turn_tokens.pop(root.span_id, None)
+        if token is not None:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # 在其他上下文中结束（例如异步生成器），只清理当前值
+                _current_span.set(None)
+        if error is not None:
+            root.record_error(error)
+        root.end()
+        if self.exporters:
+            self._export_bus.publish("trace", root=root)
+
+    @contextmanager
+    def trace_turn(self, name: str = "agent.turn", **attributes: Any) -> Iterator[Optional[Span]]:
+        """
+        以上下文管理器的形式追踪一轮对话
+
+        Args:
+            name: 根span名称
+            **attributes: 根span属性
+
+        Yields:
+            Span: 根span，未启用时为 None
+        """
+        root = self.begin_turn(name, **attributes)
+        try:
+            yield root
+        except BaseException as e:
+            self.end_turn(root, e)
+            raise
+        self.end_turn(root)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已结束的轮次全部导出"""
+        return self._export_bus.flush(timeout)
+
+    def callback_handler(self, root: Optional[Span] = None) -> "TracingCallbackHandler":
+        """创建挂在指定根span（默认当前span）下的 LangChain 回调处理器"""
+        return TracingCallbackHandler(self, root or _current_span.get())
+
+    def _export(self, event: Event) -> None:
+        root: Span = event.payload["root"]
+        spans = list(root.iter_spans())
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans, self.service_name)
+            except Exception as e:
+                logger.debug(f"追踪导出失败 {type(exporter).__name__}: {e}")
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain 回调 → span
+
+    记录LLM调用（输入/输出token、延迟、首token时间）、工具调用、输出解析和提示词构建。
+    回调的父子关系通过 run_id/parent_run_id 还原，找不到父span时挂在本轮根span下。
+    """
+
+    # 按链名称识别需要单独计时的步骤
+    CHAIN_CATEGORIES = {
+        "PromptTemplate": "prompt_build",
+        "ChatPromptTemplate": "prompt_build",
+        "OutputParser": "parse",
+    }
+
+    def __init__(self, tracer: Tracer, root: Optional[Span]):
+        super().__init__()
+        self.tracer = tracer
+        self.root = root
+        self._spans: Dict[UUID, Span] = {}
+        # 不单独计时的中间链 → 其最近的已记录祖先span
+        self._aliases: Dict[UUID, Span] = {}
+        self._lock = threading.Lock()
+
+    def _parent(self, parent_run_id: Optional[UUID]) -> Optional[Span]:
+        if parent_run_id is None:
+            return None
+        with self._lock:
+            return self._spans.get(parent_run_id) or self._aliases.get(parent_run_id)
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, category: str,
+               kind: str = "internal", **attributes: Any) -> None:
+        if self.root is None:
+            return
+        parent = self._parent(parent_run_id) or self.root
+        span = self.tracer.start_span(name, parent=parent, category=category, kind=kind, **attributes)
+        with self._lock:
+            self._spans[run_id] = span
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None) -> Optional[Span]:
+        with self._lock:
+            span = self._spans.pop(run_id, None)
+        if span is not None:
+            if error is not None:
+                span.record_error(error)
+            span.end()
+        return span
+
+    def _chain_category(self, name: str) -> Optional[str]:
+        for key, category in self.CHAIN_CATEGORIES.items():
+            if name == key or name.endswith(key):
+                return category
+        return None
+
+    # LLM
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+                     parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._start_llm(serialized, run_id, parent_run_id, kwargs)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *,
+                            run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._start_llm(serialized, run_id, parent_run_id, kwargs)
+
+    def _start_llm(self, serialized: Optional[Dict[str, Any]], run_id: UUID,
+                   parent_run_id: Optional[UUID], kwargs: Dict[str, Any]) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or (serialized or {}).get("name")
+        self._start(run_id, parent_run_id, "llm.call", "llm", kind="client", **{"llm.model": model})
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            span = self._spans.get(run_id)
+        if span is not None and "llm.ttft_ms" not in span.attributes:
+            span.attributes["llm.ttft_ms"] = round(span.duration_ms, 3)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._end(run_id)
+        if span is None:
+            return
+        input_tokens, output_tokens = _token_usage(response)
+        span.attributes["llm.input_tokens"] = input_tokens
+        span.attributes["llm.output_tokens"] = output_tokens
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    # 工具
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID,
+                      parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        self._start(run_id, parent_run_id, f"tool.{name}", "tool", **{"tool.name": name})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        span = self._end(run_id)
+        if span is not None:
+            span.attributes["tool.output_chars"] = len(str(output))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    # 链（只记录提示词构建、输出解析、历史加载，以及作为父span的其他链）
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Dict[str, Any], *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or ""
+        category = self._chain_category(name)
+        if category:
+            self._start(run_id, parent_run_id, category, category)
+            return
+        parent = self._parent(parent_run_id)
+        if parent is not None:
+            with self._lock:
+                self._aliases[run_id] = parent
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._aliases.pop(run_id, None)
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            self._aliases.pop(run_id, None)
+        self._end(run_id, error)
+
+
+def _token_usage(response: LLMResult) -> "tuple[int, int]":
+    """从LLM结果中提取输入/输出token数"""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    input_tokens = usage.get("prompt_tokens", 0)
+    output_tokens = usage.get("completion_tokens", 0)
+    if not usage:
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += metadata.get("input_tokens", 0)
+                output_tokens += metadata.get("output_tokens", 0)
+    return int(input_tokens), int(output_tokens)
+
+
+class TracedChatMessageHistory(BaseChatMessageHistory):
+    """为对话历史的加载和保存记录span的包装器"""
+
+    def __init__(self, history: BaseChatMessageHistory, tracer: Tracer):
+        self.history = history
+        self.tracer = tracer
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        with self.tracer.span("memory.load", category="memory_load"):
+            return self.history.messages
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self.tracer.span("memory.save", category="memory_save"):
+            self.history.add_messages(messages)
+
+    def clear(self) -> None:
+        self.history.clear()
+
+
+# 全局追踪器实例（首次使用时按 services.monitoring.tracing 配置创建）
+_tracer: Optional[Tracer] = None
+
+
+def create_exporters(tracing_config: Dict[str, Any]) -> List[SpanExporter]:
+    """
+    根据配置创建导出器
+
+    Args:
+        tracing_config: services.monitoring.tracing 配置
+
+    Returns:
+        导出器列表
+    """
+    exporter_names = tracing_config.get("exporter", "none")
+    if isinstance(exporter_names, str):
+        exporter_names = [exporter_names]
+
+    exporters: List[SpanExporter] = []
+    for exporter_name in exporter_names:
+        if exporter_name == "file":
+            exporters.append(FileSpanExporter(
+                tracing_config.get("file_path", "./logs/traces.jsonl"),
+                max_bytes=tracing_config.get("max_bytes", 10485760),
+                backup_count=tracing_config.get("backup_count", 5)
+            ))
+        elif exporter_name == "otlp":
+            exporters.append(OTLPHttpSpanExporter(
+                tracing_config.get("otlp_endpoint", "http://localhost:4318/v1/traces"),
+                timeout=tracing_config.get("timeout", 5.0)
+            ))
+        elif exporter_name not in ("none", None):
+            logger.warning(f"未知的追踪导出器: {exporter_name}")
+    return exporters
+
+
+def get_tracer() -> Tracer:
+    """获取全局追踪器"""
+    global _tracer
+    if _tracer is None:
+        from src.config.config_loader import config_loader
+
+        services = config_loader.get_services_config().get("services", {})
+        tracing_config = services.get("monitoring", {}).get("tracing", {})
+        _tracer = Tracer(
+            service_name=tracing_config.get("service_name", "agent-v3"),
+            exporters=create_exporters(tracing_config),
+            enabled=tracing_config.get("enabled", False)
+        )
+    return _tracer
@@ -8,10 +8,15 @@ import sys
 import os
 import json
 import yaml
+import hashlib
 import argparse
 import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
@@ -21,6 +26,48 @@ from langchain_community.chat_models import ChatOpenAI
 from src.config.config_loader import config_loader
 
 
+# 每次运行前重置的任务状态（字段不存在时跳过，兼容不同的 CrewAI 版本）
+_TASK_RUN_STATE = {
+    "output": None,
+    "used_tools": 0,
+    "tools_errors": 0,
+    "delegations": 0,
+    "retry_count": 0,
+    "start_time": None,
+    "end_time": None,
+}
+
+# CrewAI LLM 客户端缓存，相同参数的团队和角色共享同一个客户端
+_llm_cache: Dict[Tuple, Any] = {}
+_llm_cache_lock = threading.Lock()
+
+
+def get_crewai_llm(model: str, temperature: float, max_tokens: int, api_key: str, base_url: str):
+    """获取（必要时创建）CrewAI 原生 LLM 客户端"""
+    from crewai import LLM
+
+    key = (model, temperature, max_tokens, api_key, base_url)
+    with _llm_cache_lock:
+        llm = _llm_cache.get(key)
+        if llm is None:
+            llm = _llm_cache[key] = LLM(
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                api_key=api_key,
+                base_url=base_url
+            )
+        return llm
+
+
+def build_time_context() -> str:
+    """生成注入到智能体背景中的当前时间信息"""
+    now = datetime.now()
+    current_datetime = now.strftime("%Y-%m-%d %H:%M:%S")
+    current_date = now.strftime("%Y年%m月%d日")
+    return f"\n\n【重要时间信息】\n当前时间: {current_datetime} (北京时间 UTC+8)\n当前年份: {now.year}\n今天日期: {current_date}\n\n在执行任务时，请注意使用当前时间信息，特别是在分析趋势、新闻、市场状况等时效性信息时。"
+
+
 class CrewAIRuntime:
     """通用CrewAI运行时类"""
     
@@ -39,6 +86,11 @@ class CrewAIRuntime:
         self.agents = []
         self.tasks = []
         self.logger = logging.getLogger(__name__)
+        # 智能体原始背景（不含时间信息），复用团队时据此刷新时间
+        self._backstories: List[str] = []
+        self._tools: List[Any] = []
+        # 最近一次运行失败的异常（运行时池据此决定是否复用）
+        self.last_error: Optional[Exception] = None
         
         if config_path:
             self.load_config(config_path)
@@ -278,21 +330,12 @@ class CrewAIRuntime:
                 self.logger.error(f"读取LLM配置失败: {str(e)}")
                 return False
             
-            # 使用CrewAI原生LLM创建方式
-            from crewai import LLM
-            
-            # 创建LLM实例，使用CrewAI原生方式
+            # 使用CrewAI原生LLM（相同参数的客户端在团队之间复用）
             # 根据文档，模型名称格式为 provider/model-id
             # 对于硅基流动，使用 openai/ 前缀表示OpenAI兼容API
             model_with_provider = f"openai/{model_name}"
             
-            llm = LLM(
-                model=model_with_provider,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                api_key=api_key,
-                base_url=base_url
-            )
+            llm = get_crewai_llm(model_with_provider, temperature, max_tokens, api_key, base_url)
             
             # 存储实际使用的模型信息
             llm.__dict__['actual_model'] = model_name  # 从配置读取实际模型名称
@@ -315,14 +358,14 @@ class CrewAIRuntime:
             role_models = crewai_llm_config.get('role_models', {})
             
             # 获取当前时间信息（用于注入到agent的上下文）
-            current_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            current_date = datetime.now().strftime("%Y年%m月%d日")
-            current_year = datetime.now().year
+            time_context = build_time_context()
             
-            time_context = f"\n\n【重要时间信息】\n当前时间: {current_datetime} (北京时间 UTC+8)\n当前年份: {current_year}\n今天日期: {current_date}\n\n在执行任务时，请注意使用当前时间信息，特别是在分析趋势、新闻、市场状况等时效性信息时。"
+            # 相同工具列表的智能体共享同一组工具实例
+            tools_by_names: Dict[Tuple[str, ...], List[Any]] = {}
             
             # 创建智能体
             self.agents = []
+            self._backstories = []
             for agent_config in crew_config["agents"]:
                 # 确定智能体角色类型（用于选择模型和工具）
                 agent_role_type = agent_config.get("role_type", "default")
@@ -354,14 +397,7 @@ class CrewAIRuntime:
                 # 如果角色模型与默认模型不同，创建专用LLM
                 if role_model != model_name:
                     self.logger.info(f"为角色 {agent_role_type} 使用专用模型: {role_model}")
-                    role_llm = LLM(
-                        model=f"openai/{role_model}",
-                        temperature=temperature,
-                        max_tokens=max_tokens,
-                        api_key=api_key,
-                        base_url=base_url
-                    )
-                    agent_llm = role_llm
+                    agent_llm = get_crewai_llm(f"openai/{role_model}", temperature, max_tokens, api_key, base_url)
                 else:
                     agent_llm = llm
                 
@@ -386,12 +422,17 @@ class CrewAIRuntime:
                         
                         # 创建CrewAI兼容的工具
                         from src.agents.shared.crewai_tools import create_crewai_tools
-                        try:
-                            agent_tools = create_crewai_tools(tool_names)
-                            self.logger.info(f"已为智能体创建 {len(agent_tools)} 个CrewAI工具")
-                        except Exception as e:
-                            self.logger.error(f"创建CrewAI工具失败: {e}")
-                            agent_tools = []
+                        tools_key = tuple(tool_names)
+                        if tools_key in tools_by_names:
+                            agent_tools = tools_by_names[tools_key]
+                        else:
+                            try:
+                                agent_tools = create_crewai_tools(tool_names)
+                                self.logger.info(f"已为智能体创建 {len(agent_tools)} 个CrewAI工具")
+                            except Exception as e:
+                                self.logger.error(f"创建CrewAI工具失败: {e}")
+                                agent_tools = []
+                            tools_by_names[tools_key] = agent_tools
                 
                 # 将时间信息注入到backstory中
                 backstory_with_time = agent_config["backstory"] + time_context
@@ -408,6 +449,7 @@ class CrewAIRuntime:
                     tools=agent_tools if agent_tools else None  # 传递CrewAI工具
                 )
                 self.agents.append(agent)
+                self._backstories.append(agent_config["backstory"])
                 self.logger.info(f"已创建智能体: {agent_name} - {agent_role} (类型: {agent_role_type}, 模型: {role_model})")
             
             # 创建任务
@@ -453,6 +495,8 @@ class CrewAIRuntime:
                 manager_llm=llm  # 使用硅基流动LLM作为管理器
             )
             
+            self._tools = [tool for tools in tools_by_names.values() for tool in tools]
+            
             self.logger.info(f"团队 '{crew_config['name']}' 创建成功!")
             self.logger.info(f"团队描述: {crew_config['description']}")
             self.logger.info(f"智能体数量: {len(self.agents)}")
@@ -467,6 +511,38 @@ class CrewAIRuntime:
             self.logger.error(f"创建团队失败: {str(e)}")
             return False
     
+    def reset_run_state(self):
+        """
+        重置上一次运行留下的状态，使已创建的团队可以再次运行
+        
+        刷新智能体背景中的时间信息，清空任务输出与计数、团队用量统计、工具使用次数和失败记录。
+        """
+        time_context = build_time_context()
+        for agent, backstory in zip(self.agents, self._backstories):
+            agent.backstory = backstory + time_context
+            # kickoff 时 CrewAI 按首次运行记下的 _original_backstory 重新插值 backstory，需要一并刷新
+            if hasattr(agent, "_original_backstory"):
+                agent._original_backstory = agent.backstory
+            if hasattr(agent, "reset_tool_failures"):
+                agent.reset_tool_failures()
+        
+        for task in self.tasks:
+            for name, value in _TASK_RUN_STATE.items():
+                if hasattr(task, name):
+                    setattr(task, name, value)
+            if hasattr(task, "processed_by_agents"):
+                task.processed_by_agents = set()
+        
+        for tool in self._tools:
+            if hasattr(tool, "current_usage_count"):
+                tool.current_usage_count = 0
+        
+        if self.crew is not None:
+            if hasattr(self.crew, "usage_metrics"):
+                self.crew.usage_metrics = None
+            if hasattr(self.crew, "execution_logs"):
+                self.crew.execution_logs = []
+    
     def run_crew(self, query, save_result=True):
         """
         运行CrewAI团队
@@ -483,6 +559,7 @@ class CrewAIRuntime:
             return None
             
         self.logger.info(f"运行CrewAI团队，查询: {query}")
+        self.last_error = None
         
         try:
             # 运行团队 - CrewAI现在期望字典格式的输入
@@ -498,6 +575,7 @@ class CrewAIRuntime:
             
         except Exception as e:
             self.logger.error(f"团队执行失败: {str(e)}")
+            self.last_error = e
             return None
     
     def _save_result(self, query, result):
@@ -526,6 +604,120 @@ class CrewAIRuntime:
             self.logger.error(f"保存结果失败: {str(e)}")
 
 
+class CrewAIRuntimePool:
+    """
+    预热的CrewAI运行时池
+    
+    按团队配置的哈希缓存已创建好的运行时（团队、LLM客户端、工具绑定），
+    重复运行同一个团队时只需重置运行状态，不再重新读取配置和构建智能体、任务。
+    运行中的运行时会从池中取出，同一配置并发运行时各自使用独立的实例。
+    """
+    
+    def __init__(self, max_size: int = 8):
+        """
+        初始化运行时池
+        
+        Args:
+            max_size: 最多保留的空闲运行时数量，超出时按LRU淘汰
+        """
+        self.max_size = max_size
+        self.logger = logging.getLogger(__name__)
+        self._idle: "OrderedDict[str, List[CrewAIRuntime]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "build_failures": 0}
+    
+    @staticmethod
+    def config_key(config_data: Dict[str, Any]) -> str:
+        """团队配置的指纹（与配置ID无关，内容相同即视为同一团队）"""
+        payload = json.dumps(config_data.get("crewai_config", config_data), sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    @contextmanager
+    def lease(self, config_data: Dict[str, Any]) -> Iterator[Optional[CrewAIRuntime]]:
+        """
+        借出一个可直接运行的运行时，退出时归还
+        
+        Yields:
+            运行时实例；团队创建失败时为 None
+        """
+        key = self.config_key(config_data)
+        runtime = self._checkout(key)
+        if runtime is not None:
+            runtime.reset_run_state()
+            runtime.last_error = None
+        else:
+            runtime = CrewAIRuntime()
+            if not runtime.load_config_from_dict(config_data) or not runtime.create_crew():
+                with self._lock:
+                    self._stats["build_failures"] += 1
+                yield None
+                return
+        
+        # 运行失败或抛出异常时团队状态不可信，不再归还（异常在 yield 处抛出，不会执行归还）
+        yield runtime
+        if runtime.last_error is None:
+            self._checkin(key, runtime)
+    
+    def _checkout(self, key: str) -> Optional[CrewAIRuntime]:
+        with self._lock:
+            runtimes = self._idle.get(key)
+            if not runtimes:
+                self._stats["misses"] += 1
+                return None
+            runtime = runtimes.pop()
+            if not runtimes:
+                del self._idle[key]
+            self._size -= 1
+            self._stats["hits"] += 1
+            return runtime
+    
+    def _checkin(self, key: str, runtime: CrewAIRuntime) -> None:
+        with self._lock:
+            self._idle.setdefault(key, []).append(runtime)
+            self._idle.move_to_end(key)
+            self._size += 1
+            while self._size > self.max_size:
+                oldest_key, runtimes = next(iter(self._idle.items()))
+                runtimes.pop(0)
+                if not runtimes:
+                    del self._idle[oldest_key]
+                self._size -= 1
+                self._stats["evictions"] += 1
+    
+    def clear(self) -> None:
+        """清空池中所有空闲运行时"""
+        with self._lock:
+            self._idle.clear()
+            self._size = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取命中统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = self._size
+            stats["configs"] = len(self._idle)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# 全局运行时池（首次使用时按 services.crewai.runtime_pool 配置创建）
+_runtime_pool: Optional[CrewAIRuntimePool] = None
+_runtime_pool_lock = threading.Lock()
+
+
+def get_crewai_runtime_pool() -> CrewAIRuntimePool:
+    """获取全局CrewAI运行时池"""
+    global _runtime_pool
+    with _runtime_pool_lock:
+        if _runtime_pool is None:
+            services = config_loader.get_services_config().get("services", {})
+            pool_config = services.get("crewai", {}).get("runtime_pool", {})
+            _runtime_pool = CrewAIRuntimePool(max_size=pool_config.get("max_size", 8))
+        return _runtime_pool
+
+
 def main():
     """主函数"""
     parser = argparse.ArgumentParser(description="通用CrewAI运行时")
@@ -0,0 +1,165 @@
+"""
+事件总线模块
+基于有界环形缓冲区的非阻塞事件总线：发布方只做入队，由独立的消费线程把事件分发给订阅者，
+缓冲区满时丢弃新事件而不是阻塞发布方
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Event:
+    """总线上传递的结构化事件"""
+    type: str
+    payload: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = field(default_factory=time.time)
+
+
+EventHandler = Callable[[Event], None]
+
+
+class EventBus:
+    """
+    非阻塞事件总线
+
+    publish 只在锁内写入环形缓冲区，时间复杂度 O(1)，不会因为订阅者（终端、日志、网络）变慢而阻塞；
+    消费线程按发布顺序批量取出事件并依次调用订阅者。
+    """
+
+    def __init__(self, capacity: int = 1024, name: str = "event-bus"):
+        """
+        初始化事件总线
+
+        Args:
+            capacity: 环形缓冲区容量
+            name: 消费线程名称
+        """
+        if capacity <= 0:
+            raise ValueError("capacity 必须大于0")
+        self.capacity = capacity
+        self.name = name
+
+        self._buffer: List[Optional[Event]] = [None] * capacity
+        self._head = 0  # 下一个待消费位置
+        self._size = 0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._subscribers: List[EventHandler] = []
+        self._consumer: Optional[threading.Thread] = None
+        self._closed = False
+
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, handler: EventHandler) -> None:
+        """
+        订阅事件（订阅者在消费线程中被调用）
+
+        Args:
+            handler: 事件处理函数
+        """
+        with self._condition:
+            if handler not in self._subscribers:
+                self._subscribers.append(handler)
+
+    def unsubscribe(self, handler: EventHandler) -> None:
+        """取消订阅"""
+        with self._condition:
+            if handler in self._subscribers:
+                self._subscribers.remove(handler)
+
+    def publish(self, event_type: str, **payload: Any) -> bool:
+        """
+        发布事件，不会阻塞
+
+        Args:
+            event_type: 事件类型
+            **payload: 事件内容
+
+        Returns:
+            是否入队成功，缓冲区已满或总线已关闭时返回 False
+        """
+        event = Event(type=event_type, payload=payload)
+        with self._condition:
+            if self._closed or self._size >= self.capacity:
+                self.dropped += 1
+                return False
+            self._buffer[(self._head + self._size) % self.capacity] = event
+            self._size += 1
+            self.published += 1
+            self._ensure_consumer()
+            self._condition.notify_all()
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待已入队的事件全部处理完成
+
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+
+        Returns:
+            是否在超时前处理完成
+        """
+        if self._consumer is not None and threading.current_thread() is self._consumer:
+            return True
+        with self._condition:
+            return self._condition.wait_for(lambda: self._size == 0 and self._in_flight == 0, timeout)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """处理完剩余事件后停止消费线程"""
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._consumer is not None and self._consumer is not threading.current_thread():
+            self._consumer.join(timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        """获取总线统计"""
+        with self._condition:
+            return {
+                "capacity": self.capacity,
+                "pending": self._size,
+                "published": self.published,
+                "dropped": self.dropped,
+                "subscribers": len(self._subscribers),
+            }
+
+    def _ensure_consumer(self) -> None:
+        """启动消费线程（调用方需持有锁）"""
+        if self._consumer is None or not self._consumer.is_alive():
+            self._consumer = threading.Thread(target=self._consume, name=self.name, daemon=True)
+            self._consumer.start()
+
+    def _consume(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._size > 0 or self._closed)
+                if self._size == 0:
+                    return
+                batch = []
+                while self._size:
+                    batch.append(self._buffer[self._head])
+                    self._buffer[self._head] = None
+                    self._head = (self._head + 1) % self.capacity
+                    self._size -= 1
+                self._in_flight = len(batch)
+                subscribers = list(self._subscribers)
+
+            for event in batch:
+                for handler in subscribers:
+                    try:
+                        handler(event)
+                    except Exception as e:
+                        logger.debug(f"事件处理失败 {event.type}: {e}")
+
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
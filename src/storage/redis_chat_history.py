@@ -12,9 +12,16 @@ from langchain.schema import BaseMessage, HumanMessage, AIMessage
 from langchain_community.chat_message_histories import ChatMessageHistory
 import logging
 
+from src.infrastructure.monitoring.metrics import get_metrics
+
 logger = logging.getLogger(__name__)
 
 
+def _payload_size(data: Any) -> int:
+    """计算Redis中存储内容的字节数"""
+    return len(data.encode('utf-8')) if isinstance(data, str) else len(data)
+
+
 class RedisChatMessageHistory(ChatMessageHistory):
     """
     基于 Redis 的聊天消息历史记录类
@@ -63,6 +70,7 @@ class RedisChatMessageHistory(ChatMessageHistory):
         try:
             data = self.redis_client.get(self.redis_key)
             if data:
+                get_metrics().record_history_bytes("read", _payload_size(data))
                 messages_data = json.loads(data)
                 self.messages = [
                     self._message_from_dict(msg) for msg in messages_data
@@ -81,11 +89,13 @@ class RedisChatMessageHistory(ChatMessageHistory):
             messages_data = [
                 self._message_to_dict(msg) for msg in self.messages
             ]
+            payload = json.dumps(messages_data)
             self.redis_client.set(
                 self.redis_key,
-                json.dumps(messages_data),
+                payload,
                 ex=self.ttl
             )
+            get_metrics().record_history_bytes("written", _payload_size(payload))
             logger.debug(f"保存了 {len(self.messages)} 条消息到Redis")
         except Exception as e:
             logger.error(f"保存消息到Redis失败: {e}")
@@ -0,0 +1,458 @@
+"""
+资源分配求解模块
+提供基于NumPy的匈牙利算法(O(n³))、容量约束下的最小费用流求解以及稀疏效率矩阵支持
+"""
+
+import heapq
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+@dataclass
+class AssignmentResult:
+    """分配结果"""
+    assignments: List[Tuple[int, int]]
+    total_value: float
+    method: str = "hungarian"
+    shape: Tuple[int, int] = (0, 0)
+    # 以下字段用于热启动（求解器内部方向下的对偶变量）
+    col_potentials: Optional[np.ndarray] = field(default=None, repr=False)
+    transposed: bool = False
+    warm_started: bool = False
+
+    @property
+    def row_to_col(self) -> Dict[int, int]:
+        """行(资源)到列(任务)的映射"""
+        return {row: col for row, col in self.assignments}
+
+    @property
+    def col_to_row(self) -> Dict[int, int]:
+        """列(任务)到行(资源)的映射"""
+        return {col: row for row, col in self.assignments}
+
+
+def to_weight_matrix(
+    matrix: Any,
+    n_rows: Optional[int] = None,
+    n_cols: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    将效率矩阵统一转换为稠密数组和可行掩码
+
+    支持以下输入格式：
+    - 二维列表/数组，None/NaN 表示该组合不可分配
+    - 稀疏字典 {"rows": [...], "cols": [...], "values": [...]} 或 {"entries": [[row, col, value], ...]}
+    - 稀疏条目列表 [{"row": 0, "col": 1, "value": 0.9}, ...]
+    - 提供 tocoo() 方法的稀疏矩阵对象（如 scipy.sparse）
+
+    Args:
+        matrix: 效率矩阵
+        n_rows: 行数，稀疏格式下用于确定矩阵形状
+        n_cols: 列数，稀疏格式下用于确定矩阵形状
+
+    Returns:
+        (权重矩阵, 可行掩码)
+    """
+    rows, cols, values = _sparse_entries(matrix)
+    if rows is not None:
+        n_rows = n_rows if n_rows is not None else (int(rows.max()) + 1 if rows.size else 0)
+        n_cols = n_cols if n_cols is not None else (int(cols.max()) + 1 if cols.size else 0)
+        weights = np.zeros((n_rows, n_cols), dtype=float)
+        mask = np.zeros((n_rows, n_cols), dtype=bool)
+        weights[rows, cols] = values
+        mask[rows, cols] = True
+        return weights, mask
+
+    weights = np.array(
+        [[np.nan if value is None else value for value in row] for row in matrix]
+        if not isinstance(matrix, np.ndarray) else matrix,
+        dtype=float
+    )
+    if weights.ndim != 2:
+        raise ValueError("效率矩阵必须是二维的")
+    mask = np.isfinite(weights)
+    weights = np.where(mask, weights, 0.0)
+    return weights, mask
+
+
+def _sparse_entries(matrix: Any) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], Optional[np.ndarray]]:
+    """提取稀疏格式的(行, 列, 值)，非稀疏输入返回 (None, None, None)"""
+    if hasattr(matrix, "tocoo"):
+        coo = matrix.tocoo()
+        return np.asarray(coo.row, dtype=int), np.asarray(coo.col, dtype=int), np.asarray(coo.data, dtype=float)
+
+    if isinstance(matrix, dict):
+        if "entries" not in matrix:
+            return (
+                np.asarray(matrix.get("rows", []), dtype=int),
+                np.asarray(matrix.get("cols", []), dtype=int),
+                np.asarray(matrix.get("values", []), dtype=float)
+            )
+        entries = matrix["entries"]
+    elif isinstance(matrix, list) and matrix and all(isinstance(entry, dict) for entry in matrix):
+        entries = matrix
+    else:
+        return None, None, None
+
+    if entries and isinstance(entries[0], dict):
+        entries = [(entry["row"], entry["col"], entry["value"]) for entry in entries]
+
+    entries = np.asarray(entries, dtype=float).reshape(-1, 3)
+    return entries[:, 0].astype(int), entries[:, 1].astype(int), entries[:, 2]
+
+
+def _hungarian_min(
+    cost: np.ndarray,
+    col_potentials: Optional[np.ndarray] = None,
+    initial_match: Optional[Sequence[Tuple[int, int]]] = None,
+    tol: float = 1e-9
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    最小化代价的匈牙利算法（最短增广路 + 对偶势），要求行数不大于列数
+
+    每一轮增广的内层扫描是一次长度为 m 的向量运算，整体复杂度 O(n²m)。
+    传入上一次求解的列势和匹配时，仍保持紧边的匹配会被直接保留，
+    只对失效的行重新增广，矩阵变化较小时可以跳过大部分计算。
+
+    Args:
+        cost: 代价矩阵 (n, m)，n <= m
+        col_potentials: 热启动用的列势
+        initial_match: 热启动用的 (行, 列) 匹配
+        tol: 紧边判定容差
+
+    Returns:
+        (每行匹配的列索引, 列势)
+    """
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    # p[j]: 匹配到第 j 列的行(1起始)，0 表示空闲；第 0 列为增广起点哨兵
+    p = np.zeros(m + 1, dtype=int)
+
+    pending = list(range(1, n + 1))
+    if col_potentials is not None and col_potentials.shape == (m,):
+        v[1:] = col_potentials
+        u[1:] = (cost - v[1:]).min(axis=1)
+        matched_rows = set()
+        for row, col in initial_match or ():
+            if (row not in matched_rows and p[col + 1] == 0
+                    and abs(cost[row, col] - u[row + 1] - v[col + 1]) <= tol):
+                p[col + 1] = row + 1
+                matched_rows.add(row)
+        pending = [i for i in pending if i - 1 not in matched_rows]
+
+    minv = np.empty(m + 1)
+    way = np.zeros(m + 1, dtype=int)
+    used = np.zeros(m + 1, dtype=bool)
+    for i in pending:
+        p[0] = i
+        j0 = 0
+        minv.fill(np.inf)
+        used.fill(False)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # 沿增广路翻转匹配
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    row_to_col = np.full(n, -1, dtype=int)
+    for j in range(1, m + 1):
+        if p[j]:
+            row_to_col[p[j] - 1] = j - 1
+    return row_to_col, v[1:].copy()
+
+
+def solve_assignment(
+    matrix: Any,
+    maximize: bool = True,
+    warm_start: Optional[AssignmentResult] = None,
+    n_rows: Optional[int] = None,
+    n_cols: Optional[int] = None
+) -> AssignmentResult:
+    """
+    求解一对一分配问题（支持矩形矩阵和不可分配组合）
+
+    不可分配的组合以大代价参与求解，结果中会被剔除，
+    因此在最大化可行分配数量的前提下再优化总效率。
+
+    Args:
+        matrix: 效率（或代价）矩阵，格式见 to_weight_matrix
+        maximize: True 表示最大化总效率，False 表示最小化总代价
+        warm_start: 上一次的求解结果，形状一致时用于热启动
+        n_rows: 行数（稀疏输入时可选）
+        n_cols: 列数（稀疏输入时可选）
+
+    Returns:
+        AssignmentResult: 分配结果
+    """
+    weights, mask = to_weight_matrix(matrix, n_rows, n_cols)
+    n_rows, n_cols = weights.shape
+    if n_rows == 0 or n_cols == 0:
+        return AssignmentResult(assignments=[], total_value=0.0, shape=(n_rows, n_cols))
+
+    cost = -weights if maximize else weights.copy()
+    if not mask.all():
+        finite = cost[mask]
+        span = float(np.abs(finite).max()) + 1.0 if finite.size else 1.0
+        cost[~mask] = span * 2 * max(n_rows, n_cols) + 1.0
+
+    transposed = n_rows > n_cols
+    if transposed:
+        cost = np.ascontiguousarray(cost.T)
+
+    # 矩形问题的对偶要求未匹配列的势为0，热启动的势无法保证这一点；
+    # 接近方阵时补零代价的虚拟行转为方阵求解以支持热启动，差距较大时直接求解
+    n, m = cost.shape
+    padded = n < m and 2 * n >= m
+    if padded:
+        cost = np.vstack([cost, np.zeros((m - n, m))])
+
+    col_potentials = None
+    initial_match = None
+    if (warm_start is not None and warm_start.shape == (n_rows, n_cols)
+            and warm_start.transposed == transposed and warm_start.col_potentials is not None):
+        col_potentials = warm_start.col_potentials
+        initial_match = [(c, r) if transposed else (r, c) for r, c in warm_start.assignments]
+
+    row_to_col, potentials = _hungarian_min(cost, col_potentials, initial_match)
+    if n < m and not padded:
+        potentials = None
+
+    assignments = []
+    for i, j in enumerate(row_to_col[:n]):
+        if j < 0:
+            continue
+        row, col = (int(j), i) if transposed else (i, int(j))
+        if mask[row, col]:
+            assignments.append((row, col))
+    assignments.sort()
+
+    total_value = float(sum(weights[row, col] for row, col in assignments))
+    return AssignmentResult(
+        assignments=assignments,
+        total_value=total_value,
+        method="hungarian",
+        shape=(n_rows, n_cols),
+        col_potentials=potentials,
+        transposed=transposed,
+        warm_started=col_potentials is not None
+    )
+
+
+def solve_capacitated_assignment(
+    matrix: Any,
+    row_capacity: Union[int, Sequence[int]] = 1,
+    col_capacity: Union[int, Sequence[int]] = 1,
+    maximize: bool = True,
+    n_rows: Optional[int] = None,
+    n_cols: Optional[int] = None
+) -> AssignmentResult:
+    """
+    基于最小费用流求解带容量约束的分配问题
+
+    网络结构为 源点 -> 资源(容量=row_capacity) -> 任务(容量1, 费用=-效率) -> 汇点(容量=col_capacity)，
+    使用带 Johnson 势的 Dijkstra 逐次求最短增广路，只在稀疏的可行组合上建边。
+
+    Args:
+        matrix: 效率（或代价）矩阵，格式见 to_weight_matrix
+        row_capacity: 每个资源最多承担的任务数
+        col_capacity: 每个任务最多需要的资源数
+        maximize: True 表示最大化总效率，False 表示最小化总代价
+        n_rows: 行数（稀疏输入时可选）
+        n_cols: 列数（稀疏输入时可选）
+
+    Returns:
+        AssignmentResult: 分配结果
+    """
+    rows, cols, values = _sparse_entries(matrix)
+    if rows is None:
+        weights, mask = to_weight_matrix(matrix)
+        n_rows, n_cols = weights.shape
+        rows, cols = np.nonzero(mask)
+        values = weights[rows, cols]
+    else:
+        n_rows = n_rows if n_rows is not None else (int(rows.max()) + 1 if rows.size else 0)
+        n_cols = n_cols if n_cols is not None else (int(cols.max()) + 1 if cols.size else 0)
+
+    row_caps = np.broadcast_to(np.asarray(row_capacity, dtype=int), (n_rows,))
+    col_caps = np.broadcast_to(np.asarray(col_capacity, dtype=int), (n_cols,))
+
+    flow = _MinCostFlow(n_rows + n_cols + 2)
+    source, sink = n_rows + n_cols, n_rows + n_cols + 1
+    for r in range(n_rows):
+        if row_caps[r] > 0:
+            flow.add_edge(source, r, int(row_caps[r]), 0.0)
+    edge_index = {}
+    for r, c, value in zip(rows.tolist(), cols.tolist(), values.tolist()):
+        edge_index[flow.add_edge(r, n_rows + c, 1, -value if maximize else value)] = (r, c, value)
+    for c in range(n_cols):
+        if col_caps[c] > 0:
+            flow.add_edge(n_rows + c, sink, int(col_caps[c]), 0.0)
+
+    flow.run(source, sink, n_rows)
+
+    assignments = []
+    total_value = 0.0
+    for (node, pos), (r, c, value) in edge_index.items():
+        if flow.graph[node][pos][1] == 0:
+            assignments.append((r, c))
+            total_value += value
+    assignments.sort()
+    return AssignmentResult(
+        assignments=assignments,
+        total_value=float(total_value),
+        method="min_cost_flow",
+        shape=(n_rows, n_cols)
+    )
+
+
+class _MinCostFlow:
+    """逐次最短路最小费用流（邻接表 + Dijkstra + 节点势）"""
+
+    def __init__(self, n_nodes: int):
+        # 边: [终点, 剩余容量, 费用, 反向边在终点邻接表中的位置]
+        self.graph: List[List[list]] = [[] for _ in range(n_nodes)]
+
+    def add_edge(self, u: int, v: int, capacity: int, cost: float) -> Tuple[int, int]:
+        self.graph[u].append([v, capacity, cost, len(self.graph[v])])
+        self.graph[v].append([u, 0, -cost, len(self.graph[u]) - 1])
+        return u, len(self.graph[u]) - 1
+
+    def run(self, source: int, sink: int, n_left: int) -> None:
+        n = len(self.graph)
+        # 二分图是DAG：用源点->左部->右部的一次松弛得到非负的初始势
+        potential = [0.0] * n
+        for u in range(n_left):
+            for v, capacity, cost, _ in self.graph[u]:
+                if capacity > 0 and cost < potential[v]:
+                    potential[v] = cost
+        potential[sink] = min((potential[v] for v, _, _, _ in self.graph[sink]), default=0.0)
+
+        while True:
+            dist = [np.inf] * n
+            prev: List[Optional[Tuple[int, int]]] = [None] * n
+            dist[source] = 0.0
+            heap = [(0.0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                for pos, (v, capacity, cost, _) in enumerate(self.graph[u]):
+                    if capacity <= 0:
+                        continue
+                    nd = d + cost + potential[u] - potential[v]
+                    if nd < dist[v] - 1e-12:
+                        dist[v] = nd
+                        prev[v] = (u, pos)
+                        heapq.heappush(heap, (nd, v))
+            if dist[sink] == np.inf:
+                return
+            # 不可达节点的势按汇点距离截断，保证后续约化费用非负
+            for v in range(n):
+                potential[v] += min(dist[v], dist[sink])
+
+            # 计算瓶颈容量并增广
+            bottleneck = np.inf
+            v = sink
+            while v != source:
+                u, pos = prev[v]
+                bottleneck = min(bottleneck, self.graph[u][pos][1])
+                v = u
+            v = sink
+            while v != source:
+                u, pos = prev[v]
+                edge = self.graph[u][pos]
+                edge[1] -= bottleneck
+                self.graph[v][edge[3]][1] += bottleneck
+                v = u
+
+
+class AssignmentSolver:
+    """
+    带热启动缓存的分配求解器
+
+    按问题标识（如资源和任务名称）保存最近的求解结果，
+    同一问题的效率矩阵小幅变化时复用上一次的对偶势和匹配。
+    """
+
+    def __init__(self, max_cached_problems: int = 128):
+        """
+        初始化求解器
+
+        Args:
+            max_cached_problems: 热启动缓存保留的问题数量
+        """
+        self.max_cached_problems = max_cached_problems
+        self._last_results: "OrderedDict[Hashable, AssignmentResult]" = OrderedDict()
+
+    def solve(
+        self,
+        matrix: Any,
+        maximize: bool = True,
+        problem_key: Optional[Hashable] = None,
+        row_capacity: Union[int, Sequence[int]] = 1,
+        col_capacity: Union[int, Sequence[int]] = 1,
+        n_rows: Optional[int] = None,
+        n_cols: Optional[int] = None
+    ) -> AssignmentResult:
+        """
+        求解分配问题，容量均为1时使用匈牙利算法，否则使用最小费用流
+
+        Args:
+            matrix: 效率（或代价）矩阵
+            maximize: 是否最大化
+            problem_key: 问题标识，提供时启用热启动
+            row_capacity: 资源容量
+            col_capacity: 任务容量
+            n_rows: 行数（稀疏输入时可选）
+            n_cols: 列数（稀疏输入时可选）
+
+        Returns:
+            AssignmentResult: 分配结果
+        """
+        if np.any(np.asarray(row_capacity) != 1) or np.any(np.asarray(col_capacity) != 1):
+            return solve_capacitated_assignment(
+                matrix, row_capacity, col_capacity, maximize=maximize, n_rows=n_rows, n_cols=n_cols
+            )
+
+        warm_start = None
+        if problem_key is not None:
+            warm_start = self._last_results.get((problem_key, maximize))
+
+        result = solve_assignment(matrix, maximize=maximize, warm_start=warm_start, n_rows=n_rows, n_cols=n_cols)
+
+        if problem_key is not None:
+            key = (problem_key, maximize)
+            self._last_results[key] = result
+            self._last_results.move_to_end(key)
+            while len(self._last_results) > self.max_cached_problems:
+                self._last_results.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        """清空热启动缓存"""
+        self._last_results.clear()
+
+
+# 全局求解器实例
+assignment_solver = AssignmentSolver()
@@ -19,7 +19,7 @@ from langchain.callbacks.manager import (
     CallbackManagerForToolRun,
 )
 
-from src.interfaces.crewai_runtime import CrewAIRuntime
+from src.interfaces.crewai_runtime import CrewAIRuntime, get_crewai_runtime_pool
 
 
 class CrewAIRuntimeToolInput(BaseModel):
@@ -276,24 +276,21 @@ class CrewAIRuntimeTool(BaseTool):
         else:
             raise ValueError("无法识别的参数格式")
         
-        # 创建运行时实例
-        runtime = CrewAIRuntime()
-        
-        # 处理配置并加载
+        # 处理配置
         final_config = self._process_config(config, query)
-        runtime.load_config_from_dict(final_config)
-        
-        # 创建团队
-        if not runtime.create_crew():
-            return "创建CrewAI团队失败"
         
         # 从配置中获取任务描述
         task_description = query
         if "crewai_config" in final_config and "tasks" in final_config["crewai_config"] and final_config["crewai_config"]["tasks"]:
             task_description = final_config["crewai_config"]["tasks"][0].get("description", query)
         
-        # 运行团队 - 使用正确的方法名和任务描述
-        result = runtime.run_crew(task_description)
+        # 从运行时池借用团队：相同配置复用已创建的团队，否则新建
+        with get_crewai_runtime_pool().lease(final_config) as runtime:
+            if runtime is None:
+                return "创建CrewAI团队失败"
+            
+            # 运行团队 - 使用正确的方法名和任务描述
+            result = runtime.run_crew(task_description)
         
         if result is None:
             return "运行CrewAI团队时出错"
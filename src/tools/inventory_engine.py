@@ -0,0 +1,323 @@
+"""
+库存优化引擎模块
+以NumPy数组对整个SKU/库位目录批量计算EOQ、安全库存、再订货点和总成本，并支持多级库存网络的需求汇总与库存分配
+"""
+
+from dataclasses import dataclass, fields
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+
+ArrayLike = Union[float, int, np.ndarray, list]
+
+
+def service_level_z(service_level: ArrayLike) -> np.ndarray:
+    """
+    将服务水平（周期服务水平，0~1）转换为标准正态分位数 z
+
+    目录中不同服务水平的取值通常很少，只对唯一值求逆再广播回原数组。
+
+    Args:
+        service_level: 服务水平
+
+    Returns:
+        z 值数组
+    """
+    levels = np.asarray(service_level, dtype=float)
+    if np.any((levels <= 0) | (levels >= 1)):
+        raise ValueError("服务水平必须在 (0, 1) 区间内")
+    unique, inverse = np.unique(levels, return_inverse=True)
+    normal = NormalDist()
+    z_values = np.array([normal.inv_cdf(level) for level in unique])
+    return z_values[inverse].reshape(levels.shape)
+
+
+@dataclass
+class InventoryPolicy:
+    """库存策略计算结果（每个字段为与输入等长的数组）"""
+    annual_demand: np.ndarray
+    eoq: np.ndarray
+    order_frequency: np.ndarray
+    safety_stock: np.ndarray
+    reorder_point: np.ndarray
+    ordering_cost: np.ndarray
+    holding_cost: np.ndarray
+    total_cost: np.ndarray
+    service_level: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.eoq.size)
+
+    def to_frame(self) -> pd.DataFrame:
+        """转换为DataFrame，便于排序、筛选和导出"""
+        return pd.DataFrame({f.name: np.atleast_1d(getattr(self, f.name)) for f in fields(self)})
+
+
+def compute_inventory_policy(
+    annual_demand: ArrayLike,
+    holding_cost: ArrayLike,
+    order_cost: ArrayLike,
+    lead_time: ArrayLike = 0.0,
+    demand_std: ArrayLike = 0.0,
+    lead_time_std: ArrayLike = 0.0,
+    service_level: Optional[ArrayLike] = None,
+    shortage_cost: Optional[ArrayLike] = None,
+    days_per_year: float = 365.0
+) -> InventoryPolicy:
+    """
+    批量计算库存策略，所有参数可以是标量或等长数组（按NumPy规则广播）
+
+    安全库存按需求和提前期同时波动的公式计算:
+        SS = z * sqrt(L * σ_d² + d² * σ_L²)
+    其中 d 为日均需求，σ_d 为日需求标准差，L 和 σ_L 为提前期均值和标准差（天）。
+    未给出服务水平时，若提供缺货成本则取临界比 s / (h + s)，否则取 95%。
+
+    Args:
+        annual_demand: 年需求量
+        holding_cost: 单位年持有成本
+        order_cost: 每次订货成本
+        lead_time: 提前期（天）
+        demand_std: 日需求标准差
+        lead_time_std: 提前期标准差（天）
+        service_level: 周期服务水平
+        shortage_cost: 单位缺货成本
+        days_per_year: 每年天数
+
+    Returns:
+        InventoryPolicy: 库存策略
+    """
+    demand, holding, ordering, lead, sigma_d, sigma_l = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in
+          (annual_demand, holding_cost, order_cost, lead_time, demand_std, lead_time_std))
+    )
+    if np.any(holding <= 0):
+        raise ValueError("单位持有成本必须大于0")
+    if np.any(demand < 0) or np.any(ordering < 0):
+        raise ValueError("需求量和订货成本不能为负数")
+
+    if service_level is None:
+        if shortage_cost is not None:
+            shortage = np.asarray(shortage_cost, dtype=float)
+            service_level = np.clip(shortage / (holding + shortage), 0.5, 0.9999)
+        else:
+            service_level = 0.95
+    levels = np.broadcast_to(np.asarray(service_level, dtype=float), demand.shape)
+
+    eoq = np.sqrt(2.0 * demand * ordering / holding)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        order_frequency = np.where(eoq > 0, demand / eoq, 0.0)
+
+    daily_demand = demand / days_per_year
+    safety_stock = service_level_z(levels) * np.sqrt(lead * sigma_d ** 2 + daily_demand ** 2 * sigma_l ** 2)
+    safety_stock = np.maximum(safety_stock, 0.0)
+    reorder_point = daily_demand * lead + safety_stock
+
+    annual_ordering_cost = order_frequency * ordering
+    annual_holding_cost = (eoq / 2.0 + safety_stock) * holding
+    return InventoryPolicy(
+        annual_demand=demand.copy(),
+        eoq=eoq,
+        order_frequency=order_frequency,
+        safety_stock=safety_stock,
+        reorder_point=reorder_point,
+        ordering_cost=annual_ordering_cost,
+        holding_cost=annual_holding_cost,
+        total_cost=annual_ordering_cost + annual_holding_cost,
+        service_level=levels.copy()
+    )
+
+
+def node_depths(parent: ArrayLike) -> np.ndarray:
+    """
+    计算多级网络中每个节点的层级（根节点为0），parent 为 -1 表示根节点
+
+    Args:
+        parent: 父节点索引数组
+
+    Returns:
+        层级数组
+    """
+    parent = np.asarray(parent, dtype=int)
+    depth = np.zeros(parent.size, dtype=int)
+    ancestor = parent.copy()
+    for _ in range(parent.size):
+        active = ancestor >= 0
+        if not active.any():
+            return depth
+        depth[active] += 1
+        ancestor[active] = parent[ancestor[active]]
+    raise ValueError("库存网络中存在环")
+
+
+def echelon_totals(parent: ArrayLike, values: ArrayLike) -> np.ndarray:
+    """
+    将下游节点的数值逐级累加到上游节点（例如梯级需求、合并方差）
+
+    每一层只做一次 np.add.at，复杂度 O(节点数 × 层数)。
+
+    Args:
+        parent: 父节点索引数组，-1 表示根节点
+        values: 各节点自身的数值
+
+    Returns:
+        各节点的梯级合计（自身 + 所有下游）
+    """
+    parent = np.asarray(parent, dtype=int)
+    totals = np.asarray(values, dtype=float).copy()
+    depth = node_depths(parent)
+    for level in range(int(depth.max(initial=0)), 0, -1):
+        children = np.nonzero(depth == level)[0]
+        np.add.at(totals, parent[children], totals[children])
+    return totals
+
+
+def allocate_stock(group: ArrayLike, need: ArrayLike, available: ArrayLike) -> np.ndarray:
+    """
+    按需求比例（fair share）把上游可用库存分配给下游节点
+
+    Args:
+        group: 每个需求行所属的上游库存索引（如同一SKU的配送中心行）
+        need: 每个需求行的需求量
+        available: 每个上游库存的可用量
+
+    Returns:
+        每个需求行分得的数量
+    """
+    group = np.asarray(group, dtype=int)
+    need = np.maximum(np.asarray(need, dtype=float), 0.0)
+    available = np.asarray(available, dtype=float)
+    total_need = np.bincount(group, weights=need, minlength=available.size)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fill_rate = np.where(total_need > 0, np.minimum(available / total_need, 1.0), 0.0)
+    return need * fill_rate[group]
+
+
+@dataclass
+class NetworkPolicy:
+    """多级库存网络的策略结果"""
+    policy: InventoryPolicy
+    echelon_demand: np.ndarray
+    echelon_demand_std: np.ndarray
+    allocation: Optional[np.ndarray] = None
+
+
+class InventoryEngine:
+    """目录级库存优化引擎"""
+
+    # 目录数据中的列名与 compute_inventory_policy 参数的对应关系
+    COLUMNS = (
+        "annual_demand", "holding_cost", "order_cost", "lead_time",
+        "demand_std", "lead_time_std", "service_level", "shortage_cost"
+    )
+
+    def __init__(self, days_per_year: float = 365.0, default_service_level: float = 0.95):
+        """
+        初始化库存引擎
+
+        Args:
+            days_per_year: 每年天数
+            default_service_level: 目录中未给出服务水平和缺货成本时的默认服务水平
+        """
+        self.days_per_year = days_per_year
+        self.default_service_level = default_service_level
+
+    def optimize_catalog(self, catalog: Union[pd.DataFrame, Dict[str, Any], list]) -> InventoryPolicy:
+        """
+        对整个目录（每行一个SKU/库位）计算库存策略
+
+        Args:
+            catalog: DataFrame、列字典或记录列表，需求列可以命名为 annual_demand 或 demand
+
+        Returns:
+            InventoryPolicy: 库存策略
+        """
+        frame = catalog if isinstance(catalog, pd.DataFrame) else pd.DataFrame(catalog)
+        if "annual_demand" not in frame.columns and "demand" in frame.columns:
+            frame = frame.rename(columns={"demand": "annual_demand"})
+        missing = [name for name in ("annual_demand", "holding_cost", "order_cost") if name not in frame.columns]
+        if missing:
+            raise ValueError(f"目录缺少必要字段: {', '.join(missing)}")
+
+        params = {name: frame[name].to_numpy(dtype=float) for name in self.COLUMNS if name in frame.columns}
+        levels = params.get("service_level", np.full(len(frame), np.nan))
+        params["service_level"] = np.where(np.isnan(levels), self._fallback_service_level(params), levels)
+        params.pop("shortage_cost", None)
+        for name in ("lead_time", "demand_std", "lead_time_std"):
+            if name in params:
+                params[name] = np.nan_to_num(params[name])
+        return compute_inventory_policy(days_per_year=self.days_per_year, **params)
+
+    def optimize_network(
+        self,
+        parent: ArrayLike,
+        annual_demand: ArrayLike,
+        holding_cost: ArrayLike,
+        order_cost: ArrayLike,
+        lead_time: ArrayLike = 0.0,
+        demand_std: ArrayLike = 0.0,
+        lead_time_std: ArrayLike = 0.0,
+        service_level: Optional[ArrayLike] = None,
+        on_hand: Optional[ArrayLike] = None
+    ) -> NetworkPolicy:
+        """
+        多级库存网络优化
+
+        每一行是某个SKU在某个节点上的库存点，parent 指向同一SKU在上游节点的行（-1 为顶层）。
+        上游行的需求为所有下游需求之和，日需求方差按独立需求合并（风险共担），
+        再对全部行一次性计算库存策略。提供 on_hand 时，按上游现有库存对下游补货需求做比例分配。
+
+        Args:
+            parent: 父行索引
+            annual_demand: 各行自身（终端）的年需求
+            holding_cost: 单位年持有成本
+            order_cost: 每次订货成本
+            lead_time: 从上游补货的提前期（天）
+            demand_std: 各行自身的日需求标准差
+            lead_time_std: 提前期标准差（天）
+            service_level: 周期服务水平
+            on_hand: 各行现有库存
+
+        Returns:
+            NetworkPolicy: 网络策略
+        """
+        parent = np.asarray(parent, dtype=int)
+        demand = np.broadcast_to(np.asarray(annual_demand, dtype=float), parent.shape)
+        variance = np.broadcast_to(np.asarray(demand_std, dtype=float) ** 2, parent.shape)
+
+        echelon_demand = echelon_totals(parent, demand)
+        echelon_std = np.sqrt(echelon_totals(parent, variance))
+        policy = compute_inventory_policy(
+            echelon_demand, holding_cost, order_cost, lead_time, echelon_std, lead_time_std,
+            service_level=self.default_service_level if service_level is None else service_level,
+            days_per_year=self.days_per_year
+        )
+
+        allocation = None
+        if on_hand is not None:
+            stock = np.broadcast_to(np.asarray(on_hand, dtype=float), parent.shape)
+            # 下游补货需求: 补到 再订货点 + EOQ 的缺口
+            need = np.maximum(policy.reorder_point + policy.eoq - stock, 0.0)
+            allocation = np.zeros(parent.size)
+            children = np.nonzero(parent >= 0)[0]
+            allocation[children] = allocate_stock(parent[children], need[children], stock)
+        return NetworkPolicy(
+            policy=policy,
+            echelon_demand=echelon_demand,
+            echelon_demand_std=echelon_std,
+            allocation=allocation
+        )
+
+    def _fallback_service_level(self, params: Dict[str, np.ndarray]) -> np.ndarray:
+        """服务水平缺失的行使用缺货成本的临界比，否则使用默认服务水平"""
+        if "shortage_cost" not in params:
+            return np.full(params["holding_cost"].shape, self.default_service_level)
+        shortage = params["shortage_cost"]
+        critical = np.clip(shortage / (params["holding_cost"] + shortage), 0.5, 0.9999)
+        return np.where(np.isnan(critical), self.default_service_level, critical)
+
+
+# 全局库存引擎实例
+inventory_engine = InventoryEngine()
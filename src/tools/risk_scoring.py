@@ -0,0 +1,245 @@
+"""
+风险评分引擎模块
+将配置中的声明式规则表编译为向量化的 np.digitize / np.select 运算，对列式实体数据批量评分
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from src.config.config_loader import config_loader
+from src.shared.exceptions.exceptions import ConfigurationError
+
+
+@dataclass
+class RiskFactorRule:
+    """单个风险因子的编译后规则"""
+    name: str
+    kind: str
+    bins: Optional[np.ndarray] = None
+    scores: Optional[np.ndarray] = None
+    right: bool = False
+    categories: List[Any] = field(default_factory=list)
+    category_scores: List[float] = field(default_factory=list)
+
+    @classmethod
+    def from_config(cls, name: str, config: Dict[str, Any]) -> "RiskFactorRule":
+        """从配置字典编译因子规则"""
+        kind = config.get("type", "numeric")
+        if kind == "numeric":
+            bins = np.asarray(config.get("bins", []), dtype=float)
+            scores = np.asarray(config.get("scores", []), dtype=float)
+            if scores.size != bins.size + 1:
+                raise ConfigurationError(f"风险因子 {name} 的 scores 数量应比 bins 多 1")
+            if np.any(np.diff(bins) <= 0):
+                raise ConfigurationError(f"风险因子 {name} 的 bins 必须严格递增")
+            return cls(name=name, kind=kind, bins=bins, scores=scores, right=bool(config.get("right", False)))
+        if kind == "categorical":
+            values = config.get("values", {})
+            return cls(
+                name=name,
+                kind=kind,
+                categories=list(values.keys()),
+                category_scores=[float(score) for score in values.values()]
+            )
+        raise ConfigurationError(f"不支持的风险因子类型: {kind}")
+
+    def score(self, column: np.ndarray) -> np.ndarray:
+        """
+        对一列数据计算因子得分，缺失值和未知取值得0分
+
+        Args:
+            column: 列数据
+
+        Returns:
+            得分数组
+        """
+        if self.kind == "numeric":
+            values = pd.to_numeric(pd.Series(column), errors="coerce").to_numpy(dtype=float)
+            missing = np.isnan(values)
+            contribution = self.scores[np.digitize(values, self.bins, right=self.right)]
+            contribution[missing] = 0.0
+            return contribution
+        conditions = [column == category for category in self.categories]
+        return np.select(conditions, self.category_scores, default=0.0).astype(float)
+
+
+@dataclass
+class RiskRuleTable:
+    """某一风险类型的规则表"""
+    risk_type: str
+    entity_key: str
+    base_score: float
+    score_range: tuple
+    factors: List[RiskFactorRule]
+    level_thresholds: np.ndarray
+    level_labels: List[str]
+    entity_label: str = ""
+    title: str = ""
+    ranking_title: str = ""
+    mitigation: List[Dict[str, Any]] = field(default_factory=list)
+
+    @classmethod
+    def from_config(cls, risk_type: str, config: Dict[str, Any], levels: Dict[str, Any]) -> "RiskRuleTable":
+        """从配置字典编译规则表"""
+        thresholds = np.asarray(levels.get("thresholds", [30, 70]), dtype=float)
+        labels = list(levels.get("labels", ["低", "中", "高"]))
+        if len(labels) != thresholds.size + 1:
+            raise ConfigurationError("风险等级 labels 数量应比 thresholds 多 1")
+        return cls(
+            risk_type=risk_type,
+            entity_key=config.get("entity_key", risk_type),
+            base_score=float(config.get("base_score", 50)),
+            score_range=tuple(config.get("score_range", [0, 100])),
+            factors=[
+                RiskFactorRule.from_config(name, factor)
+                for name, factor in (config.get("factors") or {}).items()
+            ],
+            level_thresholds=thresholds,
+            level_labels=labels,
+            entity_label=config.get("entity_label", risk_type),
+            title=config.get("title", ""),
+            ranking_title=config.get("ranking_title", ""),
+            mitigation=list(config.get("mitigation") or [])
+        )
+
+
+@dataclass
+class RiskScoringResult:
+    """按风险分数降序排列的评分结果"""
+    names: np.ndarray
+    scores: np.ndarray
+    levels: np.ndarray
+    level_labels: List[str]
+
+    def __len__(self) -> int:
+        return int(self.names.size)
+
+    def names_at_level(self, label: str) -> List[Any]:
+        """获取指定风险等级的实体名称（保持排名顺序）"""
+        if label not in self.level_labels:
+            return []
+        return self.names[self.levels == self.level_labels.index(label)].tolist()
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """转换为记录列表"""
+        return [
+            {"name": name, "score": float(score), "level": self.level_labels[level]}
+            for name, score, level in zip(self.names.tolist(), self.scores.tolist(), self.levels.tolist())
+        ]
+
+
+EntityData = Union[pd.DataFrame, Mapping[str, Sequence[Any]], Sequence[Mapping[str, Any]]]
+
+
+class RiskScoringEngine:
+    """
+    规则表驱动的风险评分引擎
+
+    规则来自 risk_rules.yaml，编译后缓存；智能体工具和离线批量评分共用同一份规则。
+    """
+
+    def __init__(self, rules_config: Optional[Dict[str, Any]] = None):
+        """
+        初始化评分引擎
+
+        Args:
+            rules_config: 规则配置，默认从 config_loader 加载 risk_rules 配置
+        """
+        self._rules_config = rules_config
+        self._tables: Optional[Dict[str, RiskRuleTable]] = None
+
+    @property
+    def tables(self) -> Dict[str, RiskRuleTable]:
+        """已编译的规则表（首次访问时加载）"""
+        if self._tables is None:
+            config = self._rules_config if self._rules_config is not None else config_loader.get_risk_rules_config()
+            levels = config.get("levels", {})
+            self._tables = {
+                risk_type: RiskRuleTable.from_config(risk_type, table, levels)
+                for risk_type, table in config.items()
+                if risk_type != "levels" and isinstance(table, dict)
+            }
+        return self._tables
+
+    def reload(self, rules_config: Optional[Dict[str, Any]] = None) -> None:
+        """重新加载规则"""
+        self._rules_config = rules_config
+        self._tables = None
+
+    def get_table(self, risk_type: str) -> RiskRuleTable:
+        """获取风险类型对应的规则表"""
+        if risk_type not in self.tables:
+            raise ConfigurationError(f"不支持的风险类型: {risk_type}")
+        return self.tables[risk_type]
+
+    def score(self, risk_type: str, entities: EntityData, name_field: str = "name") -> RiskScoringResult:
+        """
+        批量计算风险分数并排名
+
+        Args:
+            risk_type: 风险类型，如 supplier、logistics、market
+            entities: 实体数据，可以是 DataFrame、列字典或记录列表；缺少名称的实体会被忽略
+            name_field: 名称字段
+
+        Returns:
+            RiskScoringResult: 评分结果
+        """
+        table = self.get_table(risk_type)
+        frame = entities if isinstance(entities, pd.DataFrame) else pd.DataFrame(entities)
+
+        if name_field not in frame.columns:
+            empty = np.array([], dtype=object)
+            return RiskScoringResult(empty, np.array([], dtype=float), np.array([], dtype=int), table.level_labels)
+        frame = frame[frame[name_field].notna()]
+
+        scores = np.full(len(frame), table.base_score, dtype=float)
+        for factor in table.factors:
+            if factor.name in frame.columns:
+                scores += factor.score(frame[factor.name].to_numpy())
+        np.clip(scores, table.score_range[0], table.score_range[1], out=scores)
+
+        # 稳定排序，同分时保持输入顺序
+        order = np.argsort(-scores, kind="stable")
+        ranked_scores = scores[order]
+        return RiskScoringResult(
+            names=frame[name_field].to_numpy()[order],
+            scores=ranked_scores,
+            levels=np.digitize(ranked_scores, table.level_thresholds),
+            level_labels=table.level_labels
+        )
+
+    def format_report(self, risk_type: str, result: RiskScoringResult) -> str:
+        """
+        将评分结果格式化为风险评估报告
+
+        Args:
+            risk_type: 风险类型
+            result: 评分结果
+
+        Returns:
+            报告文本
+        """
+        table = self.get_table(risk_type)
+        lines = [f"{table.title}:", "", f"{table.ranking_title}:"]
+        for i, (name, score, level) in enumerate(zip(result.names.tolist(), result.scores.tolist(), result.levels.tolist())):
+            lines.append(f"{i+1}. {name}: 风险分数 {score:.1f} ({table.level_labels[level]}风险)")
+
+        lines.extend(["", "风险缓解建议:"])
+        sections = []
+        for item in table.mitigation:
+            names = result.names_at_level(item.get("level"))
+            if names:
+                section = [f"{item.get('label')}({', '.join(str(name) for name in names)}):"]
+                section.extend(f"- {action}" for action in item.get("actions", []))
+                sections.append("\n".join(section))
+        report = "\n".join(lines) + "\n"
+        if sections:
+            report += "\n\n".join(sections) + "\n"
+        return report
+
+
+# 全局评分引擎实例
+risk_scoring_engine = RiskScoringEngine()
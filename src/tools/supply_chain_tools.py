@@ -12,6 +12,9 @@ import math
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 from src.config.config_loader import config_loader
+from src.tools.assignment_solver import assignment_solver, to_weight_matrix
+from src.tools.inventory_engine import compute_inventory_policy, inventory_engine
+from src.tools.risk_scoring import risk_scoring_engine
 
 
 class DataAnalyzerTool(BaseTool):
@@ -350,7 +353,7 @@ class ForecastingModelTool(BaseTool):
 class OptimizationEngineTool(BaseTool):
     """优化引擎工具"""
     name: str = "optimization_engine"
-    description: str = "用于供应链优化问题，包括库存优化、路径优化、资源分配等，支持线性规划和启发式算法"
+    description: str = "用于供应链优化问题，包括库存优化、路径优化、资源分配等，支持线性规划、最优指派(匈牙利算法/最小费用流)和启发式算法"
     
     def _run(self, problem: str, optimization_type: str = "inventory") -> str:
         """
@@ -396,6 +399,10 @@ class OptimizationEngineTool(BaseTool):
     
     def _inventory_optimization(self, problem: Dict[str, Any]) -> str:
         """库存优化"""
+        # 提供items时按整个目录批量优化
+        if "items" in problem:
+            return self._catalog_inventory_optimization(problem["items"])
+        
         result = "库存优化结果:\n\n"
         
         # 检查必要参数
@@ -407,36 +414,61 @@ class OptimizationEngineTool(BaseTool):
         holding_cost = problem["holding_cost"]
         order_cost = problem["order_cost"]
         
-        # 计算经济订货量(EOQ)
-        eoq = math.sqrt(2 * demand * order_cost / holding_cost)
-        
-        # 计算年订货次数
-        order_frequency = demand / eoq
-        
-        # 计算年总成本
-        total_cost = (demand / eoq) * order_cost + (eoq / 2) * holding_cost
+        # 计算经济订货量(EOQ)、安全库存和再订货点
+        policy = compute_inventory_policy(
+            demand,
+            holding_cost,
+            order_cost,
+            lead_time=problem.get("lead_time", 0),
+            demand_std=problem.get("demand_std", 0),
+            lead_time_std=problem.get("lead_time_std", 0),
+            service_level=problem.get("service_level"),
+            shortage_cost=problem.get("shortage_cost")
+        )
         
         result += f"年需求量: {demand}\n"
         result += f"单位持有成本: {holding_cost}\n"
         result += f"每次订货成本: {order_cost}\n\n"
-        result += f"经济订货量(EOQ): {eoq:.2f}\n"
-        result += f"年订货次数: {order_frequency:.2f}\n"
-        result += f"年总成本: {total_cost:.2f}\n"
-        
-        # 如果有缺货成本，计算再订货点
-        if "shortage_cost" in problem and "lead_time" in problem:
-            shortage_cost = problem["shortage_cost"]
-            lead_time = problem["lead_time"]
-            
-            # 计算最优缺货概率
-            optimal_shortage_prob = holding_cost / (holding_cost + shortage_cost)
+        result += f"经济订货量(EOQ): {float(policy.eoq):.2f}\n"
+        result += f"年订货次数: {float(policy.order_frequency):.2f}\n"
+        result += f"年总成本: {float(policy.total_cost):.2f}\n"
+        
+        # 如果有提前期，计算安全库存和再订货点
+        if "lead_time" in problem:
+            result += f"\n服务水平: {float(policy.service_level):.2%}\n"
+            result += f"安全库存: {float(policy.safety_stock):.2f}\n"
+            result += f"再订货点: {float(policy.reorder_point):.2f}\n"
             
-            # 计算再订货点
-            daily_demand = demand / 365  # 假设一年365天
-            reorder_point = daily_demand * lead_time
-            
-            result += f"\n再订货点: {reorder_point:.2f}\n"
-            result += f"最优缺货概率: {optimal_shortage_prob:.4f}\n"
+            if "shortage_cost" in problem:
+                # 计算最优缺货概率
+                optimal_shortage_prob = holding_cost / (holding_cost + problem["shortage_cost"])
+                result += f"最优缺货概率: {optimal_shortage_prob:.4f}\n"
+        
+        return result
+    
+    def _catalog_inventory_optimization(self, items: List[Dict[str, Any]], top_n: int = 10) -> str:
+        """目录级库存优化（所有SKU一次向量化计算）"""
+        if not isinstance(items, list) or not items:
+            return "items字段应为非空列表，每项包含 demand、holding_cost、order_cost 等参数"
+        
+        try:
+            policy = inventory_engine.optimize_catalog(items)
+        except (ValueError, KeyError) as e:
+            return f"库存优化参数错误: {str(e)}"
+        
+        frame = policy.to_frame()
+        frame.insert(0, "sku", [item.get("sku", item.get("name", f"SKU-{i+1}")) for i, item in enumerate(items)])
+        
+        result = "目录库存优化结果:\n\n"
+        result += f"SKU数量: {len(frame)}\n"
+        result += f"年总成本合计: {frame['total_cost'].sum():.2f}\n"
+        result += f"安全库存合计: {frame['safety_stock'].sum():.2f}\n\n"
+        result += f"年总成本最高的{min(top_n, len(frame))}个SKU:\n"
+        for row in frame.nlargest(top_n, "total_cost").itertuples(index=False):
+            result += (
+                f"- {row.sku}: EOQ {row.eoq:.2f}, 安全库存 {row.safety_stock:.2f}, "
+                f"再订货点 {row.reorder_point:.2f}, 年总成本 {row.total_cost:.2f}\n"
+            )
         
         return result
     
@@ -492,45 +524,43 @@ class OptimizationEngineTool(BaseTool):
         resources = problem["resources"]
         tasks = problem["tasks"]
         efficiency = problem["efficiency"]
+        maximize = problem.get("objective", "max") != "min"
         
-        # 简单的贪心算法进行资源分配
         n_resources = len(resources)
         n_tasks = len(tasks)
-        
-        # 初始化分配结果
-        allocation = [-1] * n_tasks  # -1表示未分配
-        allocated_resources = set()
-        
-        # 按效率从高到低排序所有可能的分配
-        allocations = []
-        for i in range(n_resources):
-            for j in range(n_tasks):
-                allocations.append((i, j, efficiency[i][j]))
-        
-        allocations.sort(key=lambda x: x[2], reverse=True)
-        
-        # 贪心分配
-        for resource_idx, task_idx, eff in allocations:
-            if resource_idx not in allocated_resources and allocation[task_idx] == -1:
-                allocation[task_idx] = resource_idx
-                allocated_resources.add(resource_idx)
-        
-        # 计算总效率
-        total_efficiency = 0
-        for task_idx, resource_idx in enumerate(allocation):
-            if resource_idx != -1:
-                total_efficiency += efficiency[resource_idx][task_idx]
+        weights, _ = to_weight_matrix(efficiency, n_resources, n_tasks)
+        
+        # 资源/任务容量均为1时使用匈牙利算法，否则使用最小费用流；
+        # 以资源和任务名称为问题标识，效率小幅变化时热启动
+        solution = assignment_solver.solve(
+            efficiency,
+            maximize=maximize,
+            problem_key=(tuple(resources), tuple(tasks)),
+            row_capacity=problem.get("resource_capacity", 1),
+            col_capacity=problem.get("task_capacity", 1),
+            n_rows=n_resources,
+            n_cols=n_tasks
+        )
+        
+        allocation: Dict[int, List[int]] = {}
+        for resource_idx, task_idx in solution.assignments:
+            allocation.setdefault(task_idx, []).append(resource_idx)
         
         result += f"资源数量: {n_resources}\n"
-        result += f"任务数量: {n_tasks}\n\n"
+        result += f"任务数量: {n_tasks}\n"
+        result += f"求解方法: {'匈牙利算法' if solution.method == 'hungarian' else '最小费用流'}\n\n"
         result += "资源分配结果:\n"
-        for task_idx, resource_idx in enumerate(allocation):
-            if resource_idx != -1:
-                result += f"{tasks[task_idx]} -> {resources[resource_idx]} (效率: {efficiency[resource_idx][task_idx]})\n"
+        for task_idx in range(n_tasks):
+            if task_idx in allocation:
+                assigned = ", ".join(
+                    f"{resources[resource_idx]} (效率: {weights[resource_idx, task_idx]:g})"
+                    for resource_idx in allocation[task_idx]
+                )
+                result += f"{tasks[task_idx]} -> {assigned}\n"
             else:
                 result += f"{tasks[task_idx]} -> 未分配\n"
         
-        result += f"\n总效率: {total_efficiency:.2f}\n"
+        result += f"\n总效率: {solution.total_value:.2f}\n"
         
         return result
     
@@ -588,263 +618,30 @@ class RiskAssessmentTool(BaseTool):
     
     def _supplier_risk_assessment(self, data: Dict[str, Any]) -> str:
         """供应商风险评估"""
-        result = "供应商风险评估结果:\n\n"
-        
-        # 提取供应商信息
-        if "suppliers" not in data:
-            return "缺少供应商信息，请提供suppliers字段"
-        
-        suppliers = data["suppliers"]
-        if not isinstance(suppliers, list):
-            return "suppliers字段应为列表格式"
-        
-        # 评估每个供应商
-        risk_scores = []
-        for supplier in suppliers:
-            if "name" not in supplier:
-                continue
-                
-            name = supplier["name"]
-            
-            # 计算风险分数
-            score = 50  # 基础分数
-            
-            # 财务稳定性
-            if "financial_stability" in supplier:
-                financial = supplier["financial_stability"]
-                if financial == "high":
-                    score -= 20
-                elif financial == "medium":
-                    score -= 10
-                elif financial == "low":
-                    score += 20
-            
-            # 交付可靠性
-            if "delivery_reliability" in supplier:
-                reliability = supplier["delivery_reliability"]
-                if reliability >= 0.95:
-                    score -= 15
-                elif reliability >= 0.9:
-                    score -= 5
-                elif reliability >= 0.8:
-                    score += 5
-                else:
-                    score += 15
-            
-            # 质量一致性
-            if "quality_consistency" in supplier:
-                quality = supplier["quality_consistency"]
-                if quality >= 0.98:
-                    score -= 15
-                elif quality >= 0.95:
-                    score -= 5
-                elif quality >= 0.9:
-                    score += 5
-                else:
-                    score += 15
-            
-            # 确保分数在0-100范围内
-            score = max(0, min(100, score))
-            risk_scores.append((name, score))
-        
-        # 按风险分数排序
-        risk_scores.sort(key=lambda x: x[1], reverse=True)
-        
-        # 输出结果
-        result += "供应商风险排名:\n"
-        for i, (name, score) in enumerate(risk_scores):
-            risk_level = "低" if score < 30 else "中" if score < 70 else "高"
-            result += f"{i+1}. {name}: 风险分数 {score:.1f} ({risk_level}风险)\n"
-        
-        # 风险缓解建议
-        result += "\n风险缓解建议:\n"
-        high_risk = [name for name, score in risk_scores if score >= 70]
-        if high_risk:
-            result += f"高风险供应商({', '.join(high_risk)}):\n"
-            result += "- 建议寻找备选供应商\n"
-            result += "- 增加库存缓冲\n"
-            result += "- 加强质量监控\n"
-        
-        medium_risk = [name for name, score in risk_scores if 30 <= score < 70]
-        if medium_risk:
-            result += f"\n中等风险供应商({', '.join(medium_risk)}):\n"
-            result += "- 定期评估供应商表现\n"
-            result += "- 建立供应商发展计划\n"
-            result += "- 考虑部分业务转移\n"
-        
-        return result
+        return self._rule_table_assessment(data, "supplier")
     
     def _logistics_risk_assessment(self, data: Dict[str, Any]) -> str:
         """物流风险评估"""
-        result = "物流风险评估结果:\n\n"
-        
-        # 提取物流信息
-        if "routes" not in data:
-            return "缺少物流路线信息，请提供routes字段"
-        
-        routes = data["routes"]
-        if not isinstance(routes, list):
-            return "routes字段应为列表格式"
-        
-        # 评估每条路线
-        risk_scores = []
-        for route in routes:
-            if "name" not in route:
-                continue
-                
-            name = route["name"]
-            
-            # 计算风险分数
-            score = 50  # 基础分数
-            
-            # 运输距离
-            if "distance" in route:
-                distance = route["distance"]
-                if distance > 1000:
-                    score += 15
-                elif distance > 500:
-                    score += 5
-            
-            # 运输方式
-            if "transport_mode" in route:
-                mode = route["transport_mode"]
-                if mode == "air":
-                    score -= 10  # 空运速度快，风险低
-                elif mode == "sea":
-                    score += 5   # 海运时间长，风险中等
-                elif mode == "road":
-                    score += 10  # 公路运输易受影响
-            
-            # 历史延误率
-            if "delay_rate" in route:
-                delay_rate = route["delay_rate"]
-                if delay_rate < 0.05:
-                    score -= 15
-                elif delay_rate < 0.1:
-                    score -= 5
-                elif delay_rate < 0.2:
-                    score += 5
-                else:
-                    score += 15
-            
-            # 确保分数在0-100范围内
-            score = max(0, min(100, score))
-            risk_scores.append((name, score))
-        
-        # 按风险分数排序
-        risk_scores.sort(key=lambda x: x[1], reverse=True)
-        
-        # 输出结果
-        result += "物流路线风险排名:\n"
-        for i, (name, score) in enumerate(risk_scores):
-            risk_level = "低" if score < 30 else "中" if score < 70 else "高"
-            result += f"{i+1}. {name}: 风险分数 {score:.1f} ({risk_level}风险)\n"
-        
-        # 风险缓解建议
-        result += "\n风险缓解建议:\n"
-        high_risk = [name for name, score in risk_scores if score >= 70]
-        if high_risk:
-            result += f"高风险路线({', '.join(high_risk)}):\n"
-            result += "- 考虑多式联运\n"
-            result += "- 增加运输时间缓冲\n"
-            result += "- 购买运输保险\n"
-        
-        medium_risk = [name for name, score in risk_scores if 30 <= score < 70]
-        if medium_risk:
-            result += f"\n中等风险路线({', '.join(medium_risk)}):\n"
-            result += "- 优化运输计划\n"
-            result += "- 加强物流跟踪\n"
-            result += "- 建立应急计划\n"
-        
-        return result
+        return self._rule_table_assessment(data, "logistics")
     
     def _market_risk_assessment(self, data: Dict[str, Any]) -> str:
         """市场风险评估"""
-        result = "市场风险评估结果:\n\n"
-        
-        # 提取市场信息
-        if "products" not in data:
-            return "缺少产品信息，请提供products字段"
+        return self._rule_table_assessment(data, "market")
+    
+    def _rule_table_assessment(self, data: Dict[str, Any], risk_type: str) -> str:
+        """基于risk_rules.yaml规则表的向量化风险评估"""
+        table = risk_scoring_engine.get_table(risk_type)
         
-        products = data["products"]
-        if not isinstance(products, list):
-            return "products字段应为列表格式"
+        if table.entity_key not in data:
+            return f"缺少{table.entity_label}，请提供{table.entity_key}字段"
         
-        # 评估每个产品
-        risk_scores = []
-        for product in products:
-            if "name" not in product:
-                continue
-                
-            name = product["name"]
-            
-            # 计算风险分数
-            score = 50  # 基础分数
-            
-            # 需求波动性
-            if "demand_volatility" in product:
-                volatility = product["demand_volatility"]
-                if volatility < 0.1:
-                    score -= 20
-                elif volatility < 0.2:
-                    score -= 10
-                elif volatility < 0.3:
-                    score += 0
-                else:
-                    score += 20
-            
-            # 价格波动性
-            if "price_volatility" in product:
-                price_vol = product["price_volatility"]
-                if price_vol < 0.05:
-                    score -= 15
-                elif price_vol < 0.1:
-                    score -= 5
-                elif price_vol < 0.2:
-                    score += 5
-                else:
-                    score += 15
-            
-            # 竞争激烈程度
-            if "competition_level" in product:
-                competition = product["competition_level"]
-                if competition == "low":
-                    score -= 15
-                elif competition == "medium":
-                    score += 0
-                elif competition == "high":
-                    score += 15
-            
-            # 确保分数在0-100范围内
-            score = max(0, min(100, score))
-            risk_scores.append((name, score))
-        
-        # 按风险分数排序
-        risk_scores.sort(key=lambda x: x[1], reverse=True)
-        
-        # 输出结果
-        result += "产品市场风险排名:\n"
-        for i, (name, score) in enumerate(risk_scores):
-            risk_level = "低" if score < 30 else "中" if score < 70 else "高"
-            result += f"{i+1}. {name}: 风险分数 {score:.1f} ({risk_level}风险)\n"
-        
-        # 风险缓解建议
-        result += "\n风险缓解建议:\n"
-        high_risk = [name for name, score in risk_scores if score >= 70]
-        if high_risk:
-            result += f"高风险产品({', '.join(high_risk)}):\n"
-            result += "- 多元化产品组合\n"
-            result += "- 灵活定价策略\n"
-            result += "- 需求预测与监控\n"
-        
-        medium_risk = [name for name, score in risk_scores if 30 <= score < 70]
-        if medium_risk:
-            result += f"\n中等风险产品({', '.join(medium_risk)}):\n"
-            result += "- 市场趋势分析\n"
-            result += "- 竞争对手监控\n"
-            result += "- 库存策略优化\n"
+        entities = data[table.entity_key]
+        if not isinstance(entities, list):
+            return f"{table.entity_key}字段应为列表格式"
         
-        return result
+        entities = [entity for entity in entities if isinstance(entity, dict)]
+        scoring = risk_scoring_engine.score(risk_type, entities)
+        return risk_scoring_engine.format_report(risk_type, scoring)
     
     async def _arun(self, data: str, risk_type: str = "supplier") -> str:
         """异步执行风险评估"""
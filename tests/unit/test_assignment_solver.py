@@ -0,0 +1,129 @@
+"""
+资源分配求解器测试用例
+验证匈牙利算法、最小费用流和热启动的正确性
+"""
+
+import itertools
+import json
+
+import numpy as np
+import pytest
+
+from src.tools.assignment_solver import (
+    AssignmentSolver,
+    solve_assignment,
+    solve_capacitated_assignment,
+    to_weight_matrix
+)
+from src.tools.supply_chain_tools import OptimizationEngineTool
+
+
+def brute_force_best(weights: np.ndarray) -> float:
+    """穷举求最大总效率"""
+    n_rows, n_cols = weights.shape
+    if n_rows <= n_cols:
+        return max(
+            sum(weights[i, perm[i]] for i in range(n_rows))
+            for perm in itertools.permutations(range(n_cols), n_rows)
+        )
+    return max(
+        sum(weights[perm[j], j] for j in range(n_cols))
+        for perm in itertools.permutations(range(n_rows), n_cols)
+    )
+
+
+class TestHungarian:
+    """测试匈牙利算法"""
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_matches_brute_force(self, seed):
+        """随机矩形矩阵的结果与穷举一致"""
+        rng = np.random.default_rng(seed)
+        n_rows, n_cols = rng.integers(1, 6, 2)
+        weights = rng.integers(0, 20, (n_rows, n_cols)).astype(float)
+
+        result = solve_assignment(weights.tolist())
+        assert result.total_value == pytest.approx(brute_force_best(weights))
+        assert len(result.assignments) == min(n_rows, n_cols)
+
+    def test_beats_greedy(self):
+        """贪心会先选0.9，最优解应为两条0.8"""
+        result = solve_assignment([[0.9, 0.8], [0.8, 0.1]])
+        assert result.assignments == [(0, 1), (1, 0)]
+        assert result.total_value == pytest.approx(1.6)
+
+    def test_minimize(self):
+        """最小化代价"""
+        result = solve_assignment([[4, 1, 3], [2, 0, 5], [3, 2, 2]], maximize=False)
+        assert result.total_value == pytest.approx(5)
+
+    def test_forbidden_pairs_are_excluded(self):
+        """None 表示不可分配，结果中不应出现"""
+        result = solve_assignment([[1, None], [None, 2], [3, 4]])
+        weights, mask = to_weight_matrix([[1, None], [None, 2], [3, 4]])
+        assert all(mask[row, col] for row, col in result.assignments)
+        assert result.total_value == pytest.approx(5)
+
+    def test_sparse_entries(self):
+        """稀疏格式输入"""
+        result = solve_assignment({"entries": [[0, 1, 3], [1, 0, 2]]}, n_rows=3, n_cols=2)
+        assert result.shape == (3, 2)
+        assert result.total_value == pytest.approx(5)
+
+    @pytest.mark.parametrize("shape", [(5, 5), (4, 6), (6, 4)])
+    def test_warm_start(self, shape):
+        """矩阵小幅变化后热启动结果仍然最优"""
+        rng = np.random.default_rng(42)
+        weights = rng.integers(0, 20, shape).astype(float)
+        first = solve_assignment(weights)
+
+        changed = weights + rng.integers(-2, 3, shape)
+        warm = solve_assignment(changed, warm_start=first)
+        assert warm.warm_started
+        assert warm.total_value == pytest.approx(brute_force_best(changed))
+
+
+class TestMinCostFlow:
+    """测试容量约束分配"""
+
+    def test_resource_capacity(self):
+        """资源A可承担两个任务"""
+        result = solve_capacitated_assignment([[5, 4, 3], [1, 1, 1]], row_capacity=[2, 1])
+        assert result.method == "min_cost_flow"
+        assert result.assignments == [(0, 0), (0, 1), (1, 2)]
+        assert result.total_value == pytest.approx(10)
+
+    def test_unit_capacity_matches_hungarian(self):
+        """容量为1时与匈牙利算法一致"""
+        rng = np.random.default_rng(7)
+        weights = rng.random((6, 8))
+        assert solve_capacitated_assignment(weights).total_value == pytest.approx(
+            solve_assignment(weights).total_value
+        )
+
+
+class TestAssignmentSolver:
+    """测试求解器和工具集成"""
+
+    def test_problem_key_enables_warm_start(self):
+        solver = AssignmentSolver()
+        solver.solve([[1, 2], [3, 4]], problem_key="demo")
+        assert solver.solve([[1, 2], [3, 5]], problem_key="demo").warm_started
+
+    def test_cache_is_bounded(self):
+        solver = AssignmentSolver(max_cached_problems=2)
+        for key in range(5):
+            solver.solve([[1.0]], problem_key=key)
+        assert len(solver._last_results) == 2
+
+    def test_optimization_engine_resource(self):
+        tool = OptimizationEngineTool()
+        problem = {
+            "resources": ["A", "B"],
+            "tasks": ["x", "y"],
+            "efficiency": [[0.9, 0.8], [0.8, 0.1]]
+        }
+        result = tool._run(json.dumps(problem), "resource")
+        assert "x -> B" in result
+        assert "y -> A" in result
+        assert "总效率: 1.60" in result
@@ -0,0 +1,142 @@
+"""
+缓存批量操作测试用例
+验证 get_many/set_many/delete_many 在 Redis 上合并为单次往返，以及不再逐次 PING
+"""
+
+import pytest
+
+from src.infrastructure.cache.cache_service import MemoryCacheService, RedisCacheService
+from src.infrastructure.cache.tiered_cache import WRITE_BEHIND, TieredCacheService
+
+
+class FakePipeline:
+    """记录命令并在 execute 时一次性执行"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def setex(self, key, seconds, value):
+        self.commands.append((key, seconds, value))
+
+    async def execute(self):
+        self.redis.calls.append("pipeline")
+        for key, seconds, value in self.commands:
+            self.redis.data[key] = value
+            self.redis.expires[key] = seconds
+        return [True] * len(self.commands)
+
+
+class FakeRedis:
+    """最小化的 redis.asyncio 客户端替身，记录每次网络往返"""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.calls = []
+
+    async def ping(self):
+        self.calls.append("ping")
+        return True
+
+    async def get(self, key):
+        self.calls.append("get")
+        return self.data.get(key)
+
+    async def set(self, key, value):
+        self.calls.append("set")
+        self.data[key] = value
+        return True
+
+    async def mget(self, keys):
+        self.calls.append("mget")
+        return [self.data.get(key) for key in keys]
+
+    async def mset(self, mapping):
+        self.calls.append("mset")
+        self.data.update(mapping)
+        return True
+
+    async def delete(self, *keys):
+        self.calls.append("delete")
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def redis_cache():
+    cache = RedisCacheService()
+    cache._redis = FakeRedis()
+    cache._connected = True
+    return cache
+
+
+class TestRedisBatchOperations:
+    """测试 Redis 批量操作"""
+
+    @pytest.mark.asyncio
+    async def test_set_many_and_get_many_single_round_trip(self, redis_cache):
+        values = {f"task:{i}": {"id": i, "status": "pending"} for i in range(50)}
+        assert await redis_cache.set_many(values)
+        result = await redis_cache.get_many(list(values) + ["task:missing"])
+
+        assert result == values
+        assert redis_cache._redis.calls == ["mset", "mget"]
+
+    @pytest.mark.asyncio
+    async def test_set_many_with_expire_uses_pipeline(self, redis_cache):
+        assert await redis_cache.set_many({"a": 1, "b": 2}, expire=60)
+        assert redis_cache._redis.calls == ["pipeline"]
+        assert redis_cache._redis.expires == {"a": 60, "b": 60}
+
+    @pytest.mark.asyncio
+    async def test_delete_many(self, redis_cache):
+        await redis_cache.set_many({"a": 1, "b": 2, "c": 3})
+        assert await redis_cache.delete_many(["a", "b", "x"]) == 2
+        assert await redis_cache.delete_many([]) == 0
+        assert redis_cache._redis.calls == ["mset", "delete"]
+
+    @pytest.mark.asyncio
+    async def test_single_ops_do_not_ping(self, redis_cache):
+        await redis_cache.set("k", "v")
+        assert await redis_cache.get("k") == "v"
+        assert "ping" not in redis_cache._redis.calls
+
+
+class TestDefaultBatchOperations:
+    """测试基类的默认批量实现和二级缓存的批量路径"""
+
+    @pytest.mark.asyncio
+    async def test_memory_cache_batch(self):
+        cache = MemoryCacheService()
+        await cache.set_many({"a": 1, "b": 2}, expire=60)
+        assert await cache.get_many(["a", "b", "c"]) == {"a": 1, "b": 2}
+        assert await cache.delete_many(["a", "c"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_tiered_get_many_queries_l2_once_for_misses(self, redis_cache):
+        tiered = TieredCacheService(l2=redis_cache, invalidation_channel=None)
+        await redis_cache.set_many({"a": 1, "b": 2})
+        await tiered.get("a")
+        redis_cache._redis.calls.clear()
+
+        assert await tiered.get_many(["a", "b", "c"]) == {"a": 1, "b": 2}
+        assert redis_cache._redis.calls == ["mget"]
+        stats = tiered.get_stats()
+        assert (stats["l1_hits"], stats["l2_hits"], stats["misses"]) == (1, 2, 1)
+
+    @pytest.mark.asyncio
+    async def test_write_behind_flush_is_batched(self, redis_cache):
+        tiered = TieredCacheService(l2=redis_cache, write_policy=WRITE_BEHIND, invalidation_channel=None)
+        for i in range(20):
+            await tiered.set(f"msg:{i}", {"i": i}, expire=300)
+        assert await tiered.flush() == 20
+        assert redis_cache._redis.calls == ["pipeline"]
@@ -0,0 +1,91 @@
+"""
+缓存编解码测试用例
+验证头字节分派、无损回退、压缩阈值、pickle开关与旧数据兼容
+"""
+
+import json
+import pickle
+from datetime import datetime
+
+import pytest
+
+from src.infrastructure.cache.codecs import (
+    CODEC_JSON,
+    CODEC_MSGPACK,
+    CODEC_PICKLE,
+    CODEC_TEXT,
+    COMPRESSION_ZLIB,
+    MSGPACK_AVAILABLE,
+    CacheSerializer
+)
+from src.shared.exceptions.exceptions import CacheError
+
+
+def header(data: bytes):
+    assert data[0] == 0xFF
+    return data[1] & 0x07, data[1] >> 3
+
+
+class TestCacheSerializer:
+    """测试缓存编解码"""
+
+    @pytest.mark.parametrize("value", ["库存", b"\x00\x01", 42, 3.5, True, None, {"a": [1, {"b": "c"}]}])
+    def test_round_trip(self, value):
+        serializer = CacheSerializer()
+        decoded = serializer.decode(serializer.encode(value))
+        assert decoded == value and type(decoded) is type(value)
+
+    def test_structured_codec_selection(self):
+        data = CacheSerializer().encode({"sessions": ["s1"]})
+        assert header(data)[0] == (CODEC_MSGPACK if MSGPACK_AVAILABLE else CODEC_JSON)
+        assert header(CacheSerializer(codec="json").encode({"a": 1}))[0] == CODEC_JSON
+        assert header(CacheSerializer().encode("text"))[0] == CODEC_TEXT
+
+    @pytest.mark.parametrize("codec", ["auto", "json"])
+    def test_lossy_values_fall_back_to_pickle(self, codec):
+        serializer = CacheSerializer(codec=codec)
+        value = {"created_at": datetime(2024, 1, 1), "pair": (1, 2), 3: "int key"}
+        data = serializer.encode(value)
+        assert header(data)[0] == CODEC_PICKLE
+        assert serializer.decode(data) == value
+
+    def test_pickle_disabled(self):
+        serializer = CacheSerializer(allow_pickle=False)
+        with pytest.raises(CacheError):
+            serializer.encode({"created_at": datetime(2024, 1, 1)})
+        pickled = CacheSerializer().encode(datetime(2024, 1, 1))
+        with pytest.raises(CacheError):
+            serializer.decode(pickled)
+
+    def test_compression_above_threshold(self):
+        serializer = CacheSerializer(compression="zlib", compress_threshold=100)
+        small = serializer.encode("x" * 10)
+        large = serializer.encode("补货建议" * 200)
+        assert header(small)[1] == 0
+        assert header(large)[1] == COMPRESSION_ZLIB
+        assert len(large) < 200
+        assert serializer.decode(large) == "补货建议" * 200
+        # 未开启压缩的实例也能读取压缩数据
+        assert CacheSerializer().decode(large) == "补货建议" * 200
+
+    def test_legacy_values_still_readable(self):
+        serializer = CacheSerializer()
+        assert serializer.decode(pickle.dumps({"a": 1})) == {"a": 1}
+        assert serializer.decode(json.dumps([1, 2]).encode()) == [1, 2]
+        assert serializer.decode("旧文本".encode("utf-8")) == "旧文本"
+
+    @pytest.mark.parametrize("raw, expected", [
+        (b'\n{"a": 1}', {"a": 1}),
+        (b"\t\xe7\xbc\xa9\xe8\xbf\x9b", "\t缩进"),
+        (b"\x01\x02", "\x01\x02"),
+        (b"\xff\x3f", "\ufffd?"),
+    ])
+    def test_legacy_values_with_control_bytes(self, raw, expected):
+        # 以控制字符开头的旧数据、标记字节后头字节不合法的数据都按旧格式解码
+        assert CacheSerializer().decode(raw) == expected
+
+    def test_invalid_options(self):
+        with pytest.raises(CacheError):
+            CacheSerializer(codec="yaml")
+        with pytest.raises(CacheError):
+            CacheSerializer(compression="brotli")
@@ -0,0 +1,315 @@
+"""
+核心服务查询测试用例
+验证消息、会话、任务的列表查询下推到数据库，缓存按实体分键并维护二级索引
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from src.core.domain.message_model import MessageType
+from src.core.domain.session_model import SessionStatus
+from src.core.domain.task_model import TaskPriority, TaskResult, TaskStatus
+from src.core.services import MessageService, SessionService, TaskService
+from src.infrastructure.cache.cache_service import MemoryCacheService
+
+
+class FakeDatabase:
+    """内存数据库替身，方法签名与 DatabaseService 一致，select 按条件过滤并记录调用"""
+
+    def __init__(self):
+        self.tables = {}
+        self.selects = []
+        self.transactions = 0
+
+    async def insert(self, table, data):
+        self.tables.setdefault(table, {})[data["id"]] = dict(data)
+        return data["id"]
+
+    async def update(self, table, data, where):
+        rows = self._match(table, where)
+        for row in rows:
+            row.update(data)
+        return len(rows)
+
+    async def delete(self, table, where):
+        rows = self._match(table, where)
+        for row in rows:
+            del self.tables[table][row["id"]]
+        return len(rows)
+
+    def _match(self, table, where, exclude=None):
+        def value(row, column):
+            item = row.get(column)
+            return getattr(item, "value", item)
+
+        return [
+            row for row in self.tables.get(table, {}).values()
+            if all(value(row, k) == v for k, v in (where or {}).items())
+            and all(value(row, k) != v for k, v in (exclude or {}).items())
+        ]
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.transactions += 1
+        yield
+
+    async def select(self, table, where=None, order_by=None, descending=False, limit=None, exclude=None):
+        self.selects.append({"table": table, "where": where, "order_by": order_by,
+                             "descending": descending, "limit": limit, "exclude": exclude})
+        rows = self._match(table, where, exclude)
+        if order_by:
+            rows.sort(key=lambda row: row[order_by], reverse=descending)
+        return rows[:limit] if limit is not None else rows
+
+
+@pytest.fixture
+def db():
+    return FakeDatabase()
+
+
+@pytest.fixture
+def cache():
+    return MemoryCacheService()
+
+
+class TestMessageServiceQueries:
+    """测试消息查询"""
+
+    @pytest.mark.asyncio
+    async def test_messages_by_session_uses_index(self, db, cache):
+        service = MessageService(db, cache)
+        for i in range(3):
+            await service.create_message("s1", f"m{i}", MessageType.USER)
+        await service.create_message("s2", "other", MessageType.USER)
+
+        messages = await service.get_messages_by_session("s1")
+        assert [m.content for m in messages] == ["m0", "m1", "m2"]
+        assert db.selects[-1]["where"] == {"session_id": "s1"}
+
+        # 第二次命中二级索引，不再查询数据库
+        db.selects.clear()
+        assert len(await service.get_messages_by_session("s1")) == 3
+        assert db.selects == []
+
+        # 新消息使会话索引失效，下次查询从数据库重建，其他会话的索引不受影响
+        await service.get_messages_by_session("s2")
+        await service.create_message("s1", "m3", MessageType.AGENT)
+        db.selects.clear()
+        assert [m.content for m in await service.get_messages_by_session("s1")][-1] == "m3"
+        assert len(db.selects) == 1
+        assert len(await service.get_messages_by_session("s2")) == 1
+        assert len(db.selects) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_creates_do_not_lose_index_entries(self, db, cache):
+        service = MessageService(db, cache)
+        await service.get_messages_by_session("s1")
+        await asyncio.gather(*(service.create_message("s1", f"m{i}", MessageType.USER) for i in range(20)))
+        assert len(await service.get_messages_by_session("s1")) == 20
+
+    @pytest.mark.asyncio
+    async def test_conversation_pushes_limit_and_filter(self, db, cache):
+        service = MessageService(db, cache)
+        await service.create_message("s1", "sys", MessageType.SYSTEM)
+        for i in range(5):
+            await service.create_message("s1", f"m{i}", MessageType.USER)
+
+        messages = await service.get_conversation("s1", limit=2, include_system=False)
+        assert [m.content for m in messages] == ["m3", "m4"]
+        query = db.selects[-1]
+        assert query["limit"] == 2 and query["descending"] is True
+        assert query["exclude"] == {"type": "system"}
+
+    @pytest.mark.asyncio
+    async def test_status_update_keeps_index(self, db, cache):
+        service = MessageService(db, cache)
+        message = await service.create_message("s1", "hello", MessageType.USER)
+        await service.get_messages_by_session("s1")
+        db.selects.clear()
+
+        assert await service.read_message(message.id)
+        messages = await service.get_messages_by_session("s1")
+        assert messages[0].status.value == "read"
+        assert db.selects == []
+
+    @pytest.mark.asyncio
+    async def test_thread_and_delete(self, db, cache):
+        service = MessageService(db, cache)
+        root = await service.create_message("s1", "q", MessageType.USER)
+        reply = await service.create_message("s1", "a", MessageType.AGENT, parent_id=root.id)
+        thread = await service.get_message_thread(reply.id)
+        assert [m.id for m in thread] == [root.id, reply.id]
+
+        assert await service.delete_messages_by_session("s1") == 2
+        assert db.tables["messages"] == {}
+        assert await service.get_message(root.id) is None
+        assert await service.get_messages_by_session("s1") == []
+
+
+class TestSessionServiceQueries:
+    """测试会话查询"""
+
+    @pytest.mark.asyncio
+    async def test_sessions_by_user_and_agent(self, db, cache):
+        service = SessionService(db, cache)
+        await service.create_session("a", "u1", "agent1")
+        await service.create_session("b", "u1", "agent2")
+        await service.create_session("c", "u2", "agent1")
+
+        assert [s.title for s in await service.get_sessions_by_user("u1")] == ["a", "b"]
+        assert [s.title for s in await service.get_sessions_by_agent("agent1")] == ["a", "c"]
+        assert db.selects[0]["where"] == {"user_id": "u1"}
+
+        session = (await service.get_sessions_by_user("u2"))[0]
+        assert session.context.user_id == "u2"
+
+    @pytest.mark.asyncio
+    async def test_delete_session_removes_messages_in_one_transaction(self, db, cache):
+        messages = MessageService(db, cache)
+        service = SessionService(db, cache, message_service=messages)
+        session = await service.create_session("a", "u1", "agent1")
+        other = await service.create_session("b", "u1", "agent1")
+        message = await messages.create_message(session.id, "hi", MessageType.USER)
+        await messages.create_message(other.id, "keep", MessageType.USER)
+
+        assert await service.delete_session(session.id)
+        # 外层事务 + 删除消息的嵌套事务
+        assert db.transactions == 2
+        assert await service.get_session(session.id) is None
+        assert await messages.get_message(message.id) is None
+        assert [m.content for m in await messages.get_messages_by_session(other.id)] == ["keep"]
+
+    @pytest.mark.asyncio
+    async def test_active_sessions_filtered_in_database(self, db, cache):
+        service = SessionService(db, cache)
+        first = await service.create_session("a", "u1", "agent1")
+        await service.create_session("b", "u1", "agent1")
+        assert await service.close_session(first.id)
+
+        active = await service.get_active_sessions("u1")
+        assert [s.title for s in active] == ["b"]
+        assert db.selects[-1]["where"] == {"status": "active", "user_id": "u1"}
+        assert (await service.get_session(first.id)).status == SessionStatus.CLOSED
+
+
+class TestTaskServiceQueries:
+    """测试任务查询"""
+
+    @pytest.mark.asyncio
+    async def test_status_index_invalidated_on_transition(self, db, cache):
+        service = TaskService(db, cache)
+        task = await service.create_task("t1", "d", "agent1")
+        await service.create_task("t2", "d", "agent1", priority=TaskPriority.URGENT)
+
+        assert len(await service.get_tasks_by_status(TaskStatus.PENDING)) == 2
+        assert await service.start_task(task.id)
+        assert [t.title for t in await service.get_tasks_by_status(TaskStatus.PENDING)] == ["t2"]
+        assert [t.title for t in await service.get_tasks_by_status(TaskStatus.RUNNING)] == ["t1"]
+
+        assert await service.complete_task(task.id, TaskResult(success=True))
+        assert db.transactions == 2
+        assert not await service.complete_task(task.id, TaskResult(success=True))
+        assert await service.get_tasks_by_status(TaskStatus.RUNNING) == []
+        assert len(await service.get_tasks_by_agent("agent1")) == 2
+
+    @pytest.mark.asyncio
+    async def test_pending_tasks_for_agent(self, db, cache):
+        service = TaskService(db, cache)
+        await service.create_task("low", "d", "agent1", priority=TaskPriority.LOW)
+        await service.create_task("urgent", "d", "agent1", priority=TaskPriority.URGENT)
+        await service.create_task("other", "d", "agent2")
+
+        tasks = await service.get_pending_tasks("agent1")
+        assert [t.title for t in tasks] == ["urgent", "low"]
+        assert db.selects[-1]["where"] == {"status": "pending", "agent_id": "agent1"}
+
+
+@asynccontextmanager
+async def open_sqlite(path):
+    """带 sessions/tasks 表的真实 SQLite 服务"""
+    pytest.importorskip("aiosqlite")
+    from src.infrastructure.database.database_service import SQLiteService
+
+    service = SQLiteService(str(path))
+    try:
+        await service.execute(
+            "CREATE TABLE sessions (id TEXT PRIMARY KEY, title TEXT, context TEXT, status TEXT, "
+            "created_at TIMESTAMP, updated_at TIMESTAMP, last_activity TIMESTAMP, user_id TEXT, agent_id TEXT)"
+        )
+        await service.execute(
+            "CREATE TABLE tasks (id TEXT PRIMARY KEY, title TEXT, description TEXT, agent_id TEXT, status TEXT, "
+            "priority TEXT, input_data TEXT, result TEXT, created_at TIMESTAMP, updated_at TIMESTAMP, "
+            "started_at TIMESTAMP, completed_at TIMESTAMP)"
+        )
+        await service.execute(
+            "CREATE TABLE messages (id TEXT PRIMARY KEY, session_id TEXT, content TEXT, type TEXT, status TEXT, "
+            "metadata TEXT, parent_id TEXT, created_at TIMESTAMP, updated_at TIMESTAMP)"
+        )
+        yield service
+    finally:
+        await service.disconnect()
+
+
+class TestSQLiteRoundTrip:
+    """会话和任务经真实 SQLiteService 写入再读回"""
+
+    @pytest.mark.asyncio
+    async def test_session_round_trip(self, tmp_path, cache):
+        async with open_sqlite(tmp_path / "sessions.db") as sqlite:
+            service = SessionService(sqlite, cache)
+            session = await service.create_session("会话", "u1", "agent1", metadata={"source": "web"})
+            assert await service.update_session_context(session.id, {"step": 2})
+            await cache.flushdb()
+
+            loaded = await service.get_session(session.id)
+            assert loaded.status == SessionStatus.ACTIVE
+            assert loaded.context.user_id == "u1"
+            assert loaded.context.metadata == {"source": "web"}
+            assert [s.id for s in await service.get_sessions_by_user("u1")] == [session.id]
+            assert await service.close_session(session.id)
+            assert (await service.get_active_sessions("u1")) == []
+
+    @pytest.mark.asyncio
+    async def test_task_round_trip(self, tmp_path, cache):
+        async with open_sqlite(tmp_path / "tasks.db") as sqlite:
+            service = TaskService(sqlite, cache)
+            task = await service.create_task("任务", "d", "agent1", TaskPriority.HIGH, {"sku": "A1"})
+            assert await service.start_task(task.id)
+            assert await service.complete_task(task.id, TaskResult(success=True, data={"qty": 3}))
+            await cache.flushdb()
+
+            loaded = await service.get_task(task.id)
+            assert loaded.status == TaskStatus.COMPLETED
+            assert loaded.priority == TaskPriority.HIGH
+            assert loaded.input_data == {"sku": "A1"}
+            assert loaded.result == TaskResult(success=True, data={"qty": 3})
+            assert [t.id for t in await service.get_tasks_by_status(TaskStatus.COMPLETED)] == [task.id]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_transitions_apply_once(self, tmp_path, cache):
+        async with open_sqlite(tmp_path / "transitions.db") as sqlite:
+            service = TaskService(sqlite, cache)
+            task = await service.create_task("任务", "d", "agent1")
+            assert await service.start_task(task.id)
+
+            results = await asyncio.gather(
+                service.complete_task(task.id, TaskResult(success=True)),
+                service.fail_task(task.id, "超时"),
+                service.cancel_task(task.id),
+            )
+            assert results.count(True) == 1
+
+    @pytest.mark.asyncio
+    async def test_delete_session_cascades_in_sqlite(self, tmp_path, cache):
+        async with open_sqlite(tmp_path / "cascade.db") as sqlite:
+            messages = MessageService(sqlite, cache, write_behind=True, flush_interval=60)
+            service = SessionService(sqlite, cache, message_service=messages)
+            session = await service.create_session("会话", "u1", "agent1")
+            await messages.create_message(session.id, "hi", MessageType.USER)
+
+            assert await service.delete_session(session.id)
+            assert await sqlite.select("messages") == []
+            assert await sqlite.select("sessions") == []
+            await messages.close()
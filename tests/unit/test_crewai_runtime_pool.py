@@ -0,0 +1,174 @@
+"""
+CrewAI 运行时池测试
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.interfaces import crewai_runtime
+from src.interfaces.crewai_runtime import CrewAIRuntime, CrewAIRuntimePool
+
+
+def make_config(name="研究团队", task="分析市场"):
+    return {
+        "crewai_config": {
+            "name": name,
+            "description": "测试团队",
+            "agents": [{"role": "研究员", "goal": "研究", "backstory": "资深研究员"}],
+            "tasks": [{"description": task, "expected_output": "报告", "agent": "研究员"}],
+        }
+    }
+
+
+class FakeCrew:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.kickoffs = 0
+        self.usage_metrics = None
+        self.execution_logs = []
+
+    def kickoff(self, inputs):
+        if self.fail:
+            raise RuntimeError("LLM 不可用")
+        self.kickoffs += 1
+        self.usage_metrics = {"total_tokens": 100}
+        self.execution_logs.append(inputs)
+        return f"结果: {inputs['query']}"
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """用假团队替换 create_crew，记录构建次数"""
+    built = []
+
+    def fake_create_crew(self):
+        self.agents = [SimpleNamespace(backstory="资深研究员[旧时间]")]
+        self._backstories = ["资深研究员"]
+        self.tasks = [SimpleNamespace(output="上次输出", used_tools=3, tools_errors=1, processed_by_agents={"研究员"})]
+        self._tools = [SimpleNamespace(current_usage_count=2)]
+        self.crew = FakeCrew(fail=self.config_data["crewai_config"]["name"] == "失败团队")
+        built.append(self)
+        return True
+
+    monkeypatch.setattr(CrewAIRuntime, "create_crew", fake_create_crew)
+    return built
+
+
+class TestCrewAIRuntimePool:
+    """运行时池测试"""
+
+    def test_reuses_runtime_for_same_config(self, builds):
+        pool = CrewAIRuntimePool(max_size=4)
+
+        for query in ("第一次", "第二次", "第三次"):
+            with pool.lease(make_config()) as runtime:
+                assert runtime.run_crew(query, save_result=False) == f"结果: {query}"
+
+        assert len(builds) == 1
+        assert builds[0].crew.kickoffs == 3
+        stats = pool.get_stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 2
+        assert stats["idle"] == 1
+
+    def test_config_key_ignores_key_order(self):
+        config = make_config()
+        reordered = {"crewai_config": dict(reversed(list(config["crewai_config"].items())))}
+        assert CrewAIRuntimePool.config_key(config) == CrewAIRuntimePool.config_key(reordered)
+        assert CrewAIRuntimePool.config_key(config) != CrewAIRuntimePool.config_key(make_config(task="写报告"))
+
+    def test_reset_run_state_between_leases(self, builds):
+        pool = CrewAIRuntimePool()
+        with pool.lease(make_config()) as runtime:
+            runtime.run_crew("第一次", save_result=False)
+
+        with pool.lease(make_config()) as reused:
+            assert reused is runtime
+            task = reused.tasks[0]
+            assert task.output is None
+            assert task.used_tools == 0
+            assert task.tools_errors == 0
+            assert task.processed_by_agents == set()
+            # 没有的字段不会被添加
+            assert not hasattr(task, "retry_count")
+            assert reused.crew.usage_metrics is None
+            assert reused.crew.execution_logs == []
+            assert reused._tools[0].current_usage_count == 0
+
+    def test_reset_refreshes_time_on_real_agent(self, monkeypatch):
+        from crewai import Agent
+
+        def create_crew(self):
+            llm = crewai_runtime.get_crewai_llm("openai/m", 0.7, 100, "k", "http://llm.test")
+            self.agents = [Agent(role="研究员", goal="研究", backstory="资深研究员[第一次]", llm=llm, verbose=False)]
+            self._backstories = ["资深研究员"]
+            self.tasks = []
+            self._tools = []
+            self.crew = None
+            return True
+
+        monkeypatch.setattr(CrewAIRuntime, "create_crew", create_crew)
+        runtime = CrewAIRuntime()
+        runtime.create_crew()
+        agent = runtime.agents[0]
+        # 第一次 kickoff 时 CrewAI 记下原始背景并据此插值
+        agent.interpolate_inputs({"query": "第一次"})
+
+        monkeypatch.setattr(crewai_runtime, "build_time_context", lambda: "[第二次]")
+        runtime.reset_run_state()
+        agent.interpolate_inputs({"query": "第二次"})
+        assert agent.backstory == "资深研究员[第二次]"
+
+    def test_concurrent_leases_use_separate_runtimes(self, builds):
+        pool = CrewAIRuntimePool()
+        with pool.lease(make_config()) as first:
+            with pool.lease(make_config()) as second:
+                assert first is not second
+        assert pool.get_stats()["idle"] == 2
+
+    def test_lru_eviction(self, builds):
+        pool = CrewAIRuntimePool(max_size=2)
+        for name in ("A", "B"):
+            with pool.lease(make_config(name)):
+                pass
+        with pool.lease(make_config("A")):
+            pass
+        with pool.lease(make_config("C")):
+            pass
+
+        stats = pool.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["idle"] == 2
+        with pool.lease(make_config("B")):
+            pass
+        assert len(builds) == 4
+
+    def test_failed_runs_are_discarded(self, builds):
+        pool = CrewAIRuntimePool()
+        with pool.lease(make_config("失败团队")) as runtime:
+            assert runtime.run_crew("查询", save_result=False) is None
+        assert pool.get_stats()["idle"] == 0
+
+        with pytest.raises(ValueError):
+            with pool.lease(make_config()):
+                raise ValueError("中断")
+        assert pool.get_stats()["idle"] == 0
+
+    def test_build_failure_yields_none(self, monkeypatch):
+        monkeypatch.setattr(CrewAIRuntime, "create_crew", lambda self: False)
+        pool = CrewAIRuntimePool()
+        with pool.lease(make_config()) as runtime:
+            assert runtime is None
+        assert pool.get_stats()["build_failures"] == 1
+        assert pool.get_stats()["idle"] == 0
+
+
+class TestCrewAILLMCache:
+    """LLM 客户端缓存测试"""
+
+    def test_same_parameters_share_client(self, monkeypatch):
+        monkeypatch.setattr(crewai_runtime, "_llm_cache", {})
+        first = crewai_runtime.get_crewai_llm("openai/m", 0.7, 100, "k", "http://llm.test")
+        assert crewai_runtime.get_crewai_llm("openai/m", 0.7, 100, "k", "http://llm.test") is first
+        assert crewai_runtime.get_crewai_llm("openai/other", 0.7, 100, "k", "http://llm.test") is not first
@@ -0,0 +1,152 @@
+"""
+数据库批量写入测试用例
+验证 insert_many/upsert_many 的分批、SQLite 的批量事务和 PostgreSQL 的 COPY 路径
+"""
+
+from contextlib import asynccontextmanager
+
+import pytest
+
+from src.infrastructure.database.database_service import PostgreSQLService, SQLiteService
+from src.shared.exceptions.exceptions import DatabaseError
+
+
+@asynccontextmanager
+async def open_sqlite(tmp_path):
+    pytest.importorskip("aiosqlite")
+    service = SQLiteService(str(tmp_path / "bulk.db"), batch_size=100)
+    try:
+        await service.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, qty INTEGER)")
+        yield service
+    finally:
+        await service.disconnect()
+
+
+class TestSQLiteBulk:
+    """测试 SQLite 批量写入"""
+
+    @pytest.mark.asyncio
+    async def test_insert_many_in_batches(self, tmp_path):
+        async with open_sqlite(tmp_path) as sqlite:
+            calls = []
+            execute_many = sqlite.execute_many
+
+            async def counting(query, params_list):
+                calls.append(len(params_list))
+                return await execute_many(query, params_list)
+
+            sqlite.execute_many = counting
+            rows = [{"id": i, "name": f"sku-{i}", "qty": i} for i in range(250)]
+            assert await sqlite.insert_many("items", rows) == 250
+            assert calls == [100, 100, 50]
+            assert len(await sqlite.select("items")) == 250
+
+    @pytest.mark.asyncio
+    async def test_upsert_many(self, tmp_path):
+        async with open_sqlite(tmp_path) as sqlite:
+            await sqlite.insert_many("items", [{"id": 1, "name": "a", "qty": 1}])
+            rows = [{"id": 1, "name": "a", "qty": 5}, {"id": 2, "name": "b", "qty": 2}]
+            assert await sqlite.upsert_many("items", rows, ["id"]) == 2
+
+            items = await sqlite.select("items", order_by="id")
+            assert [(item["id"], item["qty"]) for item in items] == [(1, 5), (2, 2)]
+
+            await sqlite.upsert_many("items", [{"id": 1, "name": "x", "qty": 9}], ["id"], update_columns=[])
+            assert (await sqlite.select("items", {"id": 1}))[0]["name"] == "a"
+
+    @pytest.mark.asyncio
+    async def test_rows_must_share_columns(self, tmp_path):
+        async with open_sqlite(tmp_path) as sqlite:
+            with pytest.raises(DatabaseError):
+                await sqlite.insert_many("items", [{"id": 1, "name": "a"}, {"id": 2}])
+
+    @pytest.mark.asyncio
+    async def test_rejects_unsafe_identifiers(self, tmp_path):
+        async with open_sqlite(tmp_path) as sqlite:
+            with pytest.raises(DatabaseError):
+                await sqlite.insert_many("items; DROP TABLE items", [{"id": 1}])
+
+
+class FakeTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def start(self):
+        self.conn.log.append("BEGIN")
+
+    async def commit(self):
+        self.conn.log.append("COMMIT")
+
+    async def rollback(self):
+        self.conn.log.append("ROLLBACK")
+
+    async def __aenter__(self):
+        await self.start()
+
+    async def __aexit__(self, exc_type, *exc):
+        await (self.rollback() if exc_type else self.commit())
+        return False
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.log.append(("copy", table, tuple(columns), len(records)))
+
+    async def executemany(self, query, args):
+        self.log.append(("executemany", query, len(args)))
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+
+    async def acquire(self):
+        return self.conn
+
+    async def release(self, conn):
+        pass
+
+
+@pytest.fixture
+def postgres():
+    service = PostgreSQLService("localhost", 5432, "test", "user", "pw", batch_size=100)
+    service._pool = FakePool()
+    service._connected = True
+    return service
+
+
+class TestPostgreSQLBulk:
+    """测试 PostgreSQL 批量写入"""
+
+    @pytest.mark.asyncio
+    async def test_insert_many_uses_copy_in_one_transaction(self, postgres):
+        rows = [{"id": i, "name": f"sku-{i}"} for i in range(250)]
+        assert await postgres.insert_many("items", rows) == 250
+
+        log = postgres._pool.conn.log
+        assert log[0] == "BEGIN" and log[-1] == "COMMIT"
+        assert [entry[3] for entry in log[1:-1]] == [100, 100, 50]
+        assert log[1][:3] == ("copy", "items", ("id", "name"))
+
+    @pytest.mark.asyncio
+    async def test_insert_many_without_copy(self, postgres):
+        postgres.use_copy = False
+        await postgres.insert_many("items", [{"id": 1, "name": "a"}])
+        entry = [e for e in postgres._pool.conn.log if isinstance(e, tuple)][0]
+        assert entry[0] == "executemany"
+        assert entry[1] == "INSERT INTO items (id, name) VALUES ($1, $2)"
+
+    @pytest.mark.asyncio
+    async def test_upsert_many_sql(self, postgres):
+        await postgres.upsert_many("items", [{"id": 1, "name": "a"}], ["id"])
+        entry = [e for e in postgres._pool.conn.log if isinstance(e, tuple)][0]
+        assert entry[1] == (
+            "INSERT INTO items (id, name) VALUES ($1, $2) "
+            "ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name"
+        )
@@ -0,0 +1,83 @@
+"""
+事件总线测试用例
+验证环形缓冲区的顺序、溢出丢弃、flush，以及流式处理器的异步渲染
+"""
+
+import threading
+import time
+
+from langchain_core.agents import AgentAction
+
+from src.agents.shared.streaming_handler import SimpleStreamingHandler
+from src.interfaces.events.event_bus import EventBus
+
+
+class TestEventBus:
+    """测试事件总线"""
+
+    def test_events_delivered_in_order(self):
+        bus = EventBus(capacity=16)
+        received = []
+        bus.subscribe(lambda event: received.append(event.payload["i"]))
+        for i in range(10):
+            assert bus.publish("tick", i=i)
+        assert bus.flush(timeout=2)
+        assert received == list(range(10))
+
+    def test_overflow_drops_instead_of_blocking(self):
+        bus = EventBus(capacity=4)
+        release = threading.Event()
+        bus.subscribe(lambda event: release.wait(2))
+
+        start = time.perf_counter()
+        results = [bus.publish("tick", i=i) for i in range(20)]
+        assert time.perf_counter() - start < 0.5
+        assert not all(results)
+        assert bus.get_stats()["dropped"] == results.count(False)
+
+        release.set()
+        assert bus.flush(timeout=2)
+
+    def test_failing_subscriber_does_not_stop_others(self):
+        bus = EventBus()
+        received = []
+
+        def broken(event):
+            raise RuntimeError("boom")
+
+        bus.subscribe(broken)
+        bus.subscribe(lambda event: received.append(event.type))
+        bus.publish("a")
+        bus.publish("b")
+        assert bus.flush(timeout=2)
+        assert received == ["a", "b"]
+
+    def test_closed_bus_rejects_events(self):
+        bus = EventBus()
+        bus.close()
+        assert bus.publish("late") is False
+
+
+class TestBufferedStreamingHandler:
+    """测试处理器通过总线渲染"""
+
+    def test_console_output_rendered_before_chain_end_returns(self, capsys):
+        handler = SimpleStreamingHandler()
+        handler.on_chain_start({}, {"input": "库存查询"})
+        handler.on_agent_action(AgentAction("calculator", "1+1", "Action: calculator"))
+        handler.on_tool_end("2")
+        handler.on_chain_end({"output": "2"})
+
+        output = capsys.readouterr().out
+        assert output.index("📥 问题: 库存查询") < output.index("🔢 工具: calculator") < output.index("✅ 执行完成")
+        assert "📝 参数: 1+1" in output
+        assert handler.step_count == 1
+
+    def test_shared_bus_feeds_extra_consumers(self):
+        bus = EventBus()
+        logged = []
+        bus.subscribe(lambda event: logged.append(event.type))
+        handler = SimpleStreamingHandler(event_bus=bus)
+        handler.on_tool_error(ValueError("x"))
+        handler.on_chain_end({})
+        assert logged == ["tool_error", "chain_end"]
@@ -0,0 +1,115 @@
+"""
+库存优化引擎测试用例
+验证向量化EOQ/安全库存计算、多级网络汇总与库存分配
+"""
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.tools.inventory_engine import (
+    allocate_stock,
+    compute_inventory_policy,
+    echelon_totals,
+    inventory_engine,
+    service_level_z
+)
+from src.tools.supply_chain_tools import OptimizationEngineTool
+
+
+class TestInventoryPolicy:
+    """测试库存策略计算"""
+
+    def test_eoq_matches_closed_form(self):
+        policy = compute_inventory_policy(1000, 2, 50)
+        assert float(policy.eoq) == pytest.approx(math.sqrt(2 * 1000 * 50 / 2))
+        assert float(policy.total_cost) == pytest.approx(447.2136, rel=1e-4)
+
+    def test_safety_stock_uses_demand_and_lead_time_variance(self):
+        policy = compute_inventory_policy(
+            365, 1, 10, lead_time=4, demand_std=2, lead_time_std=1, service_level=0.95
+        )
+        expected = service_level_z(0.95) * math.sqrt(4 * 2 ** 2 + 1 ** 2 * 1 ** 2)
+        assert float(policy.safety_stock) == pytest.approx(float(expected))
+        assert float(policy.reorder_point) == pytest.approx(4 + float(expected))
+
+    def test_shortage_cost_sets_service_level(self):
+        policy = compute_inventory_policy(1000, 1, 10, shortage_cost=9)
+        assert float(policy.service_level) == pytest.approx(0.9)
+
+    def test_vectorized_matches_scalar(self):
+        rng = np.random.default_rng(1)
+        demand = rng.integers(100, 1000, 50).astype(float)
+        batch = compute_inventory_policy(demand, 2, 30, lead_time=5, demand_std=1)
+        for i in (0, 17, 49):
+            single = compute_inventory_policy(demand[i], 2, 30, lead_time=5, demand_std=1)
+            assert batch.total_cost[i] == pytest.approx(float(single.total_cost))
+
+    def test_invalid_holding_cost(self):
+        with pytest.raises(ValueError):
+            compute_inventory_policy([100, 200], [1, 0], 10)
+
+
+class TestCatalog:
+    """测试目录级优化"""
+
+    def test_catalog_with_missing_fields(self):
+        catalog = pd.DataFrame({
+            "demand": [1000, 50],
+            "holding_cost": [2, 1],
+            "order_cost": [50, 5],
+            "lead_time": [7, np.nan],
+            "demand_std": [2, np.nan],
+            "service_level": [np.nan, 0.99],
+        })
+        policy = inventory_engine.optimize_catalog(catalog)
+        assert len(policy) == 2
+        assert policy.service_level.tolist() == [0.95, 0.99]
+        assert policy.safety_stock[1] == 0
+
+    def test_missing_required_column(self):
+        with pytest.raises(ValueError):
+            inventory_engine.optimize_catalog([{"demand": 1}])
+
+
+class TestMultiEchelon:
+    """测试多级库存网络"""
+
+    def test_echelon_totals(self):
+        # 0: 区域仓, 1-2: 配送中心, 3-5: 门店
+        parent = [-1, 0, 0, 1, 1, 2]
+        totals = echelon_totals(parent, [0, 0, 0, 10, 20, 30])
+        assert totals.tolist() == [60, 30, 30, 10, 20, 30]
+
+    def test_cycle_detection(self):
+        with pytest.raises(ValueError):
+            echelon_totals([1, 0], [1, 1])
+
+    def test_allocate_stock_fair_share(self):
+        allocation = allocate_stock([0, 0, 1], [30, 10, 5], [20, 100])
+        assert allocation.tolist() == pytest.approx([15, 5, 5])
+
+    def test_network_pools_variance(self):
+        network = inventory_engine.optimize_network(
+            [-1, 0, 0], [0, 100, 200], 1, 10, lead_time=2, demand_std=[0, 3, 4], on_hand=[50, 0, 0]
+        )
+        assert network.echelon_demand.tolist() == [300, 100, 200]
+        assert network.echelon_demand_std[0] == pytest.approx(5)
+        assert network.allocation[1:].sum() == pytest.approx(50)
+
+
+class TestOptimizationEngineInventory:
+    """测试工具集成"""
+
+    def test_catalog_mode(self):
+        tool = OptimizationEngineTool()
+        items = [
+            {"sku": "A", "demand": 1000, "holding_cost": 2, "order_cost": 50},
+            {"sku": "B", "demand": 50, "holding_cost": 1, "order_cost": 5},
+        ]
+        result = tool._run(json.dumps({"items": items}), "inventory")
+        assert "SKU数量: 2" in result
+        assert "- A: EOQ 223.61" in result
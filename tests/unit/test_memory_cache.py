@@ -0,0 +1,98 @@
+"""
+内存缓存测试用例
+验证LRU淘汰、条目数和字节数上限、TTL过期与统计信息
+"""
+
+import pytest
+
+from src.infrastructure.cache import cache_service as cache_module
+from src.infrastructure.cache.cache_service import CacheServiceFactory, MemoryCacheService
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module.time, "time", fake.time)
+    return fake
+
+
+class TestMemoryCacheService:
+    """测试内存缓存"""
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_by_entries(self):
+        cache = MemoryCacheService(max_entries=2)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        assert await cache.get("a") == 1  # a 变为最近使用
+        await cache.set("c", 3)
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == 1
+        assert await cache.get("c") == 3
+        assert cache.get_stats()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_eviction_by_bytes(self):
+        cache = MemoryCacheService(max_bytes=2000)
+        for i in range(10):
+            await cache.set(f"k{i}", "x" * 500)
+        stats = cache.get_stats()
+        assert stats["bytes"] <= 2000
+        assert stats["entries"] < 10
+        assert await cache.get("k9") is not None
+
+        assert await cache.set("huge", "x" * 5000) is False
+        assert await cache.exists("huge") is False
+
+    @pytest.mark.asyncio
+    async def test_ttl_expiry_is_lazy_and_periodic(self, clock):
+        cache = MemoryCacheService(sweep_interval=10)
+        await cache.set("short", "v", expire=5)
+        await cache.set("other", "v", expire=5)
+        await cache.set("forever", "v")
+        assert await cache.ttl("short") == 5
+
+        clock.now += 6
+        assert await cache.get("short") is None
+        assert await cache.ttl("forever") == -1
+
+        clock.now += 10
+        await cache.get("forever")  # 触发周期清理
+        stats = cache.get_stats()
+        assert stats["entries"] == 1
+        assert stats["expirations"] == 2
+
+    @pytest.mark.asyncio
+    async def test_overwrite_clears_previous_ttl(self, clock):
+        cache = MemoryCacheService()
+        await cache.set("k", "old", expire=5)
+        await cache.set("k", "new")
+        clock.now += 10
+        assert cache.purge_expired() == 0
+        assert await cache.get("k") == "new"
+
+    @pytest.mark.asyncio
+    async def test_keys_skip_expired(self, clock):
+        cache = MemoryCacheService()
+        await cache.set("user:1", 1, expire=1)
+        await cache.set("user:2", 2)
+        await cache.set("order:1", 3)
+        clock.now += 2
+        assert await cache.keys("user:*") == ["user:2"]
+        assert await cache.keys("order:1") == ["order:1"]
+        assert sorted(await cache.keys()) == ["order:1", "user:2"]
+
+    def test_factory_reads_limits(self):
+        cache = CacheServiceFactory.create_service("memory", {"max_size": 10, "max_bytes": 4096, "ttl": 60})
+        assert (cache.max_entries, cache.max_bytes, cache.default_ttl) == (10, 4096, 60)
@@ -0,0 +1,265 @@
+"""
+消息后写测试用例
+验证新消息批量入库、缓存中的会话消息在入库前即可读取，以及持久化检查点和关闭时的收尾
+"""
+
+import asyncio
+
+import pytest
+
+from src.core.domain.message_model import MessageType
+from src.core.services import MessageService
+from src.core.services.write_behind import WriteBehindQueue
+from src.infrastructure.cache.cache_service import MemoryCacheService
+from src.infrastructure.database.database_service import SQLiteService
+
+
+class FakeDatabase:
+    """记录批量插入的数据库替身，方法签名与 DatabaseService 一致"""
+
+    def __init__(self):
+        self.rows = {}
+        self.batches = []
+        self.selects = 0
+        self.fail_next = False
+        self.rejected = set()
+
+    async def execute_many(self, query, params_list):
+        if self.fail_next:
+            self.fail_next = False
+            raise RuntimeError("database unavailable")
+        if any(params.get("content") in self.rejected for params in params_list):
+            raise ValueError("CHECK constraint failed")
+        self.batches.append(len(params_list))
+        for params in params_list:
+            self.rows[params["id"]] = dict(params)
+        return len(params_list)
+
+    async def insert_many(self, table, rows):
+        return await self.execute_many("INSERT", rows)
+
+
+    async def select(self, table, where=None, order_by=None, descending=False, limit=None, exclude=None):
+        self.selects += 1
+        rows = [row for row in self.rows.values()
+                if all(row.get(k) == v for k, v in (where or {}).items())]
+        rows.sort(key=lambda row: row["created_at"], reverse=descending)
+        return rows[:limit] if limit is not None else rows
+
+    async def delete(self, table, where):
+        matched = [row_id for row_id, row in self.rows.items()
+                   if all(row.get(k) == v for k, v in where.items())]
+        for row_id in matched:
+            del self.rows[row_id]
+        return len(matched)
+
+
+@pytest.fixture
+def db():
+    return FakeDatabase()
+
+
+class TestMessageWriteBehind:
+    """测试消息服务的后写模式"""
+
+    @pytest.mark.asyncio
+    async def test_inserts_are_batched(self, db):
+        service = MessageService(db, MemoryCacheService(), write_behind=True, flush_interval=60, flush_size=100)
+        for i in range(250):
+            await service.create_message("s1", f"m{i}", MessageType.USER)
+        assert db.rows == {}
+
+        await service.close()
+        assert db.batches == [100, 100, 50]
+        assert len(db.rows) == 250
+
+    @pytest.mark.asyncio
+    async def test_reads_served_before_flush(self, db):
+        service = MessageService(db, MemoryCacheService(), write_behind=True, flush_interval=60)
+        await service.get_messages_by_session("s1")
+        first = await service.create_message("s1", "hello", MessageType.USER, metadata={"model": "m"})
+        await service.create_message("s1", "world", MessageType.AGENT)
+
+        assert (await service.get_message(first.id)).metadata.model == "m"
+        assert db.batches == [] and db.selects == 1
+
+        # 新消息使会话索引失效，列表查询先落盘再从数据库重建
+        messages = await service.get_messages_by_session("s1")
+        assert [m.content for m in messages] == ["hello", "world"]
+        assert db.batches == [2] and db.selects == 2
+        await service.close()
+
+    @pytest.mark.asyncio
+    async def test_index_miss_flushes_before_query(self, db):
+        cache = MemoryCacheService()
+        service = MessageService(db, cache, write_behind=True, flush_interval=60)
+        await service.create_message("s1", "hello", MessageType.USER)
+        await cache.flushdb()
+
+        messages = await service.get_messages_by_session("s1")
+        assert [m.content for m in messages] == ["hello"]
+        assert db.batches == [1]
+        assert messages[0].type == MessageType.USER
+
+    @pytest.mark.asyncio
+    async def test_durable_create_waits_for_commit(self, db):
+        service = MessageService(db, MemoryCacheService(), write_behind=True, flush_interval=0.01)
+        message = await service.create_message("s1", "hello", MessageType.USER, durable=True)
+        assert message.id in db.rows
+
+    @pytest.mark.asyncio
+    async def test_flush_interval_triggers_write(self, db):
+        service = MessageService(db, MemoryCacheService(), write_behind=True, flush_interval=0.01)
+        await service.create_message("s1", "hello", MessageType.USER)
+        await asyncio.sleep(0.05)
+        assert db.batches == [1]
+
+
+class TestWriteBehindQueue:
+    """测试后写队列的失败重试"""
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_retried(self, db):
+        async def writer(records):
+            await db.execute_many("INSERT", records)
+
+        queue = WriteBehindQueue(writer, flush_interval=60)
+        db.fail_next = True
+        written = queue.enqueue({"id": "a"})
+
+        with pytest.raises(RuntimeError):
+            await queue.flush()
+        with pytest.raises(RuntimeError):
+            await written
+        assert queue.pending == 1
+
+        assert await queue.flush() == 1
+        assert "a" in db.rows and queue.get_pending("a") is None
+        assert queue.get_stats()["failed_batches"] == 1
+        await queue.close()
+
+
+class TestSQLiteExecuteMany:
+    """测试 SQLite 批量执行"""
+
+    @pytest.mark.asyncio
+    async def test_execute_many_commits_once(self, tmp_path):
+        pytest.importorskip("aiosqlite")
+        service = SQLiteService(str(tmp_path / "test.db"))
+        await service.execute("CREATE TABLE messages (id TEXT PRIMARY KEY, content TEXT)")
+        rows = [{"id": str(i), "content": f"m{i}"} for i in range(10)]
+
+        assert await service.execute_many("INSERT INTO messages (id, content) VALUES (:id, :content)", rows) == 10
+        assert len(await service.select("messages")) == 10
+        await service.disconnect()
+
+
+class TestMessageDeadLetters:
+    """测试无法入库的消息从缓存中移除"""
+
+    @pytest.mark.asyncio
+    async def test_dead_lettered_message_evicted(self, db):
+        db.rejected.add("bad")
+        service = MessageService(db, MemoryCacheService(), write_behind=True, flush_interval=60)
+        await service.create_message("s1", "ok1", MessageType.USER)
+        bad = await service.create_message("s1", "bad", MessageType.USER)
+        await service.create_message("s1", "ok2", MessageType.USER)
+        assert (await service.get_message(bad.id)).content == "bad"
+
+        # 每次 flush 是一次重试，超过重试次数后逐条写入
+        for _ in range(10):
+            try:
+                await service.flush()
+                break
+            except ValueError:
+                pass
+
+        assert await service.get_message(bad.id) is None
+        assert [m.content for m in await service.get_messages_by_session("s1")] == ["ok1", "ok2"]
+        await service.close()
+
+
+class TestWriteBehindDeadLetters:
+    """测试持续失败的批次不会阻塞队列"""
+
+    @pytest.mark.asyncio
+    async def test_poison_record_is_dead_lettered(self):
+        rows = {}
+        calls = []
+
+        async def writer(records):
+            calls.append([record["id"] for record in records])
+            if any(record["id"] == "bad" for record in records):
+                raise ValueError("UNIQUE constraint failed")
+            rows.update({record["id"]: record for record in records})
+
+        queue = WriteBehindQueue(writer, flush_interval=0.01, max_retries=2, retry_backoff=0.01)
+        for record_id in ("a", "bad", "b"):
+            queue.enqueue({"id": record_id})
+
+        for _ in range(200):
+            if not queue.pending:
+                break
+            await asyncio.sleep(0.01)
+
+        assert set(rows) == {"a", "b"}
+        # 首次写入 + 2 次重试后逐条写入
+        assert calls[:3] == [["a", "bad", "b"]] * 3
+        assert calls[3:] == [["a"], ["bad"], ["b"]]
+        assert queue.dead_letters == [{"id": "bad"}]
+        stats = queue.get_stats()
+        assert stats["dead_lettered"] == 1 and stats["pending"] == 0
+        assert queue.get_pending("bad") is None
+        await queue.close()
+
+    @pytest.mark.asyncio
+    async def test_outage_retries_with_backoff_without_dropping(self):
+        attempts = []
+        rows = {}
+        available = False
+
+        async def writer(records):
+            attempts.append(asyncio.get_running_loop().time())
+            if not available:
+                raise RuntimeError("database unavailable")
+            rows.update({record["id"]: record for record in records})
+
+        queue = WriteBehindQueue(writer, flush_interval=0.01, max_retries=1, retry_backoff=0.02, max_backoff=0.05)
+        queue.enqueue({"id": "a"})
+        queue.enqueue({"id": "b"})
+        await asyncio.sleep(0.3)
+
+        # 逐条写入也全部失败时视为数据库不可用，记录保留在队列中按退避重试
+        gaps = [later - earlier for earlier, later in zip(attempts, attempts[1:3])]
+        assert gaps == sorted(gaps) and gaps[-1] >= 0.04
+        assert queue.pending == 2
+        assert queue.dead_letters == []
+
+        available = True
+        for _ in range(100):
+            if not queue.pending:
+                break
+            await asyncio.sleep(0.01)
+        assert set(rows) == {"a", "b"}
+        await queue.close()
+        assert queue.dead_letters == []
+
+    @pytest.mark.asyncio
+    async def test_close_dead_letters_after_timeout(self):
+        dead = []
+
+        async def writer(records):
+            raise RuntimeError("database unavailable")
+
+        async def on_dead_letter(records):
+            dead.extend(record["id"] for record in records)
+
+        queue = WriteBehindQueue(
+            writer, flush_interval=60, max_retries=1, retry_backoff=0.001, on_dead_letter=on_dead_letter
+        )
+        futures = [queue.enqueue({"id": str(i)}) for i in range(3)]
+        await asyncio.wait_for(queue.close(timeout=0.05), timeout=2)
+        assert queue.pending == 0
+        assert all(future.done() for future in futures)
+        assert queue.get_stats()["dead_lettered"] == 3
+        assert dead == ["0", "1", "2"]
@@ -0,0 +1,112 @@
+"""
+指标采集测试用例
+验证智能体、工具、缓存、Redis对话历史和LLM用量指标以及 Prometheus 文本导出
+"""
+
+import pytest
+from langchain.agents import AgentExecutor, create_react_agent
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import tool
+
+from src.infrastructure.cache.cache_service import MemoryCacheService
+from src.infrastructure.monitoring import metrics as metrics_module
+from src.infrastructure.monitoring.metrics import PROMETHEUS_AVAILABLE, AgentMetrics
+
+pytestmark = pytest.mark.skipif(not PROMETHEUS_AVAILABLE, reason="prometheus-client 未安装")
+
+
+@tool
+def demand_forecast(sku: str) -> str:
+    """预测需求"""
+    return f"{sku}: 300"
+
+
+def sample(metrics: AgentMetrics, name: str, **labels) -> float:
+    value = metrics.registry.get_sample_value(f"agent_{name}", labels)
+    return value or 0.0
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    instance = AgentMetrics(llm_pricing={"fake-model": {"input": 1.0, "output": 2.0}})
+    monkeypatch.setattr(metrics_module, "_metrics", instance)
+    return instance
+
+
+class TestAgentMetrics:
+    """测试指标记录与导出"""
+
+    def test_request_and_stop_reason(self, metrics):
+        metrics.observe_request("unified", "run", "success", 0.3)
+        metrics.observe_request("unified", "run", "error", 1.2)
+        metrics.record_stop_reason("unified", "completed")
+        metrics.observe_auto_continue("unified", 2)
+
+        assert sample(metrics, "requests_total", agent="unified", method="run", status="success") == 1
+        assert sample(metrics, "request_duration_seconds_count", agent="unified", method="run") == 2
+        assert sample(metrics, "stop_reasons_total", agent="unified", reason="completed") == 1
+        assert sample(metrics, "auto_continue_attempts_sum", agent="unified") == 2
+
+    def test_llm_cost_from_pricing(self, metrics):
+        metrics.record_llm_call("fake-model", 0.5, input_tokens=1000, output_tokens=500)
+        metrics.record_llm_call("other-model", 0.5, input_tokens=10)
+
+        assert sample(metrics, "llm_tokens_total", model="fake-model", type="output") == 500
+        assert sample(metrics, "llm_cost_total", model="fake-model") == pytest.approx(2.0)
+        assert sample(metrics, "llm_cost_total", model="other-model") == 0
+
+    def test_render_prometheus_text(self, metrics):
+        metrics.record_tool_call("calculator", 0.01)
+        text = metrics.render().decode("utf-8")
+        assert 'agent_tool_calls_total{status="success",tool="calculator"} 1.0' in text
+        assert metrics.content_type.startswith("text/plain")
+
+    def test_disabled_metrics_are_noop(self):
+        disabled = AgentMetrics(enabled=False)
+        disabled.observe_request("unified", "run", "success", 0.1)
+        disabled.record_llm_call("m", 0.1, 1, 1)
+        assert disabled.registry is None
+        assert disabled.render().startswith(b"#")
+        assert disabled.start_server(0) is False
+
+    @pytest.mark.parametrize("port, expected", [("9101", 9101), ("", None), (None, None)])
+    def test_port_read_from_config(self, monkeypatch, port, expected):
+        from src.config.config_loader import config_loader
+
+        config = {"services": {"monitoring": {"metrics": {"port": port}}}}
+        monkeypatch.setattr(config_loader, "get_services_config", lambda: config)
+        monkeypatch.setattr(metrics_module, "_metrics", None)
+        assert metrics_module.get_metrics().port == expected
+
+
+class TestInstrumentation:
+    """测试各组件的埋点"""
+
+    @pytest.mark.asyncio
+    async def test_memory_cache_hits_and_misses(self, metrics):
+        cache = MemoryCacheService()
+        await cache.connect()
+        await cache.set("k", "v")
+        await cache.get("k")
+        await cache.get("missing")
+
+        assert sample(metrics, "cache_requests_total", backend="memory", result="hit") == 1
+        assert sample(metrics, "cache_requests_total", backend="memory", result="miss") == 1
+
+    def test_callback_handler_records_tools_and_llm(self, metrics):
+        llm = FakeListChatModel(responses=[
+            "Thought: 预测\nAction: demand_forecast\nAction Input: A",
+            "Thought: 完成\nFinal Answer: 300",
+        ])
+        prompt = PromptTemplate.from_template("{tools}\n{tool_names}\nQuestion: {input}\nThought:{agent_scratchpad}")
+        executor = AgentExecutor(agent=create_react_agent(llm, [demand_forecast], prompt), tools=[demand_forecast])
+
+        executor.invoke({"input": "A 的需求"}, config={"callbacks": [metrics.callback_handler()]})
+
+        assert sample(metrics, "tool_calls_total", tool="demand_forecast", status="success") == 1
+        llm_calls = sum(
+            s.value for family in metrics.registry.collect() if family.name == "agent_llm_requests"
+            for s in family.samples if s.name == "agent_llm_requests_total"
+        )
+        assert llm_calls == 2
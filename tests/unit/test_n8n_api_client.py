@@ -0,0 +1,185 @@
+"""
+N8N API 客户端测试
+
+使用 httpx.MockTransport 模拟 n8n API，验证重试、请求合并、分页与客户端共享。
+"""
+
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from src.agents.shared.n8n_api_tools import (
+    N8NAPIClient,
+    N8NAPIError,
+    N8NDeleteWorkflowTool,
+    N8NListWorkflowsTool,
+    close_n8n_clients,
+    get_n8n_client
+)
+
+
+def make_client(handler, **kwargs) -> N8NAPIClient:
+    kwargs.setdefault("backoff_base", 0.001)
+    return N8NAPIClient("http://n8n.test", "key", transport=httpx.MockTransport(handler), **kwargs)
+
+
+class TestN8NAPIClientRetry:
+    """重试与错误处理测试"""
+
+    def test_retries_on_429_and_5xx(self):
+        statuses = [429, 503]
+
+        def handler(request):
+            if statuses:
+                return httpx.Response(statuses.pop(0), headers={"Retry-After": "0"})
+            return httpx.Response(200, json={"id": "wf1", "name": "demo"})
+
+        client = make_client(handler)
+        try:
+            assert client.get_workflow("wf1")["name"] == "demo"
+            stats = client.get_stats()
+            assert stats["requests"] == 3
+            assert stats["retries"] == 2
+        finally:
+            client.close()
+
+    def test_gives_up_after_max_retries(self):
+        client = make_client(lambda request: httpx.Response(502, json={"message": "bad gateway"}), max_retries=2)
+        try:
+            with pytest.raises(N8NAPIError) as exc_info:
+                client.get_workflow("wf1")
+            assert exc_info.value.status_code == 502
+            assert "bad gateway" in str(exc_info.value)
+            assert client.get_stats()["requests"] == 3
+        finally:
+            client.close()
+
+    def test_post_not_retried_on_5xx(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(500, json={"message": "boom"})
+
+        client = make_client(handler)
+        try:
+            with pytest.raises(N8NAPIError):
+                client.execute_workflow("wf1")
+            assert len(calls) == 1
+        finally:
+            client.close()
+
+    def test_client_error_not_retried(self):
+        client = make_client(lambda request: httpx.Response(404, json={"message": "Not Found"}))
+        try:
+            with pytest.raises(N8NAPIError, match="N8N API 错误: Not Found"):
+                client.delete_workflow("missing")
+            assert client.get_stats()["retries"] == 0
+        finally:
+            client.close()
+
+    def test_empty_response(self):
+        client = make_client(lambda request: httpx.Response(204))
+        try:
+            assert client.delete_workflow("wf1") == {"success": True}
+        finally:
+            client.close()
+
+
+class TestN8NAPIClientCoalescing:
+    """相同 GET 请求合并测试"""
+
+    @pytest.mark.asyncio
+    async def test_identical_gets_share_one_request(self):
+        release = threading.Event()
+        calls = []
+
+        async def handler(request):
+            calls.append(str(request.url))
+            while not release.is_set():
+                await asyncio.sleep(0.005)
+            return httpx.Response(200, json={"id": "wf1"})
+
+        client = make_client(handler)
+        try:
+            tasks = [asyncio.create_task(client.aget_workflow("wf1")) for _ in range(5)]
+            other = asyncio.create_task(client.aget_workflow("wf2"))
+            await asyncio.sleep(0.05)
+            release.set()
+            results = await asyncio.gather(*tasks, other)
+
+            assert len(calls) == 2
+            assert all(result["id"] == "wf1" for result in results[:5])
+            assert client.get_stats()["coalesced"] == 4
+            # 合并的调用方拿到的是独立副本
+            results[0]["id"] = "changed"
+            assert results[1]["id"] == "wf1"
+        finally:
+            client.close()
+
+
+class TestN8NAPIClientPagination:
+    """分页遍历测试"""
+
+    @staticmethod
+    def paged_handler(seen):
+        pages = {
+            None: {"data": [{"id": "1"}, {"id": "2"}], "nextCursor": "c2"},
+            "c2": {"data": [{"id": "3"}, {"id": "4"}], "nextCursor": "c3"},
+            "c3": {"data": [{"id": "5"}], "nextCursor": None},
+        }
+
+        def handler(request):
+            seen.append(dict(request.url.params))
+            return httpx.Response(200, json=pages[request.url.params.get("cursor")])
+
+        return handler
+
+    def test_list_workflows_follows_cursor(self):
+        seen = []
+        client = make_client(self.paged_handler(seen))
+        try:
+            workflows = client.list_workflows(active=True)
+            assert [w["id"] for w in workflows] == ["1", "2", "3", "4", "5"]
+            assert len(seen) == 3
+            assert all(params["active"] == "true" for params in seen)
+        finally:
+            client.close()
+
+    def test_iter_stops_fetching_when_consumer_stops(self):
+        seen = []
+        client = make_client(self.paged_handler(seen))
+        try:
+            executions = client.get_executions("wf1", limit=3)
+            assert [e["id"] for e in executions] == ["1", "2", "3"]
+            assert len(seen) == 2
+            assert seen[0]["workflowId"] == "wf1"
+        finally:
+            client.close()
+
+    @pytest.mark.asyncio
+    async def test_async_iteration(self):
+        seen = []
+        client = make_client(self.paged_handler(seen))
+        try:
+            ids = [workflow["id"] async for workflow in client.aiter_workflows(page_size=2)]
+            assert ids == ["1", "2", "3", "4", "5"]
+            assert seen[0]["limit"] == "2"
+        finally:
+            client.close()
+
+
+class TestSharedN8NClient:
+    """客户端共享测试"""
+
+    def test_tools_share_client(self):
+        try:
+            list_tool = N8NListWorkflowsTool(api_url="http://shared.test/", api_key="k")
+            delete_tool = N8NDeleteWorkflowTool(api_url="http://shared.test", api_key="k")
+            assert list_tool.client is delete_tool.client
+            assert list_tool.client is get_n8n_client("http://shared.test", "k")
+            assert get_n8n_client("http://shared.test", "other") is not list_tool.client
+        finally:
+            close_n8n_clients()
@@ -0,0 +1,154 @@
+"""
+工作流设计流式解析测试
+"""
+
+import json
+
+import pytest
+
+from src.agents.shared import n8n_api_tools
+from src.agents.shared.n8n_api_tools import N8NGenerateAndCreateWorkflowTool, close_n8n_clients
+from src.agents.shared.n8n_design_stream import WorkflowDesignStreamError, WorkflowDesignStreamParser
+from src.agents.shared.n8n_workflow_templates import WorkflowTemplateStore
+
+
+DESIGN = {
+    "workflow_name": "智能客服",
+    "nodes": [
+        {"name": "Webhook", "type": "webhook", "description": "接收请求", "position": [250, 300]},
+        {"name": "AI Agent", "type": "aiAgent", "description": "回答问题"},
+        {"name": "Respond", "type": "respondToWebhook", "description": "返回结果"},
+    ],
+    "connections": [
+        {"from": "Webhook", "to": "AI Agent"},
+        {"from": "AI Agent", "to": "Respond"},
+    ],
+}
+
+
+def chunks(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def feed_all(parser, text, size=7):
+    for chunk in chunks(text, size):
+        if parser.feed(chunk):
+            break
+    return parser
+
+
+class TestWorkflowDesignStreamParser:
+    """增量解析器测试"""
+
+    @pytest.mark.parametrize("size", [1, 3, 64])
+    def test_parses_streamed_design(self, size):
+        seen = []
+        text = "```json\n" + json.dumps(DESIGN, ensure_ascii=False, indent=2) + "\n```\n以上是设计。"
+        parser = WorkflowDesignStreamParser(lambda field, index, item, p: seen.append((field, index)))
+
+        feed_all(parser, text, size)
+
+        assert parser.done
+        assert parser.result() == DESIGN
+        assert seen == [("nodes", 0), ("nodes", 1), ("nodes", 2), ("connections", 0), ("connections", 1)]
+        assert parser.closed_fields == {"nodes", "connections"}
+        # 根对象闭合后的说明文字不再消费
+        assert parser.consumed < len(text)
+
+    def test_nested_values_and_escapes(self):
+        design = {"workflow_name": "a \"quoted\" } name", "nodes": [{"name": "n", "params": {"x": [1, -2.5e3, True, None]}}],
+                  "connections": []}
+        parser = feed_all(WorkflowDesignStreamParser(), json.dumps(design), size=2)
+        assert parser.result() == design
+        assert parser.items["nodes"] == design["nodes"]
+
+    @pytest.mark.parametrize("text, message", [
+        ("{'workflow_name': 1}", "双引号"),
+        ('{"nodes": [1, 2,]}', "逗号"),
+        ('{"a": 1 // 注释\n}', "注释"),
+        ('{"a": True}', "双引号内"),
+        ('{"a": nul }', "无效的值"),
+        ('{"a": [1}', "括号不匹配"),
+        ('{"a": 1 "b": 2}', "缺少逗号"),
+    ])
+    def test_syntax_errors_raise_early(self, text, message):
+        parser = WorkflowDesignStreamParser()
+        with pytest.raises(WorkflowDesignStreamError) as exc_info:
+            feed_all(parser, text + ' ' * 100, size=1)
+        assert message in str(exc_info.value)
+        assert exc_info.value.kind == "json"
+        assert parser.consumed <= len(text)
+
+    def test_validator_error_stops_at_offending_item(self):
+        text = json.dumps(DESIGN)
+
+        def validator(field, index, item, parser):
+            return "节点类型不支持" if field == "nodes" and index == 1 else None
+
+        parser = WorkflowDesignStreamParser(validator)
+        with pytest.raises(WorkflowDesignStreamError) as exc_info:
+            feed_all(parser, text)
+        assert exc_info.value.kind == "validation"
+        assert exc_info.value.partial.endswith('"description": "\\u56de\\u7b54\\u95ee\\u9898"}')
+        assert len(parser.items["connections"]) == 0
+
+    def test_incomplete_output(self):
+        parser = feed_all(WorkflowDesignStreamParser(), '{"workflow_name": "x", "nodes": [')
+        with pytest.raises(WorkflowDesignStreamError, match="JSON 不完整"):
+            parser.result()
+        with pytest.raises(WorkflowDesignStreamError, match="没有 JSON"):
+            feed_all(WorkflowDesignStreamParser(), "抱歉，无法生成").result()
+
+
+class StreamingLLM:
+    """按块流式输出的 LLM，记录实际被读取的块数"""
+
+    class Chunk:
+        def __init__(self, content):
+            self.content = content
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.prompts = []
+        self.chunks_read = []
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        self.chunks_read.append(0)
+        for chunk in chunks(self.responses.pop(0), 5):
+            self.chunks_read[-1] += 1
+            yield self.Chunk(chunk)
+
+
+class TestGenerateToolStreaming:
+    """生成工具流式校验测试"""
+
+    def test_aborts_on_first_structural_error_and_retries(self, monkeypatch):
+        from src.infrastructure.llm import llm_factory
+
+        bad = dict(DESIGN, nodes=[{"name": "Agent", "type": "aiAgent"}] + DESIGN["nodes"])
+        bad_text = json.dumps(bad, ensure_ascii=False)
+        llm = StreamingLLM([bad_text, json.dumps(DESIGN, ensure_ascii=False)])
+        monkeypatch.setattr(n8n_api_tools, "get_workflow_template_store", lambda: WorkflowTemplateStore())
+        monkeypatch.setattr(llm_factory.LLMFactory, "create_llm", staticmethod(lambda **kwargs: llm))
+
+        try:
+            tool = N8NGenerateAndCreateWorkflowTool(api_url="http://stream.test", api_key="k")
+            workflow = tool._generate_workflow_with_llm("创建智能客服")
+
+            assert len(workflow["nodes"]) == 3
+            # 第一次生成在第一个节点处即被中断
+            assert llm.chunks_read[0] < len(chunks(bad_text, 5)) / 2
+            assert "第一个节点必须是触发器类型" in llm.prompts[1]
+            assert '"name": "Agent"' in llm.prompts[1]
+        finally:
+            close_n8n_clients()
+
+    def test_validate_workflow_design_unchanged(self):
+        try:
+            tool = N8NGenerateAndCreateWorkflowTool(api_url="http://stream.test", api_key="k")
+            assert tool._validate_workflow_design(DESIGN) is None
+            broken = dict(DESIGN, connections=[{"from": "Webhook", "to": "Missing"}])
+            assert tool._validate_workflow_design(broken) == "连接引用了不存在的节点: Missing"
+        finally:
+            close_n8n_clients()
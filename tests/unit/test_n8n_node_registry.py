@@ -0,0 +1,121 @@
+"""
+N8N 节点类型注册表测试
+"""
+
+import pytest
+
+from src.agents.shared.n8n_api_tools import N8NGenerateAndCreateWorkflowTool, close_n8n_clients
+from src.agents.shared.n8n_node_registry import NodeRegistry, get_node_registry
+
+
+@pytest.fixture
+def registry():
+    return get_node_registry()
+
+
+class TestNodeRegistry:
+    """注册表查找测试"""
+
+    def test_bundled_schema_loaded(self, registry):
+        assert len(registry.specs) >= 34
+        assert len(set(registry.names())) == len(registry.specs)
+        assert get_node_registry() is registry
+
+    @pytest.mark.parametrize("node_type", ["aiAgent", "AIAGENT", "agent", "@n8n/n8n-nodes-langchain.agent"])
+    def test_resolve_by_name_alias_and_full_type(self, registry, node_type):
+        assert registry.resolve(node_type).name == "aiAgent"
+
+    def test_type_and_version(self, registry):
+        assert registry.n8n_type("set") == "n8n-nodes-base.set"
+        assert registry.type_version("n8n-nodes-base.set") == 3
+        assert registry.type_version("httpRequest") == 4
+        # 未登记的类型沿用 n8n-nodes-base 命名空间和版本 1
+        assert registry.n8n_type("customNode") == "n8n-nodes-base.customNode"
+        assert registry.type_version("customNode") == 1
+        assert registry.parameters("customNode") == {}
+
+    def test_parameters_substitute_description(self, registry):
+        params = registry.parameters("emailSend", '库存"预警"')
+        assert params["subject"] == '库存"预警"'
+        assert registry.parameters("emailSend")["subject"] == "通知"
+        assert registry.parameters("aiAgent", "回答问题")["text"] == "={{ $json.input || '回答问题' }}"
+
+    def test_parameters_are_independent_copies(self, registry):
+        first = registry.parameters("httpRequest")
+        first["url"] = "changed"
+        assert registry.parameters("httpRequest")["url"] == "https://api.example.com/endpoint"
+
+    def test_triggers(self, registry):
+        assert registry.is_trigger("webhook")
+        assert registry.is_trigger("cron")
+        assert not registry.is_trigger("set")
+        assert "manualTrigger" in registry.trigger_names()
+
+    def test_prompt_section_lists_prompt_nodes_only(self, registry):
+        section = registry.render_prompt_section()
+        assert "- aiAgent: AI Agent 智能体" in section
+        assert "  * ⭐ 对话场景必选节点！" in section
+        assert "- noOp" not in section
+        assert section.index("【触发器类】") < section.index("【AI/智能类】")
+        assert section is registry.render_prompt_section()
+
+    def test_load_from_path(self, tmp_path):
+        path = tmp_path / "nodes.json"
+        path.write_text(
+            '{"categories": [{"id": "t", "title": "【触发】"}],'
+            ' "nodes": [{"name": "start", "type": "x.start", "version": 2, "category": "t",'
+            ' "description": "开始", "trigger": true}]}',
+            encoding="utf-8"
+        )
+        registry = NodeRegistry.load(path)
+        assert registry.type_version("START") == 2
+        assert registry.is_trigger("x.start")
+        assert registry.render_prompt_section() == "【触发】\n- start: 开始"
+
+
+class TestRegistryDrivesGenerator:
+    """生成工具使用注册表测试"""
+
+    @pytest.fixture
+    def tool(self):
+        tool = N8NGenerateAndCreateWorkflowTool(api_url="http://registry.test", api_key="k")
+        yield tool
+        close_n8n_clients()
+
+    def test_prompt_uses_registry(self, tool, registry):
+        prompt = tool._build_workflow_prompt("创建客服", 0)
+        assert registry.render_prompt_section() in prompt
+
+    def test_validation_rejects_unknown_type(self, tool):
+        design = {
+            "workflow_name": "x",
+            "nodes": [{"name": "W", "type": "webhook"}, {"name": "X", "type": "magicNode"}],
+            "connections": [],
+        }
+        error = tool._validate_workflow_design(design)
+        assert "magicNode 不受支持" in error
+        assert "aiAgent" in error
+
+    def test_validation_first_node_trigger(self, tool):
+        design = {"workflow_name": "x", "nodes": [{"name": "S", "type": "set"}, {"name": "W", "type": "webhook"}],
+                  "connections": []}
+        assert tool._validate_workflow_design(design).startswith("第一个节点必须是触发器类型")
+
+    def test_convert_design(self, tool):
+        workflow = tool._convert_design_to_n8n({
+            "workflow_name": "客服",
+            "nodes": [
+                {"name": "Webhook", "type": "webhook"},
+                {"name": "Agent", "type": "aiAgent", "description": "回答"},
+                {"name": "Reply", "type": "n8n-nodes-base.respondToWebhook"},
+            ],
+            "connections": [{"from": "Webhook", "to": "Agent"}, {"from": "Agent", "to": "Reply"}],
+        }, "客服")
+
+        webhook, agent, reply = workflow["nodes"]
+        assert webhook["type"] == "n8n-nodes-base.webhook"
+        assert webhook["parameters"]["path"] == "webhook"
+        assert agent["type"] == "@n8n/n8n-nodes-langchain.agent"
+        assert agent["parameters"]["text"] == "={{ $json.input || '回答' }}"
+        assert reply["type"] == "n8n-nodes-base.respondToWebhook"
+        assert workflow["connections"]["Webhook"]["main"][0][0]["node"] == "Agent"
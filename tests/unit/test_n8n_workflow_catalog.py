@@ -0,0 +1,142 @@
+"""
+N8N 工作流目录缓存测试
+"""
+
+import json
+
+import pytest
+
+from src.agents.shared.n8n_api_tools import N8NListWorkflowsTool, close_n8n_clients
+from src.agents.shared.n8n_workflow_catalog import N8NWorkflowCatalog, WorkflowSummary, get_workflow_catalog
+
+
+def workflow(workflow_id, name, updated_at, active=False, tags=(), nodes=2):
+    return {
+        "id": workflow_id,
+        "name": name,
+        "active": active,
+        "tags": [{"id": tag, "name": tag} for tag in tags],
+        "nodes": [{"name": f"n{i}"} for i in range(nodes)],
+        "createdAt": "2024-01-01T00:00:00.000Z",
+        "updatedAt": updated_at,
+    }
+
+
+class FakeClient:
+    """只实现 iter_workflows 的 n8n 客户端"""
+
+    def __init__(self, workflows):
+        self.api_url = "http://fake.test"
+        self.api_key = "k"
+        self.workflows = workflows
+        self.list_calls = 0
+
+    def iter_workflows(self, active=None, page_size=100):
+        self.list_calls += 1
+        yield from self.workflows
+
+
+@pytest.fixture
+def client():
+    return FakeClient([
+        workflow("1", "库存预警", "2024-01-03", active=True, tags=["inventory"]),
+        workflow("2", "订单同步", "2024-01-02", tags=["orders", "erp"]),
+        workflow("3", "库存日报", "2024-01-01", tags=["inventory", "report"], nodes=5),
+    ])
+
+
+class TestWorkflowSummary:
+    """工作流摘要测试"""
+
+    def test_from_workflow(self):
+        summary = WorkflowSummary.from_workflow(workflow("9", "demo", "2024-02-01", active=True, tags=["a"], nodes=3))
+        assert summary.id == "9"
+        assert summary.active is True
+        assert summary.tags == ["a"]
+        assert summary.node_count == 3
+        assert summary.updated_at == "2024-02-01"
+
+
+class TestN8NWorkflowCatalog:
+    """工作流目录测试"""
+
+    def test_search_is_local_until_stale(self, client):
+        catalog = N8NWorkflowCatalog(client, ttl=3600)
+        results, total = catalog.search()
+        assert [w.id for w in results] == ["1", "2", "3"]
+        assert total == 3
+
+        catalog.search(active=True)
+        catalog.search(name="库存")
+        assert client.list_calls == 1
+
+        catalog.invalidate()
+        catalog.search()
+        assert client.list_calls == 2
+
+    def test_filters(self, client):
+        catalog = N8NWorkflowCatalog(client, ttl=3600)
+        assert [w.id for w in catalog.search(name="库存")[0]] == ["1", "3"]
+        assert [w.id for w in catalog.search(tag="INVENTORY")[0]] == ["1", "3"]
+        assert [w.id for w in catalog.search(tag="inventory", active=False)[0]] == ["3"]
+        assert [w.id for w in catalog.search(active=True)[0]] == ["1"]
+
+        results, total = catalog.search(limit=1)
+        assert len(results) == 1
+        assert total == 3
+
+    def test_incremental_sync(self, client):
+        catalog = N8NWorkflowCatalog(client, ttl=3600)
+        catalog.sync()
+
+        client.workflows = [
+            workflow("1", "库存预警", "2024-01-03", active=True, tags=["inventory"]),
+            workflow("2", "订单同步 v2", "2024-01-05", active=True, tags=["orders"]),
+            workflow("4", "新工作流", "2024-01-04"),
+        ]
+        assert catalog.sync(force=True) == {"changed": 2, "removed": 1}
+
+        assert catalog.get("3") is None
+        assert catalog.search(tag="erp")[0] == []
+        assert [w.id for w in catalog.search(active=True)[0]] == ["2", "1"]
+        assert [w.id for w in catalog.search(name="订单")[0]] == ["2"]
+
+    def test_upsert_and_remove(self, client):
+        catalog = N8NWorkflowCatalog(client, ttl=3600)
+        catalog.sync()
+
+        catalog.upsert(workflow("5", "采购审批", "2024-02-01", tags=["purchase"]))
+        catalog.remove("1")
+
+        assert [w.id for w in catalog.search(tag="purchase")[0]] == ["5"]
+        assert catalog.search(active=True)[0] == []
+        assert client.list_calls == 1
+
+
+class TestListWorkflowsTool:
+    """列出工作流工具测试"""
+
+    def test_tool_uses_catalog(self, client):
+        try:
+            tool = N8NListWorkflowsTool(api_url="http://catalog.test", api_key="k")
+            catalog = N8NWorkflowCatalog(client, ttl=3600)
+            object.__setattr__(tool, "catalog", catalog)
+
+            output = json.loads(tool._run(tag="inventory", limit=1))
+            assert output["success"] is True
+            assert output["total"] == 2
+            assert output["workflows"] == [{
+                "id": "1", "name": "库存预警", "active": True,
+                "tags": ["inventory"], "nodes": 2, "updated_at": "2024-01-03"
+            }]
+
+            tool._run(active="true")
+            assert client.list_calls == 1
+            tool._run(refresh="true")
+            assert client.list_calls == 2
+        finally:
+            close_n8n_clients()
+
+    def test_shared_catalog_per_client(self, client):
+        assert get_workflow_catalog(client) is get_workflow_catalog(client)
+        assert get_workflow_catalog(client) is not get_workflow_catalog(FakeClient([]))
@@ -0,0 +1,177 @@
+"""
+N8N 工作流模板库测试
+"""
+
+import json
+
+import pytest
+
+from src.agents.shared import n8n_api_tools, n8n_workflow_templates
+from src.agents.shared.n8n_api_tools import N8NGenerateAndCreateWorkflowTool, close_n8n_clients
+from src.agents.shared.n8n_workflow_templates import WorkflowTemplateStore
+
+
+VOCABULARY = ["客服", "对话", "库存", "邮件", "订单", "webhook", "定时", "报告"]
+
+
+class FakeEmbeddingService:
+    """按关键词出现次数生成向量的嵌入服务"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def embed_query(self, text):
+        self.calls += 1
+        return [float(text.count(word)) for word in VOCABULARY]
+
+
+class FakeLLM:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.calls += 1
+        self.prompts.append(prompt)
+        return self.responses.pop(0)
+
+
+DESIGN = {
+    "workflow_name": "智能客服",
+    "nodes": [
+        {"name": "Webhook", "type": "webhook", "description": "接收客服对话请求"},
+        {"name": "AI Agent", "type": "aiAgent", "description": "创建智能客服对话"},
+        {"name": "Respond", "type": "respondToWebhook", "description": "返回结果"},
+    ],
+    "connections": [
+        {"from": "Webhook", "to": "AI Agent"},
+        {"from": "AI Agent", "to": "Respond"},
+    ],
+}
+
+
+class TestWorkflowTemplateStore:
+    """模板库测试"""
+
+    def test_near_duplicate_is_seed_not_hit(self):
+        embeddings = FakeEmbeddingService()
+        store = WorkflowTemplateStore(embeddings, similarity_threshold=0.9)
+
+        miss = store.lookup("创建智能客服对话")
+        assert not miss.hit
+        store.add("创建智能客服对话", DESIGN, miss.embedding, llm_calls=2)
+        assert embeddings.calls == 1
+
+        # 相似需求不直接复用，只作为 few-shot 示例
+        match = store.lookup("帮我做一个客服对话")
+        assert not match.hit
+        assert match.seed.description == "创建智能客服对话"
+        assert match.score == pytest.approx(1.0)
+        with pytest.raises(ValueError):
+            store.reuse(match)
+
+        exact = store.lookup("创建智能客服对话")
+        assert exact.hit
+        assert exact.seed is None
+        design = store.reuse(exact)
+        assert design == DESIGN
+        # 修改副本不影响模板本身
+        design["workflow_name"] = "改过"
+        assert exact.template.design["workflow_name"] == "智能客服"
+
+        stats = store.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["seeded"] == 1
+        assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-4)
+        assert stats["llm_calls"] == 2
+        assert stats["llm_calls_saved"] == 2
+
+    def test_dissimilar_request_misses(self):
+        store = WorkflowTemplateStore(FakeEmbeddingService(), similarity_threshold=0.9)
+        store.add("创建智能客服对话", DESIGN)
+
+        match = store.lookup("定时生成库存报告并发邮件")
+        assert not match.hit
+        assert match.seed is None
+        assert match.score < 0.9
+
+    def test_exact_match_without_embeddings(self):
+        store = WorkflowTemplateStore()
+        store.add("创建智能客服对话", DESIGN)
+
+        assert store.lookup("  创建智能客服对话 ").hit
+        assert not store.lookup("创建智能客服").hit
+        assert store.get_stats()["hits"] == 1
+
+    def test_persistence_and_forget(self, tmp_path):
+        path = str(tmp_path / "templates.json")
+        store = WorkflowTemplateStore(FakeEmbeddingService(), storage_path=path)
+        template = store.add("创建智能客服对话", DESIGN)
+
+        reloaded = WorkflowTemplateStore(FakeEmbeddingService(), storage_path=path)
+        assert reloaded.lookup("客服对话").seed is not None
+        assert reloaded.lookup("创建智能客服对话").hit
+
+        reloaded.forget(template.id)
+        assert not WorkflowTemplateStore(storage_path=path).lookup("创建智能客服对话").hit
+
+    def test_eviction_keeps_most_used(self):
+        store = WorkflowTemplateStore(max_templates=2)
+        store.add("a", DESIGN)
+        store.add("b", DESIGN)
+        store.lookup("a")
+        store.add("c", DESIGN)
+
+        assert store.lookup("a").hit
+        assert not store.lookup("b").hit
+        assert store.lookup("c").hit
+
+    def test_embeddings_disabled_by_default(self, monkeypatch, tmp_path):
+        config = {"services": {"tools": {"n8n_templates": {"storage_path": str(tmp_path / "t.json")}}}}
+        monkeypatch.setattr(n8n_workflow_templates.config_loader, "get_services_config", lambda: config)
+        monkeypatch.setattr(n8n_workflow_templates, "_template_store", None)
+
+        store = n8n_workflow_templates.get_workflow_template_store()
+        assert store.embedding_service is None
+
+
+class TestGenerateToolUsesTemplates:
+    """生成工具复用模板测试"""
+
+    def test_llm_skipped_only_for_identical_request(self, monkeypatch):
+        from src.infrastructure.llm import llm_factory
+
+        store = WorkflowTemplateStore(FakeEmbeddingService(), similarity_threshold=0.9)
+        llm = FakeLLM([
+            "不是 JSON",
+            json.dumps(DESIGN, ensure_ascii=False),
+            json.dumps(DESIGN, ensure_ascii=False),
+        ])
+        monkeypatch.setattr(n8n_api_tools, "get_workflow_template_store", lambda: store)
+        monkeypatch.setattr(llm_factory.LLMFactory, "create_llm", staticmethod(lambda **kwargs: llm))
+
+        try:
+            tool = N8NGenerateAndCreateWorkflowTool(api_url="http://templates.test", api_key="k")
+            first = tool._generate_workflow_with_llm("创建智能客服对话")
+            assert llm.calls == 2
+
+            assert "参考示例" not in llm.prompts[0]
+
+            again = tool._generate_workflow_with_llm("  创建智能客服对话")
+            assert llm.calls == 2
+            assert [node["type"] for node in again["nodes"]] == [node["type"] for node in first["nodes"]]
+
+            # 相似需求仍调用 LLM，已校验的设计作为示例放进 prompt
+            tool._generate_workflow_with_llm("创建一个客服对话")
+            assert llm.calls == 3
+            assert "参考示例" in llm.prompts[-1]
+            assert "创建智能客服对话" in llm.prompts[-1]
+
+            stats = store.get_stats()
+            assert stats["hits"] == 1
+            assert stats["seeded"] == 1
+            assert stats["llm_calls_saved"] == 2
+        finally:
+            close_n8n_clients()
@@ -0,0 +1,154 @@
+"""
+并行ReAct测试用例
+验证多动作解析、草稿区格式以及同步/异步并发执行
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import tool
+
+from src.agents.shared.parallel_react import (
+    ParallelAgentExecutor,
+    ParallelReActOutputParser,
+    create_parallel_react_agent,
+    format_parallel_log_to_str,
+    is_parallel_safe
+)
+
+
+MULTI_ACTION_OUTPUT = (
+    "Thought: 三个调用互不依赖\n"
+    "Action: slow_lookup\nAction Input: A\n"
+    "Action: slow_lookup\nAction Input: B\n"
+    "Action: slow_lookup\nAction Input: {\"name\": \"C\"}"
+)
+
+
+@tool
+def slow_lookup(query: str) -> str:
+    """模拟耗时查询"""
+    time.sleep(0.3)
+    return f"{query}@{threading.current_thread().name}"
+
+
+slow_lookup.metadata = {"parallel_safe": True}
+
+WRITES = []
+
+
+@tool
+def slow_write(query: str) -> str:
+    """模拟有副作用的耗时写操作"""
+    WRITES.append(query)
+    time.sleep(0.1)
+    return f"wrote {query} #{len(WRITES)}"
+
+
+def build_executor(responses, tools=(slow_lookup,)):
+    prompt = PromptTemplate.from_template("{tools}\n{tool_names}\nQuestion: {input}\nThought:{agent_scratchpad}")
+    agent = create_parallel_react_agent(FakeListLLM(responses=responses), list(tools), prompt)
+    return ParallelAgentExecutor(agent=agent, tools=list(tools), return_intermediate_steps=True)
+
+
+class TestParallelReActOutputParser:
+    """测试输出解析"""
+
+    def test_multiple_actions(self):
+        actions = ParallelReActOutputParser().parse(MULTI_ACTION_OUTPUT)
+        assert [a.tool_input for a in actions] == ["A", "B", '{"name": "C"}']
+        assert all(a.log == MULTI_ACTION_OUTPUT for a in actions)
+
+    def test_single_action_and_finish(self):
+        parser = ParallelReActOutputParser()
+        actions = parser.parse("Thought: x\nAction: slow_lookup\nAction Input: A")
+        assert len(actions) == 1 and isinstance(actions[0], AgentAction)
+        assert isinstance(parser.parse("Thought: done\nFinal Answer: ok"), AgentFinish)
+
+    def test_duplicate_actions_kept_for_observation_numbering(self):
+        text = "Action: t\nAction Input: x\nAction: t\nAction Input: x"
+        assert len(ParallelReActOutputParser().parse(text)) == 2
+
+    def test_actions_with_final_answer_rejected(self):
+        with pytest.raises(OutputParserException):
+            ParallelReActOutputParser().parse(MULTI_ACTION_OUTPUT + "\nFinal Answer: ok")
+
+
+class TestScratchpad:
+    """测试草稿区格式"""
+
+    def test_group_replays_log_once(self):
+        actions = ParallelReActOutputParser().parse(MULTI_ACTION_OUTPUT)
+        text = format_parallel_log_to_str([(a, f"obs{i}") for i, a in enumerate(actions)])
+        assert text.count("Thought: 三个调用互不依赖") == 1
+        assert text.endswith("Observation 1: obs0\nObservation 2: obs1\nObservation 3: obs2\nThought: ")
+
+    def test_single_step_matches_standard_format(self):
+        action = AgentAction("t", "x", "Action: t\nAction Input: x")
+        assert format_parallel_log_to_str([(action, "y")]) == "Action: t\nAction Input: x\nObservation: y\nThought: "
+
+
+class TestParallelAgentExecutor:
+    """测试并发执行"""
+
+    def test_sync_invoke_runs_concurrently(self):
+        executor = build_executor([MULTI_ACTION_OUTPUT, "Thought: done\nFinal Answer: ok"])
+        start = time.perf_counter()
+        result = executor.invoke({"input": "q"})
+        elapsed = time.perf_counter() - start
+
+        observations = [step[1] for step in result["intermediate_steps"]]
+        assert result["output"] == "ok"
+        assert [o.split("@")[0] for o in observations] == ["A", "B", '{"name": "C"}']
+        assert elapsed < 0.8
+        assert not executor._batches
+
+    def test_async_invoke_runs_concurrently(self):
+        executor = build_executor([MULTI_ACTION_OUTPUT, "Thought: done\nFinal Answer: ok"])
+        start = time.perf_counter()
+        result = asyncio.run(executor.ainvoke({"input": "q"}))
+        assert time.perf_counter() - start < 0.8
+        assert len(result["intermediate_steps"]) == 3
+
+    def test_single_action_runs_inline(self):
+        executor = build_executor(["Action: slow_lookup\nAction Input: A", "Final Answer: ok"])
+        result = executor.invoke({"input": "q"})
+        assert result["intermediate_steps"][0][1] == f"A@{threading.current_thread().name}"
+
+    def test_duplicate_actions_share_one_result(self):
+        output = "Action: slow_write\nAction Input: A\nAction: slow_write\nAction Input: B\nAction: slow_write\nAction Input: A"
+        WRITES.clear()
+        executor = build_executor([output, "Final Answer: ok"], tools=(slow_write,))
+        result = executor.invoke({"input": "q"})
+
+        steps = result["intermediate_steps"]
+        assert WRITES == ["A", "B"]
+        assert [step[1] for step in steps] == ["wrote A #1", "wrote B #2", "wrote A #1"]
+        assert [step[0].tool_input for step in steps] == ["A", "B", "A"]
+
+    def test_side_effecting_tools_run_sequentially(self):
+        output = "Action: slow_write\nAction Input: A\nAction: slow_write\nAction Input: B\nAction: slow_lookup\nAction Input: C"
+        assert not is_parallel_safe(slow_write)
+        assert is_parallel_safe(slow_lookup)
+
+        for run in (lambda e: e.invoke({"input": "q"}), lambda e: asyncio.run(e.ainvoke({"input": "q"}))):
+            WRITES.clear()
+            executor = build_executor([output, "Final Answer: ok"], tools=(slow_write, slow_lookup))
+            steps = run(executor)["intermediate_steps"]
+            assert WRITES == ["A", "B"]
+            assert [step[1] for step in steps[:2]] == ["wrote A #1", "wrote B #2"]
+            assert steps[2][1].startswith("C@")
+
+    def test_async_duplicates_share_one_result(self):
+        output = "Action: slow_write\nAction Input: A\nAction: slow_write\nAction Input: A"
+        WRITES.clear()
+        executor = build_executor([output, "Final Answer: ok"], tools=(slow_write,))
+        steps = asyncio.run(executor.ainvoke({"input": "q"}))["intermediate_steps"]
+        assert WRITES == ["A"]
+        assert [step[1] for step in steps] == ["wrote A #1", "wrote A #1"]
@@ -0,0 +1,102 @@
+"""
+PostgreSQL 连接池测试用例
+验证连接池参数来自配置、生成的CRUD语句文本被复用，以及连接池占用和等待时间统计
+"""
+
+import pytest
+
+from src.infrastructure.database.database_service import DatabaseServiceFactory, PostgreSQLService
+from src.shared.exceptions.exceptions import DatabaseError
+
+
+class FakeConnection:
+    def __init__(self):
+        self.queries = []
+
+    async def execute(self, query, *args):
+        self.queries.append((query, args))
+        return "UPDATE 1"
+
+    async def fetchrow(self, query, *args):
+        self.queries.append((query, args))
+        return {"id": 1}
+
+
+class FakeAcquire:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        self.pool.busy += 1
+        return self.pool.conn
+
+    async def __aexit__(self, *exc):
+        self.pool.busy -= 1
+        return False
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+        self.busy = 0
+
+    def acquire(self):
+        return FakeAcquire(self)
+
+    def get_size(self):
+        return 3
+
+    def get_idle_size(self):
+        return 3 - self.busy
+
+
+@pytest.fixture
+def service():
+    db = PostgreSQLService("localhost", 5432, "test", "user", "pw", max_size=4)
+    db._pool = FakePool()
+    db._connected = True
+    return db
+
+
+class TestPostgreSQLPool:
+    """测试 PostgreSQL 连接池配置与统计"""
+
+    def test_factory_reads_pool_config(self):
+        db = DatabaseServiceFactory.create_service("postgresql", {
+            "pool": {"min_size": 2, "max_size": 20, "statement_cache_size": 256, "command_timeout": 60}
+        })
+        assert (db.min_size, db.max_size, db.statement_cache_size, db.command_timeout) == (2, 20, 256, 60)
+
+        legacy = DatabaseServiceFactory.create_service("postgresql", {"pool_size": 8})
+        assert legacy.max_size == 8
+
+    @pytest.mark.asyncio
+    async def test_generated_statements_are_reused(self, service):
+        await service.update("tasks", {"status": "running"}, {"id": "a"})
+        await service.update("tasks", {"status": "done"}, {"id": "b"})
+        await service.delete("tasks", {"id": "a"})
+        await service.insert("tasks", {"id": "c", "status": "pending"})
+
+        queries = [query for query, _ in service._pool.conn.queries]
+        assert queries[0] is queries[1]
+        assert queries[0] == "UPDATE tasks SET status = $1 WHERE id = $2"
+        assert service._pool.conn.queries[1][1] == ("done", "b")
+        assert queries[2] == "DELETE FROM tasks WHERE id = $1"
+        assert queries[3] == "INSERT INTO tasks (id, status) VALUES ($1, $2) RETURNING id"
+        assert service.get_pool_stats()["cached_statements"] == 3
+
+    @pytest.mark.asyncio
+    async def test_rejects_unsafe_identifiers(self, service):
+        with pytest.raises(DatabaseError):
+            await service.update("tasks", {"status = 'x'; --": 1}, {"id": "a"})
+
+    @pytest.mark.asyncio
+    async def test_pool_stats(self, service):
+        await service.execute("SELECT 1")
+        await service.fetch_one("SELECT 1")
+
+        stats = service.get_pool_stats()
+        assert stats["acquisitions"] == 2
+        assert stats["in_use"] == 0 and stats["utilization"] == 0.0
+        assert stats["max_size"] == 4 and stats["size"] == 3
+        assert stats["max_wait"] >= stats["avg_wait"] >= 0.0
@@ -0,0 +1,180 @@
+"""
+PostgreSQL 事务测试用例
+验证事务固定使用同一个连接、嵌套事务使用保存点，以及异常时回滚并归还连接
+"""
+
+import asyncio
+
+import pytest
+
+from src.infrastructure.database.database_service import PostgreSQLService
+from src.shared.exceptions.exceptions import DatabaseError
+
+
+class FakeTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def start(self):
+        self.savepoint = self.conn.depth > 0
+        self.conn.depth += 1
+        self.conn.log.append("SAVEPOINT" if self.savepoint else "BEGIN")
+
+    async def commit(self):
+        self.conn.depth -= 1
+        self.conn.log.append("RELEASE" if self.savepoint else "COMMIT")
+
+    async def rollback(self):
+        self.conn.depth -= 1
+        self.conn.log.append("ROLLBACK TO" if self.savepoint else "ROLLBACK")
+
+    async def __aenter__(self):
+        await self.start()
+
+    async def __aexit__(self, exc_type, *exc):
+        await (self.rollback() if exc_type else self.commit())
+        return False
+
+
+class FakeConnection:
+    def __init__(self, name):
+        self.name = name
+        self.depth = 0
+        self.log = []
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    async def execute(self, query, *args):
+        self.log.append(query)
+        return "UPDATE 1"
+
+    async def fetchrow(self, query, *args):
+        self.log.append(query)
+        return {"id": 1}
+
+
+class FakeAcquire:
+    """asyncpg 的 acquire() 既可 await 也可 async with"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __await__(self):
+        return self.pool._take().__await__()
+
+    async def __aenter__(self):
+        self.conn = await self.pool._take()
+        return self.conn
+
+    async def __aexit__(self, *exc):
+        await self.pool.release(self.conn)
+        return False
+
+
+class FakePool:
+    def __init__(self):
+        self.created = 0
+        self.in_use = 0
+        self.connections = []
+
+    async def _take(self):
+        self.created += 1
+        self.in_use += 1
+        conn = FakeConnection(f"conn{self.created}")
+        self.connections.append(conn)
+        return conn
+
+    def acquire(self):
+        return FakeAcquire(self)
+
+    async def release(self, conn):
+        self.in_use -= 1
+
+
+@pytest.fixture
+def service():
+    db = PostgreSQLService("localhost", 5432, "test", "user", "pw")
+    db._pool = FakePool()
+    db._connected = True
+    return db
+
+
+class TestPostgreSQLTransaction:
+    """测试 PostgreSQL 事务"""
+
+    @pytest.mark.asyncio
+    async def test_statements_share_pinned_connection(self, service):
+        async with service.transaction():
+            await service.execute("UPDATE a SET x = $1", {"x": 1})
+            await service.insert("a", {"x": 2})
+            await service.update("a", {"x": 3}, {"id": 1})
+
+        pool = service._pool
+        assert pool.created == 1 and pool.in_use == 0
+        log = pool.connections[0].log
+        assert log[0] == "BEGIN" and log[-1] == "COMMIT"
+        assert len(log) == 5
+
+    @pytest.mark.asyncio
+    async def test_nested_transaction_uses_savepoint(self, service):
+        async with service.transaction():
+            await service.execute("UPDATE a SET x = 1")
+            with pytest.raises(ValueError):
+                async with service.transaction():
+                    await service.execute("UPDATE a SET x = 2")
+                    raise ValueError("boom")
+            await service.execute("UPDATE a SET x = 3")
+
+        log = service._pool.connections[0].log
+        assert log == ["BEGIN", "UPDATE a SET x = 1", "SAVEPOINT", "UPDATE a SET x = 2",
+                       "ROLLBACK TO", "UPDATE a SET x = 3", "COMMIT"]
+
+    @pytest.mark.asyncio
+    async def test_error_rolls_back_and_releases(self, service):
+        with pytest.raises(RuntimeError):
+            async with service.transaction():
+                await service.execute("UPDATE a SET x = 1")
+                raise RuntimeError("fail")
+
+        assert service._pool.connections[0].log[-1] == "ROLLBACK"
+        assert service._pool.in_use == 0
+        # 事务结束后语句重新从连接池借用连接
+        await service.execute("SELECT 1")
+        assert service._pool.created == 2
+
+    @pytest.mark.asyncio
+    async def test_commit_without_transaction(self, service):
+        with pytest.raises(DatabaseError):
+            await service.commit_transaction()
+
+    @pytest.mark.asyncio
+    async def test_task_spawned_in_transaction_uses_pool_after_commit(self, service):
+        committed = asyncio.Event()
+
+        async def background_writer():
+            # 模拟事务中启动的后写任务：事务提交后才写入
+            await committed.wait()
+            await service.execute("INSERT INTO b VALUES (1)")
+
+        async with service.transaction():
+            await service.execute("UPDATE a SET x = 1")
+            task = asyncio.create_task(background_writer())
+        committed.set()
+        await task
+
+        pool = service._pool
+        transaction_conn, background_conn = pool.connections
+        assert transaction_conn.log == ["BEGIN", "UPDATE a SET x = 1", "COMMIT"]
+        assert background_conn.log == ["INSERT INTO b VALUES (1)"]
+        assert pool.in_use == 0
+
+    @pytest.mark.asyncio
+    async def test_task_spawned_in_transaction_does_not_join_it(self, service):
+        async with service.transaction():
+            await service.execute("UPDATE a SET x = 1")
+            await asyncio.create_task(service.execute("SELECT 1"))
+
+        transaction_conn, task_conn = service._pool.connections
+        assert transaction_conn.log == ["BEGIN", "UPDATE a SET x = 1", "COMMIT"]
+        assert task_conn.log == ["SELECT 1"]
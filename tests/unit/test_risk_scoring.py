@@ -0,0 +1,107 @@
+"""
+风险评分引擎测试用例
+验证规则表编译、向量化评分和风险评估工具集成
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.shared.exceptions.exceptions import ConfigurationError
+from src.tools.risk_scoring import RiskFactorRule, RiskScoringEngine, risk_scoring_engine
+from src.tools.supply_chain_tools import RiskAssessmentTool
+
+
+class TestRiskFactorRule:
+    """测试因子规则编译"""
+
+    def test_numeric_left_closed(self):
+        """right=false 时阈值落在上一段"""
+        rule = RiskFactorRule.from_config("r", {"type": "numeric", "bins": [0.8, 0.9, 0.95], "scores": [15, 5, -5, -15]})
+        scores = rule.score(np.array([0.79, 0.8, 0.9, 0.95, np.nan]))
+        assert scores.tolist() == [15, 5, -5, -15, 0]
+
+    def test_numeric_right_closed(self):
+        """right=true 时阈值落在下一段"""
+        rule = RiskFactorRule.from_config("d", {"type": "numeric", "bins": [500, 1000], "scores": [0, 5, 15], "right": True})
+        assert rule.score(np.array([500, 501, 1000, 1001])).tolist() == [0, 5, 5, 15]
+
+    def test_categorical_unknown_is_zero(self):
+        rule = RiskFactorRule.from_config("c", {"type": "categorical", "values": {"high": -20, "low": 20}})
+        column = np.array(["high", "low", "unknown", None], dtype=object)
+        assert rule.score(column).tolist() == [-20, 20, 0, 0]
+
+    def test_invalid_scores_length(self):
+        with pytest.raises(ConfigurationError):
+            RiskFactorRule.from_config("x", {"type": "numeric", "bins": [1, 2], "scores": [0, 1]})
+
+
+class TestRiskScoringEngine:
+    """测试评分引擎"""
+
+    def test_supplier_scores_and_ranking(self):
+        suppliers = [
+            {"name": "A", "financial_stability": "high", "delivery_reliability": 0.96, "quality_consistency": 0.99},
+            {"name": "B", "financial_stability": "low", "delivery_reliability": 0.7, "quality_consistency": 0.85},
+            {"name": "C", "delivery_reliability": 0.9},
+            {"financial_stability": "low"},
+        ]
+        result = risk_scoring_engine.score("supplier", suppliers)
+        assert result.names.tolist() == ["B", "C", "A"]
+        assert result.scores.tolist() == [100, 45, 0]
+        assert result.names_at_level("高") == ["B"]
+        assert result.names_at_level("中") == ["C"]
+
+    def test_dataframe_batch(self):
+        """列式批量评分与记录列表结果一致"""
+        rng = np.random.default_rng(0)
+        n = 1000
+        frame = pd.DataFrame({
+            "name": [f"S{i}" for i in range(n)],
+            "financial_stability": rng.choice(["high", "medium", "low"], n),
+            "delivery_reliability": rng.random(n),
+            "quality_consistency": rng.random(n),
+        })
+        by_frame = risk_scoring_engine.score("supplier", frame)
+        by_records = risk_scoring_engine.score("supplier", frame.to_dict("records"))
+        assert by_frame.names.tolist() == by_records.names.tolist()
+        assert np.all(np.diff(by_frame.scores) <= 0)
+
+    def test_custom_rules(self):
+        engine = RiskScoringEngine({
+            "levels": {"thresholds": [50], "labels": ["低", "高"]},
+            "custom": {"entity_key": "items", "base_score": 10, "factors": {
+                "x": {"type": "numeric", "bins": [1], "scores": [0, 60]}
+            }},
+        })
+        result = engine.score("custom", {"name": ["a", "b"], "x": [0, 5]})
+        assert result.to_records() == [
+            {"name": "b", "score": 70.0, "level": "高"},
+            {"name": "a", "score": 10.0, "level": "低"},
+        ]
+
+    def test_unknown_risk_type(self):
+        with pytest.raises(ConfigurationError):
+            risk_scoring_engine.get_table("unknown")
+
+
+class TestRiskAssessmentTool:
+    """测试工具集成"""
+
+    def test_logistics_report(self):
+        tool = RiskAssessmentTool()
+        routes = [
+            {"name": "海运线", "distance": 5000, "transport_mode": "road", "delay_rate": 0.3},
+            {"name": "空运线", "distance": 300, "transport_mode": "air", "delay_rate": 0.01},
+        ]
+        report = tool._run(json.dumps({"routes": routes}), "logistics")
+        assert "1. 海运线: 风险分数 90.0 (高风险)" in report
+        assert "2. 空运线: 风险分数 25.0 (低风险)" in report
+        assert "高风险路线(海运线):" in report
+
+    def test_missing_entities(self):
+        tool = RiskAssessmentTool()
+        assert tool._run(json.dumps({}), "market") == "缺少产品信息，请提供products字段"
+        assert tool._run(json.dumps({"suppliers": {}}), "supplier") == "suppliers字段应为列表格式"
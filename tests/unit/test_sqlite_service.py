@@ -0,0 +1,157 @@
+"""
+SQLite 服务测试用例
+验证 WAL 模式、只读连接池与写连接的读写分离、组提交，以及事务和保存点
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from src.infrastructure.database.database_service import DatabaseServiceFactory, SQLiteService
+from src.shared.exceptions.exceptions import DatabaseError
+
+
+@asynccontextmanager
+async def open_sqlite(path, **kwargs):
+    pytest.importorskip("aiosqlite")
+    service = SQLiteService(str(path), **kwargs)
+    try:
+        await service.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        yield service
+    finally:
+        await service.disconnect()
+
+
+class TestSQLiteService:
+    """测试 SQLite 服务"""
+
+    @pytest.mark.asyncio
+    async def test_wal_pragmas(self, tmp_path):
+        async with open_sqlite(tmp_path / "wal.db") as db:
+            assert (await db.fetch_one("PRAGMA journal_mode"))["journal_mode"] == "wal"
+            async with db.transaction():
+                # 事务中的读取走写连接
+                assert (await db.fetch_one("PRAGMA synchronous"))["synchronous"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writes_are_group_committed(self, tmp_path):
+        async with open_sqlite(tmp_path / "group.db") as db:
+            await asyncio.gather(*(db.insert("items", {"id": i, "name": f"n{i}"}) for i in range(50)))
+
+            assert len(await db.select("items")) == 50
+            stats = db.get_stats()
+            assert stats["commits"] < stats["writes"]
+
+    @pytest.mark.asyncio
+    async def test_failed_write_does_not_abort_batch(self, tmp_path):
+        async with open_sqlite(tmp_path / "batch.db") as db:
+            await db.insert("items", {"id": 1, "name": "a"})
+            results = await asyncio.gather(
+                db.insert("items", {"id": 2, "name": "b"}),
+                db.insert("items", {"id": 1, "name": "duplicate"}),
+                db.insert("items", {"id": 3, "name": "c"}),
+                return_exceptions=True
+            )
+            assert isinstance(results[1], DatabaseError)
+            assert [row["id"] for row in await db.select("items", order_by="id")] == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_reads_not_blocked_by_open_transaction(self, tmp_path):
+        async with open_sqlite(tmp_path / "read.db", read_pool_size=2) as db:
+            await db.insert("items", {"id": 1, "name": "committed"})
+            inside = asyncio.Event()
+            release = asyncio.Event()
+
+            async def writer():
+                async with db.transaction():
+                    await db.insert("items", {"id": 2, "name": "pending"})
+                    inside.set()
+                    await release.wait()
+
+            task = asyncio.create_task(writer())
+            await inside.wait()
+            rows = await asyncio.wait_for(db.select("items"), timeout=2)
+            assert [row["name"] for row in rows] == ["committed"]
+
+            release.set()
+            await task
+            assert len(await db.select("items")) == 2
+
+    @pytest.mark.asyncio
+    async def test_nested_transaction_savepoint(self, tmp_path):
+        async with open_sqlite(tmp_path / "nested.db") as db:
+            async with db.transaction():
+                await db.insert("items", {"id": 1, "name": "outer"})
+                with pytest.raises(ValueError):
+                    async with db.transaction():
+                        await db.insert("items", {"id": 2, "name": "inner"})
+                        raise ValueError("boom")
+            assert [row["name"] for row in await db.select("items")] == ["outer"]
+
+    @pytest.mark.asyncio
+    async def test_task_spawned_in_transaction_writes_after_commit(self, tmp_path):
+        async with open_sqlite(tmp_path / "spawned.db") as db:
+            committed = asyncio.Event()
+
+            async def background_writer():
+                await committed.wait()
+                await db.insert("items", {"id": 2, "name": "background"})
+
+            async with db.transaction():
+                await db.insert("items", {"id": 1, "name": "tx"})
+                task = asyncio.create_task(background_writer())
+            commits = db.get_stats()["commits"]
+            committed.set()
+            await task
+
+            # 后台写入经过写任务的组提交，而不是直接在写连接上执行
+            assert db.get_stats()["commits"] == commits + 1
+            assert len(await db.select("items")) == 2
+
+    @pytest.mark.asyncio
+    async def test_task_spawned_in_transaction_cannot_write_during_it(self, tmp_path):
+        async with open_sqlite(tmp_path / "isolated.db") as db:
+            with pytest.raises(ValueError):
+                async with db.transaction():
+                    await db.insert("items", {"id": 1, "name": "rolled back"})
+                    # 子任务写入需要事务持有的写连接，直接报错而不是加入事务或互相等待
+                    with pytest.raises(DatabaseError):
+                        await asyncio.wait_for(
+                            asyncio.create_task(db.insert("items", {"id": 2, "name": "child"})), timeout=1
+                        )
+                    raise ValueError("boom")
+            assert await db.select("items") == []
+
+    @pytest.mark.asyncio
+    async def test_awaited_write_behind_flush_in_transaction_fails_fast(self, tmp_path):
+        from src.core.services.write_behind import WriteBehindQueue
+
+        async with open_sqlite(tmp_path / "flusher.db") as db:
+            queue = WriteBehindQueue(lambda records: db.insert_many("items", records), flush_interval=0.01)
+            async with db.transaction():
+                with pytest.raises(DatabaseError):
+                    await asyncio.wait_for(queue.enqueue({"id": 1, "name": "durable"}), timeout=1)
+            # 事务结束后后写任务重试成功
+            await queue.close()
+            assert [row["name"] for row in await db.select("items")] == ["durable"]
+
+    @pytest.mark.asyncio
+    async def test_child_read_without_reader_pool_fails_fast(self):
+        async with open_sqlite(":memory:") as db:
+            async with db.transaction():
+                with pytest.raises(DatabaseError):
+                    await asyncio.wait_for(asyncio.create_task(db.select("items")), timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_memory_database_uses_writer_for_reads(self):
+        async with open_sqlite(":memory:") as db:
+            assert db.read_pool_size == 0
+            await db.insert("items", {"id": 1, "name": "a"})
+            assert len(await db.select("items")) == 1
+
+    def test_factory_reads_sqlite_options(self):
+        db = DatabaseServiceFactory.create_service("sqlite", {
+            "path": "./data/test.db", "read_pool_size": 8, "synchronous": "full", "mmap_size": 0
+        })
+        assert (db.read_pool_size, db.synchronous, db.mmap_size) == (8, "full", 0)
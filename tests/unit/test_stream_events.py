@@ -0,0 +1,81 @@
+"""
+流式事件测试用例
+验证最终答案过滤器、SSE格式以及从AgentExecutor产出的类型化事件
+"""
+
+import asyncio
+import json
+
+from langchain.agents import AgentExecutor, create_react_agent
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import tool
+
+from src.agents.shared.stream_events import (
+    AGENT_LLM_TAG,
+    AgentStreamEvent,
+    FinalAnswerStreamFilter,
+    StreamEventType,
+    stream_agent_events
+)
+
+
+@tool
+def inventory_lookup(sku: str) -> str:
+    """查询库存"""
+    return f"{sku}: 120"
+
+
+def collect(events):
+    async def run():
+        return [event async for event in events]
+    return asyncio.run(run())
+
+
+class TestFinalAnswerStreamFilter:
+    """测试最终答案过滤"""
+
+    def test_marker_split_across_tokens(self):
+        stream_filter = FinalAnswerStreamFilter()
+        tokens = ["Thought: 我知道了\nFinal ", "Ans", "wer:", " ", "库存", "充足"]
+        assert "".join(stream_filter.feed(t) for t in tokens) == "库存充足"
+
+    def test_action_step_suppressed(self):
+        stream_filter = FinalAnswerStreamFilter()
+        tokens = ["Thought: 查库存\n", "Action: inventory_lookup\n", "Action Input: A"]
+        assert "".join(stream_filter.feed(t) for t in tokens) == ""
+        assert not stream_filter.found
+
+
+class TestAgentStreamEvent:
+    """测试事件序列化"""
+
+    def test_to_sse(self):
+        frame = AgentStreamEvent(StreamEventType.TOKEN, {"token": "你好"}).to_sse()
+        assert frame.startswith("event: token\ndata: ")
+        assert json.loads(frame.split("data: ", 1)[1]) == {"token": "你好"}
+        assert frame.endswith("\n\n")
+
+
+class TestStreamAgentEvents:
+    """测试智能体事件流"""
+
+    def test_events_from_executor(self):
+        llm = FakeListChatModel(responses=[
+            "Thought: 需要查库存\nAction: inventory_lookup\nAction Input: A",
+            "Thought: 完成\nFinal Answer: A 库存 120 件",
+        ]).with_config(tags=[AGENT_LLM_TAG])
+        prompt = PromptTemplate.from_template("{tools}\n{tool_names}\nQuestion: {input}\nThought:{agent_scratchpad}")
+        executor = AgentExecutor(agent=create_react_agent(llm, [inventory_lookup], prompt), tools=[inventory_lookup])
+
+        events = collect(stream_agent_events(executor, {"input": "A 的库存"}))
+        types = [event.type for event in events]
+
+        assert types[0] == StreamEventType.TOOL_START
+        assert types[1] == StreamEventType.TOOL_END
+        assert types[-1] == StreamEventType.FINAL
+        tokens = [event.data["token"] for event in events if event.type == StreamEventType.TOKEN]
+        assert len(tokens) > 1
+        assert "".join(tokens) == "A 库存 120 件"
+        assert events[-1].data["output"] == "A 库存 120 件"
+        assert events[1].data["output"] == "A: 120"
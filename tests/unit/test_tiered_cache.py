@@ -0,0 +1,205 @@
+"""
+二级缓存测试用例
+验证L1/L2读写路径、write_behind合并写入、失效广播与分层命中统计
+"""
+
+import asyncio
+
+import pytest
+
+from src.infrastructure.cache.cache_service import MemoryCacheService
+from src.infrastructure.cache.tiered_cache import WRITE_BEHIND, TieredCacheService
+
+
+class FakeBroker:
+    """进程内的发布订阅，模拟 Redis pub/sub"""
+
+    def __init__(self):
+        self.subscribers = []
+
+    async def publish(self, channel, message):
+        for cache in self.subscribers:
+            await cache.handle_invalidation(message)
+        return len(self.subscribers)
+
+
+class SharedL2(MemoryCacheService):
+    """共享的L2缓存，记录写入次数并支持发布消息"""
+
+    def __init__(self, broker):
+        super().__init__()
+        self.broker = broker
+        self.writes = 0
+
+    async def set(self, key, value, expire=None):
+        self.writes += 1
+        return await super().set(key, value, expire)
+
+    async def publish(self, channel, message):
+        return await self.broker.publish(channel, message)
+
+
+@pytest.fixture
+def broker():
+    return FakeBroker()
+
+
+def make_cache(l2, broker, **kwargs):
+    cache = TieredCacheService(l2=l2, **kwargs)
+    broker.subscribers.append(cache)
+    return cache
+
+
+class TestTieredCacheService:
+    """测试二级缓存"""
+
+    @pytest.mark.asyncio
+    async def test_read_path_fills_l1(self, broker):
+        l2 = SharedL2(broker)
+        await l2.set("session:1", {"user": "a"})
+        cache = make_cache(l2, broker)
+
+        assert await cache.get("session:1") == {"user": "a"}
+        assert await cache.get("session:1") == {"user": "a"}
+        assert await cache.get("missing") is None
+
+        stats = cache.get_stats()
+        assert (stats["l1_hits"], stats["l2_hits"], stats["misses"]) == (1, 1, 1)
+        assert stats["l2_hit_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_write_through_invalidates_other_workers(self, broker):
+        l2 = SharedL2(broker)
+        worker_a = make_cache(l2, broker)
+        worker_b = make_cache(l2, broker)
+
+        await worker_a.set("task:1", "pending")
+        assert await worker_b.get("task:1") == "pending"  # 回填B的L1
+
+        await worker_a.set("task:1", "done")
+        assert await worker_b.get("task:1") == "done"
+        assert worker_b.get_stats()["invalidations_received"] == 2
+        assert worker_a.get_stats()["invalidations_received"] == 0
+
+        await worker_b.delete("task:1")
+        assert await worker_a.get("task:1") is None
+
+    @pytest.mark.asyncio
+    async def test_write_behind_coalesces_writes(self, broker):
+        l2 = SharedL2(broker)
+        cache = make_cache(l2, broker, write_policy=WRITE_BEHIND, flush_interval=0.01)
+
+        for i in range(5):
+            await cache.set("counter", i)
+        assert await cache.get("counter") == 4
+        assert l2.writes == 0
+
+        await asyncio.sleep(0.05)
+        assert l2.writes == 1
+        assert await l2.get("counter") == 4
+        assert cache.get_stats()["pending_writes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_l1_ttl_caps_entry_lifetime(self, broker):
+        cache = make_cache(SharedL2(broker), broker, l1_ttl=30)
+        await cache.set("k", "v", expire=3600)
+        assert await cache.l1.ttl("k") == 30
+        assert await cache.l2.ttl("k") == 3600
+
+    def test_invalid_write_policy(self, broker):
+        with pytest.raises(Exception):
+            TieredCacheService(l2=SharedL2(broker), write_policy="lazy")
+
+
+class SlowL2(SharedL2):
+    """批量写入需要等待放行，可以在写入途中执行其他操作"""
+
+    def __init__(self, broker):
+        super().__init__(broker)
+        self.release = asyncio.Event()
+        self.fail = False
+        self.attempts = []
+
+    async def set_many(self, mapping, expire=None):
+        self.attempts.append(asyncio.get_running_loop().time())
+        await self.release.wait()
+        if self.fail:
+            raise ConnectionError("L2 不可用")
+        return await super().set_many(mapping, expire)
+
+
+class TestWriteBehindConsistency:
+    """write_behind 写回与删除的并发一致性"""
+
+    @pytest.mark.asyncio
+    async def test_delete_during_flush_is_not_resurrected(self, broker):
+        l2 = SlowL2(broker)
+        cache = make_cache(l2, broker, write_policy=WRITE_BEHIND, flush_interval=60)
+        await cache.set_many({"a": 1, "b": 2})
+
+        flushing = asyncio.create_task(cache.flush())
+        await asyncio.sleep(0)
+        await cache.delete("a")
+        await cache.delete_many(["b"])
+        l2.release.set()
+        await flushing
+
+        assert await l2.get("a") is None
+        assert await l2.get("b") is None
+        assert await cache.get("a") is None
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_does_not_requeue_deleted_keys(self, broker):
+        l2 = SlowL2(broker)
+        l2.fail = True
+        cache = make_cache(l2, broker, write_policy=WRITE_BEHIND, flush_interval=60)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+
+        flushing = asyncio.create_task(cache.flush())
+        await asyncio.sleep(0)
+        await cache.delete("a")
+        await cache.set("b", 3)
+        l2.release.set()
+        assert await flushing == 0
+
+        assert "a" not in cache._pending
+        assert cache._pending["b"][0] == 3
+        assert cache.get_stats()["l2_write_errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_flush_loop_backs_off_while_l2_fails(self, broker):
+        l2 = SlowL2(broker)
+        l2.fail = True
+        l2.release.set()
+        cache = make_cache(l2, broker, write_policy=WRITE_BEHIND, flush_interval=0.01)
+        await cache.set("a", 1)
+
+        await asyncio.sleep(0.2)
+        cache._flush_task.cancel()
+        gaps = [later - earlier for earlier, later in zip(l2.attempts, l2.attempts[1:])]
+        # 0.01 + 0.02 + 0.04 + 0.08 ...，固定间隔重试会超过 10 次
+        assert 2 <= len(l2.attempts) <= 5
+        assert gaps == sorted(gaps)
+
+        l2.fail = False
+        assert await cache.flush() == 1
+        assert cache._flush_failures == 0
+
+
+class TestTieredFactory:
+    """工厂创建二级缓存"""
+
+    def test_l2_uses_shared_redis_connection(self, monkeypatch):
+        from src.config.config_loader import config_loader
+        from src.infrastructure.cache.cache_service import CacheServiceFactory
+
+        services = {"services": {
+            "redis": {"host": "redis.internal", "port": 6380, "password": "secret"},
+            "cache": {"redis": {"codec": "json"}},
+        }}
+        monkeypatch.setattr(config_loader, "get_services_config", lambda: services)
+
+        cache = CacheServiceFactory.create_service("tiered", {"write_policy": "write_behind", "db": 2, "l1": {"ttl": 5}})
+        assert (cache.l2.host, cache.l2.port, cache.l2.db, cache.l2.password) == ("redis.internal", 6380, 2, "secret")
+        assert cache.l1_ttl == 5
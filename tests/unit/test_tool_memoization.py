@@ -0,0 +1,116 @@
+"""
+工具结果记忆化测试用例
+验证输入指纹、缓存命中与淘汰，以及与内置工具的集成
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.agents.shared.tool_memoization import ToolResultMemoizer, tool_input_fingerprint
+from src.tools.supply_chain_tools import OptimizationEngineTool
+
+
+class DictCache:
+    """测试用的异步字典缓存，接口与 CacheService 一致"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, expire=None):
+        self.data[key] = value
+        return True
+
+    async def delete(self, key):
+        return self.data.pop(key, None) is not None
+
+
+@pytest.fixture
+def memoizer():
+    return ToolResultMemoizer(cache_service=DictCache(), max_entries=2)
+
+
+class TestFingerprint:
+    """测试输入指纹"""
+
+    def test_json_key_order_and_whitespace_ignored(self):
+        a = tool_input_fingerprint("t", ('{"a": 1, "b": [1, 2]}', "eoq"), {})
+        b = tool_input_fingerprint("t", (' {"b":[1,2],"a":1}', "eoq"), {})
+        assert a == b
+
+    def test_run_manager_ignored(self):
+        assert tool_input_fingerprint("t", ("x",), {"run_manager": object()}) == tool_input_fingerprint("t", ("x",), {})
+
+    def test_different_inputs(self):
+        assert tool_input_fingerprint("t", ("x",), {}) != tool_input_fingerprint("u", ("x",), {})
+        assert tool_input_fingerprint("t", ('{"a": 1}',), {}) != tool_input_fingerprint("t", ('{"a": 2}',), {})
+
+
+class TestToolResultMemoizer:
+    """测试记忆化层"""
+
+    def test_sync_hit_and_stats(self, memoizer):
+        tool = memoizer.wrap_tool(OptimizationEngineTool())
+        data = json.dumps({"annual_demand": 1000, "holding_cost": 2, "order_cost": 50})
+        first = tool._run(data, "inventory")
+        second = tool._run(json.dumps(json.loads(data), indent=2), "inventory")
+        assert first == second
+
+        stats = memoizer.get_stats()
+        assert stats["tools"]["optimization_engine"]["hits"] == 1
+        assert stats["tools"]["optimization_engine"]["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_cached_none_is_hit(self, memoizer):
+        calls = []
+
+        class NoneTool(OptimizationEngineTool):
+            def _run(self, data: str, optimization_type: str) -> str:
+                calls.append(data)
+                return None
+
+        tool = memoizer.wrap_tool(NoneTool())
+        assert tool._run("x", "inventory") is None
+        assert tool._run("x", "inventory") is None
+        assert len(calls) == 1
+
+    def test_lru_eviction(self, memoizer):
+        tool = memoizer.wrap_tool(OptimizationEngineTool())
+        for value in (1, 2, 3):
+            tool._run(json.dumps({"annual_demand": value * 100}), "inventory")
+        assert memoizer.get_stats()["entries"] == 2
+        assert len(memoizer.cache.data) == 2
+
+    def test_async_path_shares_cache(self, memoizer):
+        tool = memoizer.wrap_tool(OptimizationEngineTool())
+        data = json.dumps({"annual_demand": 500})
+        sync_result = tool._run(data, "inventory")
+        async_result = asyncio.run(tool._arun(data, "inventory"))
+        assert async_result == sync_result
+        assert memoizer.get_stats()["hits"] == 1
+
+    def test_async_miss_counted_once(self, memoizer):
+        tool = memoizer.wrap_tool(OptimizationEngineTool())
+        data = json.dumps({"annual_demand": 800})
+
+        async def run_twice():
+            return await tool._arun(data, "inventory"), await tool._arun(data, "inventory")
+
+        first, second = asyncio.run(run_twice())
+        assert first == second
+        stats = memoizer.get_stats()["tools"]["optimization_engine"]
+        assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+        assert memoizer.get_stats()["entries"] == 1
+
+    def test_wrap_is_idempotent_and_keeps_schema(self, memoizer):
+        tool = OptimizationEngineTool()
+        fields_before = set(tool.args)
+        memoizer.wrap_tool(tool)
+        memoizer.wrap_tool(tool)
+        assert set(tool.args) == fields_before
+        tool._run("{}", "inventory")
+        assert memoizer.get_stats()["misses"] == 1
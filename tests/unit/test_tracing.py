@@ -0,0 +1,129 @@
+"""
+链路追踪测试用例
+验证span树构建、LangChain回调采集、对话历史追踪与OTLP文件导出
+"""
+
+import json
+
+import pytest
+from langchain.agents import AgentExecutor, create_react_agent
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables.history import RunnableWithMessageHistory
+from langchain_core.tools import tool
+
+from src.infrastructure.monitoring.tracing import (
+    FileSpanExporter,
+    TracedChatMessageHistory,
+    Tracer,
+    summarize_trace
+)
+
+
+@tool
+def demand_forecast(sku: str) -> str:
+    """预测需求"""
+    return f"{sku}: 300"
+
+
+def build_executor():
+    llm = FakeListChatModel(responses=[
+        "Thought: 预测\nAction: demand_forecast\nAction Input: A",
+        "Thought: 完成\nFinal Answer: 300",
+    ])
+    prompt = PromptTemplate.from_template(
+        "{tools}\n{tool_names}\n{chat_history}\nQuestion: {input}\nThought:{agent_scratchpad}"
+    )
+    agent = create_react_agent(llm, [demand_forecast], prompt)
+    return AgentExecutor(agent=agent, tools=[demand_forecast])
+
+
+class TestTracer:
+    """测试追踪器"""
+
+    def test_nested_spans(self):
+        tracer = Tracer(exporters=[])
+        with tracer.trace_turn("turn") as root:
+            with tracer.span("outer") as outer:
+                with tracer.span("inner"):
+                    pass
+        assert [child.name for child in root.children] == ["outer"]
+        assert outer.children[0].parent_id == outer.span_id
+        assert outer.children[0].trace_id == root.trace_id
+        assert tracer.current_span() is None
+
+    def test_span_outside_turn_is_noop(self):
+        tracer = Tracer(exporters=[])
+        with tracer.span("orphan") as span:
+            assert span is None
+
+    def test_error_recorded(self):
+        tracer = Tracer(exporters=[])
+        with pytest.raises(ValueError):
+            with tracer.trace_turn() as root:
+                with tracer.span("step"):
+                    raise ValueError("bad")
+        assert root.status == "error"
+        assert root.children[0].attributes["error.type"] == "ValueError"
+
+    def test_disabled_tracer(self):
+        tracer = Tracer(enabled=False)
+        assert tracer.begin_turn() is None
+        tracer.end_turn(None)
+
+
+class TestAgentTracing:
+    """测试智能体执行的span采集"""
+
+    def test_breakdown_from_callbacks_and_history(self):
+        tracer = Tracer(exporters=[])
+        history = InMemoryChatMessageHistory()
+        runnable = RunnableWithMessageHistory(
+            build_executor(),
+            lambda session_id: TracedChatMessageHistory(history, tracer),
+            input_messages_key="input",
+            history_messages_key="chat_history",
+        )
+
+        with tracer.trace_turn("agent.run") as turn:
+            runnable.invoke(
+                {"input": "A 的需求"},
+                config={"configurable": {"session_id": "s"}, "callbacks": [tracer.callback_handler(turn)]}
+            )
+        summary = summarize_trace(turn)
+
+        assert set(summary["breakdown_ms"]) >= {"llm", "tool", "parse", "prompt_build", "memory_load", "memory_save"}
+        assert summary["llm_usage"]["calls"] == 2
+        tool_spans = [span for span in summary["spans"] if span["name"] == "tool.demand_forecast"]
+        assert tool_spans and tool_spans[0]["tool.name"] == "demand_forecast"
+        assert len(history.messages) == 2
+
+    def test_file_exporter_writes_otlp_json(self, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        tracer = Tracer(service_name="test-agent", exporters=[FileSpanExporter(str(path))])
+        with tracer.trace_turn("agent.run", session_id="s"):
+            with tracer.span("output.format", category="output_format"):
+                pass
+        assert tracer.flush(timeout=2)
+
+        payload = json.loads(path.read_text(encoding="utf-8").strip())
+        resource_spans = payload["resourceSpans"][0]
+        assert resource_spans["resource"]["attributes"][0]["value"]["stringValue"] == "test-agent"
+        spans = resource_spans["scopeSpans"][0]["spans"]
+        assert [span["name"] for span in spans] == ["agent.run", "output.format"]
+        assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+        assert len(spans[0]["traceId"]) == 32
+
+    def test_file_exporter_rotates_at_max_bytes(self, tmp_path):
+        path = tmp_path / "traces.jsonl"
+        exporter = FileSpanExporter(str(path), max_bytes=600, backup_count=2)
+        tracer = Tracer(service_name="test-agent", exporters=[exporter])
+        for _ in range(8):
+            with tracer.trace_turn("agent.run"):
+                pass
+        assert tracer.flush(timeout=2)
+
+        files = sorted(p.name for p in tmp_path.iterdir())
+        assert files == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"]
+        assert all((tmp_path / name).stat().st_size <= 600 for name in files)